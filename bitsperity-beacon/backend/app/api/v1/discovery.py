@@ -2,10 +2,11 @@
 Discovery API Endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 import structlog
 
-from app.core.service_registry import ServiceRegistry
+from app.core.service_registry import ServiceRegistry, decode_page_cursor
+from app.core.response_encoding import parse_fields, dump_list_response, encode_response
 from app.schemas.discovery import DiscoveryResponse, ServiceDiscoveryFilter
 from app.schemas.service import ServiceResponse
 
@@ -19,23 +20,39 @@ from app.api.v1.services import get_service_registry
 
 @router.get("/discover", response_model=DiscoveryResponse)
 async def discover_services(
+    request: Request,
     type: Optional[str] = Query(None, description="Filter by service type"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
     protocol: Optional[str] = Query(None, description="Filter by protocol"),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(50, ge=1, le=100, description="Limit results"),
-    skip: int = Query(0, ge=0, description="Skip results"),
+    skip: int = Query(0, ge=0, description="Skip results (legacy, prefer cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor from previous page (next_cursor)"),
+    fields: Optional[str] = Query(None, description="Comma separated service fields, e.g. host,port,type"),
     registry: ServiceRegistry = Depends(get_service_registry)
 ):
     """Entdecke Services (Legacy/Backup API für mDNS)"""
     try:
-        services = await registry.discover_services(
+        after = decode_page_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected_fields = parse_fields(fields)
+    
+    try:
+        services, next_cursor = await registry.discover_services_page(
             service_type=type,
             tags=tags,
             protocol=protocol,
             status=status,
             limit=limit,
-            skip=skip
+            skip=skip,
+            after=after
+        )
+        total = await registry.count_services(
+            service_type=type,
+            tags=tags,
+            protocol=protocol,
+            status=status
         )
         
         service_responses = [ServiceResponse(**service.model_dump()) for service in services]
@@ -51,12 +68,14 @@ async def discover_services(
         if status:
             filters_applied["status"] = status
         
-        return DiscoveryResponse(
+        response = DiscoveryResponse(
             services=service_responses,
-            total=len(service_responses),
+            total=total,
             filters_applied=filters_applied,
-            discovery_method="api"
+            discovery_method="api",
+            next_cursor=next_cursor
         )
+        return await encode_response(request, dump_list_response(response, selected_fields))
         
     except Exception as e:
         logger.error("Fehler beim Service Discovery", error=str(e))
@@ -65,20 +84,36 @@ async def discover_services(
 
 @router.post("/discover", response_model=DiscoveryResponse)
 async def discover_services_with_filter(
+    request: Request,
     filter_data: ServiceDiscoveryFilter,
     limit: int = Query(50, ge=1, le=100, description="Limit results"),
-    skip: int = Query(0, ge=0, description="Skip results"),
+    skip: int = Query(0, ge=0, description="Skip results (legacy, prefer cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor from previous page (next_cursor)"),
+    fields: Optional[str] = Query(None, description="Comma separated service fields, e.g. host,port,type"),
     registry: ServiceRegistry = Depends(get_service_registry)
 ):
     """Entdecke Services mit POST Filter"""
     try:
-        services = await registry.discover_services(
+        after = decode_page_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected_fields = parse_fields(fields)
+    
+    try:
+        services, next_cursor = await registry.discover_services_page(
             service_type=filter_data.type,
             tags=filter_data.tags,
             protocol=filter_data.protocol,
             status=filter_data.status,
             limit=limit,
-            skip=skip
+            skip=skip,
+            after=after
+        )
+        total = await registry.count_services(
+            service_type=filter_data.type,
+            tags=filter_data.tags,
+            protocol=filter_data.protocol,
+            status=filter_data.status
         )
         
         service_responses = [ServiceResponse(**service.model_dump()) for service in services]
@@ -94,12 +129,14 @@ async def discover_services_with_filter(
         if filter_data.status:
             filters_applied["status"] = filter_data.status
         
-        return DiscoveryResponse(
+        response = DiscoveryResponse(
             services=service_responses,
-            total=len(service_responses),
+            total=total,
             filters_applied=filters_applied,
-            discovery_method="api"
+            discovery_method="api",
+            next_cursor=next_cursor
         )
+        return await encode_response(request, dump_list_response(response, selected_fields))
         
     except Exception as e:
         logger.error("Fehler beim Service Discovery", error=str(e))
@@ -7,11 +7,21 @@ import structlog
 
 from app.database import database
 from app.config import settings
+from app.core.asgi_middleware import request_latency
 
 logger = structlog.get_logger(__name__)
 
 router = APIRouter()
 
+# Wird beim Start gesetzt (app.main)
+health_check_manager = None
+
+
+def set_health_check_manager(manager) -> None:
+    """Setze Health Check Manager für /metrics"""
+    global health_check_manager
+    health_check_manager = manager
+
 
 class HealthResponse(BaseModel):
     """Health Check Response Schema"""
@@ -79,4 +89,13 @@ async def readiness_check():
 @router.get("/live")
 async def liveness_check():
     """Liveness Check für Kubernetes/Docker"""
-    return {"status": "alive"} 
\ No newline at end of file
+    return {"status": "alive"} 
+
+
+@router.get("/metrics")
+async def metrics():
+    """Latenz Histogramme pro Route (seit Start) und Health Check Worker"""
+    return {
+        "http": request_latency.get_stats(),
+        "health_checks": health_check_manager.get_stats() if health_check_manager else None
+    }
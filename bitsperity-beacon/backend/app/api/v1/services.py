@@ -2,14 +2,16 @@
 Services API Endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import JSONResponse
 import structlog
 
 from app.core.json_encoder import jsonable_encoder as custom_jsonable_encoder
+from app.core.response_encoding import parse_fields, dump_list_response, encode_response
 
 from app.database import get_database, Database
-from app.core.service_registry import ServiceRegistry
+from app.config import settings
+from app.core.service_registry import DatabaseUnavailableError, ServiceRegistry, decode_page_cursor
 from app.core.mdns_base import MDNSServerBase
 from app.core.websocket_manager import WebSocketManager
 from app.schemas.service import (
@@ -17,6 +19,7 @@ from app.schemas.service import (
     ServiceUpdate, 
     ServiceResponse, 
     ServiceListResponse,
+    ServiceStatsResponse,
     HeartbeatResponse
 )
 from app.models.service import ServiceStatus
@@ -52,14 +55,46 @@ def get_websocket_manager() -> WebSocketManager:
     return websocket_manager
 
 
+def reject_if_limited(retry_after: int) -> None:
+    """429 mit Retry-After, wenn die Admission Control die Anfrage ablehnt"""
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Zu viele Anfragen",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+def database_unavailable(error: DatabaseUnavailableError) -> HTTPException:
+    """503 mit Retry-After, solange die Registry nur aus dem Snapshot läuft"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={"Retry-After": str(settings.database_reconnect_interval)}
+    )
+
+
+def client_address(request: Request, registry: ServiceRegistry) -> Optional[str]:
+    """Client Adresse für Admission Control (X-Forwarded-For nur von TRUSTED_PROXIES)"""
+    peer = request.client.host if request.client else None
+    return registry.admission.client_key(peer, request.headers)
+
+
 @router.post("/register", status_code=201)
 async def register_service(
     service_data: ServiceCreate,
+    request: Request,
     registry: ServiceRegistry = Depends(get_service_registry),
     mdns: MDNSServerBase = Depends(get_mdns_server),
     ws_manager: WebSocketManager = Depends(get_websocket_manager)
 ):
     """Registriere einen neuen Service"""
+    reject_if_limited(registry.admission.check(
+        "register",
+        client_address(request, registry),
+        (service_data.name, service_data.host, service_data.port)
+    ))
+    
     try:
         logger.info("=== SERVICE REGISTRATION START ===", service_data=service_data.model_dump())
         
@@ -85,7 +120,7 @@ async def register_service(
         try:
             service_dict = custom_jsonable_encoder(service)
             logger.info("Service dict encoded successfully", service_dict_keys=list(service_dict.keys()))
-            # await ws_manager.broadcast_service_registered(service_dict)
+            await ws_manager.broadcast_service_registered(service_dict)
         except Exception as ws_error:
             logger.error("WebSocket broadcast failed", error=str(ws_error), exc_info=True)
         
@@ -103,6 +138,8 @@ async def register_service(
             logger.debug("jsonable_encoder result", result=custom_jsonable_encoder(service))
             
             service_dict = custom_jsonable_encoder(service)
+            # Erster Heartbeat bereits verteilt (wichtig nach gleichzeitigen Registrierungen)
+            service_dict["next_heartbeat_at"] = registry.schedule_next_heartbeat(service).isoformat()
             logger.info("Service dict for response created successfully")
             logger.info("=== SERVICE REGISTRATION SUCCESS ===")
             return JSONResponse(content=service_dict)
@@ -134,6 +171,8 @@ async def register_service(
                 logger.error("Fallback serialization also failed", error=str(fallback_error))
                 raise
         
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
     except Exception as e:
         logger.error("Fehler bei Service Registrierung", 
                     error=str(e), 
@@ -142,6 +181,67 @@ async def register_service(
         raise HTTPException(status_code=500, detail=f"Service Registrierung fehlgeschlagen: {str(e)}")
 
 
+@router.get("/stats", response_model=ServiceStatsResponse)
+async def get_service_stats(
+    registry: ServiceRegistry = Depends(get_service_registry),
+    ws_manager: WebSocketManager = Depends(get_websocket_manager)
+):
+    """Hole Anzahl der Services pro Type, Tag, Protocol und Status"""
+    return ServiceStatsResponse(**registry.get_stats(), websocket=ws_manager.get_journal_stats())
+
+
+@router.get("/types", response_model=List[str])
+async def get_service_types(
+    registry: ServiceRegistry = Depends(get_service_registry)
+):
+    """Hole alle verfügbaren Service Types"""
+    try:
+        types = await registry.get_service_types()
+        return types
+        
+    except Exception as e:
+        logger.error("Fehler beim Laden der Service Types", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Service Types laden fehlgeschlagen: {str(e)}")
+
+
+@router.get("/tags", response_model=List[str])
+async def get_service_tags(
+    registry: ServiceRegistry = Depends(get_service_registry)
+):
+    """Hole alle verfügbaren Service Tags"""
+    try:
+        tags = await registry.get_service_tags()
+        return tags
+        
+    except Exception as e:
+        logger.error("Fehler beim Laden der Service Tags", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Service Tags laden fehlgeschlagen: {str(e)}")
+
+
+@router.get("/expired", response_model=ServiceListResponse)
+async def get_expired_services(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma separated service fields, e.g. host,port,type"),
+    registry: ServiceRegistry = Depends(get_service_registry)
+):
+    """Hole alle abgelaufenen Services"""
+    selected_fields = parse_fields(fields)
+    
+    try:
+        expired_services = await registry.get_expired_services()
+        service_responses = [ServiceResponse(**service.model_dump()) for service in expired_services]
+        
+        response = ServiceListResponse(
+            services=service_responses,
+            total=len(service_responses)
+        )
+        return await encode_response(request, dump_list_response(response, selected_fields))
+        
+    except Exception as e:
+        logger.error("Fehler beim Laden abgelaufener Services", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Abgelaufene Services laden fehlgeschlagen: {str(e)}")
+
+
 @router.get("/{service_id}", response_model=ServiceResponse)
 async def get_service(
     service_id: str,
@@ -183,6 +283,8 @@ async def update_service(
         
         return ServiceResponse(**service.model_dump())
         
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
     except Exception as e:
         logger.error("Fehler bei Service Update", service_id=service_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Service Update fehlgeschlagen: {str(e)}")
@@ -191,31 +293,43 @@ async def update_service(
 @router.put("/{service_id}/heartbeat", response_model=HeartbeatResponse)
 async def service_heartbeat(
     service_id: str,
+    request: Request,
     ttl: Optional[int] = Query(None, description="TTL in Sekunden"),
     registry: ServiceRegistry = Depends(get_service_registry),
     ws_manager: WebSocketManager = Depends(get_websocket_manager)
 ):
     """Service Heartbeat - verlängere TTL"""
+    reject_if_limited(registry.admission.check("heartbeat", client_address(request, registry), service_id))
+    
     try:
-        service = await registry.extend_service_ttl(service_id, ttl)
-        if not service:
-            raise HTTPException(status_code=404, detail="Service nicht gefunden")
-        
-        # Broadcast WebSocket Update
-        await ws_manager.broadcast_service_heartbeat(
-            service_id, 
-            service.expires_at.isoformat()
-        )
+        # Deutlich verfrühte Heartbeats ohne DB Write beantworten
+        service = registry.absorb_early_heartbeat(service_id, ttl)
+        absorbed = service is not None
+        if not absorbed:
+            service = await registry.extend_service_ttl(service_id, ttl)
+            if not service:
+                raise HTTPException(status_code=404, detail="Service nicht gefunden")
+            
+            # Broadcast WebSocket Update
+            await ws_manager.broadcast_service_heartbeat(
+                service_id, 
+                service.expires_at.isoformat()
+            )
         
-        logger.debug("Service Heartbeat empfangen", service_id=service_id)
+        logger.debug("Service Heartbeat empfangen", event_type="heartbeat", service_id=service_id)
         
         return HeartbeatResponse(
             service_id=service.service_id,
             status=service.status,
             expires_at=service.expires_at,
-            last_heartbeat=service.last_heartbeat
+            last_heartbeat=service.last_heartbeat,
+            next_heartbeat_at=registry.schedule_next_heartbeat(service, absorbed)
         )
         
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Fehler bei Service Heartbeat", service_id=service_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Heartbeat fehlgeschlagen: {str(e)}")
@@ -261,6 +375,8 @@ async def deregister_service(
             "mdns_deregistered": mdns_success
         })
         
+    except DatabaseUnavailableError as e:
+        raise database_unavailable(e)
     except HTTPException:
         raise
     except Exception as e:
@@ -283,86 +399,57 @@ async def get_service_status(
 
 @router.get("/", response_model=ServiceListResponse)
 async def list_services(
+    request: Request,
     type: Optional[str] = Query(None, description="Filter by service type"),
     tags: Optional[List[str]] = Query(None, description="Filter by tags"),
     protocol: Optional[str] = Query(None, description="Filter by protocol"),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(50, ge=1, le=100, description="Limit results"),
-    skip: int = Query(0, ge=0, description="Skip results"),
+    skip: int = Query(0, ge=0, description="Skip results (legacy, prefer cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor from previous page (next_cursor)"),
+    fields: Optional[str] = Query(None, description="Comma separated service fields, e.g. host,port,type"),
     registry: ServiceRegistry = Depends(get_service_registry)
 ):
     """Liste alle Services mit optionalen Filtern"""
     try:
-        services = await registry.discover_services(
+        after = decode_page_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected_fields = parse_fields(fields)
+    
+    try:
+        services, next_cursor = await registry.discover_services_page(
             service_type=type,
             tags=tags,
             protocol=protocol,
             status=status,
             limit=limit,
-            skip=skip
+            skip=skip,
+            after=after
+        )
+        total = await registry.count_services(
+            service_type=type,
+            tags=tags,
+            protocol=protocol,
+            status=status
         )
         
         service_responses = [ServiceResponse(**service.model_dump()) for service in services]
         
-        return ServiceListResponse(
+        response = ServiceListResponse(
             services=service_responses,
-            total=len(service_responses),
+            total=total,
             page=skip // limit + 1,
-            page_size=limit
+            page_size=limit,
+            next_cursor=next_cursor
         )
+        return await encode_response(request, dump_list_response(response, selected_fields))
         
     except Exception as e:
         logger.error("Fehler beim Laden der Services", error=str(e))
         raise HTTPException(status_code=500, detail=f"Services laden fehlgeschlagen: {str(e)}")
 
 
-@router.get("/types", response_model=List[str])
-async def get_service_types(
-    registry: ServiceRegistry = Depends(get_service_registry)
-):
-    """Hole alle verfügbaren Service Types"""
-    try:
-        types = await registry.get_service_types()
-        return types
-        
-    except Exception as e:
-        logger.error("Fehler beim Laden der Service Types", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Service Types laden fehlgeschlagen: {str(e)}")
-
-
-@router.get("/tags", response_model=List[str])
-async def get_service_tags(
-    registry: ServiceRegistry = Depends(get_service_registry)
-):
-    """Hole alle verfügbaren Service Tags"""
-    try:
-        tags = await registry.get_service_tags()
-        return tags
-        
-    except Exception as e:
-        logger.error("Fehler beim Laden der Service Tags", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Service Tags laden fehlgeschlagen: {str(e)}")
-
-
-@router.get("/expired", response_model=ServiceListResponse)
-async def get_expired_services(
-    registry: ServiceRegistry = Depends(get_service_registry)
-):
-    """Hole alle abgelaufenen Services"""
-    try:
-        expired_services = await registry.get_expired_services()
-        service_responses = [ServiceResponse(**service.model_dump()) for service in expired_services]
-        
-        return ServiceListResponse(
-            services=service_responses,
-            total=len(service_responses)
-        )
-        
-    except Exception as e:
-        logger.error("Fehler beim Laden abgelaufener Services", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Abgelaufene Services laden fehlgeschlagen: {str(e)}")
-
-
 # Setze globale Instanzen (wird von main.py aufgerufen)
 def set_dependencies(
     registry: ServiceRegistry,
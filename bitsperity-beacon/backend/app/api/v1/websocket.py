@@ -1,6 +1,7 @@
 """
 WebSocket API Endpoints
 """
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
 import structlog
 
@@ -28,12 +29,14 @@ router = APIRouter()
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
-    client_id: str = Query(None, description="Optional client ID")
+    client_id: str = Query(None, description="Optional client ID"),
+    resume_from: Optional[int] = Query(None, description="Last received seq - replay missed events"),
+    epoch: Optional[str] = Query(None, description="Epoch from connection_established")
 ):
     """WebSocket Endpoint für Real-time Updates"""
     ws_manager = get_websocket_manager()
     
-    await ws_manager.connect(websocket, client_id)
+    await ws_manager.connect(websocket, client_id, resume_from=resume_from, epoch=epoch)
     
     try:
         while True:
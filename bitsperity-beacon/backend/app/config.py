@@ -29,9 +29,16 @@ class Settings(BaseSettings):
     database_name: str = Field(default="beacon", env="DATABASE_NAME")
     services_collection: str = Field(default="services", env="SERVICES_COLLECTION")
     health_checks_collection: str = Field(default="health_checks", env="HEALTH_CHECKS_COLLECTION")
+    leases_collection: str = Field(default="leases", env="LEASES_COLLECTION")
+    # Storage Backend: "mongodb", "sqlite" oder "memory"
+    storage_backend: str = Field(default="mongodb", env="STORAGE_BACKEND")
+    sqlite_path: str = Field(default="/app/data/beacon.sqlite3", env="SQLITE_PATH")
+    sqlite_commit_interval: float = Field(default=0.2, env="SQLITE_COMMIT_INTERVAL")
+    sqlite_max_pending_writes: int = Field(default=1000, env="SQLITE_MAX_PENDING_WRITES")
     
     # API Configuration
     api_prefix: str = Field(default="/api/v1", env="API_PREFIX")
+    service_count_cache_ttl: int = Field(default=5, env="SERVICE_COUNT_CACHE_TTL")
     cors_origins: list = Field(default=[
         "http://localhost:8097",
         "http://umbrel.local:8097", 
@@ -48,10 +55,75 @@ class Settings(BaseSettings):
     # Logging Configuration
     log_format: str = Field(default="json", env="LOG_FORMAT")
     log_file: str = Field(default="/app/logs/beacon.log", env="LOG_FILE")
+    # Anteil behaltener Events pro event_type (1.0 = alle, 0.01 = jedes hundertste)
+    log_sample_rates: dict = Field(default={
+        "heartbeat": 0.01,
+        "health_check_success": 0.05
+    }, env="LOG_SAMPLE_RATES")
+    # Maximale Events pro Sekunde pro event_type
+    log_rate_limits: dict = Field(default={
+        "heartbeat": 5,
+        "health_check_success": 5
+    }, env="LOG_RATE_LIMITS")
+    
+    # Response Kodierung für Listen/Discovery (gzip/br ab dieser Größe in Bytes)
+    response_compression_min_size: int = Field(default=1024, env="RESPONSE_COMPRESSION_MIN_SIZE")
+    # Brotli Quality (0-11) bzw. gzip Level (1-9) - niedrig, da pro Request komprimiert wird
+    response_compression_level: int = Field(default=5, env="RESPONSE_COMPRESSION_LEVEL")
+    # Größere Antworten werden in einem Thread komprimiert statt auf dem Event Loop
+    response_compression_inline_max_size: int = Field(default=65536, env="RESPONSE_COMPRESSION_INLINE_MAX_SIZE")
+    # Frontend Dateien bis zu dieser Größe (pro Variante) im Speicher halten
+    static_cache_max_file_size: int = Field(default=524288, env="STATIC_CACHE_MAX_FILE_SIZE")
+    
+    # WebSocket Event Journal (Resume nach Reconnect ohne vollständiges Neuladen)
+    websocket_journal_size: int = Field(default=4096, env="WEBSOCKET_JOURNAL_SIZE")
     
     # Health Check Configuration
     health_check_timeout: int = Field(default=10, env="HEALTH_CHECK_TIMEOUT")
     health_check_interval: int = Field(default=60, env="HEALTH_CHECK_INTERVAL")
+    # Probes in eigenem Prozess statt auf dem API Event Loop
+    health_check_worker_enabled: bool = Field(default=False, env="HEALTH_CHECK_WORKER_ENABLED")
+    health_check_worker_concurrency: int = Field(default=100, env="HEALTH_CHECK_WORKER_CONCURRENCY")
+    health_check_worker_batch_interval: float = Field(default=0.25, env="HEALTH_CHECK_WORKER_BATCH_INTERVAL")
+    
+    # Heartbeat Pacing (next_heartbeat_at in Heartbeat Antworten)
+    # Heartbeat Periode als Anteil der TTL, Slots liegen 0.5 - 1.75 Perioden in der Zukunft
+    heartbeat_pacing_fraction: float = Field(default=0.5, env="HEARTBEAT_PACING_FRACTION")
+    # Maximale Verschiebung (Sekunden) eines Slots in eine weniger belegte Sekunde
+    heartbeat_pacing_max_shift: int = Field(default=30, env="HEARTBEAT_PACING_MAX_SHIFT")
+    
+    # Admission Control (Token Bucket pro Client-IP und pro Service, 429 mit Retry-After)
+    rate_limit_enabled: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    rate_limit_register_per_client: float = Field(default=5.0, env="RATE_LIMIT_REGISTER_PER_CLIENT")
+    rate_limit_register_burst_per_client: float = Field(default=50, env="RATE_LIMIT_REGISTER_BURST_PER_CLIENT")
+    rate_limit_register_per_service: float = Field(default=0.5, env="RATE_LIMIT_REGISTER_PER_SERVICE")
+    rate_limit_register_burst_per_service: float = Field(default=5, env="RATE_LIMIT_REGISTER_BURST_PER_SERVICE")
+    rate_limit_heartbeat_per_client: float = Field(default=50.0, env="RATE_LIMIT_HEARTBEAT_PER_CLIENT")
+    rate_limit_heartbeat_burst_per_client: float = Field(default=200, env="RATE_LIMIT_HEARTBEAT_BURST_PER_CLIENT")
+    rate_limit_heartbeat_per_service: float = Field(default=1.0, env="RATE_LIMIT_HEARTBEAT_PER_SERVICE")
+    rate_limit_heartbeat_burst_per_service: float = Field(default=5, env="RATE_LIMIT_HEARTBEAT_BURST_PER_SERVICE")
+    # Reverse Proxies (Komma getrennte IPs/CIDRs), deren X-Forwarded-For/X-Real-IP als Client Adresse gilt
+    trusted_proxies: str = Field(default="", env="TRUSTED_PROXIES")
+    # Heartbeats, die früher als dieser Anteil der TTL nach dem letzten kommen, ohne DB Write beantworten
+    heartbeat_absorb_fraction: float = Field(default=0.2, env="HEARTBEAT_ABSORB_FRACTION")
+    
+    # Registry Snapshots (Warm Start ohne MongoDB)
+    registry_snapshot_enabled: bool = Field(default=True, env="REGISTRY_SNAPSHOT_ENABLED")
+    registry_snapshot_path: str = Field(default="/app/data/registry.snapshot", env="REGISTRY_SNAPSHOT_PATH")
+    registry_snapshot_interval: int = Field(default=30, env="REGISTRY_SNAPSHOT_INTERVAL")
+    database_reconnect_interval: int = Field(default=5, env="DATABASE_RECONNECT_INTERVAL")
+    
+    # Unicast DNS-SD Responder (PTR/SRV/TXT/A direkt aus dem Registry Cache)
+    dns_sd_enabled: bool = Field(default=False, env="DNS_SD_ENABLED")
+    dns_sd_host: str = Field(default="0.0.0.0", env="DNS_SD_HOST")
+    dns_sd_port: int = Field(default=5354, env="DNS_SD_PORT")
+    dns_sd_domain: str = Field(default="local", env="DNS_SD_DOMAIN")
+    dns_sd_record_ttl: int = Field(default=30, env="DNS_SD_RECORD_TTL")
+    
+    # Cluster Configuration (mehrere Worker/Replicas)
+    cluster_mode_enabled: bool = Field(default=False, env="CLUSTER_MODE_ENABLED")
+    cluster_lease_ttl: int = Field(default=15, env="CLUSTER_LEASE_TTL")
+    cluster_watch_retry_interval: int = Field(default=5, env="CLUSTER_WATCH_RETRY_INTERVAL")
     
     class Config:
         env_file = ".env"
@@ -9,6 +9,11 @@ from .mdns_server import MDNSServer
 from .avahi_mdns import AvahiMDNSServer
 from .websocket_manager import WebSocketManager
 from .health_check_manager import HealthCheckManager
+from .health_check_worker import HealthCheckWorker
+from .cluster import ServiceChangeWatcher, LeaderElection
+from .registry_snapshot import RegistrySnapshotManager
+from .fleet_stats import FleetStats
+from .dns_sd_responder import DnsSdResponder
 
 __all__ = [
     "ServiceRegistry",
@@ -17,5 +22,11 @@ __all__ = [
     "MDNSServer",
     "AvahiMDNSServer",
     "WebSocketManager",
-    "HealthCheckManager"
+    "HealthCheckManager",
+    "HealthCheckWorker",
+    "ServiceChangeWatcher",
+    "LeaderElection",
+    "RegistrySnapshotManager",
+    "FleetStats",
+    "DnsSdResponder"
 ] 
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Admission Control für Registrierungen und Heartbeats
+
+Ein Gerät, das in einer Schleife Heartbeats sendet, würde sonst jede
+Anfrage bis zu MongoDB und Avahi durchreichen. Vor der eigentlichen
+Verarbeitung werden deshalb Token Buckets pro Client (IP) und pro Service
+geprüft. Ist ein Bucket leer, antwortet die API mit ``429`` und
+``Retry-After``.
+
+Hinter einem Reverse Proxy (Umbrel app_proxy) ist die Peer Adresse für
+alle Geräte die des Proxys. Kommt die Anfrage von einem der
+``TRUSTED_PROXIES``, wird die Client Adresse aus ``X-Forwarded-For`` bzw.
+``X-Real-IP`` übernommen.
+"""
+import ipaddress
+import math
+import time
+from typing import Dict, Hashable, List, Mapping, Optional, Union
+
+from app.config import settings
+
+# Nach so vielen Prüfungen werden volle (inaktive) Buckets entfernt
+_PRUNE_INTERVAL = 1024
+
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_trusted_proxies(value: str) -> List[IPNetwork]:
+    """Komma getrennte IPs/CIDRs (z.B. ``10.21.0.0/16,127.0.0.1``)"""
+    networks = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if entry:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+    return networks
+
+
+def _is_trusted(address: Optional[str], trusted: List[IPNetwork]) -> bool:
+    if not address or not trusted:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def resolve_client_address(peer: Optional[str], headers: Mapping[str, str],
+                           trusted: List[IPNetwork]) -> Optional[str]:
+    """
+    Client Adresse für die Admission Control
+
+    Nur wenn ``peer`` ein vertrauenswürdiger Proxy ist, werden die Header
+    ausgewertet: ``X-Forwarded-For`` von rechts nach links, die erste
+    Adresse, die kein vertrauenswürdiger Proxy ist, ist der Client.
+    """
+    if not _is_trusted(peer, trusted):
+        return peer
+
+    forwarded = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted(hop, trusted):
+            return hop
+    if forwarded:
+        return forwarded[0]
+
+    real_ip = headers.get("x-real-ip", "").strip()
+    return real_ip or peer
+
+
+class TokenBucketLimiter:
+    """Token Bucket pro Schlüssel (``rate`` Tokens pro Sekunde, max. ``burst``)"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        # Schlüssel -> [tokens, last_refill]
+        self._buckets: Dict[Hashable, List[float]] = {}
+        self._checks = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Nimm ein Token; liefert 0 bei Erfolg, sonst Sekunden bis zum nächsten Token"""
+        if self.rate <= 0:
+            return 0.0
+
+        now = now if now is not None else time.monotonic()
+        self._checks += 1
+        if self._checks % _PRUNE_INTERVAL == 0:
+            self._prune(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] < 1.0:
+            return (1.0 - bucket[0]) / self.rate
+        bucket[0] -= 1.0
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        refill_time = self.burst / self.rate
+        for key in [key for key, (_, last) in self._buckets.items() if now - last >= refill_time]:
+            del self._buckets[key]
+
+
+class AdmissionController:
+    """Rate Limits für ``register`` und ``heartbeat`` inkl. Zähler"""
+
+    def __init__(self):
+        self.enabled = settings.rate_limit_enabled
+        self.trusted_proxies = parse_trusted_proxies(settings.trusted_proxies)
+        self._limiters = {
+            ("register", "client"): TokenBucketLimiter(
+                settings.rate_limit_register_per_client, settings.rate_limit_register_burst_per_client),
+            ("register", "service"): TokenBucketLimiter(
+                settings.rate_limit_register_per_service, settings.rate_limit_register_burst_per_service),
+            ("heartbeat", "client"): TokenBucketLimiter(
+                settings.rate_limit_heartbeat_per_client, settings.rate_limit_heartbeat_burst_per_client),
+            ("heartbeat", "service"): TokenBucketLimiter(
+                settings.rate_limit_heartbeat_per_service, settings.rate_limit_heartbeat_burst_per_service),
+        }
+        self._counters: Dict[str, int] = {
+            "register_admitted": 0,
+            "register_rejected_client": 0,
+            "register_rejected_service": 0,
+            "heartbeat_admitted": 0,
+            "heartbeat_rejected_client": 0,
+            "heartbeat_rejected_service": 0,
+            "heartbeat_absorbed": 0,
+        }
+
+    def check(self, action: str, client: Optional[str], service_key: Hashable) -> int:
+        """
+        Prüfe eine Anfrage gegen Client- und Service-Limit
+
+        Liefert 0 wenn zugelassen, sonst die Wartezeit für ``Retry-After``
+        in ganzen Sekunden.
+        """
+        if not self.enabled:
+            return 0
+
+        now = time.monotonic()
+        for scope, key in (("client", client or "unknown"), ("service", service_key)):
+            retry_after = self._limiters[(action, scope)].acquire(key, now)
+            if retry_after > 0:
+                self._counters[f"{action}_rejected_{scope}"] += 1
+                return max(1, math.ceil(retry_after))
+
+        self._counters[f"{action}_admitted"] += 1
+        return 0
+
+    def client_key(self, peer: Optional[str], headers: Mapping[str, str]) -> Optional[str]:
+        """Schlüssel für die Client Buckets (Peer oder weitergeleitete Adresse)"""
+        return resolve_client_address(peer, headers, self.trusted_proxies)
+
+    def record_absorbed_heartbeat(self) -> None:
+        """Zähle einen verfrühten Heartbeat, der ohne DB Write beantwortet wurde"""
+        self._counters["heartbeat_absorbed"] += 1
+
+    def get_stats(self) -> dict:
+        stats = dict(self._counters)
+        stats["enabled"] = self.enabled
+        stats["tracked_buckets"] = sum(len(limiter) for limiter in self._limiters.values())
+        return stats
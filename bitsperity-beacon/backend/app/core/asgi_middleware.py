@@ -0,0 +1,193 @@
+"""
+Pure ASGI Middleware für Bitsperity Beacon
+
+``BaseHTTPMiddleware`` startet pro Request zusätzliche Tasks und Streams
+und puffert Streaming Responses. Beide Middlewares hier arbeiten direkt
+auf ASGI Nachrichten und hängen nur Header an bzw. messen die Zeit.
+
+- ``CORSHeaderMiddleware``: CORS Header für jede Response, Preflights
+  (OPTIONS mit ``Access-Control-Request-Method``) werden direkt beantwortet
+- ``RequestTimingMiddleware``: Latenz Histogramme pro Route
+"""
+import bisect
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+ALLOW_METHODS = b"GET, POST, PUT, DELETE, OPTIONS, PATCH"
+ALLOW_HEADERS = b"Origin, X-Requested-With, Content-Type, Accept, Authorization"
+PREFLIGHT_MAX_AGE = b"3600"
+DISALLOWED_ORIGIN = b"Disallowed CORS origin"
+
+# Obergrenzen der Histogramm Buckets in Millisekunden (letzter Bucket: +Inf)
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class CORSHeaderMiddleware:
+    """CORS Header für alle HTTP Responses (ersetzt BaseHTTPMiddleware + CORSMiddleware)"""
+
+    def __init__(self, app, allow_origins: Optional[Iterable[str]] = None):
+        self.app = app
+        origins = list(settings.cors_origins if allow_origins is None else allow_origins)
+        self.allow_all_origins = "*" in origins
+        self.allow_origins = frozenset(origin.encode("latin-1") for origin in origins)
+        self.common_headers: List[Tuple[bytes, bytes]] = [
+            (b"access-control-allow-methods", ALLOW_METHODS),
+            (b"access-control-allow-credentials", b"true"),
+        ]
+
+    def _origin_allowed(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin in self.allow_origins
+
+    def _origin_headers(self, origin: Optional[bytes]) -> List[Tuple[bytes, bytes]]:
+        if origin is None:
+            # Kein Browser Request - wie bisher immer "*" setzen
+            return [(b"access-control-allow-origin", b"*")]
+        if self._origin_allowed(origin):
+            # Origin spiegeln - "*" ist bei allow-credentials für Browser ungültig
+            return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+        return []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        requested_method = None
+        requested_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                requested_method = value
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+
+        cors_headers = self._origin_headers(origin) + self.common_headers
+
+        if scope["method"] == "OPTIONS" and origin is not None and requested_method is not None:
+            if not self._origin_allowed(origin):
+                # Wie Starlette: Preflight einer nicht erlaubten Origin ablehnen
+                await send({
+                    "type": "http.response.start",
+                    "status": 400,
+                    "headers": [
+                        (b"content-type", b"text/plain; charset=utf-8"),
+                        (b"content-length", str(len(DISALLOWED_ORIGIN)).encode("latin-1")),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": DISALLOWED_ORIGIN})
+                return
+
+            # Preflight direkt beantworten, angefragte Header erlauben
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": cors_headers + [
+                    (b"access-control-allow-headers", requested_headers or ALLOW_HEADERS),
+                    (b"access-control-max-age", PREFLIGHT_MAX_AGE),
+                    (b"content-length", b"0"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cors_headers += [
+            (b"access-control-allow-headers", ALLOW_HEADERS),
+            (b"access-control-expose-headers", b"*"),
+        ]
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+class LatencyHistograms:
+    """Latenz Histogramme pro Route (z.B. ``PUT /api/v1/services/{service_id}/heartbeat``)"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        # Route -> [count pro Bucket (+Inf zuletzt), Summe ms, Anzahl 5xx]
+        self._routes: Dict[str, list] = {}
+
+    def observe(self, route: str, duration_ms: float, status: int) -> None:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = self._routes[route] = [[0] * (len(self.buckets_ms) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets_ms, duration_ms)] += 1
+        entry[1] += duration_ms
+        if status >= 500:
+            entry[2] += 1
+
+    def reset(self) -> None:
+        self._routes.clear()
+
+    def _quantile(self, counts: List[int], total: int, quantile: float) -> Optional[float]:
+        """Obergrenze des Buckets, in dem das Quantil liegt"""
+        rank = quantile * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else None
+        return None
+
+    def get_stats(self) -> Dict[str, dict]:
+        stats = {}
+        for route, (counts, total_ms, errors) in sorted(self._routes.items()):
+            total = sum(counts)
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets_ms + ("+Inf",), counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            stats[route] = {
+                "count": total,
+                "errors": errors,
+                "avg_ms": round(total_ms / total, 3) if total else 0.0,
+                "p50_ms": self._quantile(counts, total, 0.5),
+                "p90_ms": self._quantile(counts, total, 0.9),
+                "p99_ms": self._quantile(counts, total, 0.99),
+                "buckets_ms": buckets,
+            }
+        return stats
+
+
+# Globale Instanz (Middleware schreibt, /metrics liest)
+request_latency = LatencyHistograms()
+
+
+class RequestTimingMiddleware:
+    """Misst die Dauer jedes HTTP Requests bis zum Ende der Response"""
+
+    def __init__(self, app, histograms: Optional[LatencyHistograms] = None):
+        self.app = app
+        self.histograms = histograms or request_latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Routen Template statt Pfad, damit service_ids keine eigenen Einträge erzeugen
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            key = f"{scope['method']} {path}" if path else "unmatched"
+            self.histograms.observe(key, (time.perf_counter() - start) * 1000, status)
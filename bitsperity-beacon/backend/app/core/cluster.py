@@ -0,0 +1,253 @@
+"""
+Multi-Worker Koordination für Bitsperity Beacon
+
+- ServiceChangeWatcher: hält den In-Memory Cache aller Worker über einen
+  MongoDB Change Stream auf der ``services`` Collection synchron.
+- LeaderElection: Lease-Dokument in MongoDB, damit nur ein Worker die
+  Hintergrund-Loops (TTLManager, HealthCheckManager) ausführt.
+
+Change Streams setzen ein Replica Set voraus. Ohne Replica Set wird der
+Watcher mit einer Warnung deaktiviert, die Leader Election funktioniert
+weiterhin.
+"""
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+import structlog
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from app.config import settings
+from app.database import Database
+from app.core.service_registry import ServiceRegistry
+
+logger = structlog.get_logger(__name__)
+
+# Standalone MongoDB ohne Replica Set - Change Streams grundsätzlich nicht möglich
+CHANGE_STREAMS_UNSUPPORTED_CODES = frozenset({40573})
+# Resume Token ungültig bzw. Oplog zu kurz (InvalidResumeToken, ChangeStreamFatalError,
+# ChangeStreamHistoryLost) - Cache neu synchronisieren und Stream ohne Token öffnen
+CHANGE_STREAM_RESYNC_CODES = frozenset({260, 280, 286})
+
+
+def default_worker_id() -> str:
+    """Eindeutige ID für diesen Worker (Host + PID)"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ServiceChangeWatcher:
+    """Wendet Änderungen aus dem Change Stream auf den lokalen Registry Cache an"""
+
+    def __init__(self, database: Database, service_registry: ServiceRegistry):
+        self.database = database
+        self.service_registry = service_registry
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._resume_token: Optional[Dict[str, Any]] = None
+
+    async def start(self) -> None:
+        """Starte Change Stream Watcher"""
+        if self._running:
+            logger.warning("Change Stream Watcher bereits gestartet")
+            return
+
+        if self.database.services is None:
+            logger.info("MongoDB nicht verfügbar - Change Stream Watcher deaktiviert")
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._watch_loop())
+        logger.info("Change Stream Watcher gestartet")
+
+    async def stop(self) -> None:
+        """Stoppe Change Stream Watcher"""
+        if not self._running:
+            return
+
+        self._running = False
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("Change Stream Watcher gestoppt")
+
+    async def _watch_loop(self) -> None:
+        """Watch Loop mit Resume Token und Reconnect"""
+        while self._running:
+            try:
+                async with self.database.services.watch(
+                    full_document="updateLookup",
+                    resume_after=self._resume_token
+                ) as stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self.service_registry.apply_change_event(change)
+
+            except asyncio.CancelledError:
+                break
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED_CODES:
+                    logger.warning("Change Streams nicht verfügbar - Cache Kohärenz deaktiviert",
+                                   code=e.code, error=str(e))
+                    self._running = False
+                    break
+                if e.code in CHANGE_STREAM_RESYNC_CODES:
+                    logger.warning("Change Stream nicht fortsetzbar - synchronisiere Cache neu",
+                                   code=e.code, error=str(e))
+                    await self._resync()
+                    continue
+                logger.warning("Change Stream Fehler, verbinde neu", code=e.code, error=str(e))
+                await asyncio.sleep(settings.cluster_watch_retry_interval)
+            except PyMongoError as e:
+                logger.warning("Change Stream unterbrochen, verbinde neu", error=str(e))
+                await asyncio.sleep(settings.cluster_watch_retry_interval)
+            except Exception as e:
+                logger.error("Fehler im Change Stream Watcher", error=str(e))
+                await asyncio.sleep(settings.cluster_watch_retry_interval)
+
+    async def _resync(self) -> None:
+        """Verworfenen Resume Token durch vollständigen Abgleich mit MongoDB ersetzen"""
+        self._resume_token = None
+        try:
+            await self.service_registry.reconcile_with_database()
+        except Exception as e:
+            logger.error("Cache Resync nach Change Stream Fehler fehlgeschlagen", error=str(e))
+            await asyncio.sleep(settings.cluster_watch_retry_interval)
+
+
+class LeaderElection:
+    """
+    Leader Election über ein Lease-Dokument
+
+    Das Lease wird atomar per ``find_one_and_update`` übernommen, wenn es
+    abgelaufen ist oder bereits diesem Worker gehört. Verliert der Worker
+    das Lease, wird ``on_demoted`` aufgerufen.
+    """
+
+    def __init__(self,
+                 database: Database,
+                 on_elected: Callable[[], Awaitable[None]],
+                 on_demoted: Callable[[], Awaitable[None]],
+                 lease_name: str = "background-tasks",
+                 worker_id: Optional[str] = None):
+        self.database = database
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.lease_name = lease_name
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = settings.cluster_lease_ttl
+        self.renew_interval = max(1, self.lease_ttl // 3)
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def start(self) -> None:
+        """Starte Leader Election"""
+        if self._running:
+            logger.warning("Leader Election bereits gestartet")
+            return
+
+        self._running = True
+
+        # Ohne MongoDB gibt es keine anderen Worker zum Koordinieren
+        if self.database.leases is None:
+            logger.info("MongoDB nicht verfügbar - Worker wird Leader ohne Lease",
+                        worker_id=self.worker_id)
+            await self._set_leader(True)
+            return
+
+        self._task = asyncio.create_task(self._election_loop())
+        logger.info("Leader Election gestartet", worker_id=self.worker_id,
+                    lease_ttl=self.lease_ttl)
+
+    async def stop(self) -> None:
+        """Stoppe Leader Election und gib das Lease frei"""
+        if not self._running:
+            return
+
+        self._running = False
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        if self.is_leader:
+            await self._set_leader(False)
+            await self._release_lease()
+
+        logger.info("Leader Election gestoppt", worker_id=self.worker_id)
+
+    async def _election_loop(self) -> None:
+        """Versuche regelmäßig das Lease zu erwerben bzw. zu verlängern"""
+        while self._running:
+            try:
+                acquired = await self._try_acquire_lease()
+                await self._set_leader(acquired)
+                await asyncio.sleep(self.renew_interval)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Fehler in der Leader Election", error=str(e))
+                await self._set_leader(False)
+                await asyncio.sleep(self.renew_interval)
+
+    async def _try_acquire_lease(self) -> bool:
+        """Erwerbe oder verlängere das Lease (atomar)"""
+        now = datetime.now(timezone.utc)
+        try:
+            lease = await self.database.leases.find_one_and_update(
+                {
+                    "_id": self.lease_name,
+                    "$or": [
+                        {"holder": self.worker_id},
+                        {"expires_at": {"$lt": now}}
+                    ]
+                },
+                {"$set": {
+                    "holder": self.worker_id,
+                    "expires_at": now + timedelta(seconds=self.lease_ttl),
+                    "renewed_at": now
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return lease is not None and lease.get("holder") == self.worker_id
+
+        except DuplicateKeyError:
+            # Lease existiert und gehört einem anderen, noch gültigen Worker
+            return False
+
+    async def _release_lease(self) -> None:
+        """Gib das Lease frei, damit ein anderer Worker sofort übernehmen kann"""
+        if self.database.leases is None:
+            return
+        try:
+            await self.database.leases.delete_one({
+                "_id": self.lease_name,
+                "holder": self.worker_id
+            })
+        except Exception as e:
+            logger.warning("Lease konnte nicht freigegeben werden", error=str(e))
+
+    async def _set_leader(self, leader: bool) -> None:
+        """Übernimm Statuswechsel und rufe die Callbacks auf"""
+        if leader == self.is_leader:
+            return
+
+        self.is_leader = leader
+        if leader:
+            logger.info("Worker ist Leader", worker_id=self.worker_id)
+            await self.on_elected()
+        else:
+            logger.info("Worker ist nicht mehr Leader", worker_id=self.worker_id)
+            await self.on_demoted()
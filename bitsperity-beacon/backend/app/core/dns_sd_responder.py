@@ -0,0 +1,398 @@
+"""
+Unicast DNS-SD Responder für Bitsperity Beacon
+
+Clients ohne Multicast (z.B. Container in Docker Bridge Netzwerken)
+können Services per normalem Unicast DNS auflösen::
+
+    dig @beacon -p 5354 _iot._tcp.local PTR
+
+Beantwortet werden PTR, SRV, TXT und A (sowie ANY) direkt aus dem
+In-Memory Registry Cache - ohne MongoDB Query. Antworten werden pro
+(Name, Typ) einmal fertig kodiert und bei jeder Änderung im Index
+verworfen. Pro Query werden nur noch ID, Flags und die Question Section
+(Groß-/Kleinschreibung des Clients) eingesetzt.
+"""
+import asyncio
+import ipaddress
+import struct
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import dns.flags
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+from dns.rdtypes.ANY.PTR import PTR
+from dns.rdtypes.ANY.TXT import TXT
+from dns.rdtypes.IN.A import A
+from dns.rdtypes.IN.SRV import SRV
+import structlog
+
+from app.config import settings
+from app.models.service import Service, ServiceStatus
+from app.core.service_registry import ServiceRegistry
+
+logger = structlog.get_logger(__name__)
+
+_IN = dns.rdataclass.IN
+# Vom Responder angebotene EDNS Payload Größe (vermeidet IP Fragmentierung)
+_EDNS_PAYLOAD = 1232
+# Obergrenze für gecachte Antworten (schützt vor Queries mit zufälligen Namen)
+_MAX_CACHED_ANSWERS = 10000
+
+
+class _Entry(NamedTuple):
+    instance: dns.name.Name
+    service_type: dns.name.Name
+    target: dns.name.Name
+    port: int
+    txt: Tuple[bytes, ...]
+    address: Optional[str]
+
+
+class _Answer(NamedTuple):
+    """Vorkodierte Antwort ohne Header und Question Section"""
+    flags: int
+    answer_count: int
+    additional_count: int
+    full: bytes
+    answers_only: bytes
+
+
+def _label(value: str) -> bytes:
+    return value.encode("utf-8")[:63] or b"-"
+
+
+class DnsSdIndex:
+    """DNS Sicht auf den Registry Cache (Listener für ``ServiceRegistry``)"""
+
+    def __init__(self, domain: dns.name.Name, record_ttl: int):
+        self.domain = domain
+        self.record_ttl = record_ttl
+        self.services_name = dns.name.Name((b"_services", b"_dns-sd", b"_udp") + domain.labels)
+        self.entries: Dict[str, _Entry] = {}
+        self._records: Optional[Dict[dns.name.Name, Dict[int, dns.rrset.RRset]]] = None
+        self._answers: Dict[Tuple[bytes, int], _Answer] = {}
+
+    # --- Listener Interface ---
+
+    def track(self, service: Service) -> None:
+        if service.status != ServiceStatus.ACTIVE:
+            self.untrack(service.service_id)
+            return
+
+        entry = self._build_entry(service)
+        if self.entries.get(service.service_id) == entry:
+            return
+
+        self.entries[service.service_id] = entry
+        self.invalidate()
+
+    def untrack(self, service_id: str) -> None:
+        if self.entries.pop(service_id, None) is not None:
+            self.invalidate()
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Verwerfe alle vorberechneten Records und Antworten"""
+        self._records = None
+        self._answers.clear()
+
+    # --- Antworten ---
+
+    def lookup(self, qname: dns.name.Name, key: Tuple[bytes, int]) -> _Answer:
+        """Hole die vorkodierte Antwort (baut sie beim ersten Zugriff)"""
+        answer = self._answers.get(key)
+        if answer is None:
+            if len(self._answers) >= _MAX_CACHED_ANSWERS:
+                self._answers.clear()
+            answer = self._answers[key] = self._encode(qname, key[1])
+        return answer
+
+    @property
+    def cached_answers(self) -> int:
+        return len(self._answers)
+
+    def _build_entry(self, service: Service) -> _Entry:
+        service_type = dns.name.from_text(service.mdns_service_type or "_http._tcp", origin=self.domain)
+        instance = dns.name.Name((_label(service.name),) + service_type.labels)
+
+        address = None
+        try:
+            if ipaddress.ip_address(service.host).version == 4:
+                address = service.host
+        except ValueError:
+            pass
+
+        if address:
+            target = dns.name.Name((_label("ip-" + address.replace(".", "-")),) + self.domain.labels)
+        elif "." in service.host.rstrip("."):
+            target = dns.name.from_text(service.host)
+        else:
+            target = dns.name.Name((_label(service.host),) + self.domain.labels)
+
+        txt = tuple(
+            f"{key}={value}".encode("utf-8")[:255]
+            for key, value in service.get_mdns_txt_records().items()
+        )
+        return _Entry(instance, service_type, target, service.port, txt, address)
+
+    def _build_records(self) -> Dict[dns.name.Name, Dict[int, dns.rrset.RRset]]:
+        records: Dict[dns.name.Name, Dict[int, dns.rrset.RRset]] = {}
+
+        def add(name: dns.name.Name, rdata) -> None:
+            rrset = records.setdefault(name, {}).get(rdata.rdtype)
+            if rrset is None:
+                rrset = records[name][rdata.rdtype] = dns.rrset.RRset(name, _IN, rdata.rdtype)
+                rrset.ttl = self.record_ttl
+            rrset.add(rdata)
+
+        for entry in self.entries.values():
+            add(self.services_name, PTR(_IN, dns.rdatatype.PTR, entry.service_type))
+            add(entry.service_type, PTR(_IN, dns.rdatatype.PTR, entry.instance))
+            add(entry.instance, SRV(_IN, dns.rdatatype.SRV, 0, 0, entry.port, entry.target))
+            add(entry.instance, TXT(_IN, dns.rdatatype.TXT, entry.txt or (b"",)))
+            if entry.address:
+                add(entry.target, A(_IN, dns.rdatatype.A, entry.address))
+
+        return records
+
+    def _additional_for(self, rrsets: List[dns.rrset.RRset],
+                        records: Dict[dns.name.Name, Dict[int, dns.rrset.RRset]]) -> List[dns.rrset.RRset]:
+        """Zusätzliche Records nach RFC 6763 Kapitel 12"""
+        additional: List[dns.rrset.RRset] = []
+        seen = {(rrset.name, rrset.rdtype) for rrset in rrsets}
+
+        def include(name: dns.name.Name, rdtype: int) -> None:
+            rrset = records.get(name, {}).get(rdtype)
+            if rrset is not None and (name, rdtype) not in seen:
+                seen.add((name, rdtype))
+                additional.append(rrset)
+
+        for rrset in rrsets:
+            if rrset.rdtype == dns.rdatatype.PTR and rrset.name != self.services_name:
+                for rdata in rrset:
+                    include(rdata.target, dns.rdatatype.SRV)
+                    include(rdata.target, dns.rdatatype.TXT)
+                    for srv in records.get(rdata.target, {}).get(dns.rdatatype.SRV, []):
+                        include(srv.target, dns.rdatatype.A)
+            elif rrset.rdtype == dns.rdatatype.SRV:
+                for rdata in rrset:
+                    include(rdata.target, dns.rdatatype.A)
+
+        return additional
+
+    def _encode(self, qname: dns.name.Name, qtype: int) -> _Answer:
+        if self._records is None:
+            self._records = self._build_records()
+        records = self._records
+
+        message = dns.message.Message(id=0)
+        message.flags = dns.flags.QR | dns.flags.AA
+        message.question = [dns.rrset.RRset(qname, _IN, qtype)]
+
+        if not qname.is_subdomain(self.domain):
+            message.set_rcode(dns.rcode.REFUSED)
+        elif qname not in records:
+            # Zwischennamen (z.B. _tcp.local) existieren, haben aber keine Records
+            if not any(name.is_subdomain(qname) for name in records):
+                message.set_rcode(dns.rcode.NXDOMAIN)
+        else:
+            by_type = records[qname]
+            if qtype == dns.rdatatype.ANY:
+                message.answer = list(by_type.values())
+            elif qtype in by_type:
+                message.answer = [by_type[qtype]]
+            message.additional = self._additional_for(message.answer, records)
+
+        full = message.to_wire()
+        question_length = len(qname.to_wire()) + 4
+        message.additional = []
+        answers_only = message.to_wire()
+
+        return _Answer(
+            flags=struct.unpack("!H", full[2:4])[0],
+            answer_count=struct.unpack("!H", full[6:8])[0],
+            additional_count=struct.unpack("!H", full[10:12])[0],
+            full=full[12 + question_length:],
+            answers_only=answers_only[12 + question_length:]
+        )
+
+
+class _DnsSdProtocol(asyncio.DatagramProtocol):
+    def __init__(self, responder: "DnsSdResponder"):
+        self.responder = responder
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            response = self.responder.handle_query(data)
+        except Exception as e:
+            logger.warning("Fehler bei DNS-SD Query", error=str(e))
+            return
+        if response is not None and self.transport is not None:
+            self.transport.sendto(response, addr)
+
+
+class DnsSdResponder:
+    """Asyncio UDP DNS Server für DNS-SD Lookups aus dem Registry Cache"""
+
+    def __init__(self,
+                 service_registry: ServiceRegistry,
+                 host: Optional[str] = None,
+                 port: Optional[int] = None,
+                 domain: Optional[str] = None,
+                 record_ttl: Optional[int] = None):
+        self.service_registry = service_registry
+        self.host = host or settings.dns_sd_host
+        self.port = port if port is not None else settings.dns_sd_port
+        self.index = DnsSdIndex(
+            dns.name.from_text(domain or settings.dns_sd_domain),
+            record_ttl if record_ttl is not None else settings.dns_sd_record_ttl
+        )
+        self.queries = 0
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        # TCP für Antworten, die nicht in ein UDP Paket passen (TC Bit)
+        self._tcp_server: Optional[asyncio.AbstractServer] = None
+        self._tcp_connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        """Starte UDP Responder"""
+        if self._transport is not None:
+            logger.warning("DNS-SD Responder bereits gestartet")
+            return
+
+        self.index.clear()
+        for service in self.service_registry.snapshot_services():
+            self.index.track(service)
+        self.service_registry.add_cache_listener(self.index)
+
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DnsSdProtocol(self),
+            local_addr=(self.host, self.port)
+        )
+        self._tcp_server = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+        logger.info("DNS-SD Responder gestartet", host=self.host, port=self.port,
+                    domain=self.index.domain.to_text(), services=len(self.index.entries))
+
+    async def stop(self) -> None:
+        """Stoppe UDP Responder"""
+        if self._transport is None:
+            return
+
+        self.service_registry.remove_cache_listener(self.index)
+        self._transport.close()
+        self._transport = None
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            for writer in list(self._tcp_connections):
+                writer.close()
+            await self._tcp_server.wait_closed()
+            self._tcp_server = None
+        logger.info("DNS-SD Responder gestoppt", queries=self.queries)
+
+    def get_stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "services": len(self.index.entries),
+            "cached_answers": self.index.cached_answers
+        }
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """DNS über TCP (2 Byte Längenpräfix, mehrere Queries pro Verbindung)"""
+        self._tcp_connections.add(writer)
+        try:
+            while True:
+                length = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), 10))[0]
+                data = await asyncio.wait_for(reader.readexactly(length), 10)
+                response = self.handle_query(data, tcp=True)
+                if response is None:
+                    break
+                writer.write(struct.pack("!H", len(response)) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            # Verbindungsende bzw. Shutdown - Task nicht als abgebrochen melden
+            pass
+        except Exception as e:
+            logger.warning("Fehler bei DNS-SD TCP Query", error=str(e))
+        finally:
+            self._tcp_connections.discard(writer)
+            writer.close()
+
+    def handle_query(self, data: bytes, tcp: bool = False) -> Optional[bytes]:
+        """Beantworte eine DNS Query (None = verwerfen)"""
+        if len(data) < 12:
+            return None
+
+        query_id, flags, qdcount, _, _, arcount = struct.unpack("!6H", data[:12])
+        if flags & 0x8000:
+            # Antwort statt Query - ignorieren
+            return None
+
+        self.queries += 1
+        opcode = (flags >> 11) & 0xF
+        if opcode != 0 or qdcount != 1:
+            return self._error(query_id, flags, dns.rcode.NOTIMP if opcode else dns.rcode.FORMERR)
+
+        # Question Section parsen (Namenskompression ist in Queries unüblich)
+        offset = 12
+        labels: List[bytes] = []
+        while True:
+            if offset >= len(data):
+                return self._error(query_id, flags, dns.rcode.FORMERR)
+            length = data[offset]
+            if length == 0:
+                offset += 1
+                break
+            if length & 0xC0 or offset + 1 + length > len(data):
+                return self._error(query_id, flags, dns.rcode.FORMERR)
+            labels.append(data[offset + 1:offset + 1 + length])
+            offset += 1 + length
+
+        if offset + 4 > len(data):
+            return self._error(query_id, flags, dns.rcode.FORMERR)
+        qtype = struct.unpack("!H", data[offset:offset + 2])[0]
+        question = data[12:offset + 4]
+        offset += 4
+
+        # EDNS (OPT Record direkt nach der Question)
+        edns = arcount > 0 and data[offset:offset + 3] == b"\x00\x00\x29"
+        max_size = 65535 if tcp else 512
+        if edns and not tcp:
+            max_size = min(max(struct.unpack("!H", data[offset + 3:offset + 5])[0], 512), _EDNS_PAYLOAD)
+
+        # Nicht unterstützte Typen liefern NODATA bzw. NXDOMAIN (gleicher Cache)
+        lowered = tuple(label.lower() for label in labels)
+        qname = dns.name.Name(lowered + (b"",))
+        answer = self.index.lookup(qname, (b".".join(lowered), qtype))
+
+        response_flags = answer.flags | (flags & 0x0100)  # RD übernehmen
+        answer_count, additional_count = answer.answer_count, answer.additional_count
+        body = answer.full
+
+        if 12 + len(question) + len(body) + (11 if edns else 0) > max_size:
+            body, additional_count = answer.answers_only, 0
+            if 12 + len(question) + len(body) + (11 if edns else 0) > max_size:
+                body, answer_count = b"", 0
+                response_flags |= 0x0200  # TC - Client soll per TCP fragen
+
+        if edns:
+            body += b"\x00" + struct.pack("!HHIH", dns.rdatatype.OPT, _EDNS_PAYLOAD, 0, 0)
+            additional_count += 1
+
+        header = struct.pack("!6H", query_id, response_flags, 1, answer_count, 0, additional_count)
+        return header + question + body
+
+    @staticmethod
+    def _error(query_id: int, flags: int, rcode: int) -> bytes:
+        response_flags = 0x8000 | (flags & 0x7900) | rcode  # QR + Opcode + RD
+        return struct.pack("!6H", query_id, response_flags, 0, 0, 0, 0)
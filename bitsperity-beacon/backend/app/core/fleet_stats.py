@@ -0,0 +1,114 @@
+"""
+Inkrementell gepflegte Flottenstatistik für Bitsperity Beacon
+
+Zähler pro Type, Tag, Protocol und Status werden bei jeder Änderung im
+Registry Cache (Registrierung, Update, Health Status, Deregistrierung,
+Ablauf) angepasst. Abfragen brauchen damit keine ``distinct`` Queries
+oder Aggregationen mehr.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from app.models.service import Service
+
+# service_id -> (type, tags, protocol, status)
+_Entry = Tuple[str, Tuple[str, ...], str, str]
+
+
+def _status_value(service: Service) -> str:
+    status = service.status
+    return status.value if hasattr(status, "value") else str(status)
+
+
+class FleetStats:
+    """Zähler pro Dimension, idempotent pro service_id"""
+
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self.by_type: Counter = Counter()
+        self.by_tag: Counter = Counter()
+        self.by_protocol: Counter = Counter()
+        self.by_status: Counter = Counter()
+        self.updated_at = datetime.now(timezone.utc)
+
+    @property
+    def total(self) -> int:
+        return len(self._entries)
+
+    def track(self, service: Service) -> bool:
+        """Übernimm den aktuellen Zustand eines Services (neu oder geändert)
+
+        Gibt zurück, ob sich Typ, Tags, Protokoll oder Status geändert haben.
+        """
+        entry = (
+            service.type,
+            tuple(sorted(set(service.tags))),
+            service.protocol,
+            _status_value(service),
+        )
+        previous = self._entries.get(service.service_id)
+        if previous == entry:
+            return False
+
+        if previous is not None:
+            self._apply(previous, -1)
+        self._entries[service.service_id] = entry
+        self._apply(entry, 1)
+        self.updated_at = datetime.now(timezone.utc)
+        return True
+
+    def untrack(self, service_id: str) -> None:
+        """Entferne einen Service (Deregistrierung oder Ablauf)"""
+        previous = self._entries.pop(service_id, None)
+        if previous is None:
+            return
+
+        self._apply(previous, -1)
+        self.updated_at = datetime.now(timezone.utc)
+
+    def rebuild(self, services: Iterable[Service]) -> None:
+        """Baue alle Zähler neu auf (Startup / Abgleich mit der Database)"""
+        self.clear()
+        for service in services:
+            self.track(service)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.by_type.clear()
+        self.by_tag.clear()
+        self.by_protocol.clear()
+        self.by_status.clear()
+        self.updated_at = datetime.now(timezone.utc)
+
+    def types(self) -> List[str]:
+        return sorted(self.by_type)
+
+    def tags(self) -> List[str]:
+        return sorted(self.by_tag)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "by_type": dict(self.by_type),
+            "by_tag": dict(self.by_tag),
+            "by_protocol": dict(self.by_protocol),
+            "by_status": dict(self.by_status),
+            "updated_at": self.updated_at,
+        }
+
+    def _apply(self, entry: _Entry, delta: int) -> None:
+        service_type, tags, protocol, status = entry
+        self._bump(self.by_type, service_type, delta)
+        for tag in tags:
+            self._bump(self.by_tag, tag, delta)
+        self._bump(self.by_protocol, protocol, delta)
+        self._bump(self.by_status, status, delta)
+
+    @staticmethod
+    def _bump(counter: Counter, key: str, delta: int) -> None:
+        value = counter[key] + delta
+        if value > 0:
+            counter[key] = value
+        else:
+            del counter[key]
@@ -8,23 +8,34 @@ from typing import Dict, List, Optional, TYPE_CHECKING
 from datetime import datetime, timedelta, timezone
 import structlog
 
+from app.config import settings
+from app.core.health_check_worker import HealthCheckWorker, ProbeResult, perform_http_check
+
 if TYPE_CHECKING:
     from app.core.service_registry import ServiceRegistry
     from app.core.websocket_manager import WebSocketManager
 
 logger = structlog.get_logger(__name__)
 
+# Maximale Zeit am Stück beim Anwenden von Worker Ergebnissen
+APPLY_SLICE_SECONDS = 0.002
+
 
 class HealthCheckResult:
-    """Result of a health check operation"""
+    """Result of a health check operation (success None = unknown, no probe ran)"""
     
-    def __init__(self, success: bool, response_time_ms: int, 
+    def __init__(self, success: Optional[bool], response_time_ms: int, 
                  status_code: Optional[int] = None, error: Optional[str] = None):
         self.success = success
         self.response_time_ms = response_time_ms
         self.status_code = status_code
         self.error = error
         self.timestamp = datetime.now(timezone.utc)
+    
+    @property
+    def is_unknown(self) -> bool:
+        """Worker nicht verfügbar/neu gestartet - weder Erfolg noch Fehler des Services"""
+        return self.success is None
 
 
 class HealthCheckManager:
@@ -39,6 +50,10 @@ class HealthCheckManager:
         self._running = False
         self._session: Optional[aiohttp.ClientSession] = None
         self._health_check_task: Optional[asyncio.Task] = None
+        # Probes optional in eigenem Prozess (entlastet den API Event Loop)
+        self._worker: Optional[HealthCheckWorker] = (
+            HealthCheckWorker(self._apply_worker_results) if settings.health_check_worker_enabled else None
+        )
         
     async def start(self):
         """Start health check manager"""
@@ -47,9 +62,12 @@ class HealthCheckManager:
             return
             
         try:
-            self._session = aiohttp.ClientSession(
-                timeout=aiohttp.ClientTimeout(total=60)
-            )
+            if self._worker:
+                await self._worker.start()
+            else:
+                self._session = aiohttp.ClientSession(
+                    timeout=aiohttp.ClientTimeout(total=60)
+                )
             self._running = True
             
             # Start health check loop
@@ -77,6 +95,9 @@ class HealthCheckManager:
                 except asyncio.CancelledError:
                     pass
             
+            if self._worker:
+                await self._worker.stop()
+            
             # Close HTTP session
             if self._session:
                 await self._session.close()
@@ -136,6 +157,14 @@ class HealthCheckManager:
     
     async def _process_health_checks(self, services: List):
         """Process health checks for multiple services concurrently"""
+        if self._worker:
+            # Ergebnisse kommen gebündelt über _apply_worker_results zurück
+            self._worker.submit([
+                (service.service_id, service.health_check_url, service.health_check_timeout)
+                for service in services
+            ])
+            return
+        
         # Limit concurrent health checks to avoid overwhelming
         semaphore = asyncio.Semaphore(5)
         
@@ -163,48 +192,68 @@ class HealthCheckManager:
     
     async def _perform_http_health_check(self, service) -> HealthCheckResult:
         """Perform actual HTTP health check"""
-        start_time = asyncio.get_event_loop().time()
+        if self._worker:
+            outcome = await self._worker.probe(
+                service.service_id, service.health_check_url, service.health_check_timeout
+            )
+        else:
+            outcome = await perform_http_check(
+                self._session, service.health_check_url, service.health_check_timeout
+            )
         
-        try:
-            timeout = aiohttp.ClientTimeout(total=service.health_check_timeout)
+        success, response_time_ms, status_code, error = outcome
+        return HealthCheckResult(
+            success=success,
+            response_time_ms=response_time_ms,
+            status_code=status_code,
+            error=error
+        )
+    
+    async def _apply_worker_results(self, results: List[ProbeResult]):
+        """Wende einen Batch Ergebnisse aus dem Worker Prozess an"""
+        loop = asyncio.get_running_loop()
+        slice_end = loop.time() + APPLY_SLICE_SECONDS
+        for _, service_id, success, response_time_ms, status_code, error in results:
+            if loop.time() >= slice_end:
+                # Große Batches nicht am Stück anwenden - API Requests dazwischen lassen
+                await asyncio.sleep(0)
+                slice_end = loop.time() + APPLY_SLICE_SECONDS
             
-            async with self._session.get(
-                service.health_check_url, 
-                timeout=timeout
-            ) as response:
-                response_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
-                
-                # Consider 2xx status codes as healthy
-                success = 200 <= response.status < 300
-                
-                return HealthCheckResult(
-                    success=success,
-                    response_time_ms=response_time,
-                    status_code=response.status
-                )
-                
-        except asyncio.TimeoutError:
-            response_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
-            return HealthCheckResult(
-                success=False,
-                response_time_ms=response_time,
-                error="Health check timeout"
-            )
-        except Exception as e:
-            response_time = int((asyncio.get_event_loop().time() - start_time) * 1000)
-            return HealthCheckResult(
-                success=False,
-                response_time_ms=response_time,
-                error=str(e)
+            # Aktuellen Stand holen - der Service kann sich seit dem Planen geändert haben
+            service = await self.service_registry.get_service_by_id(service_id)
+            if not service or not service.health_check_url:
+                continue
+            
+            result = HealthCheckResult(
+                success=success,
+                response_time_ms=response_time_ms,
+                status_code=status_code,
+                error=error
             )
+            await self._process_health_check_result(service, result)
+    
+    def get_stats(self) -> dict:
+        """Health Check Statistik (inkl. Worker Prozess)"""
+        return {
+            "running": self._running,
+            "mode": "process" if self._worker else "inline",
+            "worker": self._worker.get_stats() if self._worker else None
+        }
     
     async def _process_health_check_result(self, service, result: HealthCheckResult):
         """Process health check result and update service"""
+        if result.is_unknown:
+            logger.warning("Health check result unknown - service status unchanged",
+                           service_id=service.service_id,
+                           name=service.name,
+                           error=result.error)
+            return
+        
         try:
             if result.success:
                 # Health check successful!
-                print(f"🎯 HEALTH CHECK SUCCESS! service_id={service.service_id}, name={service.name}, response_time={result.response_time_ms}ms")
                 logger.info("Health check passed - extending TTL like heartbeat",
+                           event_type="health_check_success",
                            service_id=service.service_id,
                            name=service.name,
                            response_time=result.response_time_ms)
@@ -0,0 +1,330 @@
+"""
+Health Check Worker Prozess für Bitsperity Beacon
+
+Hunderte gleichzeitige HTTP Probes (DNS, TLS, aiohttp) auf dem API Event
+Loop verlängern Heartbeat- und Discovery-Antworten. Mit
+``HEALTH_CHECK_WORKER_ENABLED=true`` laufen die Probes in einem eigenen
+Prozess:
+
+- Der Hauptprozess schickt fällige Probes als Liste über eine Queue
+- Der Worker prüft sie mit eigenem Event Loop und eigener aiohttp Session
+- Ergebnisse kommen gebündelt (alle ``HEALTH_CHECK_WORKER_BATCH_INTERVAL``
+  Sekunden) zurück und werden im Hauptprozess der Reihe nach angewendet
+
+Stirbt der Worker, wird er mit Backoff neu gestartet; offene Probes
+werden im nächsten Durchlauf erneut geplant.
+"""
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# (request_id, service_id, url, timeout)
+ProbeRequest = Tuple[int, str, str, int]
+# (success, response_time_ms, status_code, error) - success None: kein Ergebnis (Worker nicht verfügbar)
+ProbeOutcome = Tuple[Optional[bool], int, Optional[int], Optional[str]]
+# (request_id, service_id, success, response_time_ms, status_code, error)
+ProbeResult = Tuple[int, str, bool, int, Optional[int], Optional[str]]
+
+_MAX_RESTART_DELAY = 30.0
+# Niedrigere CPU Priorität: bei wenigen Kernen hat der API Prozess Vorrang
+_WORKER_NICE = 10
+
+
+async def perform_http_check(session: aiohttp.ClientSession, url: str, timeout: int) -> ProbeOutcome:
+    """HTTP GET auf die Health Check URL; 2xx gilt als gesund"""
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response_time = int((loop.time() - start_time) * 1000)
+            return 200 <= response.status < 300, response_time, response.status, None
+    except asyncio.TimeoutError:
+        return False, int((loop.time() - start_time) * 1000), None, "Health check timeout"
+    except Exception as e:
+        return False, int((loop.time() - start_time) * 1000), None, str(e)
+
+
+# Worker Prozess
+
+
+async def _probe_worker(requests: multiprocessing.Queue, results: multiprocessing.Queue,
+                        concurrency: int, batch_interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    finished: List[ProbeResult] = []
+    running = set()
+
+    async def probe(request: ProbeRequest) -> None:
+        request_id, service_id, url, timeout = request
+        async with semaphore:
+            outcome = await perform_http_check(session, url, timeout)
+        finished.append((request_id, service_id) + outcome)
+
+    async def flush_loop() -> None:
+        while True:
+            await asyncio.sleep(batch_interval)
+            if finished:
+                batch = finished[:]
+                finished.clear()
+                results.put(batch)
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+        flusher = asyncio.create_task(flush_loop())
+        try:
+            while True:
+                batch = await loop.run_in_executor(None, requests.get)
+                if batch is None:
+                    break
+                for request in batch:
+                    task = asyncio.create_task(probe(request))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+        finally:
+            flusher.cancel()
+            for task in list(running):
+                task.cancel()
+            await asyncio.gather(flusher, *running, return_exceptions=True)
+            if finished:
+                results.put(finished[:])
+
+
+def run_probe_worker(requests: multiprocessing.Queue, results: multiprocessing.Queue,
+                     concurrency: int, batch_interval: float) -> None:
+    """Einstiegspunkt des Worker Prozesses"""
+    try:
+        os.nice(_WORKER_NICE)
+    except (AttributeError, OSError):
+        pass
+    try:
+        asyncio.run(_probe_worker(requests, results, concurrency, batch_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+# Hauptprozess
+
+
+class HealthCheckWorker:
+    """Startet, überwacht und beliefert den Health Check Worker Prozess"""
+
+    def __init__(self, on_results: Callable[[List[ProbeResult]], Awaitable[None]]):
+        self.on_results = on_results
+        self.concurrency = settings.health_check_worker_concurrency
+        self.batch_interval = settings.health_check_worker_batch_interval
+        self._context = multiprocessing.get_context("spawn")
+        self._process: Optional[multiprocessing.Process] = None
+        self._requests: Optional[multiprocessing.Queue] = None
+        self._results: Optional[multiprocessing.Queue] = None
+        self._reader: Optional[threading.Thread] = None
+        self._batches: Optional[asyncio.Queue] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._supervisor_task: Optional[asyncio.Task] = None
+        self._running = False
+        self._request_ids = itertools.count(1)
+        # request_id -> service_id für geplante Probes
+        self._pending: Dict[int, str] = {}
+        self._pending_services: Dict[str, int] = {}
+        # request_id -> Future für check_service_now
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._stats = {
+            "probes_submitted": 0,
+            "probes_skipped_pending": 0,
+            "results_received": 0,
+            "result_batches": 0,
+            "restarts": 0,
+        }
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._batches = asyncio.Queue()
+        self._spawn()
+        self._consumer_task = asyncio.create_task(self._consume_batches())
+        self._supervisor_task = asyncio.create_task(self._supervise())
+        logger.info("Health Check Worker gestartet", pid=self.pid, concurrency=self.concurrency)
+
+    def _spawn(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        self._process = self._context.Process(
+            target=run_probe_worker,
+            args=(self._requests, self._results, self.concurrency, self.batch_interval),
+            name="beacon-health-worker",
+            daemon=True
+        )
+        self._process.start()
+        self._reader = threading.Thread(
+            target=self._read_results, args=(loop, self._results), name="beacon-health-results", daemon=True
+        )
+        self._reader.start()
+
+    def _read_results(self, loop: asyncio.AbstractEventLoop, results: multiprocessing.Queue) -> None:
+        """Thread: Ergebnis Batches aus dem Worker an den Event Loop übergeben"""
+        while True:
+            try:
+                batch = results.get()
+            except (EOFError, OSError):
+                return
+            if batch is None:
+                return
+            try:
+                loop.call_soon_threadsafe(self._batches.put_nowait, batch)
+            except RuntimeError:
+                # Event Loop bereits geschlossen
+                return
+
+    async def _supervise(self) -> None:
+        """Worker bei Absturz mit Backoff neu starten"""
+        delay = 1.0
+        while self._running:
+            await asyncio.sleep(1.0)
+            if self.is_alive():
+                delay = 1.0
+                continue
+
+            exitcode = self._process.exitcode if self._process is not None else None
+            logger.error("Health Check Worker beendet - starte neu", exitcode=exitcode, delay=delay)
+            self._shutdown_queues()
+            self._fail_pending("Health check worker restarted")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _MAX_RESTART_DELAY)
+            if self._running:
+                self._spawn()
+                self._stats["restarts"] += 1
+
+    async def _consume_batches(self) -> None:
+        while True:
+            batch = await self._batches.get()
+            self._stats["result_batches"] += 1
+            self._stats["results_received"] += len(batch)
+
+            scheduled = []
+            for result in batch:
+                request_id, service_id = result[0], result[1]
+                waiter = self._waiters.pop(request_id, None)
+                if waiter is not None:
+                    if not waiter.done():
+                        waiter.set_result(result[2:])
+                    continue
+                if self._pending.pop(request_id, None) is not None:
+                    self._pending_services.pop(service_id, None)
+                    scheduled.append(result)
+
+            if scheduled:
+                try:
+                    await self.on_results(scheduled)
+                except Exception as e:
+                    logger.error("Fehler beim Anwenden der Health Check Ergebnisse", error=str(e))
+
+    def _fail_pending(self, error: str) -> None:
+        # Kein Urteil über den Service - die Probe hat nie stattgefunden
+        self._pending.clear()
+        self._pending_services.clear()
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_result((None, 0, None, error))
+        self._waiters.clear()
+
+    def submit(self, probes: List[Tuple[str, str, int]]) -> int:
+        """Plane Probes ``(service_id, url, timeout)``; bereits laufende werden übersprungen"""
+        if not self.is_alive():
+            return 0
+
+        batch: List[ProbeRequest] = []
+        for service_id, url, timeout in probes:
+            if service_id in self._pending_services:
+                self._stats["probes_skipped_pending"] += 1
+                continue
+            request_id = next(self._request_ids)
+            self._pending[request_id] = service_id
+            self._pending_services[service_id] = request_id
+            batch.append((request_id, service_id, url, timeout))
+
+        if batch:
+            self._requests.put(batch)
+            self._stats["probes_submitted"] += len(batch)
+        return len(batch)
+
+    async def probe(self, service_id: str, url: str, timeout: int) -> ProbeOutcome:
+        """Einzelne Probe ausführen und auf das Ergebnis warten"""
+        if not self.is_alive():
+            return None, 0, None, "Health check worker not running"
+
+        request_id = next(self._request_ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[request_id] = waiter
+        self._requests.put([(request_id, service_id, url, timeout)])
+        self._stats["probes_submitted"] += 1
+        return await waiter
+
+    def _shutdown_queues(self) -> None:
+        # Reader Thread beenden und Queues schließen
+        if self._results is not None:
+            try:
+                self._results.put(None)
+            except (ValueError, OSError):
+                pass
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+        for mp_queue in (self._requests, self._results):
+            if mp_queue is not None:
+                mp_queue.close()
+                mp_queue.cancel_join_thread()
+        self._requests = None
+        self._results = None
+        self._reader = None
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+
+        for task in (self._supervisor_task, self._consumer_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        if self._process is not None:
+            try:
+                self._requests.put(None)
+            except (ValueError, OSError, AttributeError):
+                pass
+            await asyncio.to_thread(self._process.join, 5.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                await asyncio.to_thread(self._process.join, 2.0)
+
+        self._shutdown_queues()
+        self._fail_pending("Health check worker stopped")
+        self._process = None
+        logger.info("Health Check Worker gestoppt")
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pid"] = self.pid
+        stats["alive"] = self.is_alive()
+        stats["pending_probes"] = len(self._pending) + len(self._waiters)
+        return stats
@@ -0,0 +1,169 @@
+"""
+Server-gesteuertes Heartbeat Pacing für Bitsperity Beacon
+
+Nach einem Stromausfall registrieren sich alle Geräte gleichzeitig und
+senden danach im Gleichtakt Heartbeats. Beacon gibt deshalb mit jeder
+Heartbeat Antwort ein ``next_heartbeat_at`` vor:
+
+- Jeder Service bekommt über einen Hash seiner service_id eine feste
+  Phase innerhalb seiner Heartbeat Periode (``ttl * fraction``). Damit
+  verteilen sich die Heartbeats gleichmäßig über das TTL Fenster.
+- Ist die Sekunde des Slots bereits voll belegt (gemessen an der
+  erwarteten Heartbeat Rate), wird der Slot um wenige Sekunden in die
+  am wenigsten belegte Sekunde verschoben.
+
+Der nächste Heartbeat liegt immer zwischen 0.5 und 1.75 Perioden in der
+Zukunft - bei ``fraction=0.5`` also sicher vor Ablauf der TTL.
+"""
+import hashlib
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.config import settings
+
+# Zeitraum für die gemessene Heartbeat Rate
+_OBSERVED_WINDOW = 60
+
+
+class HeartbeatPacer:
+    """Berechnet Heartbeat Slots und verfolgt erwartete und gemessene Rate"""
+
+    def __init__(self, fraction: Optional[float] = None, max_shift: Optional[int] = None):
+        self.fraction = fraction or settings.heartbeat_pacing_fraction
+        self.max_shift = max_shift if max_shift is not None else settings.heartbeat_pacing_max_shift
+        # service_id -> Heartbeat Periode in Sekunden
+        self._periods: Dict[str, float] = {}
+        self._expected_rate = 0.0
+        # Sekunde (epoch) -> Anzahl vergebener Slots
+        self._calendar: Dict[int, int] = {}
+        # service_id -> aktuell gebuchte Sekunde
+        self._booked: Dict[str, int] = {}
+        # service_id -> zuletzt vergebener Zeitpunkt (epoch)
+        self._slots: Dict[str, float] = {}
+        # Sekunde (epoch) -> Anzahl empfangener Heartbeats
+        self._observed: Dict[int, int] = {}
+
+    @property
+    def expected_rate(self) -> float:
+        """Erwartete Heartbeats pro Sekunde (Summe über 1 / Periode)"""
+        return self._expected_rate
+
+    def is_tracked(self, service_id: str) -> bool:
+        return service_id in self._periods
+
+    def period_for(self, ttl: float) -> float:
+        return max(1.0, ttl * self.fraction)
+
+    def track(self, service_id: str, ttl: float) -> None:
+        """Übernimm Service mit seiner TTL in die erwartete Rate"""
+        period = self.period_for(ttl)
+        previous = self._periods.get(service_id)
+        if previous == period:
+            return
+        if previous is not None:
+            self._expected_rate -= 1.0 / previous
+        self._periods[service_id] = period
+        self._expected_rate += 1.0 / period
+
+    def untrack(self, service_id: str) -> None:
+        """Entferne Service (Deregistrierung oder Ablauf)"""
+        period = self._periods.pop(service_id, None)
+        if period is not None:
+            self._expected_rate = max(0.0, self._expected_rate - 1.0 / period)
+        self._release(service_id)
+        self._slots.pop(service_id, None)
+
+    def record_heartbeat(self, now: Optional[float] = None) -> None:
+        """Zähle einen empfangenen Heartbeat für die gemessene Rate"""
+        second = int(now if now is not None else time.time())
+        self._observed[second] = self._observed.get(second, 0) + 1
+        if len(self._observed) > _OBSERVED_WINDOW * 2:
+            cutoff = second - _OBSERVED_WINDOW
+            for key in [key for key in self._observed if key < cutoff]:
+                del self._observed[key]
+
+    def observed_rate(self, now: Optional[float] = None) -> float:
+        """Gemessene Heartbeats pro Sekunde (letzte 60 Sekunden)"""
+        cutoff = int(now if now is not None else time.time()) - _OBSERVED_WINDOW
+        return sum(count for second, count in self._observed.items() if second > cutoff) / _OBSERVED_WINDOW
+
+    def next_heartbeat_at(self, service_id: str, ttl: float, now: Optional[float] = None) -> datetime:
+        """Berechne und buche den nächsten Heartbeat Slot eines Services"""
+        now = now if now is not None else time.time()
+        self.track(service_id, ttl)
+        period = self._periods[service_id]
+
+        # Nächstes Auftreten der Phase, frühestens eine halbe Periode nach jetzt
+        phase = self._phase(service_id, period)
+        earliest = now + period / 2
+        slot = earliest + (phase - earliest) % period
+
+        second = self._least_loaded_second(int(slot), period)
+        self._book(service_id, second, int(now))
+
+        # Nachkommaanteil der Phase beibehalten, damit sich Heartbeats innerhalb der Sekunde verteilen
+        self._slots[service_id] = second + (slot % 1.0)
+        return datetime.fromtimestamp(self._slots[service_id], tz=timezone.utc)
+
+    def booked_slot(self, service_id: str) -> Optional[datetime]:
+        """Bereits vergebener Heartbeat Slot (ohne neu zu buchen)"""
+        slot = self._slots.get(service_id)
+        return datetime.fromtimestamp(slot, tz=timezone.utc) if slot is not None else None
+
+    def get_stats(self) -> dict:
+        now = time.time()
+        upcoming = [count for second, count in self._calendar.items() if second >= int(now)]
+        return {
+            "services": len(self._periods),
+            "expected_per_second": round(self._expected_rate, 3),
+            "observed_per_second": round(self.observed_rate(now), 3),
+            "peak_scheduled_per_second": max(upcoming, default=0),
+            "slot_capacity": self._capacity()
+        }
+
+    @staticmethod
+    def _phase(service_id: str, period: float) -> float:
+        digest = hashlib.blake2b(service_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 * period
+
+    def _capacity(self) -> int:
+        """Slots pro Sekunde bevor verschoben wird"""
+        return math.ceil(self._expected_rate) + 1
+
+    def _least_loaded_second(self, second: int, period: float) -> int:
+        capacity = self._capacity()
+        if self._calendar.get(second, 0) < capacity:
+            return second
+
+        # Höchstens ein Viertel der Periode verschieben, damit die TTL sicher eingehalten wird
+        max_shift = int(min(self.max_shift, period / 4))
+        best, best_load = second, self._calendar.get(second, 0)
+        for candidate in range(second + 1, second + max_shift + 1):
+            load = self._calendar.get(candidate, 0)
+            if load < capacity:
+                return candidate
+            if load < best_load:
+                best, best_load = candidate, load
+        return best
+
+    def _book(self, service_id: str, second: int, now_second: int) -> None:
+        self._release(service_id)
+        self._calendar[second] = self._calendar.get(second, 0) + 1
+        self._booked[service_id] = second
+
+        # Vergangene Sekunden aufräumen
+        if len(self._calendar) > len(self._periods) * 2 + 64:
+            for key in [key for key in self._calendar if key < now_second]:
+                del self._calendar[key]
+
+    def _release(self, service_id: str) -> None:
+        second = self._booked.pop(service_id, None)
+        if second is None:
+            return
+        count = self._calendar.get(second, 0) - 1
+        if count > 0:
+            self._calendar[second] = count
+        else:
+            self._calendar.pop(second, None)
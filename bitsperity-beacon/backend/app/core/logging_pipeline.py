@@ -0,0 +1,208 @@
+"""
+Asynchrone Logging Pipeline für Bitsperity Beacon
+
+Log Records werden auf dem Event Loop nur noch in eine Queue gelegt.
+Rendering (JSON/Console) und das Schreiben nach stdout bzw. in die
+Logdatei passieren in einem Hintergrund-Thread (QueueListener).
+
+Hochfrequente Events (Heartbeats, erfolgreiche Health Checks) werden
+über ``event_type`` markiert und per Sampling bzw. Rate Limit gedrosselt.
+Warnings und Errors werden nie verworfen.
+"""
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from app.config import settings
+
+# Log Level, die nie gesampelt werden
+_ALWAYS_KEEP = {"warning", "warn", "error", "critical", "exception", "fatal"}
+
+_listener: Optional[QueueListener] = None
+
+
+class EventSampler:
+    """
+    structlog Processor für Sampling und Rate Limits pro Event-Typ
+
+    - ``sample_rates``: Anteil der Events, die behalten werden (0.0 - 1.0).
+      Sampling ist deterministisch (jedes N-te Event), damit kein RNG auf
+      dem Hot Path nötig ist.
+    - ``rate_limits``: maximale Events pro Sekunde (Token Bucket).
+
+    Verworfene Events werden gezählt und beim nächsten ausgegebenen Event
+    desselben Typs als ``sampled_out`` mitgeloggt.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, float]] = None):
+        self._intervals: Dict[str, int] = {}
+        for event_type, rate in (sample_rates or {}).items():
+            rate = float(rate)
+            self._intervals[event_type] = 0 if rate <= 0 else max(1, round(1 / min(rate, 1.0)))
+
+        self._rate_limits: Dict[str, float] = {
+            event_type: float(limit) for event_type, limit in (rate_limits or {}).items()
+        }
+        self._seen: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+        # Token Bucket State: event_type -> [tokens, last_refill]
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        event_type = event_dict.get("event_type")
+        if event_type is None or method_name in _ALWAYS_KEEP:
+            return event_dict
+
+        with self._lock:
+            if not self._admit(event_type):
+                self._dropped[event_type] = self._dropped.get(event_type, 0) + 1
+                raise structlog.DropEvent
+
+            dropped = self._dropped.pop(event_type, 0)
+
+        if dropped:
+            event_dict["sampled_out"] = dropped
+        return event_dict
+
+    def _admit(self, event_type: str) -> bool:
+        """Entscheide ob ein Event behalten wird (Lock muss gehalten werden)"""
+        interval = self._intervals.get(event_type)
+        if interval is not None:
+            if interval == 0:
+                return False
+            seen = self._seen.get(event_type, 0)
+            self._seen[event_type] = seen + 1
+            if seen % interval != 0:
+                return False
+
+        limit = self._rate_limits.get(event_type)
+        if limit is not None:
+            now = time.monotonic()
+            bucket = self._buckets.get(event_type)
+            if bucket is None:
+                bucket = self._buckets[event_type] = [limit, now]
+            else:
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * limit)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+
+        return True
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hole Anzahl aktuell verworfener Events pro Typ"""
+        with self._lock:
+            return {"dropped": dict(self._dropped)}
+
+
+class _DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler ohne Formatierung im aufrufenden Thread
+
+    Der Standard-QueueHandler formatiert den Record bereits in ``prepare()``
+    (also auf dem Event Loop). Hier wird der Record unverändert übergeben,
+    das Rendering übernimmt der ProcessorFormatter im Listener-Thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _build_output_handlers(renderer: Any) -> List[logging.Handler]:
+    """Erstelle die Handler, die im Hintergrund-Thread schreiben"""
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            renderer,
+        ],
+        foreign_pre_chain=[
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+        ],
+    )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [stream_handler]
+
+    # Optionale Logdatei (nur wenn das Verzeichnis existiert, z.B. /app/logs im Container)
+    log_dir = os.path.dirname(settings.log_file)
+    if settings.log_file and log_dir and os.path.isdir(log_dir):
+        try:
+            file_handler = logging.FileHandler(settings.log_file)
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError:
+            pass
+
+    return handlers
+
+
+def configure_logging() -> None:
+    """Konfiguriere structlog + stdlib Logging mit Queue-basierter Ausgabe"""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    renderer = (
+        structlog.processors.JSONRenderer()
+        if settings.log_format == "json"
+        else structlog.dev.ConsoleRenderer(colors=False)
+    )
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = QueueListener(
+        log_queue,
+        *_build_output_handlers(renderer),
+        respect_handler_level=True,
+    )
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(_DeferredFormatQueueHandler(log_queue))
+    root_logger.setLevel(settings.beacon_log_level.upper())
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            EventSampler(settings.log_sample_rates, settings.log_rate_limits),
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Stoppe den Listener-Thread und schreibe ausstehende Records"""
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    _listener = None
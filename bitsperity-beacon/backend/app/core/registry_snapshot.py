@@ -0,0 +1,177 @@
+"""
+Registry Snapshots für schnellen Warm Start
+
+Der In-Memory Registry Cache wird periodisch als kompakter msgpack
+Snapshot nach ``/app/data`` geschrieben. Beim Start wird der Snapshot
+sofort geladen, damit Discovery und mDNS bereits funktionieren, während
+MongoDB noch hochfährt. Der Abgleich mit MongoDB passiert danach im
+Hintergrund (``ServiceRegistry.reconcile_with_database``).
+
+Bei mehreren Workern schreibt nur der Worker, der die Hintergrund-Loops
+ausführt (Lease Holder), alle anderen lesen den Snapshot nur beim Start.
+"""
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+import msgpack
+import structlog
+
+from app.config import settings
+from app.models.service import Service
+from app.core.service_registry import ServiceRegistry, prepare_service_doc
+from app.core.json_encoder import jsonable_encoder
+
+logger = structlog.get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class RegistrySnapshotManager:
+    """Schreibt und lädt Snapshots des Registry Caches"""
+
+    def __init__(self, service_registry: ServiceRegistry, path: Optional[str] = None,
+                 interval: Optional[int] = None, is_writer: Optional[Callable[[], bool]] = None):
+        self.service_registry = service_registry
+        self.path = path or settings.registry_snapshot_path
+        self.interval = interval or settings.registry_snapshot_interval
+        # Darf dieser Worker schreiben? (Standard: immer, d.h. einzelne Instanz)
+        self.is_writer = is_writer or (lambda: True)
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        # cache_version des zuletzt geschriebenen Snapshots
+        self._written_version: Optional[int] = None
+
+    @property
+    def available(self) -> bool:
+        """Snapshots nur schreiben, wenn das Datenverzeichnis existiert (z.B. /app/data im Container)"""
+        directory = os.path.dirname(self.path)
+        return bool(directory) and os.path.isdir(directory)
+
+    async def load(self) -> List[Service]:
+        """Lade Services aus dem letzten Snapshot (leer wenn keiner existiert)"""
+        if not os.path.isfile(self.path):
+            return []
+
+        try:
+            data = await asyncio.to_thread(self._read_file)
+            snapshot = msgpack.unpackb(data, raw=False)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                logger.warning("Registry Snapshot Version nicht unterstützt",
+                               version=snapshot.get("version"))
+                return []
+
+            services = []
+            for doc in snapshot.get("services", []):
+                try:
+                    services.append(Service(**prepare_service_doc(doc)))
+                except Exception as e:
+                    logger.warning("Service aus Snapshot übersprungen", error=str(e))
+
+            logger.info("Registry Snapshot geladen", path=self.path,
+                        services=len(services), written_at=snapshot.get("written_at"))
+            return services
+
+        except Exception as e:
+            logger.warning("Registry Snapshot konnte nicht geladen werden",
+                           path=self.path, error=str(e))
+            return []
+
+    async def write_snapshot(self) -> bool:
+        """Schreibe den aktuellen Cache (nur wenn sich etwas geändert hat)"""
+        if not self.available or not self.is_writer():
+            return False
+
+        version = self.service_registry.cache_version
+        if version == self._written_version:
+            return False
+
+        services = self.service_registry.snapshot_services()
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "services": [jsonable_encoder(service.model_dump(by_alias=True)) for service in services]
+        }
+
+        try:
+            await asyncio.to_thread(self._write_file, snapshot)
+            self._written_version = version
+            logger.debug("Registry Snapshot geschrieben", services=len(services))
+            return True
+
+        except OSError as e:
+            logger.warning("Registry Snapshot konnte nicht geschrieben werden",
+                           path=self.path, error=str(e))
+            return False
+
+    async def start(self) -> None:
+        """Starte periodisches Schreiben"""
+        if self._running:
+            logger.warning("Registry Snapshot Manager bereits gestartet")
+            return
+
+        if not self.available:
+            logger.info("Datenverzeichnis nicht vorhanden - Registry Snapshots deaktiviert",
+                        path=self.path)
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._snapshot_loop())
+        logger.info("Registry Snapshot Manager gestartet", path=self.path, interval=self.interval)
+
+    async def stop(self) -> None:
+        """Stoppe periodisches Schreiben und schreibe einen letzten Snapshot"""
+        if not self._running:
+            return
+
+        self._running = False
+
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        await self.write_snapshot()
+        logger.info("Registry Snapshot Manager gestoppt")
+
+    async def _snapshot_loop(self) -> None:
+        """Snapshot Loop"""
+        while self._running:
+            try:
+                await asyncio.sleep(self.interval)
+                await self.write_snapshot()
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Fehler im Registry Snapshot Loop", error=str(e))
+
+    def _read_file(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def _write_file(self, snapshot: dict) -> None:
+        """
+        Atomar schreiben (tmp + rename), damit ein Absturz keinen halben Snapshot hinterlässt
+
+        Die tmp Datei ist pro Aufruf eindeutig und liegt im selben Verzeichnis,
+        damit ``os.replace`` atomar bleibt.
+        """
+        data = msgpack.packb(snapshot, use_bin_type=True)
+        directory, name = os.path.split(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
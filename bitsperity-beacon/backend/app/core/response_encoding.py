@@ -0,0 +1,117 @@
+"""
+Content Negotiation für Service Listen
+
+Discovery Antworten gehen oft per WLAN an Mikrocontroller. Listen und
+Discovery Antworten unterstützen deshalb:
+
+- ``fields=host,port,type`` - nur die angegebenen Service Felder
+- ``Accept: application/msgpack`` - binäre Darstellung statt JSON
+- ``Accept-Encoding: br`` bzw. ``gzip`` - Kompression ab
+  ``RESPONSE_COMPRESSION_MIN_SIZE`` Bytes (Brotli nur wenn installiert);
+  Antworten über ``RESPONSE_COMPRESSION_INLINE_MAX_SIZE`` Bytes werden in
+  einem Thread komprimiert, damit der Event Loop Heartbeats weiter bedient
+"""
+import asyncio
+import gzip
+import json
+from typing import Dict, List, Optional, Set
+
+import msgpack
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+
+from app.config import settings
+from app.schemas.service import ServiceResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli ist optional
+    brotli = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+_SERVICE_FIELDS = frozenset(ServiceResponse.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Parse ``fields=`` Projektion (None = alle Felder)"""
+    if not fields:
+        return None
+
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - _SERVICE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unbekannte Felder: {', '.join(sorted(unknown))}"
+        )
+    return selected or None
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Parse Accept-Encoding inkl. q-Werten"""
+    encodings: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def _select_encoding(request: Request) -> Optional[str]:
+    encodings = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    if brotli is not None and encodings.get("br", 0) > 0:
+        return "br"
+    if encodings.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def dump_list_response(response: BaseModel, fields: Optional[Set[str]] = None) -> dict:
+    """Serialisiere eine Listen-Antwort, Services ggf. auf ``fields`` reduziert"""
+    include = None
+    if fields is not None:
+        include = {name: True for name in type(response).model_fields if name != "services"}
+        include["services"] = {"__all__": fields}
+    return response.model_dump(mode="json", include=include)
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.response_compression_level)
+    return gzip.compress(body, compresslevel=max(1, min(settings.response_compression_level, 9)))
+
+
+async def encode_response(request: Request, content: dict, status_code: int = 200) -> Response:
+    """Kodiere eine Antwort gemäß Accept und Accept-Encoding"""
+    if _wants_msgpack(request):
+        body = msgpack.packb(content, use_bin_type=True)
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    else:
+        # Gleiche Kodierung wie Starlette's JSONResponse
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        media_type = "application/json"
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = _select_encoding(request) if len(body) >= settings.response_compression_min_size else None
+    if encoding is not None:
+        if len(body) > settings.response_compression_inline_max_size:
+            body = await asyncio.to_thread(_compress, body, encoding)
+        else:
+            body = _compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
@@ -2,19 +2,34 @@
 Service Registry für Bitsperity Beacon
 """
 import asyncio
+import base64
+import json
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 import structlog
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.database import Database
 from app.models.service import Service, ServiceStatus
 from app.schemas.service import ServiceCreate, ServiceUpdate
 from app.config import settings
 from app.core.json_encoder import jsonable_encoder
+from app.core.fleet_stats import FleetStats
+from app.core.heartbeat_pacing import HeartbeatPacer
+from app.core.admission import AdmissionController
 
 logger = structlog.get_logger(__name__)
 
+# Mindestabstand (Anteil der TTL) zwischen vorgegebenem Heartbeat und Ablauf
+HEARTBEAT_EXPIRY_MARGIN = 0.1
+
+
+class DatabaseUnavailableError(RuntimeError):
+    """Database (noch) nicht verbunden - nur der Snapshot Cache ist verfügbar"""
+
 
 def prepare_service_doc(doc: dict) -> dict:
     """Bereite Service Document für Pydantic Model vor"""
@@ -55,6 +70,25 @@ def prepare_service_doc(doc: dict) -> dict:
     return doc
 
 
+def encode_page_cursor(service: Service) -> str:
+    """Erstelle opaken Cursor für Keyset Pagination auf (type, service_id)"""
+    raw = json.dumps([service.type, service.service_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor: str) -> Tuple[str, str]:
+    """Dekodiere Cursor zu (type, service_id) - wirft ValueError bei ungültigem Cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        service_type, service_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Ungültiger Cursor: {cursor}") from e
+
+    if not isinstance(service_type, str) or not isinstance(service_id, str):
+        raise ValueError(f"Ungültiger Cursor: {cursor}")
+    return service_type, service_id
+
+
 class ServiceRegistry:
     """Service Registry Manager"""
     
@@ -64,46 +98,157 @@ class ServiceRegistry:
         self._services_cache: Dict[str, Service] = {}
         self._cache_ttl = 60  # Cache TTL in seconds
         self._last_cache_update = datetime.now(timezone.utc)
+        # Total Counts pro Filter: key -> (count, monotonic timestamp)
+        self._count_cache: Dict[tuple, Tuple[int, float]] = {}
+        self._count_cache_ttl = settings.service_count_cache_ttl
+        # Zähler pro Type/Tag/Protocol/Status, folgen jeder Änderung im Cache
+        self.stats = FleetStats()
+        # Verteilt Heartbeats gleichmäßig über das TTL Fenster
+        self.heartbeat_pacer = HeartbeatPacer()
+        # Rate Limits für Registrierungen und Heartbeats
+        self.admission = AdmissionController()
+        # Optionale Listener (track/untrack/clear), z.B. der DNS-SD Responder
+        self._cache_listeners: List[Any] = []
+        # Heartbeats aus dem Warm Start (ohne Database), beim Abgleich zurückgeschrieben
+        self._unsynced_heartbeats: Set[str] = set()
+        # Zählt jede Änderung im Cache (Snapshots nur schreiben, wenn sich etwas geändert hat)
+        self.cache_version = 0
+    
+    @property
+    def database_available(self) -> bool:
+        """False während eines Warm Starts, solange die Database nicht erreichbar ist"""
+        return self.database is not None and self.database.services is not None
+    
+    def _require_database(self) -> None:
+        if not self.database_available:
+            raise DatabaseUnavailableError("Database nicht verfügbar - Registry läuft aus dem Snapshot")
+    
+    def add_cache_listener(self, listener: Any) -> None:
+        """Registriere einen Listener für Änderungen im Registry Cache"""
+        self._cache_listeners.append(listener)
+    
+    def remove_cache_listener(self, listener: Any) -> None:
+        """Entferne einen Cache Listener"""
+        if listener in self._cache_listeners:
+            self._cache_listeners.remove(listener)
+    
+    def _cache_service(self, service: Service) -> None:
+        """Lege Service im Cache ab und aktualisiere die Flottenstatistik"""
+        self._services_cache[service.service_id] = service
+        self.cache_version += 1
+        if self.stats.track(service):
+            # Neuer Service oder geänderter Status/Typ/Tags: Counts sind veraltet
+            self._invalidate_counts()
+        if not self.heartbeat_pacer.is_tracked(service.service_id):
+            self.heartbeat_pacer.track(service.service_id, service.ttl)
+        for listener in self._cache_listeners:
+            listener.track(service)
+    
+    def _evict_service(self, service_id: str) -> None:
+        """Entferne Service aus Cache und Flottenstatistik"""
+        self._services_cache.pop(service_id, None)
+        self.cache_version += 1
+        self.stats.untrack(service_id)
+        self.heartbeat_pacer.untrack(service_id)
+        for listener in self._cache_listeners:
+            listener.untrack(service_id)
     
     async def register_service(self, service_data: ServiceCreate) -> Service:
-        """Registriere einen neuen Service"""
+        """
+        Registriere einen Service (idempotent)
+        
+        Ein einziges atomares Upsert auf (name, host, port): existiert der
+        Service bereits, bleibt seine service_id erhalten und die TTL wird
+        verlängert - sonst wird er neu angelegt.
+        """
+        self._require_database()
         try:
-            logger.info("=== REGISTRY: Creating Service Model ===")
             # Erstelle Service Model
             service = Service(**service_data.model_dump())
-            logger.info("Service model created", service_id=service.service_id)
-            
-            # Prüfe ob Service bereits existiert
-            existing = await self.get_service_by_name_and_host(service.name, service.host, service.port)
-            if existing:
-                logger.info("Service bereits registriert, aktualisiere", 
-                           service_id=existing.service_id, name=service.name)
-                return await self.update_service(existing.service_id, service_data)
             
-            # Speichere in Database
-            logger.info("=== REGISTRY: Saving to Database ===")
             service_dict = jsonable_encoder(service.model_dump(by_alias=True))
-            logger.info("Service dict created for database", dict_keys=list(service_dict.keys()))
-            result = await self.database.services.insert_one(service_dict)
-            logger.info("Service saved to database", inserted_id=str(result.inserted_id))
+            # Identität des Dokuments nur beim ersten Insert setzen
+            insert_only = {
+                field: service_dict.pop(field)
+                for field in ("_id", "service_id", "created_at")
+            }
+            
+            try:
+                service_doc = await self._upsert_registration(service, service_dict, insert_only)
+            except DuplicateKeyError:
+                # Paralleles Upsert hat das Dokument gerade angelegt - erneut als Update ausführen
+                service_doc = await self._upsert_registration(service, service_dict, insert_only)
+            
+            registered = Service(**prepare_service_doc(service_doc))
+            is_new = registered.service_id == service.service_id
             
             # Update Cache
-            self._services_cache[service.service_id] = service
+            self._cache_service(registered)
+            if is_new:
+                self._invalidate_counts()
             
-            logger.info("Service registriert", 
-                       service_id=service.service_id, 
-                       name=service.name,
-                       type=service.type,
-                       host=service.host,
-                       port=service.port,
-                       expires_at=service.expires_at)
+            logger.info("Service registriert" if is_new else "Service erneut registriert", 
+                       service_id=registered.service_id, 
+                       name=registered.name,
+                       type=registered.type,
+                       host=registered.host,
+                       port=registered.port,
+                       expires_at=registered.expires_at)
             
-            return service
+            return registered
             
         except Exception as e:
             logger.error("Fehler bei Service Registrierung", error=str(e))
             raise
     
+    async def _upsert_registration(self, service: Service, service_dict: dict, insert_only: dict) -> dict:
+        """Atomares find_one_and_update Upsert auf dem (name, host, port) Unique Index"""
+        return await self.database.services.find_one_and_update(
+            {"name": service.name, "host": service.host, "port": service.port},
+            {"$set": service_dict, "$setOnInsert": insert_only},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    def apply_change_event(self, change: dict) -> None:
+        """Wende ein Change Stream Event (anderer Worker) auf den Cache an"""
+        operation = change.get("operationType")
+
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if not doc:
+                # Dokument wurde zwischen Update und Lookup gelöscht
+                return
+            try:
+                service = Service(**prepare_service_doc(doc))
+            except Exception as e:
+                logger.error("Fehler beim Anwenden des Change Events",
+                           operation=operation, error=str(e))
+                return
+            if service.is_expired():
+                self._evict_service(service.service_id)
+            else:
+                self._cache_service(service)
+            if operation == "insert":
+                self._invalidate_counts()
+
+        elif operation == "delete":
+            doc_id = str(change.get("documentKey", {}).get("_id"))
+            for service_id, service in list(self._services_cache.items()):
+                if str(service.id) == doc_id:
+                    self._evict_service(service_id)
+                    break
+            self._invalidate_counts()
+
+        elif operation in ("drop", "invalidate"):
+            self._services_cache.clear()
+            self.cache_version += 1
+            self.stats.clear()
+            self.heartbeat_pacer = HeartbeatPacer()
+            for listener in self._cache_listeners:
+                listener.clear()
+            self._invalidate_counts()
+
     async def get_service_by_id(self, service_id: str) -> Optional[Service]:
         """Hole Service by ID"""
         try:
@@ -114,7 +259,11 @@ class ServiceRegistry:
                     return service
                 else:
                     # Entferne abgelaufenen Service aus Cache
-                    del self._services_cache[service_id]
+                    self._evict_service(service_id)
+            
+            if not self.database_available:
+                # Warm Start: nur der Snapshot Cache ist bekannt
+                return None
             
             # Hole aus Database
             service_doc = await self.database.services.find_one({"service_id": service_id})
@@ -131,7 +280,7 @@ class ServiceRegistry:
                 return None
             
             # Update Cache
-            self._services_cache[service_id] = service
+            self._cache_service(service)
             return service
             
         except Exception as e:
@@ -154,7 +303,7 @@ class ServiceRegistry:
             # Bereite Dokument vor
             service_doc = prepare_service_doc(service_doc)
             service = Service(**service_doc)
-            self._services_cache[service.service_id] = service
+            self._cache_service(service)
             return service
             
         except Exception as e:
@@ -163,6 +312,7 @@ class ServiceRegistry:
     
     async def update_service(self, service_id: str, update_data: ServiceUpdate) -> Optional[Service]:
         """Aktualisiere Service"""
+        self._require_database()
         try:
             service = await self.get_service_by_id(service_id)
             if not service:
@@ -183,7 +333,7 @@ class ServiceRegistry:
             )
             
             # Update Cache
-            self._services_cache[service_id] = service
+            self._cache_service(service)
             
             logger.info("Service aktualisiert", service_id=service_id)
             return service
@@ -194,6 +344,9 @@ class ServiceRegistry:
     
     async def extend_service_ttl(self, service_id: str, ttl: Optional[int] = None) -> Optional[Service]:
         """Verlängere Service TTL (Heartbeat)"""
+        if not self.database_available:
+            return self._extend_cached_ttl(service_id, ttl)
+        
         try:
             service = await self.get_service_by_id(service_id)
             if not service:
@@ -201,6 +354,7 @@ class ServiceRegistry:
             
             # Verlängere TTL
             service.extend_ttl(ttl)
+            self.heartbeat_pacer.record_heartbeat()
             
             # Speichere in Database
             update_dict = {
@@ -216,38 +370,101 @@ class ServiceRegistry:
             )
             
             # Update Cache
-            self._services_cache[service_id] = service
+            self._cache_service(service)
             
             # ⚡ Re-register to mDNS for robustness (ensures service stays in mDNS)
             if self.mdns_server and service.status.value == "active":
                 try:
-                    print(f"🔥 DEBUG: TTL-Extend - Re-registering service {service.name} to mDNS for robustness...")
                     mdns_success = await self.mdns_server.register_service(service)
-                    if mdns_success:
-                        print(f"🔥 DEBUG: TTL-Extend - mDNS re-registration SUCCESS for {service.name}")
-                    else:
-                        print(f"🔥 DEBUG: TTL-Extend - mDNS re-registration FAILED for {service.name}")
+                    if not mdns_success:
+                        logger.warning("mDNS re-registration failed during TTL extend",
+                                     service_id=service_id, name=service.name)
                 except Exception as mdns_error:
                     logger.warning("mDNS re-registration failed during TTL extend", 
                                  service_id=service_id, error=str(mdns_error))
             
-            print(f"🔥 DEBUG: Service TTL extended! service_id={service_id}, expires_at={service.expires_at}")
-            logger.warning("🔥 MYSTERY: Service TTL verlängert", service_id=service_id, expires_at=service.expires_at)
+            logger.info("Service TTL verlängert", event_type="heartbeat",
+                       service_id=service_id, expires_at=service.expires_at)
             return service
             
         except Exception as e:
             logger.error("Fehler beim Verlängern der Service TTL", service_id=service_id, error=str(e))
             return None
     
+    def _extend_cached_ttl(self, service_id: str, ttl: Optional[int] = None) -> Service:
+        """
+        Heartbeat ohne Database (Warm Start aus dem Snapshot)
+        
+        Die TTL wird nur im Cache verlängert und beim Abgleich mit der
+        Database zurückgeschrieben. Unbekannte Services lassen sich ohne
+        Database nicht prüfen - dann DatabaseUnavailableError statt 404.
+        """
+        service = self._services_cache.get(service_id)
+        if service is None or service.is_expired():
+            raise DatabaseUnavailableError("Database nicht verfügbar - Service nicht im Snapshot")
+        
+        service.extend_ttl(ttl)
+        self.heartbeat_pacer.record_heartbeat()
+        self._cache_service(service)
+        self._unsynced_heartbeats.add(service_id)
+        return service
+    
+    def absorb_early_heartbeat(self, service_id: str, ttl: Optional[int] = None) -> Optional[Service]:
+        """
+        Beantworte einen deutlich verfrühten Heartbeat aus dem Cache
+        
+        Liegt der letzte Heartbeat weniger als ``HEARTBEAT_ABSORB_FRACTION``
+        der TTL zurück, wird weder MongoDB noch mDNS angefasst und der
+        unveränderte Service geliefert. None = regulär verarbeiten.
+        """
+        fraction = settings.heartbeat_absorb_fraction
+        service = self._services_cache.get(service_id)
+        if fraction <= 0 or service is None or service.last_heartbeat is None:
+            return None
+        if service.status != ServiceStatus.ACTIVE:
+            return None
+        
+        # Geänderte TTL muss persistiert werden
+        current_ttl = (service.expires_at - service.last_heartbeat).total_seconds()
+        if abs((ttl or service.ttl) - current_ttl) > 1:
+            return None
+        
+        elapsed = (datetime.now(timezone.utc) - service.last_heartbeat).total_seconds()
+        if elapsed >= current_ttl * fraction:
+            return None
+        
+        self.heartbeat_pacer.record_heartbeat()
+        self.admission.record_absorbed_heartbeat()
+        return service
+    
+    def schedule_next_heartbeat(self, service: Service, absorbed: bool = False) -> datetime:
+        """
+        Nächster Heartbeat Zeitpunkt für den Service (Server-gesteuertes Pacing)
+        
+        Ein absorbierter Heartbeat verlängert ``expires_at`` nicht - dann gilt
+        der bereits gebuchte Slot. Der Zeitpunkt liegt immer mindestens
+        ``HEARTBEAT_EXPIRY_MARGIN`` der TTL vor Ablauf des Services.
+        """
+        now = datetime.now(timezone.utc)
+        ttl = (service.expires_at - service.last_heartbeat).total_seconds()
+        
+        slot = self.heartbeat_pacer.booked_slot(service.service_id) if absorbed else None
+        if slot is None or slot <= now:
+            slot = self.heartbeat_pacer.next_heartbeat_at(service.service_id, ttl)
+        
+        latest = service.expires_at - timedelta(seconds=max(1.0, ttl * HEARTBEAT_EXPIRY_MARGIN))
+        return max(now, min(slot, latest))
+    
     async def deregister_service(self, service_id: str) -> bool:
         """Deregistriere Service"""
+        self._require_database()
         try:
             # Entferne aus Database
             result = await self.database.services.delete_one({"service_id": service_id})
             
             # Entferne aus Cache
-            if service_id in self._services_cache:
-                del self._services_cache[service_id]
+            self._evict_service(service_id)
+            self._invalidate_counts()
             
             logger.info("Service deregistriert", service_id=service_id)
             return result.deleted_count > 0
@@ -256,33 +473,64 @@ class ServiceRegistry:
             logger.error("Fehler beim Deregistrieren des Services", service_id=service_id, error=str(e))
             return False
     
+    def _build_discovery_query(self,
+                               service_type: Optional[str] = None,
+                               tags: Optional[List[str]] = None,
+                               protocol: Optional[str] = None,
+                               status: Optional[str] = None) -> dict:
+        """Baue MongoDB Query für Discovery Filter"""
+        # Build query - convert datetime to ISO string for MongoDB comparison
+        current_time = datetime.now(timezone.utc)
+        query = {"expires_at": {"$gt": current_time.isoformat()}}
+        
+        if service_type:
+            query["type"] = service_type
+        
+        if protocol:
+            query["protocol"] = protocol
+            
+        if status:
+            query["status"] = status
+        
+        if tags:
+            query["tags"] = {"$in": tags}
+        
+        return query
+    
     async def discover_services(self, 
                               service_type: Optional[str] = None,
                               tags: Optional[List[str]] = None,
                               protocol: Optional[str] = None,
                               status: Optional[str] = None,
                               limit: int = 50,
-                              skip: int = 0) -> List[Service]:
-        """Entdecke Services mit Filtern"""
+                              skip: int = 0,
+                              after: Optional[Tuple[str, str]] = None) -> List[Service]:
+        """
+        Entdecke Services mit Filtern
+        
+        Ergebnisse sind stabil nach (type, service_id) sortiert. Mit ``after``
+        (aus ``decode_page_cursor``) wird per Keyset Pagination ab diesem
+        Schlüssel gelesen, ``skip`` wird dann ignoriert.
+        """
+        if self.database.services is None:
+            # Warm Start: MongoDB (noch) nicht erreichbar - aus dem Snapshot Cache bedienen
+            return self._discover_from_cache(service_type, tags, protocol, status, limit, skip, after)
+        
         try:
-            # Build query - convert datetime to ISO string for MongoDB comparison
-            current_time = datetime.now(timezone.utc)
-            query = {"expires_at": {"$gt": current_time.isoformat()}}
-            
-            if service_type:
-                query["type"] = service_type
-            
-            if protocol:
-                query["protocol"] = protocol
-                
-            if status:
-                query["status"] = status
+            query = self._build_discovery_query(service_type, tags, protocol, status)
             
-            if tags:
-                query["tags"] = {"$in": tags}
+            if after is not None:
+                after_type, after_id = after
+                query["$or"] = [
+                    {"type": {"$gt": after_type}},
+                    {"type": after_type, "service_id": {"$gt": after_id}}
+                ]
+                skip = 0
             
             # Query Database
-            cursor = self.database.services.find(query).skip(skip).limit(limit)
+            cursor = self.database.services.find(query).sort(
+                [("type", 1), ("service_id", 1)]
+            ).skip(skip).limit(limit)
             services_docs = await cursor.to_list(length=limit)
             
             # Prepare documents and create Service objects
@@ -299,7 +547,7 @@ class ServiceRegistry:
             
             # Update Cache
             for service in services:
-                self._services_cache[service.service_id] = service
+                self._cache_service(service)
             
             logger.debug("Services entdeckt", count=len(services), filters=query)
             return services
@@ -308,9 +556,184 @@ class ServiceRegistry:
             logger.error("Fehler beim Entdecken der Services", error=str(e))
             return []
     
+    async def discover_services_page(self,
+                                     service_type: Optional[str] = None,
+                                     tags: Optional[List[str]] = None,
+                                     protocol: Optional[str] = None,
+                                     status: Optional[str] = None,
+                                     limit: int = 50,
+                                     skip: int = 0,
+                                     after: Optional[Tuple[str, str]] = None) -> Tuple[List[Service], Optional[str]]:
+        """Entdecke eine Seite Services und liefere den Cursor für die nächste Seite"""
+        # Ein Element mehr laden, um zu erkennen ob es eine weitere Seite gibt
+        services = await self.discover_services(
+            service_type=service_type,
+            tags=tags,
+            protocol=protocol,
+            status=status,
+            limit=limit + 1,
+            skip=skip,
+            after=after
+        )
+        
+        if len(services) <= limit:
+            return services, None
+        
+        services = services[:limit]
+        return services, encode_page_cursor(services[-1])
+    
+    async def count_services(self,
+                             service_type: Optional[str] = None,
+                             tags: Optional[List[str]] = None,
+                             protocol: Optional[str] = None,
+                             status: Optional[str] = None) -> int:
+        """Zähle Services pro Filter (mit kurzem TTL Cache)"""
+        key = (service_type, tuple(sorted(tags)) if tags else None, protocol, status)
+        now = time.monotonic()
+        
+        cached = self._count_cache.get(key)
+        if cached is not None and now - cached[1] < self._count_cache_ttl:
+            return cached[0]
+        
+        if self.database.services is None:
+            return len(self._filter_cached(service_type, tags, protocol, status))
+        
+        try:
+            query = self._build_discovery_query(service_type, tags, protocol, status)
+            total = await self.database.services.count_documents(query)
+            self._count_cache[key] = (total, now)
+            return total
+            
+        except Exception as e:
+            logger.error("Fehler beim Zählen der Services", error=str(e))
+            return cached[0] if cached is not None else 0
+    
+    def _filter_cached(self,
+                       service_type: Optional[str] = None,
+                       tags: Optional[List[str]] = None,
+                       protocol: Optional[str] = None,
+                       status: Optional[str] = None) -> List[Service]:
+        """Wende Discovery Filter auf den In-Memory Cache an"""
+        services = []
+        for service in self._services_cache.values():
+            if service.is_expired():
+                continue
+            if service_type and service.type != service_type:
+                continue
+            if protocol and service.protocol != protocol:
+                continue
+            if status and service.status != status:
+                continue
+            if tags and not set(tags).intersection(service.tags):
+                continue
+            services.append(service)
+        return services
+    
+    def _discover_from_cache(self,
+                             service_type: Optional[str],
+                             tags: Optional[List[str]],
+                             protocol: Optional[str],
+                             status: Optional[str],
+                             limit: int,
+                             skip: int,
+                             after: Optional[Tuple[str, str]]) -> List[Service]:
+        """Discovery ohne MongoDB mit gleicher Sortierung und Keyset Semantik"""
+        services = sorted(
+            self._filter_cached(service_type, tags, protocol, status),
+            key=lambda service: (service.type, service.service_id)
+        )
+        
+        if after is not None:
+            services = [s for s in services if (s.type, s.service_id) > tuple(after)]
+            skip = 0
+        
+        return services[skip:skip + limit]
+    
+    def snapshot_services(self) -> List[Service]:
+        """Hole alle nicht abgelaufenen Services aus dem Cache (für Registry Snapshots)"""
+        return [service for service in self._services_cache.values() if not service.is_expired()]
+    
+    def load_snapshot(self, services: List[Service]) -> int:
+        """Befülle den Cache aus einem Snapshot, abgelaufene Services werden übersprungen"""
+        loaded = 0
+        for service in services:
+            if service.is_expired():
+                continue
+            self._cache_service(service)
+            loaded += 1
+        
+        self._invalidate_counts()
+        return loaded
+    
+    async def reconcile_with_database(self) -> Tuple[List[Service], List[Service]]:
+        """
+        Gleiche den Cache mit MongoDB ab (MongoDB ist führend)
+        
+        Returns:
+            (aktive Services laut Database, nur im Cache vorhandene und entfernte Services)
+        """
+        await self._write_back_heartbeats()
+        
+        query = {"expires_at": {"$gt": datetime.now(timezone.utc).isoformat()}}
+        services_docs = await self.database.services.find(query).to_list(length=None)
+        
+        services = []
+        for doc in services_docs:
+            try:
+                services.append(Service(**prepare_service_doc(doc)))
+            except Exception as e:
+                logger.error("Fehler beim Erstellen des Service-Objekts", 
+                           doc_id=str(doc.get("_id", "unknown")), error=str(e))
+        
+        current_ids = {service.service_id for service in services}
+        removed = [
+            service for service_id, service in self._services_cache.items()
+            if service_id not in current_ids
+        ]
+        for service in removed:
+            self._evict_service(service.service_id)
+        
+        for service in services:
+            self._cache_service(service)
+        
+        self._invalidate_counts()
+        logger.info("Registry Cache mit Database abgeglichen",
+                   services=len(services), removed=len(removed))
+        return services, removed
+    
+    async def _write_back_heartbeats(self) -> None:
+        """Schreibe Heartbeats aus dem Warm Start in die Database (nur wenn neuer)"""
+        service_ids, self._unsynced_heartbeats = self._unsynced_heartbeats, set()
+        for service_id in service_ids:
+            service = self._services_cache.get(service_id)
+            if service is None:
+                continue
+            update_dict = jsonable_encoder({
+                "expires_at": service.expires_at,
+                "last_heartbeat": service.last_heartbeat,
+                "updated_at": service.updated_at
+            })
+            await self.database.services.update_one(
+                {"service_id": service_id, "expires_at": {"$lt": update_dict["expires_at"]}},
+                {"$set": update_dict}
+            )
+        if service_ids:
+            logger.info("Heartbeats aus dem Warm Start zurückgeschrieben", services=len(service_ids))
+    
+    def _invalidate_counts(self) -> None:
+        """Verwerfe gecachte Total Counts nach Registrierung/Löschung/Statuswechsel"""
+        self._count_cache.clear()
+    
     async def get_all_active_services(self) -> List[Service]:
-        """Hole alle aktiven Services"""
-        return await self.discover_services(status=ServiceStatus.ACTIVE.value)
+        """Hole alle aktiven Services (seitenweise, nicht nur die erste Seite)"""
+        services: List[Service] = []
+        after = None
+        while True:
+            page = await self.discover_services(status=ServiceStatus.ACTIVE.value, limit=500, after=after)
+            services.extend(page)
+            if len(page) < 500:
+                return services
+            after = (page[-1].type, page[-1].service_id)
     
     async def get_all_services(self) -> List[Service]:
         """Hole alle Services (unabhängig vom Status) für Startup Re-Registration"""
@@ -333,7 +756,7 @@ class ServiceRegistry:
             # Update Cache für aktive Services
             for service in services:
                 if not service.is_expired():
-                    self._services_cache[service.service_id] = service
+                    self._cache_service(service)
             
             logger.debug("Alle Services geladen für Startup", count=len(services))
             return services
@@ -403,8 +826,8 @@ class ServiceRegistry:
             
             # 3. Entferne aus Cache
             for service_id in service_ids:
-                if service_id in self._services_cache:
-                    del self._services_cache[service_id]
+                self._evict_service(service_id)
+            self._invalidate_counts()
             
             logger.info("Abgelaufene Services entfernt", 
                        count=result.deleted_count,
@@ -417,36 +840,24 @@ class ServiceRegistry:
             return 0
     
     async def get_service_types(self) -> List[str]:
-        """Hole alle verfügbaren Service Types"""
-        try:
-            types = await self.database.services.distinct("type", {
-                "expires_at": {"$gt": datetime.now(timezone.utc).isoformat()}
-            })
-            return sorted(types)
-            
-        except Exception as e:
-            logger.error("Fehler beim Laden der Service Types", error=str(e))
-            return []
+        """Hole alle verfügbaren Service Types (aus der Flottenstatistik)"""
+        return self.stats.types()
     
     async def get_service_tags(self) -> List[str]:
-        """Hole alle verfügbaren Tags"""
-        try:
-            # Aggregation Pipeline für alle Tags
-            pipeline = [
-                {"$match": {"expires_at": {"$gt": datetime.now(timezone.utc).isoformat()}}},
-                {"$unwind": "$tags"},
-                {"$group": {"_id": "$tags"}},
-                {"$sort": {"_id": 1}}
-            ]
-            
-            cursor = self.database.services.aggregate(pipeline)
-            tags_docs = await cursor.to_list(length=None)
-            
-            return [doc["_id"] for doc in tags_docs]
-            
-        except Exception as e:
-            logger.error("Fehler beim Laden der Service Tags", error=str(e))
-            return []
+        """Hole alle verfügbaren Tags (aus der Flottenstatistik)"""
+        return self.stats.tags()
+    
+    def get_stats(self) -> dict:
+        """
+        Hole Service-Anzahl pro Type, Tag, Protocol und Status
+        
+        Die Zähler werden bei jeder Änderung inkrementell gepflegt. Abgelaufene
+        Services zählen bis zum nächsten TTL Cleanup noch mit.
+        """
+        stats = self.stats.to_dict()
+        stats["heartbeats"] = self.heartbeat_pacer.get_stats()
+        stats["admission"] = self.admission.get_stats()
+        return stats
     
     # 🆕 NEW: Health Check Support Methods (minimal addition)
     async def update_service_health_status(self, service: Service) -> bool:
@@ -472,7 +883,9 @@ class ServiceRegistry:
             
             # Update cache
             if service.service_id in self._services_cache:
-                self._services_cache[service.service_id] = service
+                self._cache_service(service)
+            if result.modified_count > 0:
+                self._invalidate_counts()
             
             return result.modified_count > 0
             
@@ -549,6 +962,9 @@ class ServiceRegistry:
             if service_id in self._services_cache:
                 self._services_cache[service_id].status = ServiceStatus.UNHEALTHY
                 self._services_cache[service_id].updated_at = datetime.now(timezone.utc)
+                self._cache_service(self._services_cache[service_id])
+            if result.modified_count > 0:
+                self._invalidate_counts()
             
             return result.modified_count > 0
             
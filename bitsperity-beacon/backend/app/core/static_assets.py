@@ -0,0 +1,279 @@
+"""
+Auslieferung des Frontend Builds (``frontend/dist``)
+
+Statt pro Request ``FileResponse`` über FastAPI Routen:
+
+- Index aller Dateien beim Start (Pfad -> Content Type, ETag, Varianten)
+- Vorkomprimierte ``.br``/``.gz`` Varianten (``python -m app.core.static_assets
+  <dist>`` beim Image Build); fehlen sie, wird beim Start im Speicher
+  komprimiert
+- ``Cache-Control: immutable`` für Dateien mit Hash im Namen
+  (``assets/index-3f9a2c1b.js``), ``no-cache`` + ETag für alles andere
+- ``If-None-Match`` -> ``304``
+- Kleine Dateien (bis ``STATIC_CACHE_MAX_FILE_SIZE``) liegen im Speicher,
+  größere werden per ``FileResponse`` gestreamt
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import FileResponse
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli ist optional
+    brotli = None
+
+# Vite Dateinamen: assets/<name>-<hash>.<ext>
+HASHED_ASSET = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9.]+$")
+COMPRESSIBLE_SUFFIXES = (".html", ".js", ".mjs", ".css", ".svg", ".json", ".map", ".txt", ".xml", ".webmanifest")
+# Unterhalb dieser Größe lohnt Kompression nicht
+MIN_COMPRESS_SIZE = 1024
+# (Encoding, Datei-Endung) in Präferenz-Reihenfolge
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+CACHE_IMMUTABLE = b"public, max-age=31536000, immutable"
+CACHE_REVALIDATE = b"no-cache"
+
+
+class _Variant(NamedTuple):
+    encoding: Optional[str]
+    path: Optional[str]
+    size: int
+    etag: bytes
+    body: Optional[bytes]
+
+
+class _Asset(NamedTuple):
+    content_type: bytes
+    cache_control: bytes
+    variants: Dict[Optional[str], _Variant]
+    etags: frozenset
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=max(1, min(level, 9)), mtime=0)
+
+
+def _content_type(path: str) -> bytes:
+    media_type, _ = mimetypes.guess_type(path)
+    if path.endswith((".js", ".mjs")):
+        media_type = "text/javascript"
+    elif path.endswith(".map"):
+        media_type = "application/json"
+    media_type = media_type or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/json", "image/svg+xml"):
+        media_type += "; charset=utf-8"
+    return media_type.encode("latin-1")
+
+
+def _accepted_encodings(headers: Iterable[Tuple[bytes, bytes]]) -> Tuple[frozenset, Optional[bytes]]:
+    """Akzeptierte Encodings (q > 0) und If-None-Match Header"""
+    accept_encoding = b""
+    if_none_match = None
+    for name, value in headers:
+        if name == b"accept-encoding":
+            accept_encoding = value
+        elif name == b"if-none-match":
+            if_none_match = value
+
+    accepted = set()
+    for part in accept_encoding.decode("latin-1").split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return frozenset(accepted), if_none_match
+
+
+def precompress(directory: str, level: int = 11) -> List[str]:
+    """Schreibe ``.br``/``.gz`` neben alle komprimierbaren Dateien (Image Build)"""
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            for encoding, suffix in ENCODINGS:
+                if encoding == "br" and brotli is None:
+                    continue
+                compressed = _compress(data, encoding, level)
+                # Nur behalten, wenn es sich lohnt
+                if len(compressed) < len(data) * 0.9:
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    written.append(path + suffix)
+    return written
+
+
+class StaticAssets:
+    """Index und Varianten aller Dateien unterhalb von ``directory``"""
+
+    def __init__(self, directory: str, cache_max_file_size: Optional[int] = None):
+        self.directory = directory
+        self.cache_max_file_size = (
+            settings.static_cache_max_file_size if cache_max_file_size is None else cache_max_file_size
+        )
+        self.cached_bytes = 0
+        self._assets: Dict[str, _Asset] = {}
+        self._scan()
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def get(self, relative_path: str) -> Optional[_Asset]:
+        return self._assets.get(relative_path)
+
+    def _scan(self) -> None:
+        for root, _, files in os.walk(self.directory):
+            names = set(files)
+            for name in files:
+                # Vorkomprimierte Varianten gehören zur Originaldatei
+                if any(name.endswith(suffix) and name[:-len(suffix)] in names for _, suffix in ENCODINGS):
+                    continue
+                path = os.path.join(root, name)
+                relative_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                self._assets[relative_path] = self._load(relative_path, path)
+
+    def _variant(self, encoding: Optional[str], path: Optional[str], data: bytes, digest: str) -> _Variant:
+        etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        cache = len(data) <= self.cache_max_file_size
+        if cache:
+            self.cached_bytes += len(data)
+        return _Variant(encoding, path, len(data), etag.encode("latin-1"), data if cache else None)
+
+    def _load(self, relative_path: str, path: str) -> _Asset:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+
+        variants = {None: self._variant(None, path, data, digest)}
+        if path.endswith(COMPRESSIBLE_SUFFIXES) and len(data) >= MIN_COMPRESS_SIZE:
+            for encoding, suffix in ENCODINGS:
+                if os.path.isfile(path + suffix):
+                    with open(path + suffix, "rb") as f:
+                        variants[encoding] = self._variant(encoding, path + suffix, f.read(), digest)
+                elif len(data) <= self.cache_max_file_size and (encoding != "br" or brotli is not None):
+                    # Kein Build-Schritt gelaufen - im Speicher komprimieren
+                    compressed = _compress(data, encoding, settings.response_compression_level)
+                    if len(compressed) < len(data) * 0.9:
+                        variants[encoding] = self._variant(encoding, None, compressed, digest)
+
+        cache_control = CACHE_IMMUTABLE if HASHED_ASSET.match(relative_path) else CACHE_REVALIDATE
+        return _Asset(
+            content_type=_content_type(path),
+            cache_control=cache_control,
+            variants=variants,
+            etags=frozenset(variant.etag for variant in variants.values()),
+        )
+
+
+class StaticAssetMiddleware:
+    """
+    Beantwortet GET/HEAD auf Frontend Dateien vor dem Routing
+
+    ``/``, ``spa_routes`` und ``/index.html`` liefern ``index.html``, Dateien
+    sind unter ``/<pfad>`` und ``/static/<pfad>`` erreichbar. Alles andere
+    geht unverändert an die App.
+    """
+
+    def __init__(self, app, directory: str, spa_routes: Iterable[str] = ()):
+        self.app = app
+        self.assets = StaticAssets(directory)
+        self._routes: Dict[str, _Asset] = {}
+        for relative_path, asset in self.assets._assets.items():
+            self._routes["/" + relative_path] = asset
+            self._routes["/static/" + relative_path] = asset
+        index = self.assets.get("index.html")
+        if index is not None:
+            for route in ("/", *spa_routes):
+                self._routes[route] = index
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        asset = self._routes.get(scope["path"])
+        if asset is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self._serve(asset, scope, receive, send)
+
+    async def _serve(self, asset: _Asset, scope, receive, send) -> None:
+        accepted, if_none_match = _accepted_encodings(scope["headers"])
+
+        variant = asset.variants[None]
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in asset.variants:
+                variant = asset.variants[encoding]
+                break
+
+        headers = [
+            (b"cache-control", asset.cache_control),
+            (b"etag", variant.etag),
+            (b"vary", b"Accept-Encoding"),
+        ]
+
+        if if_none_match is not None and self._etag_matches(if_none_match, asset.etags):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers.append((b"content-type", asset.content_type))
+        if variant.encoding:
+            headers.append((b"content-encoding", variant.encoding.encode("latin-1")))
+
+        if variant.body is None:
+            # Große Datei - von der Platte streamen
+            response = FileResponse(
+                variant.path,
+                headers={name.decode("latin-1"): value.decode("latin-1") for name, value in headers},
+                media_type=asset.content_type.decode("latin-1"),
+            )
+            await response(scope, receive, send)
+            return
+
+        headers.append((b"content-length", str(variant.size).encode("latin-1")))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({
+            "type": "http.response.body",
+            "body": b"" if scope["method"] == "HEAD" else variant.body,
+        })
+
+    @staticmethod
+    def _etag_matches(if_none_match: bytes, etags: frozenset) -> bool:
+        if if_none_match.strip() == b"*":
+            return True
+        for tag in if_none_match.split(b","):
+            tag = tag.strip()
+            if tag.startswith(b"W/"):
+                tag = tag[2:]
+            if tag in etags:
+                return True
+        return False
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "/app/frontend/dist"
+    written = precompress(target)
+    print(f"{len(written)} vorkomprimierte Dateien in {target}")
@@ -1,45 +1,83 @@
 """
 WebSocket Manager für Real-time Updates
+
+Jedes Event trägt eine fortlaufende Sequenznummer (``seq``) und wird in
+einem begrenzten Ring Journal gehalten. Ein Client, der sich mit
+``resume_from=<seq>&epoch=<epoch>`` neu verbindet, bekommt nur die
+verpassten Events. Ist die Lücke nicht mehr im Journal (oder Beacon wurde
+neu gestartet), wird stattdessen ein vollständiger Snapshot gesendet.
 """
 import asyncio
 import json
-from typing import List, Dict, Any
+import uuid
+from collections import deque
+from typing import Callable, List, Dict, Any, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 import structlog
 
+from app.config import settings
+
 logger = structlog.get_logger(__name__)
 
 
 class WebSocketManager:
     """WebSocket Manager für Real-time Updates"""
     
-    def __init__(self):
+    def __init__(self, journal_size: Optional[int] = None):
         self.active_connections: List[WebSocket] = []
         self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        # Eindeutig pro Prozess - Sequenznummern sind nur innerhalb einer Epoche vergleichbar
+        self.epoch = uuid.uuid4().hex
+        self.sequence = 0
+        # Ring Journal: (seq, fertig kodierte JSON Nachricht)
+        self.journal: deque = deque(maxlen=journal_size or settings.websocket_journal_size)
+        # Liefert alle Services (JSON-fähig) für Snapshots bei zu alten Lücken
+        self.snapshot_provider: Optional[Callable[[], List[Dict[str, Any]]]] = None
+        self.resume_stats: Dict[str, int] = {"replayed": 0, "snapshots": 0}
+    
+    def set_snapshot_provider(self, provider: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Setze Quelle für vollständige Snapshots"""
+        self.snapshot_provider = provider
     
-    async def connect(self, websocket: WebSocket, client_id: str = None) -> None:
-        """Neue WebSocket Verbindung akzeptieren"""
+    async def connect(self,
+                      websocket: WebSocket,
+                      client_id: str = None,
+                      resume_from: Optional[int] = None,
+                      epoch: Optional[str] = None) -> None:
+        """Neue WebSocket Verbindung akzeptieren (optional mit Resume ab ``resume_from``)"""
         try:
             await websocket.accept()
-            self.active_connections.append(websocket)
             
             # Speichere Connection Info
             self.connection_info[websocket] = {
-                "client_id": client_id or f"client_{len(self.active_connections)}",
+                "client_id": client_id or f"client_{len(self.active_connections) + 1}",
                 "connected_at": asyncio.get_event_loop().time()
             }
             
-            logger.info("WebSocket Verbindung hergestellt",
-                       client_id=self.connection_info[websocket]["client_id"],
-                       total_connections=len(self.active_connections))
-            
             # Sende Welcome Message
+            welcome_seq = self.sequence
             await self.send_personal_message({
                 "type": "connection_established",
                 "message": "Verbindung zu Bitsperity Beacon hergestellt",
-                "client_id": self.connection_info[websocket]["client_id"]
+                "client_id": self.connection_info[websocket]["client_id"],
+                "epoch": self.epoch,
+                "seq": welcome_seq
             }, websocket)
             
+            if resume_from is None:
+                last_seq = welcome_seq
+            elif self._can_resume(resume_from, epoch):
+                last_seq = resume_from
+            else:
+                last_seq = await self._send_snapshot(websocket)
+            
+            await self._catch_up(websocket, last_seq)
+            
+            logger.info("WebSocket Verbindung hergestellt",
+                       client_id=self.connection_info[websocket]["client_id"],
+                       resume_from=resume_from,
+                       total_connections=len(self.active_connections))
+            
         except Exception as e:
             logger.error("Fehler bei WebSocket Verbindung", error=str(e))
             await self.disconnect(websocket)
@@ -71,18 +109,67 @@ class WebSocketManager:
             logger.error("Fehler beim Senden der persönlichen Nachricht", error=str(e))
             await self.disconnect(websocket)
     
+    def _can_resume(self, resume_from: int, epoch: Optional[str]) -> bool:
+        """Liegen alle Events nach ``resume_from`` noch im Journal?"""
+        if epoch != self.epoch or resume_from < 0 or resume_from > self.sequence:
+            return False
+        if resume_from == self.sequence:
+            return True
+        return bool(self.journal) and self.journal[0][0] <= resume_from + 1
+    
+    async def _send_snapshot(self, websocket: WebSocket) -> int:
+        """Sende vollständigen Snapshot, liefert dessen Sequenznummer"""
+        seq = self.sequence
+        if self.snapshot_provider is None:
+            await self.send_personal_message({"type": "resync_required", "seq": seq}, websocket)
+            return seq
+        
+        services = self.snapshot_provider()
+        self.resume_stats["snapshots"] += 1
+        await self.send_personal_message({
+            "type": "services_snapshot",
+            "event": "services_snapshot",
+            "data": {"services": services},
+            "seq": seq
+        }, websocket)
+        return seq
+    
+    async def _catch_up(self, websocket: WebSocket, last_seq: int) -> None:
+        """
+        Sende alle Events nach ``last_seq`` aus dem Journal und nimm die
+        Verbindung danach in die Broadcasts auf
+        
+        Zwischen letzter Journal Prüfung und Aufnahme liegt kein ``await`` -
+        so geht kein Event verloren und keines kommt doppelt.
+        """
+        while True:
+            missed = [entry for entry in self.journal if entry[0] > last_seq]
+            if not missed:
+                if websocket in self.connection_info:
+                    self.active_connections.append(websocket)
+                return
+            
+            for seq, json_message in missed:
+                await websocket.send_text(json_message)
+                last_seq = seq
+            self.resume_stats["replayed"] += len(missed)
+    
     async def broadcast(self, message: Dict[str, Any]) -> None:
         """Sende Nachricht an alle verbundenen Clients"""
+        # Sequenz vergeben und im Journal ablegen (auch ohne Verbindungen, für Resume)
+        self.sequence += 1
+        message["seq"] = self.sequence
+        json_message = json.dumps(message)
+        self.journal.append((self.sequence, json_message))
+        
         if not self.active_connections:
             return
         
-        # Erstelle JSON Message
-        json_message = json.dumps(message)
-        
         # Sende an alle Verbindungen
         disconnected_connections = []
         
-        for connection in self.active_connections:
+        # Kopie - während der Sends können neue Verbindungen dazukommen (Journal Catch-up)
+        for connection in list(self.active_connections):
             try:
                 await connection.send_text(json_message)
                 
@@ -154,6 +241,16 @@ class WebSocketManager:
                 "timestamp": asyncio.get_event_loop().time()
             })
     
+    def get_journal_stats(self) -> Dict[str, Any]:
+        """Hole Journal Status (Sequenz, gehaltene Events, Resume Zähler)"""
+        return {
+            "epoch": self.epoch,
+            "sequence": self.sequence,
+            "oldest_seq": self.journal[0][0] if self.journal else None,
+            "size": len(self.journal),
+            **self.resume_stats
+        }
+    
     def get_connection_count(self) -> int:
         """Hole Anzahl aktiver Verbindungen"""
         return len(self.active_connections)
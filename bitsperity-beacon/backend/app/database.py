@@ -1,27 +1,87 @@
 """
-MongoDB Datenbankverbindung für Bitsperity Beacon
+Datenbankverbindung für Bitsperity Beacon (MongoDB, SQLite oder In-Memory)
 """
 import asyncio
-from typing import Optional
+from typing import Optional, Union
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
 import structlog
 
 from app.config import settings
+from app.storage import STORAGE_BACKENDS, MemoryCollection, SQLiteStore
 
 logger = structlog.get_logger(__name__)
 
 
+Collection = Union[AsyncIOMotorCollection, MemoryCollection]
+
+# Unique Indexes der lokalen Backends (entsprechen den MongoDB Indexes)
+SERVICE_UNIQUE_INDEXES = ("service_id", [("name", 1), ("host", 1), ("port", 1)])
+
+
 class Database:
-    """MongoDB Database Manager"""
+    """Database Manager für das konfigurierte Storage Backend"""
     
     def __init__(self):
+        self.backend: str = "mongodb"
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
-        self.services: Optional[AsyncIOMotorCollection] = None
-        self.health_checks: Optional[AsyncIOMotorCollection] = None
+        self.store: Optional[SQLiteStore] = None
+        self.services: Optional[Collection] = None
+        self.health_checks: Optional[Collection] = None
+        self.leases: Optional[Collection] = None
+    
+    @property
+    def supports_change_streams(self) -> bool:
+        """Change Streams und Leases (Cluster Mode) gibt es nur mit MongoDB"""
+        return self.backend == "mongodb"
         
     async def connect(self) -> None:
+        """Verbindung zum konfigurierten Storage Backend herstellen"""
+        backend = settings.storage_backend.lower()
+        if backend not in STORAGE_BACKENDS:
+            logger.error("Unbekanntes Storage Backend - verwende In-Memory", backend=backend)
+            backend = "memory"
+        self.backend = backend
+        
+        if backend == "mongodb":
+            await self._connect_mongodb()
+        else:
+            self._connect_local(backend)
+    
+    def _connect_local(self, backend: str) -> None:
+        """Lokales Backend ohne externen Dienst (SQLite Datei oder nur Speicher)"""
+        if self.services is not None:
+            return
+        
+        try:
+            if backend == "sqlite":
+                self.store = SQLiteStore(
+                    settings.sqlite_path,
+                    commit_interval=settings.sqlite_commit_interval,
+                    max_pending_writes=settings.sqlite_max_pending_writes
+                )
+                self.store.open()
+                self.services = self.store.collection(settings.services_collection, SERVICE_UNIQUE_INDEXES)
+                self.health_checks = self.store.collection(settings.health_checks_collection)
+                self.leases = self.store.collection(settings.leases_collection)
+                self.store.start()
+            else:
+                self.services = MemoryCollection(settings.services_collection, SERVICE_UNIQUE_INDEXES)
+                self.health_checks = MemoryCollection(settings.health_checks_collection)
+                self.leases = MemoryCollection(settings.leases_collection)
+            
+            logger.info("Lokales Storage Backend aktiv", backend=backend)
+            
+        except Exception as e:
+            logger.warning("Lokales Storage Backend nicht verfügbar - verwende In-Memory Fallback",
+                           backend=backend, error=str(e))
+            self.store = None
+            self.services = None
+            self.health_checks = None
+            self.leases = None
+    
+    async def _connect_mongodb(self) -> None:
         """Verbindung zur MongoDB herstellen"""
         try:
             logger.info("Verbinde mit MongoDB", url=settings.beacon_mongodb_url)
@@ -39,6 +99,7 @@ class Database:
             self.db = self.client[settings.database_name]
             self.services = self.db[settings.services_collection]
             self.health_checks = self.db[settings.health_checks_collection]
+            self.leases = self.db[settings.leases_collection]
             
             # Create indexes
             await self._create_indexes()
@@ -48,20 +109,37 @@ class Database:
         except ServerSelectionTimeoutError as e:
             logger.warning("MongoDB Verbindung fehlgeschlagen - verwende In-Memory Fallback", error=str(e))
             # Graceful fallback - App läuft ohne MongoDB
+            if self.client:
+                self.client.close()
             self.client = None
             self.db = None
             self.services = None
             self.health_checks = None
+            self.leases = None
         except Exception as e:
             logger.warning("Unerwarteter Fehler bei MongoDB Verbindung - verwende In-Memory Fallback", error=str(e))
             # Graceful fallback - App läuft ohne MongoDB
+            if self.client:
+                self.client.close()
             self.client = None
             self.db = None
             self.services = None
             self.health_checks = None
+            self.leases = None
     
     async def disconnect(self) -> None:
-        """Verbindung zur MongoDB schließen"""
+        """Verbindung schließen (SQLite: ausstehende Änderungen committen)"""
+        if self.store is not None:
+            logger.info("Schließe SQLite Storage")
+            await self.store.close()
+            self.store = None
+            self.services = None
+            self.health_checks = None
+            self.leases = None
+        elif self.backend == "memory":
+            self.services = None
+            self.health_checks = None
+            self.leases = None
         if self.client:
             logger.info("Schließe MongoDB Verbindung")
             self.client.close()
@@ -69,6 +147,7 @@ class Database:
             self.db = None
             self.services = None
             self.health_checks = None
+            self.leases = None
     
     async def _create_indexes(self) -> None:
         """Erstelle notwendige Indexes"""
@@ -83,6 +162,8 @@ class Database:
             await self.services.create_index("type")
             await self.services.create_index("host")
             await self.services.create_index([("type", 1), ("expires_at", 1)])
+            await self.services.create_index([("type", 1), ("service_id", 1)])  # Keyset Pagination
+            await self._create_registration_index()
             
             # Health Checks Collection Indexes
             await self.health_checks.create_index("service_id")
@@ -94,9 +175,44 @@ class Database:
         except Exception as e:
             logger.warning("Fehler beim Erstellen der Indexes - verwende In-Memory Fallback", error=str(e))
     
+    async def _create_registration_index(self) -> None:
+        """Unique Index auf (name, host, port) für idempotente Registrierung"""
+        keys = [("name", 1), ("host", 1), ("port", 1)]
+        try:
+            await self.services.create_index(keys, unique=True)
+        except DuplicateKeyError:
+            # Bestehende Datenbank aus der Zeit vor dem Upsert - Duplikate einmalig bereinigen
+            removed = await self._remove_duplicate_registrations()
+            logger.info("Doppelte Service Registrierungen entfernt", count=removed)
+            await self.services.create_index(keys, unique=True)
+    
+    async def _remove_duplicate_registrations(self) -> int:
+        """Behalte pro (name, host, port) nur die zuletzt gültige Registrierung"""
+        pipeline = [
+            {"$sort": {"expires_at": -1}},
+            {"$group": {
+                "_id": {"name": "$name", "host": "$host", "port": "$port"},
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ]
+        stale_ids = []
+        async for group in self.services.aggregate(pipeline):
+            stale_ids.extend(group["ids"][1:])
+        
+        if not stale_ids:
+            return 0
+        
+        result = await self.services.delete_many({"_id": {"$in": stale_ids}})
+        return result.deleted_count
+    
     async def health_check(self) -> bool:
         """Prüfe Datenbankverbindung"""
         try:
+            if self.backend != "mongodb":
+                return self.services is not None
+            
             if self.client is None:
                 return False
             
@@ -4,11 +4,7 @@ Enhanced with Health Check Manager Support
 """
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, Response
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI
 from fastapi.encoders import jsonable_encoder
 import structlog
 import os
@@ -18,36 +14,27 @@ from bson import ObjectId
 
 from app.config import settings
 from app.database import database
-from app.core import ServiceRegistry, TTLManager, WebSocketManager
+from app.core import (
+    ServiceRegistry, TTLManager, WebSocketManager, ServiceChangeWatcher, LeaderElection,
+    RegistrySnapshotManager, DnsSdResponder
+)
 from app.core.avahi_mdns import AvahiMDNSServer
+from app.core.asgi_middleware import CORSHeaderMiddleware, RequestTimingMiddleware
+from app.core.static_assets import StaticAssetMiddleware
 from app.core.health_check_manager import HealthCheckManager
+from app.core.logging_pipeline import configure_logging, shutdown_logging
 from app.api.v1 import services, discovery, health, websocket, debug
 from app.api.v1.services import set_dependencies
 from app.api.v1.websocket import set_websocket_manager
+from app.api.v1.health import set_health_check_manager
 
 # 🔥 DEBUG: Print startup info
 print("🚀 DEBUG: Starting Bitsperity Beacon - main.py loaded")
 print(f"🚀 DEBUG: Python version: {os.sys.version}")
 print(f"🚀 DEBUG: Current working directory: {os.getcwd()}")
 
-# Konfiguriere Logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+# Konfiguriere Logging (Rendering + Ausgabe im Hintergrund-Thread)
+configure_logging()
 
 logger = structlog.get_logger(__name__)
 
@@ -57,51 +44,158 @@ ttl_manager: TTLManager = None
 mdns_server: AvahiMDNSServer = None
 websocket_manager: WebSocketManager = None
 health_check_manager: HealthCheckManager = None
+change_watcher: ServiceChangeWatcher = None
+leader_election: LeaderElection = None
+snapshot_manager: RegistrySnapshotManager = None
+dns_sd_responder: DnsSdResponder = None
+warm_start_task: asyncio.Task = None
+# Dieser Worker führt die Hintergrund-Loops aus (Leader bzw. einzelne Instanz)
+background_tasks_running = False
 
 
-class CORSHeaderMiddleware(BaseHTTPMiddleware):
-    """Custom CORS Middleware to ensure headers are always set"""
+async def start_background_tasks() -> None:
+    """Starte Health Check Manager und TTL Manager"""
+    global background_tasks_running
+    background_tasks_running = True
+    # Start Health Check Manager
+    try:
+        await health_check_manager.start()
+        print("🔥 DEBUG: Health Check Manager started successfully")
+        logger.info("Health Check Manager gestartet")
+    except Exception as hc_error:
+        print(f"🚨 DEBUG: Health Check Manager failed to start: {hc_error}")
+        logger.warning("Health Check Manager failed to start", error=str(hc_error))
+        # Continue without health checks - not critical
     
-    async def dispatch(self, request: Request, call_next):
-        # Handle preflight requests
-        if request.method == "OPTIONS":
-            response = Response()
-            response.headers["Access-Control-Allow-Origin"] = "*"
-            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-            response.headers["Access-Control-Allow-Headers"] = "Origin, X-Requested-With, Content-Type, Accept, Authorization"
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Content-Length"] = "0"
-            return response
-        
-        # Process normal requests
-        response = await call_next(request)
-        
-        # Add CORS headers to all responses
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-        response.headers["Access-Control-Allow-Headers"] = "Origin, X-Requested-With, Content-Type, Accept, Authorization"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
+    # Starte TTL Manager
+    await ttl_manager.start()
+    print("🔥 DEBUG: TTL Manager started successfully")
+    logger.info("TTL Manager gestartet")
+
+
+async def stop_background_tasks() -> None:
+    """Stoppe TTL Manager und Health Check Manager"""
+    global background_tasks_running
+    background_tasks_running = False
+    # Stoppe TTL Manager
+    if ttl_manager:
+        print("🔥 DEBUG: Stopping TTL Manager...")
+        await ttl_manager.stop()
+        print("🔥 DEBUG: TTL Manager stopped")
+        logger.info("TTL Manager gestoppt")
+    
+    # Stop Health Check Manager
+    if health_check_manager:
+        try:
+            print("🔥 DEBUG: Stopping Health Check Manager...")
+            await health_check_manager.stop()
+            print("🔥 DEBUG: Health Check Manager stopped")
+            logger.info("Health Check Manager gestoppt")
+        except Exception as hc_error:
+            print(f"🚨 DEBUG: Error stopping Health Check Manager: {hc_error}")
+            logger.warning("Error stopping Health Check Manager", error=str(hc_error))
+
+
+async def publish_services_to_mdns(services) -> int:
+    """Registriere aktive Services beim mDNS Server (bereits registrierte werden übersprungen)"""
+    reregistered_count = 0
+    for service in services:
+        if service.status != "active":  # Only re-register active services
+            continue
+        if mdns_server.is_service_registered(service.service_id):
+            continue
+        mdns_success = await mdns_server.register_service(service)
+        if mdns_success:
+            reregistered_count += 1
+            logger.debug("Service per mDNS veröffentlicht", service_id=service.service_id, name=service.name)
+        else:
+            logger.warning("mDNS Veröffentlichung fehlgeschlagen", service_id=service.service_id, name=service.name)
+    return reregistered_count
+
+
+async def start_coordination() -> None:
+    """Starte Hintergrund-Loops (im Cluster Mode nur auf dem Leader)"""
+    global change_watcher, leader_election
+    
+    if settings.cluster_mode_enabled and not database.supports_change_streams:
+        logger.warning("Cluster Mode benötigt MongoDB - starte als einzelne Instanz",
+                       backend=database.backend)
+        await start_background_tasks()
+    elif settings.cluster_mode_enabled:
+        change_watcher = ServiceChangeWatcher(database, service_registry)
+        await change_watcher.start()
         
-        return response
+        leader_election = LeaderElection(
+            database,
+            on_elected=start_background_tasks,
+            on_demoted=stop_background_tasks
+        )
+        await leader_election.start()
+        logger.info("Cluster Mode aktiv", worker_id=leader_election.worker_id)
+    else:
+        await start_background_tasks()
+
+
+async def connect_and_reconcile(retry: bool = False) -> None:
+    """
+    Verbinde zur Database, gleiche Registry Cache und mDNS ab und starte
+    die Hintergrund-Loops
+    
+    Mit ``retry`` (Warm Start aus Snapshot) wird im Hintergrund so lange
+    neu verbunden, bis MongoDB erreichbar ist.
+    """
+    await database.connect()
+    if retry and database.services is None:
+        # Discovery aus dem Snapshot, Heartbeats nur im Cache, Schreibzugriffe mit 503
+        logger.warning("Database nicht erreichbar - Registry läuft degradiert aus dem Snapshot",
+                       retry_interval=settings.database_reconnect_interval)
+    while retry and database.services is None:
+        await asyncio.sleep(settings.database_reconnect_interval)
+        await database.connect()
+    logger.info("Database Verbindung hergestellt", connected=database.services is not None)
+    
+    # Re-register all existing services from database to mDNS
+    if database.services is not None:
+        try:
+            active_services, removed_services = await service_registry.reconcile_with_database()
+            for service in removed_services:
+                await mdns_server.unregister_service(service.service_id)
+            
+            reregistered_count = await publish_services_to_mdns(active_services)
+            logger.info("Existing services re-registered to mDNS", 
+                       total=len(active_services), 
+                       reregistered=reregistered_count,
+                       removed=len(removed_services))
+        except Exception as reregister_error:
+            logger.warning("Failed to re-register existing services to mDNS", error=str(reregister_error))
+    
+    await start_coordination()
+
+
+async def warm_start(snapshot_services) -> None:
+    """Veröffentliche Snapshot Services per mDNS und gleiche danach mit MongoDB ab"""
+    try:
+        published = await publish_services_to_mdns(snapshot_services)
+        logger.info("Snapshot Services per mDNS veröffentlicht", published=published)
+        await connect_and_reconcile(retry=True)
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.error("Fehler beim Warm Start", error=str(e))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application Lifespan Manager"""
     global service_registry, ttl_manager, mdns_server, websocket_manager, health_check_manager
+    global snapshot_manager, warm_start_task, dns_sd_responder
     
     print("🔥 DEBUG: Lifespan startup starting...")
     logger.info("Starte Bitsperity Beacon", version="1.0.0")
     
     try:
-        # 1. Verbinde zur Database
-        print("🔥 DEBUG: Step 1 - Connecting to database...")
-        await database.connect()
-        print("🔥 DEBUG: Database connection successful")
-        logger.info("Database Verbindung hergestellt")
-        
-        # 2. Initialisiere Core Komponenten
-        print("🔥 DEBUG: Step 2 - Initializing core components...")
+        # 1. Initialisiere Core Komponenten
+        print("🔥 DEBUG: Step 1 - Initializing core components...")
         websocket_manager = WebSocketManager()
         print("🔥 DEBUG: WebSocketManager created")
         
@@ -112,66 +206,64 @@ async def lifespan(app: FastAPI):
         print("🔥 DEBUG: ServiceRegistry created")
         
         # Initialize Health Check Manager
-        print("🔥 DEBUG: Step 3 - Creating HealthCheckManager...")
+        print("🔥 DEBUG: Step 2 - Creating HealthCheckManager...")
         health_check_manager = HealthCheckManager(service_registry, websocket_manager)
         print("🔥 DEBUG: HealthCheckManager created")
         
         # Initialize TTL Manager with health check support
-        print("🔥 DEBUG: Step 4 - Creating TTLManager...")
+        print("🔥 DEBUG: Step 3 - Creating TTLManager...")
         ttl_manager = TTLManager(service_registry, health_check_manager)
         print("🔥 DEBUG: TTLManager created")
         
-        # 3. Setze Dependencies für API Endpoints
-        print("🔥 DEBUG: Step 5 - Setting dependencies...")
+        # 2. Setze Dependencies für API Endpoints
+        print("🔥 DEBUG: Step 4 - Setting dependencies...")
         set_dependencies(service_registry, mdns_server, websocket_manager)
         set_websocket_manager(websocket_manager)
+        set_health_check_manager(health_check_manager)
+        # Snapshot für Clients, deren Resume Lücke nicht mehr im Journal liegt
+        websocket_manager.set_snapshot_provider(
+            lambda: [jsonable_encoder(service) for service in service_registry.snapshot_services()]
+        )
         print("🔥 DEBUG: Dependencies set")
         
+        # 3. Lade Registry Snapshot (Discovery ist sofort verfügbar)
+        snapshot_services = []
+        if settings.registry_snapshot_enabled:
+            # Nur der Worker mit den Hintergrund-Loops schreibt Snapshots
+            snapshot_manager = RegistrySnapshotManager(
+                service_registry, is_writer=lambda: background_tasks_running
+            )
+            snapshot_services = [
+                service for service in await snapshot_manager.load()
+                if not service.is_expired()
+            ]
+            service_registry.load_snapshot(snapshot_services)
+            logger.info("Registry Snapshot geladen", services=len(snapshot_services))
+        
         # 4. Starte mDNS Server
         print("🔥 DEBUG: Step 6 - Starting mDNS server...")
         await mdns_server.start()
         print("🔥 DEBUG: mDNS server started successfully")
         logger.info("mDNS Server gestartet")
         
-        # 4.5. Re-register all existing services from database to mDNS
-        print("🔥 DEBUG: Step 6.5 - Re-registering existing services to mDNS...")
-        try:
-            existing_services = await service_registry.get_all_services()
-            reregistered_count = 0
-            for service in existing_services:
-                if service.status == "active":  # Only re-register active services
-                    print(f"🔥 DEBUG: Re-registering service {service.name} to mDNS...")
-                    mdns_success = await mdns_server.register_service(service)
-                    if mdns_success:
-                        reregistered_count += 1
-                        print(f"🔥 DEBUG: mDNS re-registration SUCCESS for {service.name}")
-                    else:
-                        print(f"🔥 DEBUG: mDNS re-registration FAILED for {service.name}")
-            
-            print(f"🔥 DEBUG: Re-registered {reregistered_count}/{len(existing_services)} services to mDNS")
-            logger.info("Existing services re-registered to mDNS", 
-                       total=len(existing_services), 
-                       reregistered=reregistered_count)
-        except Exception as reregister_error:
-            print(f"🚨 DEBUG: Failed to re-register existing services: {reregister_error}")
-            logger.warning("Failed to re-register existing services to mDNS", error=str(reregister_error))
+        # Optionaler Unicast DNS-SD Responder (Clients ohne Multicast)
+        if settings.dns_sd_enabled:
+            try:
+                dns_sd_responder = DnsSdResponder(service_registry)
+                await dns_sd_responder.start()
+            except OSError as e:
+                logger.error("DNS-SD Responder konnte nicht gestartet werden", error=str(e))
+                dns_sd_responder = None
         
-        # Start Health Check Manager
-        print("🔥 DEBUG: Step 7 - Starting Health Check Manager...")
-        try:
-            await health_check_manager.start()
-            print("🔥 DEBUG: Health Check Manager started successfully")
-            logger.info("Health Check Manager gestartet")
-        except Exception as hc_error:
-            print(f"🚨 DEBUG: Health Check Manager failed to start: {hc_error}")
-            logger.warning("Health Check Manager failed to start", error=str(hc_error))
-            # Continue without health checks - not critical
+        # 5. Database, Abgleich und Hintergrund-Loops - mit Snapshot im Hintergrund
+        if snapshot_services:
+            logger.info("Warm Start aus Snapshot - Database Abgleich im Hintergrund")
+            warm_start_task = asyncio.create_task(warm_start(snapshot_services))
+        else:
+            await connect_and_reconcile()
         
-        # 5. Starte TTL Manager
-        print("🔥 DEBUG: Step 8 - Starting TTL Manager...")
-        await ttl_manager.start()
-        print("🔥 DEBUG: TTL Manager started successfully")
-        logger.info("TTL Manager gestartet")
+        if snapshot_manager:
+            await snapshot_manager.start()
         
         print("🔥 DEBUG: All startup steps completed successfully")
         logger.info("Bitsperity Beacon erfolgreich gestartet")
@@ -189,23 +281,29 @@ async def lifespan(app: FastAPI):
         logger.info("Stoppe Bitsperity Beacon")
         
         try:
-            # Stoppe TTL Manager
-            if ttl_manager:
-                print("🔥 DEBUG: Stopping TTL Manager...")
-                await ttl_manager.stop()
-                print("🔥 DEBUG: TTL Manager stopped")
-                logger.info("TTL Manager gestoppt")
-            
-            # Stop Health Check Manager
-            if health_check_manager:
+            # Stoppe Warm Start, falls MongoDB noch nicht erreicht wurde
+            if warm_start_task and not warm_start_task.done():
+                warm_start_task.cancel()
                 try:
-                    print("🔥 DEBUG: Stopping Health Check Manager...")
-                    await health_check_manager.stop()
-                    print("🔥 DEBUG: Health Check Manager stopped")
-                    logger.info("Health Check Manager gestoppt")
-                except Exception as hc_error:
-                    print(f"🚨 DEBUG: Error stopping Health Check Manager: {hc_error}")
-                    logger.warning("Error stopping Health Check Manager", error=str(hc_error))
+                    await warm_start_task
+                except asyncio.CancelledError:
+                    pass
+            
+            # Letzten Registry Snapshot schreiben
+            if snapshot_manager:
+                await snapshot_manager.stop()
+            
+            # Stoppe Cluster Koordination bzw. Hintergrund-Loops
+            if change_watcher:
+                await change_watcher.stop()
+            
+            if leader_election:
+                await leader_election.stop()
+            else:
+                await stop_background_tasks()
+            
+            if dns_sd_responder:
+                await dns_sd_responder.stop()
             
             # Stoppe mDNS Server
             if mdns_server:
@@ -226,6 +324,7 @@ async def lifespan(app: FastAPI):
         
         print("🔥 DEBUG: Shutdown completed")
         logger.info("Bitsperity Beacon gestoppt")
+        shutdown_logging()
 
 
 # Custom JSON Encoder für ObjectId und datetime
@@ -252,31 +351,28 @@ app = FastAPI(
 from fastapi.encoders import jsonable_encoder as fastapi_jsonable_encoder
 from app.core.json_encoder import jsonable_encoder
 
-# Custom CORS Middleware (first)
-app.add_middleware(CORSHeaderMiddleware)
+# Frontend Build (index.html für / und die SPA Routen)
+frontend_path = "/app/frontend/dist"
+SPA_ROUTES = ("/dashboard", "/services", "/discovery", "/settings")
 
-# Standard CORS Middleware (backup)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=3600,  # Cache preflight requests für 1 Stunde
-)
+# Pure ASGI Middlewares (CORS außen, damit auch Preflights nicht gemessen werden;
+# Frontend Dateien werden vor der Zeitmessung und dem Routing beantwortet)
+app.add_middleware(RequestTimingMiddleware)
+if os.path.isdir(frontend_path):
+    app.add_middleware(StaticAssetMiddleware, directory=frontend_path, spa_routes=SPA_ROUTES)
+app.add_middleware(CORSHeaderMiddleware)
 
-# API Routes
+# API Routes (Discovery vor Services, sonst fängt /{service_id} GET /discover ab)
 app.include_router(
-    services.router,
+    discovery.router,
     prefix=f"{settings.api_prefix}/services",
-    tags=["Services"]
+    tags=["Discovery"]
 )
 
 app.include_router(
-    discovery.router,
+    services.router,
     prefix=f"{settings.api_prefix}/services",
-    tags=["Discovery"]
+    tags=["Services"]
 )
 
 app.include_router(
@@ -297,41 +393,9 @@ app.include_router(
     tags=["Debug"]
 )
 
-# Static Files (Frontend)
-frontend_path = "/app/frontend/dist"
-if os.path.exists(frontend_path):
-    app.mount("/static", StaticFiles(directory=frontend_path), name="static")
-    
-    # Serve specific frontend assets
-    @app.get("/assets/{file_path:path}")
-    async def serve_assets(file_path: str):
-        """Serve Frontend Assets"""
-        asset_path = os.path.join(frontend_path, "assets", file_path)
-        if os.path.isfile(asset_path):
-            return FileResponse(asset_path)
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Asset not found")
-    
-    @app.get("/logo.svg")
-    async def serve_logo():
-        """Serve Logo"""
-        logo_path = os.path.join(frontend_path, "logo.svg")
-        if os.path.isfile(logo_path):
-            return FileResponse(logo_path)
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Logo not found")
-
-
 @app.get("/")
 async def root():
-    """Root Endpoint - Serve Frontend"""
-    # Serve frontend if available
-    if os.path.exists(frontend_path):
-        index_path = os.path.join(frontend_path, "index.html")
-        if os.path.isfile(index_path):
-            return FileResponse(index_path)
-    
-    # Fallback to API info
+    """Root Endpoint - API Info (ohne Frontend Build; sonst liefert StaticAssetMiddleware index.html)"""
     return {
         "name": "Bitsperity Beacon",
         "version": "1.0.0",
@@ -357,22 +421,6 @@ async def api_info():
     }
 
 
-# Frontend SPA Routing - specific routes only
-if os.path.exists(frontend_path):
-    # Serve index.html for common SPA routes
-    @app.get("/dashboard")
-    @app.get("/services")
-    @app.get("/discovery")
-    @app.get("/settings")
-    async def serve_spa_routes():
-        """Serve SPA Routes"""
-        index_path = os.path.join(frontend_path, "index.html")
-        if os.path.isfile(index_path):
-            return FileResponse(index_path)
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Frontend not found")
-
-
 if __name__ == "__main__":
     import uvicorn
     
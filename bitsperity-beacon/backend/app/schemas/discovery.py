@@ -33,6 +33,7 @@ class DiscoveryResponse(BaseModel):
     total: int
     filters_applied: Dict[str, str]
     discovery_method: str = "api"  # "api" or "mdns"
+    next_cursor: Optional[str] = None  # Opaker Cursor für die nächste Seite
     
     class Config:
         schema_extra = {
@@ -40,6 +41,7 @@ class DiscoveryResponse(BaseModel):
                 "services": [],
                 "total": 0,
                 "filters_applied": {"type": "iot"},
-                "discovery_method": "api"
+                "discovery_method": "api",
+                "next_cursor": None
             }
         } 
\ No newline at end of file
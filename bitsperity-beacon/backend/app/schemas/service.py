@@ -96,6 +96,21 @@ class ServiceListResponse(BaseModel):
     total: int
     page: int = 1
     page_size: int = 50
+    next_cursor: Optional[str] = None  # Opaker Cursor für die nächste Seite (Keyset Pagination)
+
+
+class ServiceStatsResponse(BaseModel):
+    """Schema für Service Statistik (Anzahl pro Dimension)"""
+    
+    total: int
+    by_type: Dict[str, int]
+    by_tag: Dict[str, int]
+    by_protocol: Dict[str, int]
+    by_status: Dict[str, int]
+    updated_at: datetime
+    heartbeats: dict = Field(default_factory=dict)  # Erwartete/gemessene Heartbeat Rate
+    admission: dict = Field(default_factory=dict)  # Rate Limit Zähler (zugelassen/abgelehnt/absorbiert)
+    websocket: dict = Field(default_factory=dict)  # Event Journal (Sequenz, Resume/Snapshot Zähler)
 
 
 class HeartbeatResponse(BaseModel):
@@ -105,4 +120,5 @@ class HeartbeatResponse(BaseModel):
     status: ServiceStatus
     expires_at: datetime
     last_heartbeat: datetime
+    next_heartbeat_at: Optional[datetime] = None  # Vom Server vorgegebener Zeitpunkt für den nächsten Heartbeat
     message: str = "Heartbeat received successfully" 
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Storage Backends für Bitsperity Beacon
+
+``Database`` verbindet je nach ``STORAGE_BACKEND`` mit MongoDB (Motor)
+oder mit einer lokalen Collection, die dieselbe Motor-API anbietet:
+
+- MemoryCollection: nur im Prozess (Warm Start über Registry Snapshots)
+- SQLiteStore: SQLite Datei im WAL Mode mit gebündelten Commits
+"""
+
+from .memory import MemoryCollection, MemoryCursor
+from .sqlite import SQLiteCollection, SQLiteStore
+
+STORAGE_BACKENDS = ("mongodb", "sqlite", "memory")
+
+__all__ = [
+    "MemoryCollection",
+    "MemoryCursor",
+    "SQLiteCollection",
+    "SQLiteStore",
+    "STORAGE_BACKENDS"
+]
@@ -0,0 +1,118 @@
+"""
+Benchmark: Heartbeat Write-Durchsatz der Storage Backends
+
+Simuliert den DB Write von ``extend_service_ttl`` (``update_one`` mit
+``$set`` auf ``expires_at``/``last_heartbeat``) für eine Flotte von
+Services. ``sqlite-commit-each`` committet nach jedem Write und zeigt,
+was die gebündelten Commits sparen.
+
+    python -m app.storage.benchmark --services 500 --heartbeats 20000
+    python -m app.storage.benchmark --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.storage import MemoryCollection, SQLiteStore
+
+
+def _service(index: int) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "service_id": f"bench-{index:06d}",
+        "name": f"sensor-{index}",
+        "host": f"10.0.{index // 250}.{index % 250 + 1}",
+        "port": 1883,
+        "type": "mqtt",
+        "protocol": "mqtt",
+        "tags": ["sensor", "benchmark"],
+        "metadata": {"room": f"room-{index % 20}", "firmware": "1.4.2"},
+        "ttl": 60,
+        "status": "active",
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat(),
+        "expires_at": (now + timedelta(seconds=60)).isoformat(),
+        "last_heartbeat": now.isoformat(),
+    }
+
+
+async def _run(collection, services: int, heartbeats: int,
+               after_write: Optional[Callable[[], Awaitable[None]]] = None,
+               finish: Optional[Callable[[], Awaitable[None]]] = None) -> float:
+    for index in range(services):
+        await collection.insert_one(_service(index))
+
+    start = time.perf_counter()
+    for count in range(heartbeats):
+        now = datetime.now(timezone.utc)
+        await collection.update_one(
+            {"service_id": f"bench-{count % services:06d}"},
+            {"$set": {
+                "expires_at": (now + timedelta(seconds=60)).isoformat(),
+                "last_heartbeat": now.isoformat(),
+                "updated_at": now.isoformat(),
+            }}
+        )
+        if after_write is not None:
+            await after_write()
+    if finish is not None:
+        await finish()
+    return time.perf_counter() - start
+
+
+async def benchmark(services: int, heartbeats: int, commit_interval: float,
+                    mongodb_url: Optional[str] = None) -> List[Tuple[str, float, str]]:
+    results = []
+
+    collection = MemoryCollection("services", SERVICE_UNIQUE_INDEXES)
+    results.append(("memory", await _run(collection, services, heartbeats), ""))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, each in (("sqlite", False), ("sqlite-commit-each", True)):
+            store = SQLiteStore(os.path.join(directory, f"{name}.sqlite3"), commit_interval=commit_interval)
+            store.open()
+            collection = store.collection("services", SERVICE_UNIQUE_INDEXES)
+            store.start()
+            elapsed = await _run(collection, services, heartbeats,
+                                 after_write=store.flush if each else None, finish=store.flush)
+            await store.close()
+            stats = store.get_stats()
+            results.append((name, elapsed, f"commits={stats['commits']} rows={stats['rows_written']}"))
+
+    if mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongodb_url)
+        database = client["beacon_benchmark"]
+        await database.services.drop()
+        for keys in SERVICE_UNIQUE_INDEXES:
+            await database.services.create_index(keys, unique=True)
+        results.append(("mongodb", await _run(database.services, services, heartbeats), ""))
+        await client.drop_database("beacon_benchmark")
+        client.close()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--heartbeats", type=int, default=20000)
+    parser.add_argument("--commit-interval", type=float, default=0.2)
+    parser.add_argument("--mongodb-url", default=os.environ.get("BEACON_TEST_MONGODB_URL"))
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args.services, args.heartbeats, args.commit_interval, args.mongodb_url))
+
+    print(f"{args.heartbeats} Heartbeats auf {args.services} Services")
+    print(f"{'Backend':<20} {'Heartbeats/s':>14} {'µs/Write':>10}  Details")
+    for name, elapsed, details in results:
+        print(f"{name:<20} {args.heartbeats / elapsed:>14,.0f} {elapsed / args.heartbeats * 1e6:>10.1f}  {details}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+In-Memory Collection mit Motor-kompatibler API
+
+Implementiert die Collection Methoden, die ``ServiceRegistry``, die Debug
+API und der Cluster Code auf ``database.services`` & Co. aufrufen. Unique
+Indexes werden als Dict gepflegt und liefern dieselbe
+``DuplicateKeyError`` wie MongoDB.
+"""
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
+
+from app.storage.query import apply_update, clone, equality_fields, matches, sort_documents
+
+IndexKeys = Union[str, Sequence[Tuple[str, int]]]
+
+
+def _index_fields(keys: IndexKeys) -> Tuple[str, ...]:
+    if isinstance(keys, str):
+        return (keys,)
+    return tuple(field for field, _ in keys)
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    include = {field for field, flag in projection.items() if flag and field != "_id"}
+    if include:
+        projected = {field: doc[field] for field in include if field in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            projected["_id"] = doc["_id"]
+        return projected
+    return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+
+class MemoryCursor:
+    """Cursor mit ``sort``/``skip``/``limit``/``to_list`` und async Iteration"""
+
+    def __init__(self, collection: "MemoryCollection", query: dict, projection: Optional[dict] = None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: IndexKeys, direction: int = 1) -> "MemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def _results(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._collection._matching(self._query)
+        if self._sort:
+            sort_documents(docs, self._sort)
+        end = None
+        if self._limit:
+            end = self._skip + self._limit
+        if length:
+            end = min(end, self._skip + length) if end is not None else self._skip + length
+        return [_project(clone(doc), self._projection) for doc in docs[self._skip:end]]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self._results(length)
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        for doc in self._results():
+            yield doc
+
+
+class MemoryCollection:
+    """Dokumente im Prozess (``_id`` -> Dokument) plus Unique Indexes"""
+
+    def __init__(self, name: str, unique_indexes: Iterable[IndexKeys] = ()):
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+        # Index Felder -> {Schlüssel Tupel -> _id}
+        self._unique: Dict[Tuple[str, ...], Dict[tuple, Any]] = {}
+        for keys in unique_indexes:
+            self._unique[_index_fields(keys)] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # Hooks für persistente Backends
+
+    def _persist(self, doc: dict) -> None:
+        """Dokument wurde eingefügt oder geändert"""
+
+    def _forget(self, doc_id: Any) -> None:
+        """Dokument wurde gelöscht"""
+
+    # Interne Helfer
+
+    @staticmethod
+    def _key(fields: Tuple[str, ...], doc: dict) -> tuple:
+        return tuple(doc.get(field) for field in fields)
+
+    def _load(self, doc: dict) -> None:
+        """Dokument ohne Prüfung übernehmen (Laden beim Start)"""
+        self._docs[doc["_id"]] = doc
+        for fields, index in self._unique.items():
+            index[self._key(fields, doc)] = doc["_id"]
+
+    def _candidates(self, query: dict) -> Iterable[dict]:
+        """Kandidaten über ``_id`` bzw. Unique Index, sonst alle Dokumente"""
+        equal = equality_fields(query)
+        try:
+            if "_id" in equal:
+                doc = self._docs.get(equal["_id"])
+                return (doc,) if doc is not None else ()
+            for fields, index in self._unique.items():
+                if all(field in equal for field in fields):
+                    doc_id = index.get(tuple(equal[field] for field in fields))
+                    return (self._docs[doc_id],) if doc_id is not None else ()
+        except TypeError:
+            # Nicht hashbarer Wert (z.B. Liste) - vollständiger Scan
+            pass
+        return list(self._docs.values())
+
+    def _matching(self, query: Optional[dict]) -> List[dict]:
+        query = query or {}
+        return [doc for doc in self._candidates(query) if matches(doc, query)]
+
+    def _first(self, query: Optional[dict]) -> Optional[dict]:
+        query = query or {}
+        for doc in self._candidates(query):
+            if matches(doc, query):
+                return doc
+        return None
+
+    def _check_unique(self, doc: dict, previous: Optional[dict] = None) -> None:
+        if previous is None and doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        for fields, index in self._unique.items():
+            owner = index.get(self._key(fields, doc))
+            if owner is not None and owner != doc["_id"]:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {'_'.join(fields)}"
+                )
+
+    def _store(self, doc: dict, previous: Optional[dict] = None) -> None:
+        self._check_unique(doc, previous)
+        for fields, index in self._unique.items():
+            if previous is not None:
+                index.pop(self._key(fields, previous), None)
+            index[self._key(fields, doc)] = doc["_id"]
+        self._docs[doc["_id"]] = doc
+        self._persist(doc)
+
+    def _remove(self, doc: dict) -> None:
+        del self._docs[doc["_id"]]
+        for fields, index in self._unique.items():
+            index.pop(self._key(fields, doc), None)
+        self._forget(doc["_id"])
+
+    def _upsert(self, query: dict, update: dict) -> dict:
+        doc = clone(equality_fields(query))
+        apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", str(ObjectId()))
+        self._store(doc)
+        return doc
+
+    def _update(self, doc: dict, update: dict) -> Tuple[dict, bool]:
+        # Flache Kopie genügt: apply_update ersetzt Werte, statt sie zu verändern
+        updated = dict(doc)
+        if not apply_update(updated, update):
+            return doc, False
+        self._store(updated, previous=doc)
+        return updated, True
+
+    # Motor-kompatible API
+
+    async def create_index(self, keys: IndexKeys, unique: bool = False, **kwargs) -> str:
+        fields = _index_fields(keys)
+        if unique and fields not in self._unique:
+            index: Dict[tuple, Any] = {}
+            for doc in self._docs.values():
+                key = self._key(fields, doc)
+                if key in index:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name} index: {'_'.join(fields)}"
+                    )
+                index[key] = doc["_id"]
+            self._unique[fields] = index
+        # Nicht-unique Indexes sind bei In-Memory Scans ohne Wirkung
+        return "_".join(f"{field}_1" for field in fields)
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        # Wie PyMongo: _id wird im übergebenen Dokument ergänzt
+        document.setdefault("_id", str(ObjectId()))
+        self._store(clone(document))
+        return InsertOneResult(document["_id"], True)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        doc = self._first(filter)
+        return _project(clone(doc), projection) if doc is not None else None
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor(self, filter or {}, projection)
+
+    async def count_documents(self, filter: Optional[dict] = None) -> int:
+        return len(self._matching(filter))
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        doc = self._first(filter)
+        if doc is None:
+            if not upsert:
+                return UpdateResult({"n": 0, "nModified": 0}, True)
+            inserted = self._upsert(filter, update)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": inserted["_id"]}, True)
+        _, changed = self._update(doc, update)
+        return UpdateResult({"n": 1, "nModified": int(changed)}, True)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: Optional[dict] = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs
+    ) -> Optional[dict]:
+        doc = self._first(filter)
+        if doc is None:
+            if not upsert:
+                return None
+            inserted = self._upsert(filter, update)
+            # ReturnDocument.BEFORE (False) liefert bei Inserts None
+            return _project(clone(inserted), projection) if return_document else None
+        updated, _ = self._update(doc, update)
+        return _project(clone(updated if return_document else doc), projection)
+
+    async def delete_one(self, filter: dict) -> DeleteResult:
+        doc = self._first(filter)
+        if doc is None:
+            return DeleteResult({"n": 0}, True)
+        self._remove(doc)
+        return DeleteResult({"n": 1}, True)
+
+    async def delete_many(self, filter: dict) -> DeleteResult:
+        docs = self._matching(filter)
+        for doc in docs:
+            self._remove(doc)
+        return DeleteResult({"n": len(docs)}, True)
@@ -0,0 +1,155 @@
+"""
+MongoDB Query- und Update-Semantik für lokale Storage Backends
+
+Unterstützt genau die Teilmenge, die Registry, Cluster und Debug API
+verwenden: Gleichheit (inkl. Arrays), ``$gt``/``$gte``/``$lt``/``$lte``,
+``$ne``, ``$in``/``$nin``, ``$exists``, ``$or``/``$and`` sowie die Updates
+``$set``, ``$setOnInsert`` und ``$unset``.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+_MISSING = object()
+
+
+def _compare(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    """Vergleich wie MongoDB: unterschiedliche Typen matchen nie"""
+    def compare(value: Any, operand: Any) -> bool:
+        if value is _MISSING or value is None:
+            return False
+        candidates = value if isinstance(value, list) else (value,)
+        for candidate in candidates:
+            try:
+                if op(candidate, operand):
+                    return True
+            except TypeError:
+                continue
+        return False
+    return compare
+
+
+def _equals(value: Any, operand: Any) -> bool:
+    if value is _MISSING:
+        return operand is None
+    if value == operand:
+        return True
+    # Skalar gegen Array Feld: Mitgliedschaft
+    return isinstance(value, list) and not isinstance(operand, list) and operand in value
+
+
+def _in(value: Any, operands: List[Any]) -> bool:
+    return any(_equals(value, operand) for operand in operands)
+
+
+def _exists(value: Any, operand: Any) -> bool:
+    return (value is not _MISSING) == bool(operand)
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$gt": _compare(lambda a, b: a > b),
+    "$gte": _compare(lambda a, b: a >= b),
+    "$lt": _compare(lambda a, b: a < b),
+    "$lte": _compare(lambda a, b: a <= b),
+    "$ne": lambda value, operand: not _equals(value, operand),
+    "$in": _in,
+    "$nin": lambda value, operands: not _in(value, operands),
+    "$exists": _exists,
+}
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """Prüfe, ob ``doc`` den MongoDB Filter ``query`` erfüllt"""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, sub_query) for sub_query in condition):
+                return False
+            continue
+        if field == "$and":
+            if not all(matches(doc, sub_query) for sub_query in condition):
+                return False
+            continue
+
+        value = doc.get(field, _MISSING)
+        if _is_operator_dict(condition):
+            for operator, operand in condition.items():
+                check = _OPERATORS.get(operator)
+                if check is None:
+                    raise ValueError(f"Nicht unterstützter Query Operator: {operator}")
+                if not check(value, operand):
+                    return False
+        elif not _equals(value, condition):
+            return False
+    return True
+
+
+def equality_fields(query: dict) -> Dict[str, Any]:
+    """Felder mit direkter Gleichheit (Basis für Upsert und Index Lookups)"""
+    return {
+        field: condition for field, condition in query.items()
+        if not field.startswith("$") and not _is_operator_dict(condition)
+    }
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> bool:
+    """Wende ``$set``/``$setOnInsert``/``$unset`` auf ``doc`` an; True wenn geändert"""
+    changed = False
+    for operator, fields in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            for field, value in fields.items():
+                if doc.get(field, _MISSING) != value:
+                    doc[field] = clone(value)
+                    changed = True
+        elif operator == "$unset":
+            for field in fields:
+                if field in doc:
+                    del doc[field]
+                    changed = True
+        elif operator != "$setOnInsert":
+            raise ValueError(f"Nicht unterstützter Update Operator: {operator}")
+    return changed
+
+
+def clone(value: Any) -> Any:
+    """Schnelle Tiefenkopie für JSON-artige Dokumente (inkl. datetime)"""
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+
+class _SortKey:
+    """Sortierschlüssel mit MongoDB Reihenfolge (fehlend/None zuerst, dann nach Typ)"""
+
+    __slots__ = ("rank", "value")
+
+    _TYPE_RANK = ((bool, 3), ((int, float), 1), (str, 2), (datetime, 4))
+
+    def __init__(self, value: Any):
+        if value is _MISSING or value is None:
+            self.rank, self.value = 0, 0
+            return
+        self.rank, self.value = 5, str(value)
+        for types, rank in self._TYPE_RANK:
+            if isinstance(value, types):
+                self.rank, self.value = rank, value
+                break
+
+    def __lt__(self, other: "_SortKey") -> bool:
+        if self.rank != other.rank:
+            return self.rank < other.rank
+        return self.value < other.value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _SortKey) and self.rank == other.rank and self.value == other.value
+
+
+def sort_documents(docs: List[dict], keys: List[Tuple[str, int]]) -> List[dict]:
+    """Stabil nach mehreren Feldern sortieren (1 aufsteigend, -1 absteigend)"""
+    for field, direction in reversed(keys):
+        docs.sort(key=lambda doc: _SortKey(doc.get(field, _MISSING)), reverse=direction < 0)
+    return docs
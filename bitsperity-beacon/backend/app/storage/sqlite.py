@@ -0,0 +1,208 @@
+"""
+SQLite Storage Backend (WAL, gebündelte Commits)
+
+Für Installationen ohne MongoDB (z.B. Raspberry Pi). Jede Collection ist
+eine Tabelle ``(id, doc)`` mit dem Dokument als JSON. Beim Start werden
+alle Dokumente geladen; Lesezugriffe laufen danach über die
+``MemoryCollection``. Schreibzugriffe werden pro Dokument vorgemerkt und
+alle ``SQLITE_COMMIT_INTERVAL`` Sekunden (bzw. ab
+``SQLITE_MAX_PENDING_WRITES`` Änderungen) in einer Transaktion in einem
+Worker Thread geschrieben. Mehrere Heartbeats desselben Services zwischen
+zwei Commits ergeben so nur einen Row-Write.
+
+Bei einem Absturz gehen höchstens die Änderungen seit dem letzten Commit
+verloren - Heartbeats kommen ohnehin erneut, Clients registrieren sich
+nach ``404`` neu.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import structlog
+
+from app.storage.memory import IndexKeys, MemoryCollection
+
+logger = structlog.get_logger(__name__)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+
+def _decode_object(obj: dict) -> Any:
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_document(doc: Any) -> str:
+    """JSON mit Typ-Markierung für datetime (wie Extended JSON)"""
+    return json.dumps(doc, default=_encode_value, separators=(",", ":"))
+
+
+def decode_document(data: str) -> Any:
+    return json.loads(data, object_hook=_decode_object)
+
+
+class SQLiteCollection(MemoryCollection):
+    """MemoryCollection, deren Änderungen im ``SQLiteStore`` vorgemerkt werden"""
+
+    def __init__(self, store: "SQLiteStore", name: str, unique_indexes: Iterable[IndexKeys] = ()):
+        super().__init__(name, unique_indexes)
+        self._store_backend = store
+
+    def _persist(self, doc: dict) -> None:
+        self._store_backend.stage(self.name, doc["_id"], doc)
+
+    def _forget(self, doc_id: Any) -> None:
+        self._store_backend.stage(self.name, doc_id, None)
+
+
+class SQLiteStore:
+    """Eine SQLite Datei im WAL Mode mit einer Tabelle pro Collection"""
+
+    def __init__(self, path: str, commit_interval: float = 0.2, max_pending_writes: int = 1000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_pending_writes = max_pending_writes
+        self._connection: Optional[sqlite3.Connection] = None
+        self._collections: Dict[str, SQLiteCollection] = {}
+        # (Collection, _id) -> Dokument bzw. None für Löschungen
+        self._pending: Dict[Tuple[str, Any], Optional[dict]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "staged_writes": 0,
+            "rows_written": 0,
+            "rows_deleted": 0,
+            "commits": 0,
+            "commit_errors": 0,
+            "last_commit_ms": 0.0,
+        }
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Nur der Flush Thread schreibt; Laden passiert vor dem ersten Flush
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        logger.info("SQLite Storage geöffnet", path=self.path)
+
+    def collection(self, name: str, unique_indexes: Iterable[IndexKeys] = ()) -> SQLiteCollection:
+        """Tabelle anlegen bzw. laden"""
+        if name in self._collections:
+            return self._collections[name]
+
+        self._connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" (id TEXT PRIMARY KEY, doc TEXT NOT NULL) WITHOUT ROWID'
+        )
+        collection = SQLiteCollection(self, name, unique_indexes)
+        for (data,) in self._connection.execute(f'SELECT doc FROM "{name}"'):
+            collection._load(decode_document(data))
+        self._collections[name] = collection
+        logger.info("SQLite Collection geladen", collection=name, documents=len(collection))
+        return collection
+
+    def stage(self, collection: str, doc_id: Any, doc: Optional[dict]) -> None:
+        """Änderung für den nächsten Commit vormerken (Dokumente werden nicht verändert, nur ersetzt)"""
+        self._pending[(collection, doc_id)] = doc
+        self._stats["staged_writes"] += 1
+        if len(self._pending) >= self.max_pending_writes:
+            self._wakeup.set()
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.commit_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["commit_errors"] += 1
+                logger.error("SQLite Commit fehlgeschlagen", error=str(e))
+
+    async def flush(self) -> None:
+        """Vorgemerkte Änderungen in einer Transaktion schreiben"""
+        async with self._flush_lock:
+            if not self._pending or self._connection is None:
+                return
+            pending, self._pending = self._pending, {}
+
+            writes: Dict[str, List[Tuple[str, str]]] = {}
+            deletes: Dict[str, List[Tuple[str]]] = {}
+            for (collection, doc_id), doc in pending.items():
+                key = encode_document(doc_id)
+                if doc is None:
+                    deletes.setdefault(collection, []).append((key,))
+                else:
+                    writes.setdefault(collection, []).append((key, encode_document(doc)))
+
+            try:
+                await asyncio.to_thread(self._commit, writes, deletes)
+            except Exception:
+                # Nicht geschriebene Änderungen beim nächsten Versuch erneut schreiben
+                for key, doc in pending.items():
+                    self._pending.setdefault(key, doc)
+                raise
+
+    def _commit(self, writes: Dict[str, List[Tuple[str, str]]], deletes: Dict[str, List[Tuple[str]]]) -> None:
+        start = time.perf_counter()
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            for collection, rows in writes.items():
+                connection.executemany(f'INSERT OR REPLACE INTO "{collection}" (id, doc) VALUES (?, ?)', rows)
+                self._stats["rows_written"] += len(rows)
+            for collection, rows in deletes.items():
+                connection.executemany(f'DELETE FROM "{collection}" WHERE id = ?', rows)
+                self._stats["rows_deleted"] += len(rows)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._stats["commits"] += 1
+        self._stats["last_commit_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        if self._connection is not None:
+            try:
+                await self.flush()
+            finally:
+                self._connection.close()
+                self._connection = None
+                logger.info("SQLite Storage geschlossen", path=self.path)
+
+    def get_stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pending_writes"] = len(self._pending)
+        stats["commit_interval"] = self.commit_interval
+        return stats
@@ -0,0 +1,108 @@
+"""
+Tests für die Admission Control (Token Buckets, Client Adresse hinter Proxies)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.admission import (
+    AdmissionController,
+    TokenBucketLimiter,
+    parse_trusted_proxies,
+    resolve_client_address,
+)
+
+TRUSTED = parse_trusted_proxies("10.21.0.0/16, 127.0.0.1")
+
+
+class TestTokenBucketLimiter:
+    """Burst, Nachfüllen und Retry-After"""
+
+    def test_burst_then_reject(self):
+        limiter = TokenBucketLimiter(rate=1.0, burst=3)
+
+        assert [limiter.acquire("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.acquire("a", now=0.0) == pytest.approx(1.0)
+        # Andere Schlüssel haben eigene Buckets
+        assert limiter.acquire("b", now=0.0) == 0.0
+
+    def test_refill(self):
+        limiter = TokenBucketLimiter(rate=2.0, burst=1)
+        assert limiter.acquire("a", now=0.0) == 0.0
+        assert limiter.acquire("a", now=0.25) == pytest.approx(0.25)
+        assert limiter.acquire("a", now=0.5) == 0.0
+        # Nie mehr als burst Tokens ansparen
+        assert limiter.acquire("a", now=100.0) == 0.0
+        assert limiter.acquire("a", now=100.0) > 0
+
+    def test_zero_rate_disables_limit(self):
+        limiter = TokenBucketLimiter(rate=0, burst=1)
+        assert all(limiter.acquire("a", now=0.0) == 0.0 for _ in range(10))
+        assert len(limiter) == 0
+
+    def test_idle_buckets_are_pruned(self, monkeypatch):
+        monkeypatch.setattr("app.core.admission._PRUNE_INTERVAL", 4)
+        limiter = TokenBucketLimiter(rate=1.0, burst=2)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key, now=0.0)
+
+        limiter.acquire("d", now=10.0)
+
+        assert len(limiter) == 1
+
+
+class TestAdmissionController:
+    """Client- und Service-Limits mit Retry-After in ganzen Sekunden"""
+
+    def make_controller(self):
+        controller = AdmissionController()
+        controller.enabled = True
+        controller._limiters[("heartbeat", "client")] = TokenBucketLimiter(rate=100.0, burst=100)
+        controller._limiters[("heartbeat", "service")] = TokenBucketLimiter(rate=0.5, burst=2)
+        return controller
+
+    def test_service_limit_returns_retry_after(self):
+        controller = self.make_controller()
+
+        assert controller.check("heartbeat", "10.0.0.1", "svc-1") == 0
+        assert controller.check("heartbeat", "10.0.0.1", "svc-1") == 0
+        assert controller.check("heartbeat", "10.0.0.1", "svc-1") == 2
+        assert controller.check("heartbeat", "10.0.0.1", "svc-2") == 0
+
+        stats = controller.get_stats()
+        assert stats["heartbeat_admitted"] == 3
+        assert stats["heartbeat_rejected_service"] == 1
+
+    def test_disabled_admits_everything(self):
+        controller = self.make_controller()
+        controller.enabled = False
+        assert all(controller.check("heartbeat", None, "svc-1") == 0 for _ in range(10))
+
+
+class TestClientAddress:
+    """X-Forwarded-For/X-Real-IP nur von vertrauenswürdigen Proxies"""
+
+    @pytest.mark.parametrize("peer,headers,expected", [
+        ("10.21.0.5", {"x-forwarded-for": "192.168.1.7"}, "192.168.1.7"),
+        ("10.21.0.5", {"x-forwarded-for": "6.6.6.6, 192.168.1.7, 10.21.0.9"}, "192.168.1.7"),
+        ("127.0.0.1", {"x-real-ip": "192.168.1.8"}, "192.168.1.8"),
+        ("127.0.0.1", {}, "127.0.0.1"),
+        ("10.21.0.5", {"x-forwarded-for": "10.21.0.9"}, "10.21.0.9"),
+        # Nicht vertrauenswürdiger Peer: Header werden ignoriert
+        ("192.168.1.2", {"x-forwarded-for": "1.2.3.4"}, "192.168.1.2"),
+        (None, {"x-forwarded-for": "1.2.3.4"}, None),
+    ])
+    def test_resolve(self, peer, headers, expected):
+        assert resolve_client_address(peer, headers, TRUSTED) == expected
+
+    def test_no_trusted_proxies_uses_peer(self):
+        assert resolve_client_address("10.21.0.5", {"x-forwarded-for": "192.168.1.7"}, []) == "10.21.0.5"
+
+    def test_parse(self):
+        assert parse_trusted_proxies("") == []
+        assert [str(network) for network in TRUSTED] == ["10.21.0.0/16", "127.0.0.1/32"]
+        with pytest.raises(ValueError):
+            parse_trusted_proxies("not-an-ip")
@@ -0,0 +1,113 @@
+"""
+Tests für die Pure ASGI Middlewares (CORS Header und Request Timing)
+"""
+import os
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.asgi_middleware import CORSHeaderMiddleware, LatencyHistograms, RequestTimingMiddleware
+
+
+def make_client(allow_origins, histograms: LatencyHistograms) -> httpx.AsyncClient:
+    app = FastAPI()
+
+    @app.get("/services/{service_id}")
+    async def get_service(service_id: str):
+        if service_id == "broken":
+            raise HTTPException(status_code=503, detail="unavailable")
+        return {"service_id": service_id}
+
+    app.add_middleware(RequestTimingMiddleware, histograms=histograms)
+    app.add_middleware(CORSHeaderMiddleware, allow_origins=allow_origins)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://beacon")
+
+
+class TestCORSHeaderMiddleware:
+    """Origin spiegeln, Preflight direkt beantworten"""
+
+    @pytest.mark.asyncio
+    async def test_allowed_origin_is_mirrored(self):
+        async with make_client(["http://umbrel.local"], LatencyHistograms()) as client:
+            response = await client.get("/services/a", headers={"Origin": "http://umbrel.local"})
+            foreign = await client.get("/services/a", headers={"Origin": "http://evil.example"})
+            no_origin = await client.get("/services/a")
+
+        assert response.headers["access-control-allow-origin"] == "http://umbrel.local"
+        assert response.headers["vary"] == "Origin"
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert "access-control-allow-origin" not in foreign.headers
+        assert no_origin.headers["access-control-allow-origin"] == "*"
+
+    @pytest.mark.asyncio
+    async def test_preflight(self):
+        async with make_client(["*"], LatencyHistograms()) as client:
+            response = await client.options("/services/a", headers={
+                "Origin": "http://any.example",
+                "Access-Control-Request-Method": "PUT",
+                "Access-Control-Request-Headers": "X-Custom",
+            })
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["access-control-allow-origin"] == "http://any.example"
+        assert response.headers["access-control-allow-headers"] == "X-Custom"
+        assert response.headers["access-control-max-age"] == "3600"
+
+    @pytest.mark.asyncio
+    async def test_preflight_from_disallowed_origin(self):
+        async with make_client(["http://umbrel.local"], LatencyHistograms()) as client:
+            response = await client.options("/services/a", headers={
+                "Origin": "http://evil.example",
+                "Access-Control-Request-Method": "DELETE",
+            })
+
+        assert response.status_code == 400
+        assert "access-control-allow-origin" not in response.headers
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("headers", [{}, {"Origin": "http://umbrel.local"}])
+    async def test_plain_options_reaches_the_app(self, headers):
+        histograms = LatencyHistograms()
+        async with make_client(["http://umbrel.local"], histograms) as client:
+            response = await client.options("/services/a", headers=headers)
+
+        # Kein Preflight: die App antwortet (FastAPI: 405 für nicht definiertes OPTIONS)
+        assert response.status_code == 405
+        assert response.headers["access-control-allow-origin"] in ("*", "http://umbrel.local")
+        assert sum(route["count"] for route in histograms.get_stats().values()) == 1
+
+
+class TestRequestTiming:
+    """Histogramme pro Routen Template inkl. 5xx Zähler"""
+
+    @pytest.mark.asyncio
+    async def test_observes_route_templates(self):
+        histograms = LatencyHistograms()
+        async with make_client(["*"], histograms) as client:
+            for service_id in ("a", "b", "broken"):
+                await client.get(f"/services/{service_id}")
+            await client.get("/missing")
+
+        stats = histograms.get_stats()
+        assert set(stats) == {"GET /services/{service_id}", "unmatched"}
+        route = stats["GET /services/{service_id}"]
+        assert route["count"] == 3
+        assert route["errors"] == 1
+        assert route["buckets_ms"]["+Inf"] == 3
+
+    def test_quantiles_from_buckets(self):
+        histograms = LatencyHistograms(buckets_ms=(1, 10, 100))
+        for duration in [0.5] * 50 + [5] * 40 + [50] * 9 + [500]:
+            histograms.observe("GET /x", duration, 200)
+
+        stats = histograms.get_stats()["GET /x"]
+        assert (stats["p50_ms"], stats["p90_ms"], stats["p99_ms"]) == (1, 10, 100)
+        assert stats["buckets_ms"] == {"1": 50, "10": 90, "100": 99, "+Inf": 100}
+
+        histograms.reset()
+        assert histograms.get_stats() == {}
@@ -0,0 +1,276 @@
+"""
+Tests für die Multi-Worker Koordination (Change Stream Watcher, Leader Election)
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core.cluster import LeaderElection, ServiceChangeWatcher
+from app.core.json_encoder import jsonable_encoder
+from app.core.service_registry import ServiceRegistry
+from app.models.service import Service
+from app.storage import MemoryCollection
+
+
+class ScriptedStream:
+    """Change Stream, der Events liefert und danach optional einen Fehler wirft"""
+
+    def __init__(self, changes, error=None):
+        self.changes = changes
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for index, change in enumerate(self.changes):
+            self.resume_token = {"_data": f"token-{index}"}
+            yield change
+        if self.error is not None:
+            raise self.error
+
+
+class ScriptedServices:
+    """``watch()`` liefert nacheinander die vorgegebenen Streams, danach ist Schluss"""
+
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.resume_after = []
+
+    def watch(self, full_document=None, resume_after=None):
+        self.resume_after.append(resume_after)
+        if not self.streams:
+            raise asyncio.CancelledError()
+        return self.streams.pop(0)
+
+
+class ScriptedDatabase:
+    def __init__(self, services):
+        self.services = services
+
+
+class RecordingRegistry:
+    def __init__(self):
+        self.changes = []
+        self.reconciled = 0
+
+    def apply_change_event(self, change):
+        self.changes.append(change)
+
+    async def reconcile_with_database(self):
+        self.reconciled += 1
+        return [], []
+
+
+async def run_watcher(*streams):
+    services = ScriptedServices(*streams)
+    registry = RecordingRegistry()
+    watcher = ServiceChangeWatcher(ScriptedDatabase(services), registry)
+    watcher._running = True
+    await asyncio.wait_for(watcher._watch_loop(), 5)
+    return watcher, services, registry
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(settings, "cluster_watch_retry_interval", 0)
+
+
+class TestServiceChangeWatcher:
+    """Fehlerpfade des Change Streams"""
+
+    @pytest.mark.asyncio
+    async def test_standalone_disables_watcher(self):
+        watcher, services, registry = await run_watcher(
+            ScriptedStream([], OperationFailure("only supported on replica sets", code=40573)),
+            ScriptedStream([{"operationType": "insert"}]),
+        )
+
+        assert not watcher._running
+        assert len(services.resume_after) == 1
+        assert registry.changes == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("code", [260, 280, 286])
+    async def test_lost_history_resyncs_and_reopens(self, code):
+        watcher, services, registry = await run_watcher(
+            ScriptedStream([{"operationType": "insert"}], OperationFailure("history lost", code=code)),
+            ScriptedStream([{"operationType": "delete"}]),
+        )
+
+        assert registry.reconciled == 1
+        # Erster Stream ohne Token, nach dem Resync wieder ohne (verworfener) Token
+        assert services.resume_after == [None, None, {"_data": "token-0"}]
+        assert [change["operationType"] for change in registry.changes] == ["insert", "delete"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("error", [
+        AutoReconnect("primary stepped down"),
+        OperationFailure("not authorized", code=13),
+    ])
+    async def test_transient_errors_resume_with_token(self, error):
+        watcher, services, registry = await run_watcher(
+            ScriptedStream([{"operationType": "insert"}, {"operationType": "update"}], error),
+            ScriptedStream([]),
+        )
+
+        assert registry.reconciled == 0
+        assert services.resume_after[1] == {"_data": "token-1"}
+        assert len(registry.changes) == 2
+
+
+class LeaseDatabase:
+    def __init__(self):
+        self.leases = MemoryCollection("leases")
+
+
+class RecordingElection(LeaderElection):
+    """Leader Election mit protokollierten Statuswechseln"""
+
+    def __init__(self, database, worker_id):
+        self.events = []
+
+        async def elected():
+            self.events.append("elected")
+
+        async def demoted():
+            self.events.append("demoted")
+
+        super().__init__(database, elected, demoted, worker_id=worker_id)
+
+    async def renew(self) -> bool:
+        acquired = await self._try_acquire_lease()
+        await self._set_leader(acquired)
+        return acquired
+
+
+def expire_lease(database):
+    lease = database.leases._docs["background-tasks"]
+    lease["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+
+class TestLeaderElection:
+    """Lease Übernahme, Verlängerung und Abgabe"""
+
+    @pytest.mark.asyncio
+    async def test_single_holder_while_lease_valid(self):
+        database = LeaseDatabase()
+        first, second = RecordingElection(database, "worker-a"), RecordingElection(database, "worker-b")
+
+        assert await first.renew()
+        # Upsert auf bestehende _id schlägt mit DuplicateKeyError fehl -> kein Leader
+        assert not await second.renew()
+        assert await first.renew()
+
+        assert first.events == ["elected"]
+        assert second.events == []
+        assert database.leases._docs["background-tasks"]["holder"] == "worker-a"
+
+    @pytest.mark.asyncio
+    async def test_takeover_after_expiry_demotes_previous_holder(self):
+        database = LeaseDatabase()
+        first, second = RecordingElection(database, "worker-a"), RecordingElection(database, "worker-b")
+        await first.renew()
+
+        expire_lease(database)
+        assert await second.renew()
+        assert not await first.renew()
+
+        assert first.events == ["elected", "demoted"]
+        assert second.events == ["elected"]
+        assert database.leases._docs["background-tasks"]["holder"] == "worker-b"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquire_has_one_winner(self):
+        database = LeaseDatabase()
+        elections = [RecordingElection(database, f"worker-{index}") for index in range(5)]
+
+        results = await asyncio.gather(*(election.renew() for election in elections))
+
+        assert results.count(True) == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_lease(self):
+        database = LeaseDatabase()
+        first, second = RecordingElection(database, "worker-a"), RecordingElection(database, "worker-b")
+        first._running = True
+        await first.renew()
+
+        await first.stop()
+
+        assert first.events == ["elected", "demoted"]
+        assert await second.renew()
+
+
+def service_doc(service_id: str = "svc-1", **fields) -> dict:
+    service = Service(service_id=service_id, name="sensor", type="iot", host="10.0.0.1", port=80, ttl=60)
+    doc = jsonable_encoder(service.model_dump(by_alias=True))
+    doc.update(fields)
+    return doc
+
+
+class TestApplyChangeEvent:
+    """Events anderer Worker im lokalen Cache"""
+
+    def test_insert_update_delete(self):
+        registry = ServiceRegistry(database=None)
+        doc = service_doc()
+
+        registry.apply_change_event({"operationType": "insert", "fullDocument": doc})
+        assert registry.stats.by_status == {"active": 1}
+
+        registry.apply_change_event({"operationType": "update",
+                                     "fullDocument": dict(doc, status="unhealthy", tags=["pump"])})
+        assert registry._services_cache["svc-1"].status == "unhealthy"
+        assert registry.stats.by_status == {"unhealthy": 1}
+        assert registry.stats.by_tag == {"pump": 1}
+
+        registry.apply_change_event({"operationType": "delete", "documentKey": {"_id": doc["_id"]}})
+        assert registry._services_cache == {}
+        assert registry.stats.total == 0
+
+    def test_counts_invalidated(self):
+        registry = ServiceRegistry(database=None)
+        registry.apply_change_event({"operationType": "insert", "fullDocument": service_doc()})
+
+        registry._count_cache[(None, None, None, None)] = (1, 0.0)
+        registry.apply_change_event({"operationType": "update",
+                                     "fullDocument": service_doc(status="unhealthy")})
+        assert registry._count_cache == {}
+
+    def test_expired_or_missing_documents(self):
+        registry = ServiceRegistry(database=None)
+        registry.apply_change_event({"operationType": "insert", "fullDocument": service_doc()})
+
+        # Update auf ein bereits abgelaufenes Dokument entfernt den Service
+        expired = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+        registry.apply_change_event({"operationType": "update",
+                                     "fullDocument": service_doc(expires_at=expired)})
+        assert registry._services_cache == {}
+
+        # Zwischen Update und Lookup gelöscht: kein fullDocument
+        registry.apply_change_event({"operationType": "update", "fullDocument": None})
+        registry.apply_change_event({"operationType": "insert", "fullDocument": {"name": "broken"}})
+        assert registry._services_cache == {}
+
+    def test_drop_clears_cache(self):
+        registry = ServiceRegistry(database=None)
+        for index in range(3):
+            registry.apply_change_event({"operationType": "insert", "fullDocument": service_doc(f"svc-{index}")})
+
+        registry.apply_change_event({"operationType": "drop"})
+
+        assert registry._services_cache == {}
+        assert registry.stats.total == 0
+        assert registry.heartbeat_pacer.expected_rate == 0
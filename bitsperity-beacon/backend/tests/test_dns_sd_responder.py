@@ -0,0 +1,114 @@
+"""
+Tests für den Unicast DNS-SD Responder (Antworten aus dem Registry Cache)
+"""
+import os
+import sys
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.dns_sd_responder import DnsSdResponder
+from app.core.service_registry import ServiceRegistry
+from app.models.service import Service, ServiceStatus
+
+
+def make_service(service_id: str, name: str, host: str = "192.168.1.20") -> Service:
+    return Service(service_id=service_id, name=name, type="iot", host=host, port=8080,
+                   mdns_service_type="_iot._tcp")
+
+
+@pytest.fixture
+def responder():
+    responder = DnsSdResponder(ServiceRegistry(database=None), port=0, domain="local.", record_ttl=30)
+    responder.index.track(make_service("svc-1", "sensor"))
+    return responder
+
+
+def query(responder, name: str, rdtype: str, want_dnssec: bool = False, tcp: bool = False, **kwargs):
+    request = dns.message.make_query(name, rdtype, want_dnssec=want_dnssec, **kwargs)
+    return dns.message.from_wire(responder.handle_query(request.to_wire(), tcp=tcp))
+
+
+class TestDnsSdResponder:
+    """PTR/SRV/TXT/A Antworten inkl. Additional Records"""
+
+    def test_ptr_with_additional_records(self, responder):
+        response = query(responder, "_IOT._tcp.local.", "PTR")
+
+        assert response.rcode() == dns.rcode.NOERROR
+        assert response.flags & dns.flags.AA
+        # Question Section in der Schreibweise des Clients
+        assert response.question[0].name.to_text() == "_IOT._tcp.local."
+        # Namenskompression kann auf die Question zeigen, DNS Namen sind case-insensitiv
+        assert [rdata.target.to_text().lower() for rdata in response.answer[0]] == ["sensor._iot._tcp.local."]
+        additional = {dns.rdatatype.to_text(rrset.rdtype) for rrset in response.additional}
+        assert additional == {"SRV", "TXT", "A"}
+
+    def test_srv_points_to_address_record(self, responder):
+        response = query(responder, "sensor._iot._tcp.local.", "SRV")
+
+        srv = response.answer[0][0]
+        assert srv.port == 8080
+        assert srv.target.to_text() == "ip-192-168-1-20.local."
+        assert response.additional[0][0].address == "192.168.1.20"
+        assert response.answer[0].ttl == 30
+
+    def test_services_enumeration(self, responder):
+        response = query(responder, "_services._dns-sd._udp.local.", "PTR")
+        assert [rdata.target.to_text() for rdata in response.answer[0]] == ["_iot._tcp.local."]
+
+    @pytest.mark.parametrize("name,rcode", [
+        ("unknown._iot._tcp.local.", dns.rcode.NXDOMAIN),
+        ("_tcp.local.", dns.rcode.NOERROR),
+        ("example.com.", dns.rcode.REFUSED),
+    ])
+    def test_negative_answers(self, responder, name, rcode):
+        response = query(responder, name, "PTR")
+        assert response.rcode() == rcode
+        assert response.answer == []
+
+    def test_index_follows_registry_changes(self, responder):
+        assert query(responder, "_iot._tcp.local.", "PTR").answer
+        assert responder.index.cached_answers == 1
+
+        service = make_service("svc-1", "sensor")
+        service.status = ServiceStatus.UNHEALTHY
+        responder.index.track(service)
+
+        assert responder.index.cached_answers == 0
+        assert query(responder, "_iot._tcp.local.", "PTR").rcode() == dns.rcode.NXDOMAIN
+
+    def test_large_answer_sets_truncation_bit(self, responder):
+        for index in range(40):
+            responder.index.track(make_service(f"svc-{index}", f"sensor-with-a-long-name-{index}"))
+
+        udp = query(responder, "_iot._tcp.local.", "PTR")
+        assert udp.flags & dns.flags.TC
+        assert udp.answer == []
+
+        tcp = query(responder, "_iot._tcp.local.", "PTR", tcp=True)
+        assert not tcp.flags & dns.flags.TC
+        assert len(tcp.answer[0]) == 40
+
+    def test_edns_payload_size(self, responder):
+        for index in range(20):
+            responder.index.track(make_service(f"svc-{index}", f"sensor-{index}"))
+
+        response = query(responder, "_iot._tcp.local.", "PTR", use_edns=0, payload=4096)
+        assert not response.flags & dns.flags.TC
+        assert response.edns == 0
+        assert response.payload == 1232
+
+    def test_malformed_queries(self, responder):
+        assert responder.handle_query(b"\x00" * 5) is None
+        request = dns.message.make_query("_iot._tcp.local.", "PTR")
+        request.flags |= dns.flags.QR
+        assert responder.handle_query(request.to_wire()) is None
+
+        truncated = dns.message.make_query("_iot._tcp.local.", "PTR").to_wire()[:20]
+        assert dns.message.from_wire(responder.handle_query(truncated)).rcode() == dns.rcode.FORMERR
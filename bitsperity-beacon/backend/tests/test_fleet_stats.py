@@ -0,0 +1,71 @@
+"""
+Tests für die inkrementell gepflegte Flottenstatistik
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.fleet_stats import FleetStats
+from app.models.service import Service, ServiceStatus
+
+
+def make_service(service_id: str, service_type: str = "iot", tags=None, protocol: str = "http") -> Service:
+    return Service(service_id=service_id, name=service_id, type=service_type, host="10.0.0.1", port=80,
+                   tags=tags or [], protocol=protocol)
+
+
+class TestFleetStats:
+    """Zähler folgen Registrierung, Änderung und Deregistrierung"""
+
+    def test_track_counts_dimensions(self):
+        stats = FleetStats()
+        assert stats.track(make_service("a", tags=["sensor", "sensor", "garden"]))
+        assert stats.track(make_service("b", "mqtt", tags=["sensor"], protocol="mqtt"))
+
+        assert stats.to_dict()["total"] == 2
+        assert stats.by_type == {"iot": 1, "mqtt": 1}
+        # Doppelte Tags eines Services zählen einmal
+        assert stats.by_tag == {"sensor": 2, "garden": 1}
+        assert stats.by_protocol == {"http": 1, "mqtt": 1}
+        assert stats.by_status == {"active": 2}
+        assert stats.types() == ["iot", "mqtt"]
+        assert stats.tags() == ["garden", "sensor"]
+
+    def test_track_is_idempotent(self):
+        stats = FleetStats()
+        service = make_service("a", tags=["sensor"])
+        stats.track(service)
+
+        assert not stats.track(service)
+        assert stats.total == 1
+        assert stats.by_tag == {"sensor": 1}
+
+    def test_change_moves_counts(self):
+        stats = FleetStats()
+        service = make_service("a", tags=["sensor"])
+        stats.track(service)
+
+        service.status = ServiceStatus.UNHEALTHY
+        service.tags = ["pump"]
+        assert stats.track(service)
+
+        assert stats.by_status == {"unhealthy": 1}
+        assert stats.by_tag == {"pump": 1}
+
+    def test_untrack_removes_empty_keys(self):
+        stats = FleetStats()
+        stats.track(make_service("a", tags=["sensor"]))
+        stats.untrack("a")
+        stats.untrack("unknown")
+
+        assert stats.total == 0
+        assert stats.by_type == {} and stats.by_tag == {} and stats.by_status == {}
+
+    def test_rebuild_replaces_state(self):
+        stats = FleetStats()
+        stats.track(make_service("old"))
+        stats.rebuild([make_service("a", "mqtt"), make_service("b", "mqtt")])
+
+        assert stats.total == 2
+        assert stats.by_type == {"mqtt": 2}
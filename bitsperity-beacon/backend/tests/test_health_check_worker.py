@@ -0,0 +1,167 @@
+"""
+Tests für Health Checks im Worker Prozess
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.health_check_manager import HealthCheckManager, HealthCheckResult
+from app.core.health_check_worker import HealthCheckWorker
+from app.models.service import Service, ServiceStatus
+
+
+class RecordingRegistry:
+    """Liefert einen Service und zählt Status Updates"""
+
+    def __init__(self, service: Service):
+        self.service = service
+        self.updates = 0
+
+    async def get_service_by_id(self, service_id: str):
+        return self.service if service_id == self.service.service_id else None
+
+    async def update_service_health_status(self, service: Service):
+        self.updates += 1
+
+
+class RecordingWebSocketManager:
+    def __init__(self):
+        self.events = []
+
+    async def broadcast_health_status_changed(self, event: dict):
+        self.events.append(event)
+
+
+async def noop_results(results):
+    pass
+
+
+def make_manager(failures: int = 0):
+    service = Service(name="sensor", type="http", host="10.0.0.1", port=80,
+                      health_check_url="http://10.0.0.1/health", health_check_retries=3)
+    service.consecutive_health_failures = failures
+    registry = RecordingRegistry(service)
+    manager = HealthCheckManager(registry, RecordingWebSocketManager())
+    manager._worker = HealthCheckWorker(noop_results)
+    return manager, registry, service
+
+
+class TestWorkerUnavailable:
+    """Worker Ausfälle sind kein Fehler des Services"""
+
+    @pytest.mark.asyncio
+    async def test_worker_not_running_is_unknown(self):
+        manager, registry, service = make_manager(failures=2)
+
+        result = await manager.check_service_now(service.service_id)
+
+        assert result.is_unknown
+        assert result.error == "Health check worker not running"
+        assert registry.updates == 0
+        assert service.consecutive_health_failures == 2
+        assert service.status == ServiceStatus.ACTIVE
+
+    @pytest.mark.asyncio
+    async def test_restart_resolves_waiters_as_unknown(self):
+        worker = HealthCheckWorker(noop_results)
+        waiter = asyncio.get_running_loop().create_future()
+        worker._waiters[1] = waiter
+        worker._pending[2] = "svc"
+        worker._pending_services["svc"] = 2
+
+        worker._fail_pending("Health check worker restarted")
+
+        success, _, _, error = waiter.result()
+        assert success is None
+        assert error == "Health check worker restarted"
+        assert worker.get_stats()["pending_probes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_real_failure_still_counts(self):
+        manager, registry, service = make_manager()
+
+        await manager._process_health_check_result(service, HealthCheckResult(False, 10, 503, None))
+
+        assert registry.updates == 1
+        assert service.consecutive_health_failures == 1
+
+
+class TestWorkerResults:
+    """Ergebnis Batches: Waiter, geplante Probes und unbekannte Request IDs"""
+
+    @pytest.mark.asyncio
+    async def test_consume_batches_routes_results(self):
+        applied = []
+
+        async def on_results(results):
+            applied.extend(results)
+
+        worker = HealthCheckWorker(on_results)
+        worker._batches = asyncio.Queue()
+        waiter = asyncio.get_running_loop().create_future()
+        worker._waiters[1] = waiter
+        worker._pending[2] = "svc-2"
+        worker._pending_services["svc-2"] = 2
+
+        consumer = asyncio.create_task(worker._consume_batches())
+        worker._batches.put_nowait([
+            (1, "svc-1", True, 5, 200, None),
+            (2, "svc-2", False, 7, 503, None),
+            (3, "svc-3", True, 1, 200, None),  # Nach Neustart verworfen
+        ])
+        assert await asyncio.wait_for(waiter, 1) == (True, 5, 200, None)
+        await asyncio.sleep(0)
+        consumer.cancel()
+
+        assert applied == [(2, "svc-2", False, 7, 503, None)]
+        assert worker.get_stats()["pending_probes"] == 0
+        assert worker.get_stats()["results_received"] == 3
+
+
+class TestWorkerProcess:
+    """Probes laufen im Worker Prozess gegen einen echten HTTP Server"""
+
+    @pytest.mark.asyncio
+    async def test_probe_and_submit(self):
+        async def health(request):
+            return web.Response(status=200 if request.path == "/ok" else 503)
+
+        app = web.Application()
+        app.router.add_get("/{name}", health)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        results = []
+        delivered = asyncio.Event()
+
+        async def on_results(batch):
+            results.extend(batch)
+            delivered.set()
+
+        worker = HealthCheckWorker(on_results)
+        await worker.start()
+        try:
+            success, _, status_code, error = await asyncio.wait_for(
+                worker.probe("svc-1", f"http://127.0.0.1:{port}/ok", 5), 30)
+            assert (success, status_code, error) == (True, 200, None)
+
+            assert worker.submit([("svc-2", f"http://127.0.0.1:{port}/down", 5)]) == 1
+            # Bereits geplante Probe wird nicht doppelt eingereicht
+            assert worker.submit([("svc-2", f"http://127.0.0.1:{port}/down", 5)]) == 0
+            await asyncio.wait_for(delivered.wait(), 30)
+        finally:
+            await worker.stop()
+            await runner.cleanup()
+
+        assert [(service_id, success, status_code) for _, service_id, success, _, status_code, _ in results] == [
+            ("svc-2", False, 503)]
+        assert worker.get_stats()["probes_skipped_pending"] == 1
+        assert not worker.is_alive()
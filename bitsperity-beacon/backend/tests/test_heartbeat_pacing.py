@@ -0,0 +1,125 @@
+"""
+Tests für Heartbeat Pacing und verfrühte (absorbierte) Heartbeats
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.heartbeat_pacing import HeartbeatPacer
+from app.core.service_registry import HEARTBEAT_EXPIRY_MARGIN, ServiceRegistry
+from app.models.service import Service, ServiceStatus
+
+NOW = 1_700_000_000.0
+
+
+def make_service(ttl: int = 60, age: float = 0.0, service_id: str = "svc-1") -> Service:
+    last_heartbeat = datetime.now(timezone.utc) - timedelta(seconds=age)
+    return Service(
+        service_id=service_id,
+        name="sensor",
+        type="http",
+        host="10.0.0.1",
+        port=80,
+        ttl=ttl,
+        last_heartbeat=last_heartbeat,
+        expires_at=last_heartbeat + timedelta(seconds=ttl)
+    )
+
+
+@pytest.fixture
+def registry():
+    return ServiceRegistry(database=None)
+
+
+class TestHeartbeatPacer:
+    """Slots liegen zwischen 0.5 und 1.75 Perioden in der Zukunft"""
+
+    @pytest.mark.parametrize("ttl", [2, 10, 60, 300, 3600])
+    def test_slot_bounds(self, ttl):
+        pacer = HeartbeatPacer(fraction=0.5, max_shift=30)
+        period = pacer.period_for(ttl)
+
+        for index in range(200):
+            slot = pacer.next_heartbeat_at(f"svc-{index}", ttl, now=NOW).timestamp()
+            assert NOW + period / 2 - 1 <= slot <= NOW + period * 1.75 + 1
+            assert slot < NOW + ttl
+
+    def test_slots_spread_over_period(self):
+        pacer = HeartbeatPacer(fraction=0.5, max_shift=30)
+        seconds = [int(pacer.next_heartbeat_at(f"svc-{index}", 120, now=NOW).timestamp())
+                   for index in range(600)]
+
+        # 600 Services, 60s Periode: erwartet 10/s, Kapazität 11 pro Sekunde
+        assert max(seconds.count(second) for second in set(seconds)) <= pacer.get_stats()["slot_capacity"]
+        assert pacer.expected_rate == pytest.approx(10.0)
+
+    def test_untrack_releases_slot(self):
+        pacer = HeartbeatPacer(fraction=0.5, max_shift=30)
+        pacer.next_heartbeat_at("svc-1", 60, now=NOW)
+
+        pacer.untrack("svc-1")
+
+        assert pacer.booked_slot("svc-1") is None
+        assert pacer.expected_rate == 0.0
+        assert pacer._calendar == {}
+
+    def test_rebooking_replaces_previous_slot(self):
+        pacer = HeartbeatPacer(fraction=0.5, max_shift=30)
+        pacer.next_heartbeat_at("svc-1", 60, now=NOW)
+        pacer.next_heartbeat_at("svc-1", 60, now=NOW + 30)
+
+        assert sum(pacer._calendar.values()) == 1
+
+
+class TestAbsorbedHeartbeat:
+    """Absorbierte Heartbeats verschieben expires_at nicht"""
+
+    def test_absorb_keeps_booked_slot(self, registry):
+        service = make_service(ttl=60)
+        registry._cache_service(service)
+        booked = registry.schedule_next_heartbeat(service)
+
+        assert registry.absorb_early_heartbeat(service.service_id) is service
+        assert registry.schedule_next_heartbeat(service, absorbed=True) == booked
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_absorb_then_schedule_stays_before_expiry(self, registry, seed):
+        # Heartbeat kurz nach dem letzten: expires_at bleibt bei T0 + ttl
+        service = make_service(ttl=60, age=10, service_id=f"svc-{seed}")
+        registry._cache_service(service)
+        registry.heartbeat_pacer._slots.pop(service.service_id, None)
+
+        assert registry.absorb_early_heartbeat(service.service_id) is service
+        next_heartbeat = registry.schedule_next_heartbeat(service, absorbed=True)
+
+        assert next_heartbeat >= datetime.now(timezone.utc) - timedelta(seconds=1)
+        assert next_heartbeat <= service.expires_at - timedelta(seconds=60 * HEARTBEAT_EXPIRY_MARGIN)
+
+    def test_expired_slot_is_rebooked(self, registry):
+        service = make_service(ttl=60, age=5)
+        registry._cache_service(service)
+        registry.heartbeat_pacer._slots[service.service_id] = (
+            datetime.now(timezone.utc) - timedelta(seconds=1)).timestamp()
+
+        next_heartbeat = registry.schedule_next_heartbeat(service, absorbed=True)
+        assert next_heartbeat > datetime.now(timezone.utc) - timedelta(seconds=1)
+        assert next_heartbeat <= service.expires_at
+
+    def test_absorb_only_early_active_heartbeats(self, registry):
+        early = make_service(ttl=60, age=5, service_id="svc-early")
+        late = make_service(ttl=60, age=40, service_id="svc-late")
+        unhealthy = make_service(ttl=60, age=5, service_id="svc-unhealthy")
+        unhealthy.status = ServiceStatus.UNHEALTHY
+        for service in (early, late, unhealthy):
+            registry._cache_service(service)
+
+        assert registry.absorb_early_heartbeat("svc-early") is early
+        assert registry.absorb_early_heartbeat("svc-late") is None
+        assert registry.absorb_early_heartbeat("svc-unhealthy") is None
+        # Geänderte TTL muss persistiert werden
+        assert registry.absorb_early_heartbeat("svc-early", ttl=120) is None
+        assert registry.admission.get_stats()["heartbeat_absorbed"] == 1
@@ -0,0 +1,111 @@
+"""
+Tests für die asynchrone Logging Pipeline (Sampling, Queue Handler, Listener)
+"""
+import json
+import logging
+import os
+import sys
+
+import pytest
+import structlog
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core import logging_pipeline
+from app.core.logging_pipeline import EventSampler, _DeferredFormatQueueHandler
+
+
+def run(sampler: EventSampler, method_name: str = "info", **event):
+    """Ein Event durch den Processor schicken (None = verworfen)"""
+    try:
+        return sampler(None, method_name, dict(event, event="message"))
+    except structlog.DropEvent:
+        return None
+
+
+class TestEventSampler:
+    """Sampling und Rate Limits pro event_type"""
+
+    def test_sample_rate_keeps_every_nth_event(self):
+        sampler = EventSampler(sample_rates={"heartbeat": 0.25})
+
+        kept = [run(sampler, event_type="heartbeat") for _ in range(12)]
+
+        assert [index for index, event in enumerate(kept) if event is not None] == [0, 4, 8]
+        # Verworfene Events werden beim nächsten ausgegebenen Event gemeldet
+        assert "sampled_out" not in kept[0]
+        assert kept[4]["sampled_out"] == 3
+        assert sampler.get_stats() == {"dropped": {"heartbeat": 3}}
+
+    def test_rates_are_per_event_type(self):
+        sampler = EventSampler(sample_rates={"heartbeat": 0, "health_check_success": 1.0})
+
+        assert run(sampler, event_type="heartbeat") is None
+        assert run(sampler, event_type="health_check_success") is not None
+        assert run(sampler, event_type="service_registered") is not None
+        assert run(sampler) is not None
+
+    @pytest.mark.parametrize("method_name", ["warning", "error", "critical", "exception"])
+    def test_warnings_and_errors_are_never_sampled(self, method_name):
+        sampler = EventSampler(sample_rates={"heartbeat": 0}, rate_limits={"heartbeat": 1})
+
+        assert all(run(sampler, method_name, event_type="heartbeat") is not None for _ in range(10))
+        assert sampler.get_stats() == {"dropped": {}}
+
+    def test_rate_limit(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(logging_pipeline.time, "monotonic", lambda: now[0])
+        sampler = EventSampler(rate_limits={"heartbeat": 2})
+
+        assert [run(sampler, event_type="heartbeat") is not None for _ in range(4)] == [True, True, False, False]
+        now[0] += 0.5
+        event = run(sampler, event_type="heartbeat")
+        assert event["sampled_out"] == 2
+
+
+class TestQueuePipeline:
+    """Rendering im Listener Thread, Flush beim Shutdown"""
+
+    def test_prepare_does_not_format(self):
+        handler = _DeferredFormatQueueHandler(None)
+        record = logging.LogRecord("beacon", logging.INFO, __file__, 1, "value %s", ("x",), None)
+
+        assert handler.prepare(record) is record
+        assert record.msg == "value %s"
+        assert record.args == ("x",)
+
+    def test_shutdown_flushes_queued_records(self, tmp_path, monkeypatch):
+        log_file = tmp_path / "beacon.log"
+        monkeypatch.setattr(settings, "log_file", str(log_file))
+        monkeypatch.setattr(settings, "log_format", "json")
+        monkeypatch.setattr(settings, "log_sample_rates", {"heartbeat": 0})
+        root_logger = logging.getLogger()
+        root_handlers, root_level = list(root_logger.handlers), root_logger.level
+
+        try:
+            logging_pipeline.configure_logging()
+            logger = structlog.get_logger("test_logging_pipeline")
+            for index in range(200):
+                logger.info("Service registriert", index=index)
+            logger.info("Heartbeat", event_type="heartbeat")
+            logger.warning("Heartbeat verspätet", event_type="heartbeat")
+            logging.getLogger("uvicorn").info("stdlib record")
+            logging_pipeline.shutdown_logging()
+        finally:
+            logging_pipeline.shutdown_logging()
+            structlog.reset_defaults()
+            for handler in list(root_logger.handlers):
+                root_logger.removeHandler(handler)
+            for handler in root_handlers:
+                root_logger.addHandler(handler)
+            root_logger.setLevel(root_level)
+
+        lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+        events = [line["event"] for line in lines]
+        assert events.count("Service registriert") == 200
+        assert [line["index"] for line in lines if line["event"] == "Service registriert"] == list(range(200))
+        assert "Heartbeat" not in events
+        assert "Heartbeat verspätet" in events
+        assert "stdlib record" in events
+        assert logging_pipeline._listener is None
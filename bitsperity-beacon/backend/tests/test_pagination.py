@@ -0,0 +1,59 @@
+"""
+Tests für Keyset Pagination (Cursor Codec und Seiten über die Registry)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.json_encoder import jsonable_encoder
+from app.core.service_registry import ServiceRegistry, decode_page_cursor, encode_page_cursor
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.models.service import Service
+from app.storage import MemoryCollection
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.services = MemoryCollection("services", SERVICE_UNIQUE_INDEXES)
+
+
+def make_service(service_id: str, service_type: str = "iot") -> Service:
+    return Service(service_id=service_id, name=service_id, type=service_type, host="10.0.0.1", port=80, ttl=300)
+
+
+class TestPageCursor:
+    """Opaker Cursor auf (type, service_id)"""
+
+    def test_roundtrip(self):
+        cursor = encode_page_cursor(make_service("svc-ä/1", "mqtt"))
+        assert "=" not in cursor
+        assert decode_page_cursor(cursor) == ("mqtt", "svc-ä/1")
+
+    @pytest.mark.parametrize("cursor", ["", "%%%", "bm90IGpzb24", "WzEsMl0", "WyJhIl0"])
+    def test_invalid_cursor_raises_value_error(self, cursor):
+        with pytest.raises(ValueError):
+            decode_page_cursor(cursor)
+
+
+class TestKeysetPages:
+    """Alle Services genau einmal, sortiert nach (type, service_id)"""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_services(self):
+        registry = ServiceRegistry(MemoryDatabase())
+        services = [make_service(f"svc-{index:02d}", "iot" if index % 2 else "http") for index in range(7)]
+        for service in services:
+            await registry.database.services.insert_one(jsonable_encoder(service.model_dump(by_alias=True)))
+
+        seen, after = [], None
+        while True:
+            page, cursor = await registry.discover_services_page(limit=3, after=after)
+            seen.extend((service.type, service.service_id) for service in page)
+            if cursor is None:
+                break
+            after = decode_page_cursor(cursor)
+
+        assert seen == sorted((service.type, service.service_id) for service in services)
@@ -0,0 +1,111 @@
+"""
+Tests für die idempotente Registrierung auf (name, host, port)
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.service_registry import ServiceRegistry
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.schemas.service import ServiceCreate
+from app.storage import MemoryCollection
+
+
+class MemoryDatabase:
+    def __init__(self, services=None):
+        self.services = services if services is not None else MemoryCollection("services", SERVICE_UNIQUE_INDEXES)
+
+
+class RacingCollection(MemoryCollection):
+    """Ein paralleler Worker legt das Dokument zwischen Lookup und Insert an"""
+
+    def __init__(self):
+        super().__init__("services", SERVICE_UNIQUE_INDEXES)
+        self.competitor = None
+        self.calls = 0
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        self.calls += 1
+        if self.competitor is not None:
+            competitor, self.competitor = self.competitor, None
+            await super().find_one_and_update(filter, competitor, **kwargs)
+            raise DuplicateKeyError("E11000 duplicate key error collection: services index: name_host_port")
+        return await super().find_one_and_update(filter, update, **kwargs)
+
+
+def make_create(**fields) -> ServiceCreate:
+    data = {"name": "sensor", "type": "iot", "host": "10.0.0.1", "port": 8080, "tags": ["garden"], "ttl": 60}
+    data.update(fields)
+    return ServiceCreate(**data)
+
+
+class TestIdempotentRegistration:
+    """Gleiche (name, host, port) -> gleiche service_id"""
+
+    @pytest.mark.asyncio
+    async def test_reregister_keeps_identity(self):
+        registry = ServiceRegistry(MemoryDatabase())
+        first = await registry.register_service(make_create())
+        await asyncio.sleep(0.01)
+
+        second = await registry.register_service(make_create(ttl=120))
+
+        assert second.service_id == first.service_id
+        assert second.id == first.id
+        assert second.created_at == first.created_at
+        assert second.ttl == 120
+        assert second.expires_at > first.expires_at
+        assert await registry.database.services.count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_reregister_does_not_invalidate_counts_or_double_track(self):
+        registry = ServiceRegistry(MemoryDatabase())
+        await registry.register_service(make_create())
+        assert await registry.count_services() == 1
+        assert registry._count_cache
+
+        await registry.register_service(make_create())
+
+        assert registry._count_cache
+        assert registry.stats.total == 1
+        assert registry.stats.by_tag == {"garden": 1}
+        assert registry.heartbeat_pacer.get_stats()["services"] == 1
+
+    @pytest.mark.asyncio
+    async def test_other_port_is_a_new_service(self):
+        registry = ServiceRegistry(MemoryDatabase())
+        first = await registry.register_service(make_create())
+        await registry.count_services()
+
+        second = await registry.register_service(make_create(port=8081))
+
+        assert second.service_id != first.service_id
+        assert registry._count_cache == {}
+        assert registry.stats.total == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_key_retry(self):
+        services = RacingCollection()
+        registry = ServiceRegistry(MemoryDatabase(services))
+        winner = await registry.register_service(make_create())
+        await registry.database.services.delete_one({"service_id": winner.service_id})
+        registry._evict_service(winner.service_id)
+
+        # Konkurrierende Registrierung legt das Dokument an, unser Upsert läuft in den Unique Index
+        services.competitor = {
+            "$set": {"type": "iot", "tags": ["garden"]},
+            "$setOnInsert": {"_id": str(ObjectId()), "service_id": "svc-competitor",
+                             "created_at": winner.created_at.isoformat()},
+        }
+        registered = await registry.register_service(make_create())
+
+        assert services.calls == 3
+        assert registered.service_id == "svc-competitor"
+        assert await services.count_documents({}) == 1
+        assert registry.stats.total == 1
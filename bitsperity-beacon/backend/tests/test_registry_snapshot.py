@@ -0,0 +1,92 @@
+"""
+Tests für Registry Snapshots (Schreiben nur bei Änderungen, atomare tmp Dateien)
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.registry_snapshot import RegistrySnapshotManager
+from app.core.service_registry import ServiceRegistry
+from app.models.service import Service
+
+
+def make_service(service_id: str) -> Service:
+    return Service(service_id=service_id, name=service_id, type="iot", host="10.0.0.1", port=80, ttl=300)
+
+
+def make_manager(tmp_path, registry=None, is_writer=None) -> RegistrySnapshotManager:
+    registry = registry or ServiceRegistry(database=None)
+    return RegistrySnapshotManager(registry, path=str(tmp_path / "registry.msgpack"), interval=1,
+                                   is_writer=is_writer)
+
+
+class TestRegistrySnapshot:
+    """Warm Start Daten ohne unnötige Arbeit auf dem Event Loop"""
+
+    @pytest.mark.asyncio
+    async def test_roundtrip(self, tmp_path):
+        manager = make_manager(tmp_path)
+        manager.service_registry._cache_service(make_service("svc-1"))
+
+        assert await manager.write_snapshot()
+
+        loaded = await make_manager(tmp_path).load()
+        assert [service.service_id for service in loaded] == ["svc-1"]
+        assert os.listdir(tmp_path) == ["registry.msgpack"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_registry_is_not_serialized(self, tmp_path, monkeypatch):
+        manager = make_manager(tmp_path)
+        manager.service_registry._cache_service(make_service("svc-1"))
+        assert await manager.write_snapshot()
+
+        def fail():
+            raise AssertionError("snapshot_services ohne Änderung aufgerufen")
+
+        monkeypatch.setattr(manager.service_registry, "snapshot_services", fail)
+        assert not await manager.write_snapshot()
+
+        monkeypatch.undo()
+        manager.service_registry._evict_service("svc-1")
+        assert await manager.write_snapshot()
+        assert await make_manager(tmp_path).load() == []
+
+    @pytest.mark.asyncio
+    async def test_only_writer_writes(self, tmp_path):
+        leader = {"value": False}
+        manager = make_manager(tmp_path, is_writer=lambda: leader["value"])
+        manager.service_registry._cache_service(make_service("svc-1"))
+
+        assert not await manager.write_snapshot()
+        assert not os.path.exists(manager.path)
+
+        leader["value"] = True
+        assert await manager.write_snapshot()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writers_use_separate_tmp_files(self, tmp_path):
+        registry = ServiceRegistry(database=None)
+        for index in range(200):
+            registry._cache_service(make_service(f"svc-{index}"))
+        managers = [make_manager(tmp_path, registry) for _ in range(4)]
+
+        results = await asyncio.gather(*(manager.write_snapshot() for manager in managers))
+
+        assert all(results)
+        assert len(await make_manager(tmp_path).load()) == 200
+        assert os.listdir(tmp_path) == ["registry.msgpack"]
+
+    def test_failed_write_removes_tmp_file(self, tmp_path, monkeypatch):
+        manager = make_manager(tmp_path)
+
+        def fail(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", fail)
+        with pytest.raises(OSError):
+            manager._write_file({"version": 1, "services": []})
+        assert os.listdir(tmp_path) == []
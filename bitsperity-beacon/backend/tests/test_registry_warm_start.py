@@ -0,0 +1,120 @@
+"""
+Tests für den Warm Start aus dem Registry Snapshot ohne Database
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api.v1 import services as services_api
+from app.core.json_encoder import jsonable_encoder
+from app.core.service_registry import DatabaseUnavailableError, ServiceRegistry
+from app.core.websocket_manager import WebSocketManager
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.models.service import Service
+from app.storage import MemoryCollection
+
+
+class OfflineDatabase:
+    """Database vor dem ersten erfolgreichen connect()"""
+    services = None
+
+
+def make_service(service_id: str = "svc-1", ttl: int = 60) -> Service:
+    return Service(service_id=service_id, name="sensor", type="iot", host="10.0.0.1", port=8080, ttl=ttl)
+
+
+@pytest.fixture
+def registry():
+    registry = ServiceRegistry(OfflineDatabase())
+    registry.load_snapshot([make_service()])
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    app = FastAPI()
+    app.include_router(services_api.router, prefix="/api/v1/services")
+    services_api.set_dependencies(registry, object(), WebSocketManager())
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://beacon")
+
+
+class TestRegistryWithoutDatabase:
+    """Registry bedient den Snapshot, Schreibzugriffe sind explizit nicht verfügbar"""
+
+    @pytest.mark.asyncio
+    async def test_reads_served_from_snapshot(self, registry):
+        assert not registry.database_available
+        assert [service.service_id for service in await registry.discover_services()] == ["svc-1"]
+        assert await registry.count_services() == 1
+        assert (await registry.get_service_by_id("svc-1")).name == "sensor"
+        assert await registry.get_service_by_id("unknown") is None
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_extends_cache_only(self, registry):
+        service = registry._services_cache["svc-1"]
+        service.expires_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+
+        extended = await registry.extend_service_ttl("svc-1")
+
+        assert extended.expires_at > datetime.now(timezone.utc) + timedelta(seconds=50)
+        assert registry._unsynced_heartbeats == {"svc-1"}
+        with pytest.raises(DatabaseUnavailableError):
+            await registry.extend_service_ttl("unknown")
+
+    @pytest.mark.asyncio
+    async def test_writes_raise_database_unavailable(self, registry):
+        with pytest.raises(DatabaseUnavailableError):
+            await registry.deregister_service("svc-1")
+        assert "svc-1" in registry._services_cache
+
+    @pytest.mark.asyncio
+    async def test_reconcile_writes_back_heartbeats(self, registry):
+        stored = make_service()
+        stored.expires_at = datetime.now(timezone.utc) + timedelta(seconds=5)
+        collection = MemoryCollection("services", SERVICE_UNIQUE_INDEXES)
+        await collection.insert_one(jsonable_encoder(stored.model_dump(by_alias=True)))
+
+        await registry.extend_service_ttl("svc-1")
+        registry.database.services = collection
+        active, removed = await registry.reconcile_with_database()
+
+        assert [service.service_id for service in active] == ["svc-1"]
+        assert removed == []
+        assert active[0].expires_at > datetime.now(timezone.utc) + timedelta(seconds=50)
+        assert registry._unsynced_heartbeats == set()
+
+
+class TestServiceApiWithoutDatabase:
+    """Keine 404/500 Antworten während des Warm Starts"""
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_for_snapshot_service(self, client):
+        async with client:
+            response = await client.put("/api/v1/services/svc-1/heartbeat")
+        assert response.status_code == 200
+        assert response.json()["service_id"] == "svc-1"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("method,path,body", [
+        ("PUT", "/api/v1/services/unknown/heartbeat", None),
+        ("POST", "/api/v1/services/register", {"name": "pump", "type": "iot", "host": "10.0.0.2", "port": 80}),
+        ("DELETE", "/api/v1/services/svc-1", None),
+    ])
+    async def test_writes_return_503_with_retry_after(self, client, method, path, body):
+        async with client:
+            response = await client.request(method, path, json=body)
+        assert response.status_code == 503
+        assert response.headers["retry-after"]
+
+    @pytest.mark.asyncio
+    async def test_list_served_from_snapshot(self, client):
+        async with client:
+            response = await client.get("/api/v1/services/")
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
@@ -0,0 +1,72 @@
+"""
+Tests für Content Negotiation und Kompression der Listen-Antworten
+"""
+import asyncio
+import gzip
+import os
+import sys
+
+import msgpack
+import pytest
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core import response_encoding
+from app.core.response_encoding import encode_response
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/services/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def make_content(services: int) -> dict:
+    return {"services": [{"service_id": f"svc-{index}", "host": "10.0.0.1"} for index in range(services)]}
+
+
+class TestEncodeResponse:
+    """Kompression klein inline, groß im Thread"""
+
+    @pytest.mark.asyncio
+    async def test_small_response_not_compressed(self):
+        response = await encode_response(make_request(accept_encoding="gzip"), make_content(1))
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+    @pytest.mark.asyncio
+    async def test_gzip_and_msgpack(self, monkeypatch):
+        monkeypatch.setattr(response_encoding, "brotli", None)
+        content = make_content(100)
+
+        response = await encode_response(make_request(accept="application/msgpack", accept_encoding="br, gzip"),
+                                         content)
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.media_type == "application/msgpack"
+        assert msgpack.unpackb(gzip.decompress(response.body)) == content
+
+    @pytest.mark.asyncio
+    async def test_large_response_compressed_off_loop(self, monkeypatch):
+        monkeypatch.setattr(response_encoding, "brotli", None)
+        monkeypatch.setattr(settings, "response_compression_inline_max_size", 2048)
+        threads = []
+
+        async def to_thread(function, *args):
+            threads.append(function)
+            return function(*args)
+
+        monkeypatch.setattr(asyncio, "to_thread", to_thread)
+
+        inline = await encode_response(make_request(accept_encoding="gzip"), make_content(40))
+        assert inline.headers["content-encoding"] == "gzip"
+        assert threads == []
+
+        response = await encode_response(make_request(accept_encoding="gzip"), make_content(500))
+        assert threads == [response_encoding._compress]
+        assert gzip.decompress(response.body).startswith(b'{"services":[')
@@ -0,0 +1,61 @@
+"""
+Tests für den Count Cache der Service Registry
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.json_encoder import jsonable_encoder
+from app.core.service_registry import ServiceRegistry
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.models.service import Service, ServiceStatus
+from app.storage import MemoryCollection
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.services = MemoryCollection("services", SERVICE_UNIQUE_INDEXES)
+
+
+async def make_registry() -> ServiceRegistry:
+    registry = ServiceRegistry(MemoryDatabase())
+    service = Service(service_id="svc-1", name="sensor", type="iot", host="10.0.0.1", port=8080, ttl=60)
+    await registry.database.services.insert_one(jsonable_encoder(service.model_dump(by_alias=True)))
+    registry._cache_service(service)
+    return registry
+
+
+class TestCountCacheInvalidation:
+    """Statuswechsel verwerfen gecachte Counts sofort"""
+
+    @pytest.mark.asyncio
+    async def test_mark_unhealthy(self):
+        registry = await make_registry()
+        assert await registry.count_services(status="active") == 1
+        assert await registry.count_services(status="unhealthy") == 0
+
+        assert await registry.mark_service_unhealthy("svc-1")
+
+        assert await registry.count_services(status="active") == 0
+        assert await registry.count_services(status="unhealthy") == 1
+
+    @pytest.mark.asyncio
+    async def test_health_status_update(self):
+        registry = await make_registry()
+        assert await registry.count_services(status="active") == 1
+
+        service = registry._services_cache["svc-1"].model_copy()
+        service.status = ServiceStatus.UNHEALTHY
+        assert await registry.update_service_health_status(service)
+
+        assert await registry.count_services(status="active") == 0
+
+    @pytest.mark.asyncio
+    async def test_unchanged_service_keeps_cache(self):
+        registry = await make_registry()
+        registry._count_cache[(None, None, None, None)] = (1, 0.0)
+        registry._cache_service(registry._services_cache["svc-1"])
+        assert registry._count_cache
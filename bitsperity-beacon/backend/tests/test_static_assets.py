@@ -0,0 +1,108 @@
+"""
+Tests für die Auslieferung des Frontend Builds (Varianten, ETags, Caching)
+"""
+import gzip
+import os
+import sys
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core.static_assets import StaticAssetMiddleware, StaticAssets, precompress
+
+SCRIPT = b"console.log('beacon');\n" * 200
+
+
+@pytest.fixture
+def dist(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><div id=app></div>")
+    (tmp_path / "assets" / "index-3f9a2c1b.js").write_bytes(SCRIPT)
+    (tmp_path / "favicon.ico").write_bytes(b"\x00" * 64)
+    return tmp_path
+
+
+async def fallback(scope, receive, send):
+    await PlainTextResponse("api", status_code=404)(scope, receive, send)
+
+
+def make_client(directory) -> httpx.AsyncClient:
+    app = StaticAssetMiddleware(fallback, str(directory), spa_routes=["/services"])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://beacon")
+
+
+class TestStaticAssets:
+    """Index, Varianten und Cache-Control"""
+
+    def test_index_and_in_memory_compression(self, dist):
+        assets = StaticAssets(str(dist))
+
+        assert len(assets) == 3
+        script = assets.get("assets/index-3f9a2c1b.js")
+        assert script.cache_control == b"public, max-age=31536000, immutable"
+        assert gzip.decompress(script.variants["gzip"].body) == SCRIPT
+        # Zu klein zum Komprimieren, kein Hash im Namen
+        index = assets.get("index.html")
+        assert set(index.variants) == {None}
+        assert index.cache_control == b"no-cache"
+
+    def test_precompressed_variants_are_used(self, dist):
+        written = precompress(str(dist), level=6)
+        assert str(dist / "assets" / "index-3f9a2c1b.js.gz") in written
+
+        assets = StaticAssets(str(dist))
+        # Varianten zählen nicht als eigene Dateien
+        assert len(assets) == 3
+        assert assets.get("assets/index-3f9a2c1b.js").variants["gzip"].path.endswith(".js.gz")
+
+    @pytest.mark.asyncio
+    async def test_serves_negotiated_variant(self, dist):
+        async with make_client(dist) as client:
+            gzipped = await client.get("/assets/index-3f9a2c1b.js", headers={"Accept-Encoding": "gzip"})
+            identity = await client.get("/static/assets/index-3f9a2c1b.js",
+                                        headers={"Accept-Encoding": "gzip;q=0"})
+
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.headers["content-type"] == "text/javascript; charset=utf-8"
+        assert gzipped.headers["vary"] == "Accept-Encoding"
+        assert gzipped.content == SCRIPT
+        assert "content-encoding" not in identity.headers
+        assert identity.content == SCRIPT
+        assert gzipped.headers["etag"] != identity.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_etag_revalidation(self, dist):
+        async with make_client(dist) as client:
+            first = await client.get("/", headers={"Accept-Encoding": "identity"})
+            cached = await client.get("/services", headers={"If-None-Match": "W/" + first.headers["etag"]})
+            changed = await client.get("/", headers={"If-None-Match": '"other"'})
+
+        assert first.text == "<!doctype html><div id=app></div>"
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert changed.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_large_files_are_streamed(self, dist, monkeypatch):
+        monkeypatch.setattr(settings, "static_cache_max_file_size", 0)
+
+        async with make_client(dist) as client:
+            response = await client.get("/favicon.ico")
+            head = await client.head("/favicon.ico")
+
+        assert response.content == b"\x00" * 64
+        assert response.headers["etag"]
+        assert head.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_other_requests_reach_the_app(self, dist):
+        async with make_client(dist) as client:
+            missing = await client.get("/api/v1/services")
+            post = await client.post("/index.html")
+
+        assert missing.text == "api"
+        assert post.status_code == 404
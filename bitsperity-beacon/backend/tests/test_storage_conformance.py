@@ -0,0 +1,309 @@
+"""
+Conformance Tests für die Storage Backends
+
+Alle Backends müssen sich für die Queries der Registry, der Debug API und
+des Cluster Codes wie MongoDB verhalten. MongoDB wird nur getestet, wenn
+``BEACON_TEST_MONGODB_URL`` gesetzt ist.
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.database import SERVICE_UNIQUE_INDEXES
+from app.storage import MemoryCollection, SQLiteStore
+
+MONGODB_URL = os.environ.get("BEACON_TEST_MONGODB_URL")
+
+BACKENDS = [
+    "memory",
+    "sqlite",
+    pytest.param("mongodb", marks=pytest.mark.skipif(
+        not MONGODB_URL, reason="BEACON_TEST_MONGODB_URL nicht gesetzt")),
+]
+
+
+class Collections:
+    def __init__(self, services, leases):
+        self.services = services
+        self.leases = leases
+
+
+@pytest_asyncio.fixture(params=BACKENDS)
+async def db(request, tmp_path):
+    if request.param == "memory":
+        yield Collections(
+            MemoryCollection("services", SERVICE_UNIQUE_INDEXES),
+            MemoryCollection("leases")
+        )
+    elif request.param == "sqlite":
+        store = SQLiteStore(str(tmp_path / "beacon.sqlite3"), commit_interval=0.05)
+        store.open()
+        collections = Collections(
+            store.collection("services", SERVICE_UNIQUE_INDEXES),
+            store.collection("leases")
+        )
+        store.start()
+        yield collections
+        await store.close()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGODB_URL)
+        database = client["beacon_conformance"]
+        await database.services.drop()
+        await database.leases.drop()
+        for keys in SERVICE_UNIQUE_INDEXES:
+            await database.services.create_index(keys, unique=True)
+        yield Collections(database.services, database.leases)
+        await client.drop_database("beacon_conformance")
+        client.close()
+
+
+def iso(offset_seconds: int) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=offset_seconds)).isoformat()
+
+
+def service_doc(service_id: str, name: str, port: int = 80, **fields) -> dict:
+    doc = {
+        "service_id": service_id,
+        "name": name,
+        "host": "10.0.0.1",
+        "port": port,
+        "type": "http",
+        "tags": [],
+        "expires_at": iso(300),
+    }
+    doc.update(fields)
+    return doc
+
+
+@pytest.mark.asyncio
+async def test_insert_and_find_one(db):
+    doc = service_doc("a", "alpha")
+    result = await db.services.insert_one(doc)
+
+    assert result.inserted_id == doc["_id"]
+    found = await db.services.find_one({"_id": result.inserted_id})
+    assert found["service_id"] == "a"
+    assert await db.services.find_one({"service_id": "missing"}) is None
+
+
+@pytest.mark.asyncio
+async def test_unique_indexes(db):
+    await db.services.insert_one(service_doc("a", "alpha"))
+
+    with pytest.raises(DuplicateKeyError):
+        await db.services.insert_one(service_doc("a", "other"))
+    with pytest.raises(DuplicateKeyError):
+        await db.services.insert_one(service_doc("b", "alpha"))
+
+    await db.services.insert_one(service_doc("b", "alpha", port=81))
+    assert await db.services.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_registration_upsert(db):
+    query = {"name": "alpha", "host": "10.0.0.1", "port": 80}
+    first = await db.services.find_one_and_update(
+        query,
+        {"$set": {"type": "http", "expires_at": iso(300)}, "$setOnInsert": {"service_id": "a"}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    second = await db.services.find_one_and_update(
+        query,
+        {"$set": {"type": "mqtt", "expires_at": iso(600)}, "$setOnInsert": {"service_id": "b"}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    assert first["service_id"] == second["service_id"] == "a"
+    assert second["type"] == "mqtt"
+    assert first["_id"] == second["_id"]
+    assert await db.services.count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_find_one_and_update_return_document(db):
+    await db.services.insert_one(service_doc("a", "alpha"))
+
+    before = await db.services.find_one_and_update(
+        {"service_id": "a"}, {"$set": {"type": "mqtt"}}, return_document=ReturnDocument.BEFORE
+    )
+    missing = await db.services.find_one_and_update({"service_id": "x"}, {"$set": {"type": "mqtt"}})
+
+    assert before["type"] == "http"
+    assert missing is None
+    assert (await db.services.find_one({"service_id": "a"}))["type"] == "mqtt"
+
+
+@pytest.mark.asyncio
+async def test_expiry_range_queries(db):
+    await db.services.insert_one(service_doc("expired", "e", expires_at=iso(-10)))
+    await db.services.insert_one(service_doc("soon", "s", expires_at=iso(30)))
+    await db.services.insert_one(service_doc("later", "l", expires_at=iso(3000)))
+
+    now = iso(0)
+    active = await db.services.find({"expires_at": {"$gt": now}}).to_list(length=None)
+    expired = await db.services.find({"expires_at": {"$lt": now}}).to_list(length=None)
+    near = await db.services.count_documents({"expires_at": {"$lt": iso(60), "$gt": now}})
+
+    assert {doc["service_id"] for doc in active} == {"soon", "later"}
+    assert [doc["service_id"] for doc in expired] == ["expired"]
+    assert near == 1
+
+
+@pytest.mark.asyncio
+async def test_tag_and_type_filters(db):
+    await db.services.insert_one(service_doc("a", "a", tags=["sensor", "kitchen"]))
+    await db.services.insert_one(service_doc("b", "b", tags=["sensor"], type="mqtt"))
+    await db.services.insert_one(service_doc("c", "c", tags=["camera"]))
+
+    sensors = await db.services.find({"tags": {"$in": ["sensor"]}}).to_list(length=None)
+    kitchen = await db.services.find({"tags": "kitchen"}).to_list(length=None)
+    http = await db.services.count_documents({"type": "http", "tags": {"$in": ["sensor", "camera"]}})
+
+    assert {doc["service_id"] for doc in sensors} == {"a", "b"}
+    assert [doc["service_id"] for doc in kitchen] == ["a"]
+    assert http == 2
+
+
+@pytest.mark.asyncio
+async def test_exists_and_ne(db):
+    await db.services.insert_one(service_doc("url", "u", health_check_url="http://x/health"))
+    await db.services.insert_one(service_doc("none", "n", health_check_url=None))
+    await db.services.insert_one(service_doc("missing", "m"))
+    await db.services.insert_one(service_doc("off", "o", health_check_url="http://y/health",
+                                             fallback_to_health_check=False))
+
+    docs = await db.services.find({
+        "health_check_url": {"$exists": True, "$ne": None},
+        "fallback_to_health_check": {"$ne": False}
+    }).to_list(length=None)
+
+    assert [doc["service_id"] for doc in docs] == ["url"]
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination(db):
+    for index, service_type in enumerate(["mqtt", "http", "http", "api", "mqtt"]):
+        await db.services.insert_one(service_doc(f"s{index}", f"n{index}", type=service_type))
+
+    pages = []
+    after = None
+    while True:
+        query = {"expires_at": {"$gt": iso(0)}}
+        if after:
+            query["$or"] = [
+                {"type": {"$gt": after[0]}},
+                {"type": after[0], "service_id": {"$gt": after[1]}}
+            ]
+        docs = await db.services.find(query).sort([("type", 1), ("service_id", 1)]).limit(2).to_list(length=2)
+        if not docs:
+            break
+        pages.append([doc["service_id"] for doc in docs])
+        after = (docs[-1]["type"], docs[-1]["service_id"])
+
+    assert pages == [["s3", "s1"], ["s2", "s0"], ["s4"]]
+
+    skipped = await db.services.find({}).sort([("type", -1), ("service_id", 1)]).skip(3).limit(10).to_list(length=10)
+    assert [doc["service_id"] for doc in skipped] == ["s2", "s3"]
+
+
+@pytest.mark.asyncio
+async def test_update_one_counts(db):
+    await db.services.insert_one(service_doc("a", "alpha"))
+    expires_at = iso(900)
+
+    changed = await db.services.update_one({"service_id": "a"}, {"$set": {"expires_at": expires_at}})
+    unchanged = await db.services.update_one({"service_id": "a"}, {"$set": {"expires_at": expires_at}})
+    missing = await db.services.update_one({"service_id": "x"}, {"$set": {"expires_at": expires_at}})
+
+    assert (changed.matched_count, changed.modified_count) == (1, 1)
+    assert (unchanged.matched_count, unchanged.modified_count) == (1, 0)
+    assert (missing.matched_count, missing.modified_count) == (0, 0)
+    assert (await db.services.find_one({"service_id": "a"}))["expires_at"] == expires_at
+
+
+@pytest.mark.asyncio
+async def test_delete(db):
+    for index in range(4):
+        await db.services.insert_one(service_doc(f"s{index}", f"n{index}"))
+
+    one = await db.services.delete_one({"service_id": "s0"})
+    none = await db.services.delete_one({"service_id": "s0"})
+    many = await db.services.delete_many({"service_id": {"$in": ["s1", "s2", "x"]}})
+
+    assert (one.deleted_count, none.deleted_count, many.deleted_count) == (1, 0, 2)
+    assert [doc["service_id"] for doc in await db.services.find({}).to_list(length=None)] == ["s3"]
+    # Freigewordene Unique Keys sind wieder verwendbar
+    await db.services.insert_one(service_doc("s0", "n0"))
+
+
+@pytest.mark.asyncio
+async def test_lease_takeover(db):
+    now = datetime(2024, 1, 1, 12, 0, 0)
+
+    async def acquire(holder: str, at: datetime):
+        return await db.leases.find_one_and_update(
+            {"_id": "leader", "$or": [{"holder": holder}, {"expires_at": {"$lt": at}}]},
+            {"$set": {"holder": holder, "expires_at": at + timedelta(seconds=15)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    assert (await acquire("w1", now))["holder"] == "w1"
+    with pytest.raises(DuplicateKeyError):
+        await acquire("w2", now + timedelta(seconds=5))
+    renewed = await acquire("w1", now + timedelta(seconds=10))
+    assert renewed["expires_at"] == now + timedelta(seconds=25)
+    assert (await acquire("w2", now + timedelta(seconds=30)))["holder"] == "w2"
+
+
+@pytest.mark.asyncio
+async def test_results_are_copies(db):
+    await db.services.insert_one(service_doc("a", "alpha", tags=["x"], metadata={"k": "v"}))
+
+    found = await db.services.find_one({"service_id": "a"})
+    found["tags"].append("y")
+    found["metadata"]["k"] = "changed"
+    listed = await db.services.find({"service_id": "a"}).to_list(length=None)
+
+    assert listed[0]["tags"] == ["x"]
+    assert listed[0]["metadata"] == {"k": "v"}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_persistence_and_batching(tmp_path):
+    path = str(tmp_path / "beacon.sqlite3")
+    store = SQLiteStore(path, commit_interval=60)
+    store.open()
+    services = store.collection("services", SERVICE_UNIQUE_INDEXES)
+    await services.insert_one(service_doc("a", "alpha"))
+    await services.insert_one(service_doc("b", "beta"))
+    for index in range(50):
+        await services.update_one({"service_id": "a"}, {"$set": {"expires_at": iso(index)}})
+    await services.delete_one({"service_id": "b"})
+    last_expiry = (await services.find_one({"service_id": "a"}))["expires_at"]
+
+    await store.flush()
+    stats = store.get_stats()
+    # 53 Änderungen, aber nur ein Row-Write und ein Delete in einem Commit
+    assert stats["staged_writes"] == 53
+    assert (stats["rows_written"], stats["rows_deleted"], stats["commits"]) == (1, 1, 1)
+    await store.close()
+
+    reopened = SQLiteStore(path)
+    reopened.open()
+    services = reopened.collection("services", SERVICE_UNIQUE_INDEXES)
+    docs = await services.find({}).to_list(length=None)
+    assert [(doc["service_id"], doc["expires_at"]) for doc in docs] == [("a", last_expiry)]
+    with pytest.raises(DuplicateKeyError):
+        await services.insert_one(service_doc("a", "other"))
+    await reopened.close()
@@ -0,0 +1,104 @@
+"""
+Tests für Sequenznummern, Journal und Resume im WebSocket Manager
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.websocket_manager import WebSocketManager
+
+
+class RecordingWebSocket:
+    """Minimaler WebSocket, der gesendete Nachrichten sammelt"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+    def types(self):
+        return [message["type"] for message in self.messages]
+
+    def sequences(self):
+        return [message["seq"] for message in self.messages if message["type"] == "service_heartbeat"]
+
+
+async def make_manager(events: int, journal_size: int = 100) -> WebSocketManager:
+    manager = WebSocketManager(journal_size=journal_size)
+    manager.set_snapshot_provider(lambda: [{"service_id": "svc-1"}])
+    for index in range(events):
+        await manager.broadcast_service_heartbeat(f"svc-{index}", "2026-01-01T00:00:00Z")
+    return manager
+
+
+class TestWebSocketJournal:
+    """Resume liefert genau die verpassten Events, sonst einen Snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_sequence_and_journal(self):
+        manager = await make_manager(events=5, journal_size=3)
+
+        assert manager.sequence == 5
+        assert [seq for seq, _ in manager.journal] == [3, 4, 5]
+        assert manager.get_journal_stats()["oldest_seq"] == 3
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_events(self):
+        manager = await make_manager(events=5)
+        websocket = RecordingWebSocket()
+
+        await manager.connect(websocket, resume_from=2, epoch=manager.epoch)
+
+        assert websocket.types()[0] == "connection_established"
+        assert websocket.sequences() == [3, 4, 5]
+        assert websocket in manager.active_connections
+        assert manager.resume_stats["replayed"] == 3
+
+        await manager.broadcast_service_heartbeat("svc-new", "2026-01-01T00:00:00Z")
+        assert websocket.sequences() == [3, 4, 5, 6]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("resume_from,epoch", [
+        (1, "current"),   # Lücke nicht mehr im Journal
+        (2, "other"),     # Beacon neu gestartet
+        (99, "current"),  # Sequenz aus der Zukunft
+    ])
+    async def test_snapshot_when_gap_cannot_be_filled(self, resume_from, epoch):
+        manager = await make_manager(events=5, journal_size=3)
+        websocket = RecordingWebSocket()
+
+        await manager.connect(websocket, resume_from=resume_from,
+                              epoch=manager.epoch if epoch == "current" else epoch)
+
+        assert websocket.types() == ["connection_established", "services_snapshot"]
+        assert websocket.messages[1]["seq"] == 5
+        assert websocket.messages[1]["data"]["services"] == [{"service_id": "svc-1"}]
+        assert manager.resume_stats["snapshots"] == 1
+
+    @pytest.mark.asyncio
+    async def test_resume_at_current_sequence(self):
+        manager = await make_manager(events=5, journal_size=3)
+        websocket = RecordingWebSocket()
+
+        await manager.connect(websocket, resume_from=5, epoch=manager.epoch)
+
+        assert websocket.types() == ["connection_established"]
+
+    @pytest.mark.asyncio
+    async def test_resync_without_snapshot_provider(self):
+        manager = WebSocketManager(journal_size=2)
+        for index in range(4):
+            await manager.broadcast_services_cleanup(index)
+        websocket = RecordingWebSocket()
+
+        await manager.connect(websocket, resume_from=0, epoch=manager.epoch)
+
+        assert websocket.types() == ["connection_established", "resync_required"]
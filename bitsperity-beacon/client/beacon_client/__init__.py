@@ -0,0 +1,24 @@
+"""
+Python Client für Bitsperity Beacon
+
+- BeaconClient: gepoolte HTTP Session, Registrierung und Discovery
+- HeartbeatLoop: automatische Heartbeats mit Jitter, Backoff und Re-Registrierung
+- DiscoveryCache: lokaler, per WebSocket aktueller Discovery Cache
+"""
+
+from .client import BeaconClient, RegisteredService
+from .heartbeat import HeartbeatLoop
+from .cache import DiscoveryCache
+from .exceptions import BeaconError, RateLimitedError, ServiceNotFoundError
+
+__version__ = "0.1.0"
+
+__all__ = [
+    "BeaconClient",
+    "RegisteredService",
+    "HeartbeatLoop",
+    "DiscoveryCache",
+    "BeaconError",
+    "RateLimitedError",
+    "ServiceNotFoundError"
+]
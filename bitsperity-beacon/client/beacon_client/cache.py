@@ -0,0 +1,208 @@
+"""
+Lokaler Discovery Cache
+
+Hält alle Services im Speicher und folgt Änderungen über den Beacon
+WebSocket (``/api/v1/ws``). Lookups kommen damit aus dem Speicher statt
+vor jedem ausgehenden Request ``/discover`` aufzurufen. Nach einem
+Reconnect werden nur die verpassten Events nachgeholt (``resume_from``),
+Beacon sendet einen Snapshot, wenn die Lücke zu alt ist. Zusätzlich wird
+periodisch komplett neu synchronisiert.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import aiohttp
+
+from .exceptions import BeaconError
+from .heartbeat import backoff_delay, parse_datetime
+
+if TYPE_CHECKING:
+    from .client import BeaconClient
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveryCache:
+    """In-Memory Abbild der Beacon Registry"""
+
+    def __init__(self,
+                 client: "BeaconClient",
+                 resync_interval: float = 300.0,
+                 reconnect_base: float = 1.0,
+                 reconnect_cap: float = 30.0):
+        self.client = client
+        self.resync_interval = resync_interval
+        self.reconnect_base = reconnect_base
+        self.reconnect_cap = reconnect_cap
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.connected = False
+        self.last_sync: Optional[datetime] = None
+        # Position im Beacon Event Journal (für Resume nach Reconnect)
+        self.epoch: Optional[str] = None
+        self.last_seq: Optional[int] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._resync_task: Optional[asyncio.Task] = None
+
+    # --- Lookups (nur Speicher, kein Netzwerk) ---
+
+    def get(self, service_id: str) -> Optional[Dict[str, Any]]:
+        """Hole einen Service per ID (None wenn unbekannt oder abgelaufen)"""
+        service = self.services.get(service_id)
+        if service is None or self._is_expired(service):
+            return None
+        return service
+
+    def find(self,
+             type: Optional[str] = None,
+             tags: Optional[List[str]] = None,
+             protocol: Optional[str] = None,
+             status: Optional[str] = "active") -> List[Dict[str, Any]]:
+        """Finde Services mit denselben Filtern wie ``/services/discover``"""
+        matches = []
+        for service in self.services.values():
+            if self._is_expired(service):
+                continue
+            if type and service.get("type") != type:
+                continue
+            if protocol and service.get("protocol") != protocol:
+                continue
+            if status and service.get("status") != status:
+                continue
+            if tags and not set(tags).intersection(service.get("tags") or []):
+                continue
+            matches.append(service)
+        return matches
+
+    def first(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        """Erster passender Service oder None"""
+        matches = self.find(**filters)
+        return matches[0] if matches else None
+
+    # --- Synchronisation ---
+
+    async def start(self) -> None:
+        """Initialer Sync und Start des WebSocket Watchers"""
+        if self._watch_task is not None:
+            return
+
+        try:
+            await self.refresh()
+        except (BeaconError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Beacon evtl. noch nicht erreichbar - der Watcher synchronisiert nach dem Connect
+            logger.warning(f"Initialer Discovery Sync fehlgeschlagen: {e}")
+
+        self._watch_task = asyncio.create_task(self._watch_loop())
+        self._resync_task = asyncio.create_task(self._resync_loop())
+
+    async def stop(self) -> None:
+        """Stoppe Watcher und periodischen Sync"""
+        for task in (self._watch_task, self._resync_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        self._watch_task = None
+        self._resync_task = None
+        self.connected = False
+
+    async def refresh(self) -> None:
+        """Lade alle Services neu (vollständiger Sync)"""
+        services = await self.client.list_services()
+        self.services = {service["service_id"]: service for service in services}
+        self.last_sync = datetime.now(timezone.utc)
+        logger.debug(f"Discovery Cache synchronisiert: {len(self.services)} Services")
+
+    def apply_event(self, message: Dict[str, Any]) -> None:
+        """Wende ein WebSocket Event auf den Cache an"""
+        event_type = message.get("type")
+        data = message.get("data") or {}
+        service_id = data.get("service_id")
+        seq = message.get("seq")
+
+        if event_type == "connection_established":
+            if message.get("epoch") != self.epoch:
+                self.epoch = message.get("epoch")
+                self.last_seq = seq
+            return
+        if event_type in ("services_snapshot", "resync_required"):
+            if event_type == "services_snapshot":
+                self.services = {service["service_id"]: service for service in data.get("services", [])}
+                self.last_sync = datetime.now(timezone.utc)
+            self.last_seq = seq
+            return
+        if seq is not None:
+            if self.last_seq is not None and seq <= self.last_seq:
+                return  # Bereits angewendet
+            self.last_seq = seq
+
+        if event_type in ("service_registered", "service_updated") and service_id:
+            self.services[service_id] = data
+        elif event_type == "service_deregistered" and service_id:
+            self.services.pop(service_id, None)
+        elif event_type == "service_heartbeat" and service_id:
+            service = self.services.get(service_id)
+            if service is not None:
+                service["expires_at"] = data.get("expires_at")
+        elif event_type == "services_cleanup":
+            # Event enthält keine IDs - abgelaufene lokal entfernen
+            self._drop_expired()
+
+    async def _watch_loop(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                resuming = self.epoch is not None and self.last_seq is not None
+                params = {"resume_from": self.last_seq, "epoch": self.epoch} if resuming else None
+                async with self.client.session.ws_connect(self.client.websocket_url,
+                                                          params=params, heartbeat=30) as ws:
+                    self.connected = True
+                    attempt = 0
+                    if not resuming:
+                        # Erster Connect: vollständiger Sync, danach nur noch Events
+                        await self.refresh()
+
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            try:
+                                message = json.loads(msg.data)
+                            except ValueError:
+                                continue
+                            self.apply_event(message)
+                            if message.get("type") == "resync_required":
+                                await self.refresh()
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+
+            except asyncio.CancelledError:
+                raise
+            except (BeaconError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug(f"Discovery WebSocket getrennt: {e}")
+
+            self.connected = False
+            delay = backoff_delay(attempt, self.reconnect_base, self.reconnect_cap)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _resync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await self.refresh()
+            except (BeaconError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Periodischer Discovery Sync fehlgeschlagen: {e}")
+
+    def _drop_expired(self) -> None:
+        for service_id in [sid for sid, service in self.services.items() if self._is_expired(service)]:
+            del self.services[service_id]
+
+    @staticmethod
+    def _is_expired(service: Dict[str, Any]) -> bool:
+        expires_at = parse_datetime(service.get("expires_at"))
+        return expires_at is not None and expires_at <= datetime.now(timezone.utc)
@@ -0,0 +1,213 @@
+"""
+HTTP Client für Bitsperity Beacon
+
+Eine gepoolte aiohttp Session für alle Requests, automatische Heartbeats
+für registrierte Services und ein lokaler Discovery Cache.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from .cache import DiscoveryCache
+from .exceptions import BeaconError, RateLimitedError, ServiceNotFoundError
+from .heartbeat import HeartbeatLoop
+
+DEFAULT_BASE_URL = "http://umbrel.local:8097/api/v1"
+DEFAULT_TTL = 300
+
+
+class RegisteredService:
+    """Ein von diesem Client registrierter Service"""
+
+    def __init__(self, payload: Dict[str, Any], service: Dict[str, Any]):
+        self.payload = payload
+        self.service = service
+        self.heartbeat: Optional[HeartbeatLoop] = None
+
+    @property
+    def service_id(self) -> str:
+        return self.service["service_id"]
+
+    @property
+    def name(self) -> str:
+        return self.payload["name"]
+
+    @property
+    def ttl(self) -> int:
+        return self.payload.get("ttl") or DEFAULT_TTL
+
+
+class BeaconClient:
+    """
+    Async Client für die Beacon API
+
+    Beispiel::
+
+        async with BeaconClient("http://umbrel.local:8097/api/v1") as beacon:
+            await beacon.register(name="sensor-1", type="iot", host="192.168.1.50", port=8080, ttl=60)
+            await beacon.cache.start()
+            broker = beacon.cache.first(type="mqtt")
+    """
+
+    def __init__(self,
+                 base_url: str = DEFAULT_BASE_URL,
+                 timeout: float = 10.0,
+                 max_connections: int = 10,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session = session
+        self._owns_session = session is None
+        self.registrations: Dict[str, RegisteredService] = {}
+        self.cache = DiscoveryCache(self)
+
+    async def __aenter__(self) -> "BeaconClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Gepoolte Session (Keep-Alive Verbindungen werden wiederverwendet)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._owns_session = True
+        return self._session
+
+    @property
+    def websocket_url(self) -> str:
+        if self.base_url.startswith("https://"):
+            return "wss://" + self.base_url[len("https://"):] + "/ws"
+        return "ws://" + self.base_url.split("://", 1)[-1] + "/ws"
+
+    async def close(self, deregister: bool = False) -> None:
+        """Stoppe Heartbeats und Cache, optional Services deregistrieren"""
+        for registration in list(self.registrations.values()):
+            if deregister:
+                try:
+                    await self.deregister(registration.service_id)
+                except (BeaconError, aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+            elif registration.heartbeat:
+                await registration.heartbeat.stop()
+
+        await self.cache.stop()
+
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+        async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+            if response.status == 404:
+                raise ServiceNotFoundError(f"{method} {path}: nicht gefunden", status=404)
+            if response.status == 429:
+                try:
+                    retry_after = float(response.headers.get("Retry-After", 1))
+                except ValueError:
+                    retry_after = 1.0
+                raise RateLimitedError(f"{method} {path}: Rate Limit, erneut in {retry_after:.0f}s",
+                                       retry_after=retry_after)
+            if response.status >= 400:
+                detail = await response.text()
+                raise BeaconError(f"{method} {path} fehlgeschlagen ({response.status}): {detail}",
+                                  status=response.status)
+            return await response.json()
+
+    # --- Registrierung ---
+
+    async def register(self,
+                       name: str,
+                       type: str,
+                       host: str,
+                       port: int,
+                       protocol: str = "http",
+                       tags: Optional[List[str]] = None,
+                       metadata: Optional[Dict[str, Any]] = None,
+                       ttl: Optional[int] = None,
+                       heartbeat: bool = True,
+                       heartbeat_interval: Optional[float] = None,
+                       **extra: Any) -> RegisteredService:
+        """
+        Registriere einen Service und starte automatische Heartbeats
+
+        Zusätzliche Felder (z.B. ``health_check_url``) werden unverändert an
+        ``POST /services/register`` übergeben.
+        """
+        payload: Dict[str, Any] = {
+            "name": name,
+            "type": type,
+            "host": host,
+            "port": port,
+            "protocol": protocol,
+            "tags": tags or [],
+            "metadata": metadata or {},
+            **extra
+        }
+        if ttl is not None:
+            payload["ttl"] = ttl
+
+        service = await self._request("POST", "/services/register", json=payload)
+        registration = RegisteredService(payload, service)
+        self.registrations[registration.service_id] = registration
+
+        if heartbeat:
+            registration.heartbeat = HeartbeatLoop(self, registration, interval=heartbeat_interval)
+            registration.heartbeat.start()
+
+        return registration
+
+    async def reregister(self, registration: RegisteredService) -> None:
+        """Registriere erneut (z.B. nach 404 beim Heartbeat)"""
+        old_id = registration.service_id
+        registration.service = await self._request("POST", "/services/register", json=registration.payload)
+
+        if registration.service_id != old_id:
+            self.registrations.pop(old_id, None)
+            self.registrations[registration.service_id] = registration
+
+    async def heartbeat(self, service_id: str, ttl: Optional[int] = None) -> Dict[str, Any]:
+        """Sende einen Heartbeat (verlängert die TTL)"""
+        params = {"ttl": ttl} if ttl is not None else None
+        return await self._request("PUT", f"/services/{service_id}/heartbeat", params=params)
+
+    async def deregister(self, service_id: str) -> None:
+        """Stoppe Heartbeats und deregistriere den Service"""
+        registration = self.registrations.pop(service_id, None)
+        if registration and registration.heartbeat:
+            await registration.heartbeat.stop()
+
+        try:
+            await self._request("DELETE", f"/services/{service_id}")
+        except ServiceNotFoundError:
+            pass
+
+    # --- Discovery ---
+
+    async def list_services(self, page_size: int = 100, **filters: Any) -> List[Dict[str, Any]]:
+        """Hole alle Services (folgt ``next_cursor`` über alle Seiten)"""
+        base_params: List[tuple] = [("limit", page_size)]
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                base_params.extend((key, item) for item in value)
+            else:
+                base_params.append((key, value))
+
+        services: List[Dict[str, Any]] = []
+        params = base_params
+        while True:
+            page = await self._request("GET", "/services/", params=params)
+            services.extend(page.get("services", []))
+
+            next_cursor = page.get("next_cursor")
+            if not next_cursor:
+                return services
+            params = base_params + [("cursor", next_cursor)]
@@ -0,0 +1,24 @@
+"""
+Exceptions für den Bitsperity Beacon Client
+"""
+from typing import Optional
+
+
+class BeaconError(Exception):
+    """Fehler bei der Kommunikation mit Beacon"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceNotFoundError(BeaconError):
+    """Service ist Beacon nicht (mehr) bekannt - z.B. nach TTL Ablauf"""
+
+
+class RateLimitedError(BeaconError):
+    """Beacon lehnt die Anfrage wegen Rate Limit ab (429)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message, status=429)
+        self.retry_after = retry_after
@@ -0,0 +1,142 @@
+"""
+Automatische Heartbeats mit Jitter und Backoff
+
+Feste Intervalle synchronisieren sich nach Stromausfällen (alle Geräte
+starten gleichzeitig) und erzeugen Lastspitzen. Jedes Intervall wird
+deshalb zufällig gestreut, Fehler werden mit exponentiellem Backoff
+("full jitter") wiederholt. Kennt Beacon den Service nicht mehr (404),
+wird er neu registriert - dank idempotenter Registrierung mit derselben
+service_id.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import aiohttp
+
+from .exceptions import BeaconError, RateLimitedError, ServiceNotFoundError
+
+if TYPE_CHECKING:
+    from .client import BeaconClient, RegisteredService
+
+logger = logging.getLogger(__name__)
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def server_delay(response: Dict[str, Any]) -> Optional[float]:
+    """
+    Wartezeit bis zum vom Server vorgegebenen ``next_heartbeat_at``
+
+    Gerechnet relativ zu ``last_heartbeat`` aus derselben Antwort (beides
+    Serverzeit), damit eine falsch gehende Geräteuhr keine Rolle spielt.
+    """
+    next_at = parse_datetime(response.get("next_heartbeat_at"))
+    server_now = parse_datetime(response.get("last_heartbeat"))
+    if next_at is None or server_now is None:
+        return None
+    delay = (next_at - server_now).total_seconds()
+    return delay if delay > 0 else None
+
+
+def jittered(interval: float, jitter: float) -> float:
+    """Streue ein Intervall um ±jitter (Anteil)"""
+    return interval * random.uniform(1.0 - jitter, 1.0 + jitter)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponentieller Backoff mit Full Jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HeartbeatLoop:
+    """Hält die Registrierung eines Services am Leben"""
+
+    def __init__(self,
+                 client: "BeaconClient",
+                 registration: "RegisteredService",
+                 interval: Optional[float] = None,
+                 jitter: float = 0.2,
+                 backoff_base: float = 1.0,
+                 backoff_cap: Optional[float] = None):
+        self.client = client
+        self.registration = registration
+        # Standard: drei Heartbeats pro TTL, damit einzelne Fehler nicht zum Ablauf führen
+        self.interval = interval or max(1.0, registration.ttl / 3)
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        # Backoff nie länger als ein reguläres Intervall, sonst läuft die TTL ab
+        self.backoff_cap = backoff_cap or self.interval
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Starte Heartbeat Loop"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stoppe Heartbeat Loop"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _next_delay(self, response: Dict[str, Any]) -> float:
+        """Server Vorgabe (Pacing) bevorzugen, sonst eigenes Intervall mit Jitter"""
+        delay = server_delay(response)
+        if delay is not None and delay < self.registration.ttl:
+            return delay
+        return jittered(self.interval, self.jitter)
+
+    async def _run(self) -> None:
+        delay = self._next_delay(self.registration.service)
+        while True:
+            await asyncio.sleep(delay)
+            delay = await self._beat()
+
+    async def _beat(self) -> float:
+        """Ein Heartbeat, liefert die Wartezeit bis zum nächsten"""
+        try:
+            try:
+                response = await self.client.heartbeat(self.registration.service_id, ttl=self.registration.ttl)
+            except ServiceNotFoundError:
+                logger.warning(f"Service {self.registration.name} nicht mehr registriert - registriere neu")
+                await self.client.reregister(self.registration)
+                response = self.registration.service
+
+            self.failures = 0
+            return self._next_delay(response)
+
+        except RateLimitedError as e:
+            # Vorgabe des Servers einhalten, zählt nicht als Fehler
+            logger.warning(f"Heartbeat für {self.registration.name} gedrosselt, "
+                           f"neuer Versuch in {e.retry_after:.0f}s")
+            return e.retry_after * random.uniform(1.0, 1.0 + self.jitter)
+
+        except (BeaconError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            delay = backoff_delay(self.failures, self.backoff_base, self.backoff_cap)
+            self.failures += 1
+            logger.warning(f"Heartbeat für {self.registration.name} fehlgeschlagen "
+                           f"({self.failures}x), neuer Versuch in {delay:.1f}s: {e}")
+            return delay
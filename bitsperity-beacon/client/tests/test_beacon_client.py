@@ -0,0 +1,195 @@
+"""
+Tests für den Beacon Python Client (HTTP API, Heartbeats, Discovery Cache)
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from beacon_client import BeaconClient, DiscoveryCache, HeartbeatLoop, RateLimitedError, ServiceNotFoundError
+from beacon_client.heartbeat import backoff_delay, jittered, server_delay
+
+
+def iso(delta: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=delta)).isoformat()
+
+
+class FakeBeacon:
+    """Minimale Beacon API: Registrierung, Heartbeat und Liste mit Cursor"""
+
+    def __init__(self):
+        self.services = {}
+        self.heartbeat_status = 200
+        self.registrations = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v1/services/register", self.register)
+        app.router.add_put("/api/v1/services/{service_id}/heartbeat", self.heartbeat)
+        app.router.add_get("/api/v1/services/", self.list_services)
+        return app
+
+    async def register(self, request):
+        payload = await request.json()
+        self.registrations += 1
+        service = dict(payload, service_id=f"svc-{payload['name']}", status="active",
+                       last_heartbeat=iso(), expires_at=iso(payload.get("ttl", 300)))
+        self.services[service["service_id"]] = service
+        return web.json_response(service)
+
+    async def heartbeat(self, request):
+        if self.heartbeat_status == 429:
+            return web.Response(status=429, headers={"Retry-After": "7"})
+        service = self.services.get(request.match_info["service_id"])
+        if service is None or self.heartbeat_status == 404:
+            return web.Response(status=404)
+        service.update(last_heartbeat=iso(), next_heartbeat_at=iso(40), expires_at=iso(120))
+        return web.json_response(service)
+
+    async def list_services(self, request):
+        ordered = sorted(self.services)
+        limit = int(request.query["limit"])
+        start = int(request.query.get("cursor", 0))
+        page = ordered[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(ordered) else None
+        return web.json_response({"services": [self.services[sid] for sid in page], "next_cursor": next_cursor})
+
+
+@pytest_asyncio.fixture
+async def beacon():
+    fake = FakeBeacon()
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = BeaconClient(f"http://127.0.0.1:{port}/api/v1")
+    yield fake, client
+    await client.close()
+    await runner.cleanup()
+
+
+class TestHelpers:
+    """Server Pacing, Jitter und Backoff"""
+
+    def test_server_delay_uses_server_clock(self):
+        response = {"last_heartbeat": "2020-01-01T00:00:00Z", "next_heartbeat_at": "2020-01-01T00:00:42Z"}
+        assert server_delay(response) == 42
+        assert server_delay({"last_heartbeat": "2020-01-01T00:00:00Z"}) is None
+        assert server_delay({"last_heartbeat": "2020-01-01T00:01:00Z",
+                             "next_heartbeat_at": "2020-01-01T00:00:00Z"}) is None
+
+    def test_jitter_and_backoff_bounds(self):
+        for attempt in range(10):
+            assert 80 <= jittered(100, 0.2) <= 120
+            assert 0 <= backoff_delay(attempt, 1.0, 30.0) <= min(30.0, 2 ** attempt)
+
+
+class TestBeaconClient:
+    """Registrierung, Heartbeats und Paging gegen eine lokale Fake API"""
+
+    @pytest.mark.asyncio
+    async def test_register_and_list_all_pages(self, beacon):
+        fake, client = beacon
+        for index in range(5):
+            await client.register(f"sensor-{index}", "iot", "10.0.0.1", 80, heartbeat=False)
+
+        services = await client.list_services(page_size=2)
+
+        assert [service["service_id"] for service in services] == sorted(fake.services)
+        assert set(client.registrations) == set(fake.services)
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_errors(self, beacon):
+        fake, client = beacon
+        fake.heartbeat_status = 429
+        with pytest.raises(RateLimitedError) as error:
+            await client.heartbeat("svc-unknown")
+        assert error.value.retry_after == 7
+
+        fake.heartbeat_status = 404
+        with pytest.raises(ServiceNotFoundError):
+            await client.heartbeat("svc-unknown")
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_loop_follows_server_and_reregisters(self, beacon):
+        fake, client = beacon
+        registration = await client.register("pump", "iot", "10.0.0.2", 80, ttl=120, heartbeat=False)
+        loop = HeartbeatLoop(client, registration)
+
+        # Server Vorgabe: next_heartbeat_at 40s nach last_heartbeat
+        assert 39 <= await loop._beat() <= 41
+
+        # Beacon kennt den Service nicht mehr: neu registrieren
+        fake.services.clear()
+        await loop._beat()
+        assert fake.registrations == 2
+        assert "svc-pump" in fake.services
+
+        fake.heartbeat_status = 429
+        assert 7 <= await loop._beat() <= 7 * 1.2
+        assert loop.failures == 0
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_loop_backs_off_on_errors(self):
+        client = BeaconClient("http://127.0.0.1:9/api/v1", timeout=1)
+        registration = type("Registration", (), {"service_id": "svc-1", "name": "pump", "ttl": 60,
+                                                 "service": {}})()
+        loop = HeartbeatLoop(client, registration, backoff_base=1.0)
+        try:
+            for _ in range(3):
+                assert 0 <= await loop._beat() <= loop.interval
+        finally:
+            await client.close()
+        assert loop.failures == 3
+
+
+class TestDiscoveryCache:
+    """Events mit Sequenznummern auf den lokalen Cache anwenden"""
+
+    def make_cache(self) -> DiscoveryCache:
+        cache = DiscoveryCache(client=None)
+        cache.apply_event({"type": "connection_established", "epoch": "e1", "seq": 0})
+        return cache
+
+    def test_apply_events_in_order(self):
+        cache = self.make_cache()
+        service = {"service_id": "svc-1", "type": "mqtt", "status": "active", "tags": ["broker"],
+                   "expires_at": iso(60)}
+        cache.apply_event({"type": "service_registered", "data": service, "seq": 1})
+        cache.apply_event({"type": "service_heartbeat", "seq": 2,
+                           "data": {"service_id": "svc-1", "expires_at": iso(120)}})
+
+        assert cache.first(type="mqtt", tags=["broker"])["service_id"] == "svc-1"
+        assert cache.find(type="http") == []
+
+        # Bereits angewendete Sequenzen werden ignoriert
+        cache.apply_event({"type": "service_deregistered", "data": {"service_id": "svc-1"}, "seq": 2})
+        assert cache.get("svc-1") is not None
+        cache.apply_event({"type": "service_deregistered", "data": {"service_id": "svc-1"}, "seq": 3})
+        assert cache.get("svc-1") is None
+        assert cache.last_seq == 3
+
+    def test_snapshot_replaces_services(self):
+        cache = self.make_cache()
+        cache.apply_event({"type": "service_registered", "data": {"service_id": "old"}, "seq": 1})
+        cache.apply_event({"type": "services_snapshot", "seq": 10,
+                           "data": {"services": [{"service_id": "new", "status": "active"}]}})
+
+        assert list(cache.services) == ["new"]
+        assert cache.last_seq == 10
+
+    def test_expired_services_are_hidden_and_cleaned_up(self):
+        cache = self.make_cache()
+        cache.apply_event({"type": "service_registered", "seq": 1,
+                           "data": {"service_id": "svc-1", "status": "active", "expires_at": iso(-1)}})
+
+        assert cache.get("svc-1") is None
+        assert cache.find() == []
+        cache.apply_event({"type": "services_cleanup", "data": {"removed_count": 1}, "seq": 2})
+        assert cache.services == {}
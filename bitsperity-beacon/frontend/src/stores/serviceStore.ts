@@ -35,6 +35,9 @@ interface ServiceStore {
   setLoading: (loading: boolean) => void
 }
 
+// Position im Beacon Event Journal - nach Reconnect nur verpasste Events nachladen
+const journal: { epoch: string | null; lastSeq: number | null } = { epoch: null, lastSeq: null }
+
 export const useServiceStore = create<ServiceStore>((set, get) => ({
   // Initial State
   services: [],
@@ -131,7 +134,10 @@ export const useServiceStore = create<ServiceStore>((set, get) => ({
   connectWebSocket: () => {
     // Build WebSocket URL dynamically at runtime
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
-    const wsUrl = `${protocol}//${window.location.host}${API_CONFIG.WS_URL}`
+    const resume = journal.epoch !== null && journal.lastSeq !== null
+      ? `?resume_from=${journal.lastSeq}&epoch=${journal.epoch}`
+      : ''
+    const wsUrl = `${protocol}//${window.location.host}${API_CONFIG.WS_URL}${resume}`
     
     try {
       const ws = new WebSocket(wsUrl)
@@ -227,11 +233,42 @@ function handleWebSocketMessage(
   set: any,
   get: any
 ) {
+  if (typeof message.seq === 'number' && message.type !== 'connection_established') {
+    // Duplikate (z.B. beim Resume) ignorieren
+    if (journal.lastSeq !== null && message.seq <= journal.lastSeq &&
+        message.type !== 'services_snapshot' && message.type !== 'resync_required') {
+      return
+    }
+    journal.lastSeq = message.seq
+  }
+
   switch (message.type) {
+    case 'connection_established':
+      // Neue Epoche (erster Connect oder Beacon Neustart): ab hier zählen
+      if (message.epoch !== journal.epoch) {
+        journal.epoch = message.epoch ?? null
+        journal.lastSeq = message.seq ?? null
+      }
+      break
+
+    case 'services_snapshot':
+      // Lücke zu alt für das Journal - Beacon schickt alle Services
+      set({ services: message.data?.services ?? [] })
+      break
+
+    case 'resync_required':
+      get().fetchServices()
+      break
+
     case 'service_registered':
       if (message.data) {
+        // Registrierung ist idempotent - bekannte Services ersetzen statt duplizieren
         set((state: any) => ({
-          services: [...state.services, message.data]
+          services: state.services.some((service: Service) => service.service_id === message.data.service_id)
+            ? state.services.map((service: Service) =>
+                service.service_id === message.data.service_id ? message.data : service
+              )
+            : [...state.services, message.data]
         }))
       }
       break
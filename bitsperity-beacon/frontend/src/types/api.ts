@@ -25,6 +25,8 @@ export interface WebSocketMessage {
   timestamp?: number
   message?: string
   client_id?: string
+  seq?: number
+  epoch?: string
 }
 
 export interface ServiceDiscoveryFilter {
@@ -0,0 +1,144 @@
+"""
+bitsperity-mqtt-mcp - Message Ring Buffer
+Always-on Capture pro Session
+
+Der Session Client abonniert ein Capture Pattern (z.B. "#") und legt jede
+Message in einen begrenzten Ring Buffer mit Index pro Topic. Tools fragen
+"Messages auf sensor/+/temp der letzten N Sekunden" direkt aus dem Speicher
+ab und sammeln nur live, wenn der Buffer das Fenster nicht abdeckt.
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional
+
+import aiomqtt
+
+from topic_trie import pattern_covers, topic_matches
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_BUFFER_MAX_BYTES = 16 * 1024 * 1024
+
+
+class BufferedMessage(NamedTuple):
+    seq: int
+    received_at: float
+    topic: str
+    message: aiomqtt.Message
+
+
+class MessageRingBuffer:
+    """
+    Begrenzter Ring Buffer der zuletzt empfangenen Messages
+
+    - Älteste Messages fallen heraus (``max_messages`` / ``max_bytes``)
+    - Index pro Topic: Abfragen lesen nur passende Topics, von neu nach alt
+    - Abdeckung: Ein Fenster gilt nur als abgedeckt, wenn die Capture
+      seitdem ohne Verbindungsabbruch lief und nichts daraus verdrängt wurde
+    """
+
+    def __init__(self, pattern: str = '#', max_messages: int = DEFAULT_BUFFER_SIZE,
+                 max_bytes: int = DEFAULT_BUFFER_MAX_BYTES):
+        self.pattern = pattern
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+
+        self._entries: Deque[BufferedMessage] = deque()
+        self._by_topic: Dict[str, Deque[BufferedMessage]] = {}
+        self._seq = 0
+        self._bytes = 0
+
+        # Capture lückenlos seit (None = nicht verbunden/abonniert)
+        self.covered_since: Optional[float] = None
+        # received_at der zuletzt verdrängten Message
+        self.evicted_until = 0.0
+
+        self.messages_received = 0
+        self.messages_evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def matches(self, topic: str) -> bool:
+        return topic_matches(topic, self.pattern)
+
+    def mark_covered(self, since: Optional[float] = None):
+        """Capture ist (wieder) abonniert - ab jetzt lückenlos"""
+        self.covered_since = time.time() if since is None else since
+
+    def mark_gap(self):
+        """Verbindung verloren - bisherige Fenster gelten nicht mehr als vollständig"""
+        self.covered_since = None
+
+    def append(self, message: aiomqtt.Message, received_at: Optional[float] = None):
+        topic = message.topic.value
+        self._seq += 1
+        entry = BufferedMessage(self._seq, time.time() if received_at is None else received_at, topic, message)
+
+        self._entries.append(entry)
+        topic_entries = self._by_topic.get(topic)
+        if topic_entries is None:
+            topic_entries = self._by_topic[topic] = deque()
+        topic_entries.append(entry)
+        self._bytes += len(message.payload or b'')
+        self.messages_received += 1
+
+        while self._entries and (len(self._entries) > self.max_messages or self._bytes > self.max_bytes):
+            self._evict()
+
+    def _evict(self):
+        oldest = self._entries.popleft()
+        topic_entries = self._by_topic[oldest.topic]
+        topic_entries.popleft()
+        if not topic_entries:
+            del self._by_topic[oldest.topic]
+        self._bytes -= len(oldest.message.payload or b'')
+        self.evicted_until = oldest.received_at
+        self.messages_evicted += 1
+
+    def covers(self, patterns: Iterable[str], window_seconds: float) -> bool:
+        """Liefert der Buffer alle Messages der Patterns aus den letzten ``window_seconds``?"""
+        if self.covered_since is None:
+            return False
+
+        cutoff = time.time() - window_seconds
+        if self.covered_since > cutoff or self.evicted_until >= cutoff:
+            return False
+
+        return all(pattern_covers(self.pattern, pattern) for pattern in patterns)
+
+    def topics(self, patterns: Iterable[str]) -> List[str]:
+        """Topics mit Messages im Buffer, die zu einem der Patterns passen"""
+        patterns = list(patterns)
+        return [topic for topic in self._by_topic if any(topic_matches(topic, p) for p in patterns)]
+
+    def query(self, patterns: Iterable[str], window_seconds: float,
+              limit: Optional[int] = None) -> List[BufferedMessage]:
+        """Messages der letzten ``window_seconds`` (älteste zuerst, max. die neuesten ``limit``)"""
+        cutoff = time.time() - window_seconds
+        selected: List[BufferedMessage] = []
+
+        for topic in self.topics(patterns):
+            for entry in reversed(self._by_topic[topic]):
+                if entry.received_at < cutoff:
+                    break
+                selected.append(entry)
+
+        selected.sort(key=lambda entry: entry.seq)
+        if limit is not None and len(selected) > limit:
+            selected = selected[-limit:]
+        return selected
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'pattern': self.pattern,
+            'buffered_messages': len(self._entries),
+            'buffered_bytes': self._bytes,
+            'max_messages': self.max_messages,
+            'topics': len(self._by_topic),
+            'messages_received': self.messages_received,
+            'messages_evicted': self.messages_evicted,
+            'covered_seconds': round(now - max(self.covered_since, self.evicted_until), 1)
+            if self.covered_since is not None else 0
+        }
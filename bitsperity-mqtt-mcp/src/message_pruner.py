@@ -7,16 +7,29 @@ Reduces large message collections (500) to manageable sizes (50)
 while preserving important data.
 """
 
+import bisect
+import hashlib
 import logging
-import json
+import math
+import random
 import re
-from typing import Dict, Any, List, Set, Optional
+from typing import Callable, Dict, Any, Iterable, List, NamedTuple, Set, Optional
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from payload_decoder import STRUCTURED_TYPES, get_decoded
+from topic_trie import topic_matches
 
 logger = logging.getLogger(__name__)
 
 
+class MessageFeatures(NamedTuple):
+    """Einmal pro Message berechnete Pruning Features"""
+    is_error: bool
+    pattern: tuple  # (Topic Tiefe, Payload Größenklasse)
+    signature: int  # Hash aus Topic, Payload Anfang und Timestamp
+
+
 class SimpleMessagePruner:
     """
     Simple but effective message pruning strategies
@@ -45,7 +58,9 @@ class SimpleMessagePruner:
             r'disconnected', r'timeout', r'rejected', r'denied'
         ]
         
-        self.error_regex = re.compile('|'.join(self.error_patterns), re.IGNORECASE)
+        # Auf lowercase Text: case-sensitive Regex ist deutlich schneller als IGNORECASE
+        self._error_search = re.compile('|'.join(self.error_patterns)).search
+        self._topic_error_search = re.compile('error|warning|alarm|alert|fault').search
         
         logger.info(f"MessagePruner initialized with target_count={target_count}")
     
@@ -53,6 +68,9 @@ class SimpleMessagePruner:
         """
         Prune message collection using simple rules
         
+        Features (error flag, pattern, signature) werden einmal pro Message
+        berechnet, die Auswahl arbeitet danach nur noch auf Indizes.
+        
         Args:
             messages: List of message dictionaries
             target_count: Override default target count
@@ -76,175 +94,152 @@ class SimpleMessagePruner:
         
         logger.info(f"Pruning {len(messages)} messages to {target} messages")
         
-        # Step 1: Extract error/warning messages (always keep)
-        error_messages = self._extract_error_messages(messages)
-        non_error_messages = [msg for msg in messages if not self._is_error_message(msg)]
+        # Single pass: Features pro Message
+        features = [self._extract_features(msg) for msg in messages]
+        
+        # Step 1: Split error/warning messages (always keep) from the rest
+        error_indexes = [index for index, feature in enumerate(features) if feature.is_error]
+        non_error_indexes = [index for index, feature in enumerate(features) if not feature.is_error]
+        logger.debug(f"Found {len(error_indexes)} error/warning messages")
         
         # Step 2: Get temporal boundaries (first/last messages)
-        boundary_count = min(10, len(non_error_messages) // 4)  # Adaptive boundary size
-        first_messages = non_error_messages[:boundary_count]
-        last_messages = non_error_messages[-boundary_count:] if len(non_error_messages) > boundary_count else []
-        middle_messages = non_error_messages[boundary_count:-boundary_count] if len(non_error_messages) > 2 * boundary_count else []
+        boundary_count = min(10, len(non_error_indexes) // 4)  # Adaptive boundary size
+        first_indexes = non_error_indexes[:boundary_count]
+        last_indexes = non_error_indexes[-boundary_count:] if len(non_error_indexes) > boundary_count else []
+        middle_indexes = non_error_indexes[boundary_count:-boundary_count] if len(non_error_indexes) > 2 * boundary_count else []
         
         # Step 3: Calculate remaining slots
-        used_slots = len(error_messages) + len(first_messages) + len(last_messages)
+        used_slots = len(error_indexes) + len(first_indexes) + len(last_indexes)
         remaining_slots = max(0, target - used_slots)
         
         # Step 4: Select distributed messages from middle
-        distributed_messages = self._distribute_messages(middle_messages, remaining_slots)
+        distributed_indexes = self._distribute_messages(middle_indexes, remaining_slots, features)
         
         # Step 5: Combine all selected messages
-        pruned_messages = self._combine_and_deduplicate([
-            error_messages,
-            first_messages, 
-            distributed_messages,
-            last_messages
-        ])
+        pruned_indexes = self._combine_and_deduplicate([
+            error_indexes,
+            first_indexes,
+            distributed_indexes,
+            last_indexes
+        ], features)
         
         # Step 6: Final size enforcement
-        if len(pruned_messages) > target:
+        if len(pruned_indexes) > target:
             # Prefer errors and boundaries, cut from distributed
-            keep_critical = error_messages + first_messages + last_messages
+            keep_critical = error_indexes + first_indexes + last_indexes
             remaining_target = target - len(keep_critical)
             if remaining_target > 0:
-                pruned_messages = keep_critical + distributed_messages[:remaining_target]
+                pruned_indexes = keep_critical + distributed_indexes[:remaining_target]
             else:
-                pruned_messages = keep_critical[:target]
+                pruned_indexes = keep_critical[:target]
+        
+        pruned_messages = [messages[index] for index in pruned_indexes]
+        error_count = sum(1 for index in pruned_indexes if features[index].is_error)
         
         logger.info(f"Pruning complete: {len(messages)} → {len(pruned_messages)} messages")
         
-        return self._create_pruning_result(messages, pruned_messages, start_time, "success")
+        return self._create_pruning_result(messages, pruned_messages, start_time, "success", error_count=error_count)
     
-    def _extract_error_messages(self, messages: List[Dict]) -> List[Dict]:
-        """Extract messages that appear to be errors or warnings"""
-        error_messages = []
+    def _extract_features(self, message: Dict) -> MessageFeatures:
+        """Kompakter Feature Record einer Message (einmal pro Message)"""
+        topic = message.get('topic', '')
+        decoded = getattr(message, 'decoded', None)
+        if decoded is not None:
+            payload = decoded.raw_text
+            payload_lower = decoded.search_text
+        else:
+            payload = str(message.get('payload', ''))
+            payload_lower = payload.lower()
+        
+        is_error = bool(self._topic_error_search(topic.lower()) or self._error_search(payload_lower))
         
-        for msg in messages:
-            if self._is_error_message(msg):
-                error_messages.append(msg)
+        # Simple pattern: topic structure + payload size category
+        payload_size = len(payload)
+        if payload_size < 50:
+            size_category = 'small'
+        elif payload_size < 200:
+            size_category = 'medium'
+        else:
+            size_category = 'large'
         
-        logger.debug(f"Found {len(error_messages)} error/warning messages")
-        return error_messages
+        return MessageFeatures(
+            is_error=is_error,
+            pattern=(topic.count('/') + 1, size_category),
+            signature=hash((topic, payload[:100], message.get('timestamp', '')))
+        )
     
     def _is_error_message(self, message: Dict) -> bool:
         """
         Simple error detection using pattern matching
         
-        Checks topic and payload for error indicators
+        Checks topic and payload for error indicators. JSON Felder wie
+        ``error``/``status``/``level`` brauchen kein eigenes Parsing, ihre Werte
+        stehen im Payload Text und werden von der Regex mit erfasst.
         """
-        # Check topic for error patterns
-        topic = message.get('topic', '').lower()
-        if any(pattern in topic for pattern in ['error', 'warning', 'alarm', 'alert', 'fault']):
+        if self._topic_error_search(message.get('topic', '').lower()):
             return True
-        
-        # Check payload for error patterns
-        payload = str(message.get('payload', '')).lower()
-        if self.error_regex.search(payload):
-            return True
-        
-        # Check for JSON error fields
-        try:
-            if isinstance(message.get('payload'), str):
-                payload_data = json.loads(message['payload'])
-                if isinstance(payload_data, dict):
-                    # Check for common error fields
-                    error_fields = ['error', 'warning', 'status', 'level', 'severity']
-                    for field in error_fields:
-                        if field in payload_data:
-                            value = str(payload_data[field]).lower()
-                            if any(pattern in value for pattern in ['error', 'warn', 'fail', 'critical']):
-                                return True
-        except (json.JSONDecodeError, TypeError):
-            pass
-        
-        return False
-    
-    def _distribute_messages(self, messages: List[Dict], count: int) -> List[Dict]:
+        decoded = getattr(message, 'decoded', None)
+        if decoded is not None:
+            return bool(self._error_search(decoded.search_text))
+        return bool(self._error_search(str(message.get('payload', '')).lower()))
+    
+    def _distribute_messages(self, indexes: List[int], count: int, features: List[MessageFeatures]) -> List[int]:
         """
         Distribute messages evenly over time/position
         
         Uses simple step-based distribution for even coverage
         """
-        if not messages or count <= 0:
+        if not indexes or count <= 0:
             return []
         
-        if count >= len(messages):
-            return messages
+        if count >= len(indexes):
+            return indexes
         
         # Simple step-based distribution
-        step = len(messages) / count
+        step = len(indexes) / count
         distributed = []
         
         for i in range(count):
-            index = int(i * step)
-            if index < len(messages):
-                distributed.append(messages[index])
+            position = int(i * step)
+            if position < len(indexes):
+                distributed.append(indexes[position])
         
         # Add unique pattern preference (prefer different payload sizes/structures)
         if len(distributed) < count:
-            # Add messages with unique characteristics
-            seen_patterns = set()
-            for msg in distributed:
-                pattern = self._get_message_pattern(msg)
-                seen_patterns.add(pattern)
+            chosen = set(distributed)
+            seen_patterns = {features[index].pattern for index in distributed}
             
-            for msg in messages:
+            for index in indexes:
                 if len(distributed) >= count:
                     break
-                pattern = self._get_message_pattern(msg)
-                if pattern not in seen_patterns and msg not in distributed:
-                    distributed.append(msg)
+                pattern = features[index].pattern
+                if pattern not in seen_patterns and index not in chosen:
+                    distributed.append(index)
+                    chosen.add(index)
                     seen_patterns.add(pattern)
         
-        logger.debug(f"Distributed {len(distributed)} messages from {len(messages)}")
+        logger.debug(f"Distributed {len(distributed)} messages from {len(indexes)}")
         return distributed
     
-    def _get_message_pattern(self, message: Dict) -> str:
-        """Get simple pattern signature for message"""
-        topic = message.get('topic', '')
-        payload = message.get('payload', '')
-        
-        # Simple pattern: topic structure + payload size category
-        topic_parts = len(topic.split('/'))
-        payload_size = len(str(payload))
-        
-        # Categorize payload size
-        if payload_size < 50:
-            size_category = 'small'
-        elif payload_size < 200:
-            size_category = 'medium'
-        else:
-            size_category = 'large'
-        
-        return f"{topic_parts}parts_{size_category}"
-    
-    def _combine_and_deduplicate(self, message_groups: List[List[Dict]]) -> List[Dict]:
+    def _combine_and_deduplicate(self, index_groups: List[List[int]], features: List[MessageFeatures]) -> List[int]:
         """
         Combine message groups and remove duplicates while preserving order
         """
-        seen_messages = set()
+        seen_signatures = set()
         combined = []
         
-        for group in message_groups:
-            for msg in group:
-                # Create simple message signature for deduplication
-                signature = self._get_message_signature(msg)
-                if signature not in seen_messages:
-                    seen_messages.add(signature)
-                    combined.append(msg)
+        for group in index_groups:
+            for index in group:
+                signature = features[index].signature
+                if signature not in seen_signatures:
+                    seen_signatures.add(signature)
+                    combined.append(index)
         
         return combined
     
-    def _get_message_signature(self, message: Dict) -> str:
-        """Create simple signature for message deduplication"""
-        topic = message.get('topic', '')
-        payload = str(message.get('payload', ''))[:100]  # First 100 chars
-        timestamp = message.get('timestamp', '')
-        
-        return f"{topic}:{hash(payload)}:{timestamp}"
-    
     def _create_pruning_result(self, original_messages: List[Dict], pruned_messages: List[Dict], 
-                              start_time: datetime, status: str) -> Dict[str, Any]:
+                              start_time: datetime, status: str,
+                              error_count: Optional[int] = None) -> Dict[str, Any]:
         """Create standardized pruning result"""
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
@@ -255,7 +250,8 @@ class SimpleMessagePruner:
         reduction_ratio = (1 - pruned_count / original_count) * 100 if original_count > 0 else 0
         
         # Calculate pruning statistics
-        error_count = len([msg for msg in pruned_messages if self._is_error_message(msg)])
+        if error_count is None:
+            error_count = sum(1 for msg in pruned_messages if self._is_error_message(msg))
         unique_topics = len(set(msg.get('topic', '') for msg in pruned_messages))
         
         return {
@@ -275,172 +271,531 @@ class SimpleMessagePruner:
         }
 
 
-class SchemaDetector:
+class StreamingMessageCollector:
     """
-    Simple schema detection for MQTT messages
+    Streaming Sampling während der Collection (konstanter Speicher)
+    
+    Statt alle Messages zu sammeln und danach zu prunen, wird jede Message
+    beim Eintreffen einsortiert:
+    1. Error/Warning Messages (die letzten ``max_errors``)
+    2. Erste und letzte ``boundary_count`` Messages
+    3. Reservoir Sample pro Topic (``per_topic_samples``, Algorithm R)
     
-    Detects basic patterns in message structures without complex AI
+    Optionale Early-Stop Bedingungen beenden die Collection vor dem Timeout:
+    Message Anzahl, Predicate auf den Message Record, alle erwarteten Topics gesehen.
     """
     
-    def __init__(self):
-        """Initialize schema detector"""
-        self.topic_schemas = defaultdict(list)
-        logger.info("SchemaDetector initialized")
+    def __init__(self, target_count: int = 50, boundary_count: int = 10, max_errors: int = 20,
+                 per_topic_samples: int = 10, max_topics: int = 1000,
+                 stop_after_messages: Optional[int] = None,
+                 stop_predicate: Optional[Callable[[Dict], bool]] = None,
+                 expected_topics: Optional[List[str]] = None,
+                 pruner: Optional[SimpleMessagePruner] = None,
+                 rng: Optional[random.Random] = None):
+        self.target_count = target_count
+        self.boundary_count = boundary_count
+        self.per_topic_samples = per_topic_samples
+        self.max_topics = max_topics
+        self.stop_after_messages = stop_after_messages
+        self.stop_predicate = stop_predicate
+        self.pruner = pruner or SimpleMessagePruner(target_count=target_count)
+        self.rng = rng or random.Random()
+        
+        # Erwartete Topics (auch Wildcard Patterns), noch nicht gesehen
+        self.expected_topics = list(expected_topics or [])
+        self._missing_topics = list(self.expected_topics)
+        
+        self.total_messages = 0
+        self.errors_seen = 0
+        self.topics_untracked = 0
+        self.stop_reason: Optional[str] = None
+        self.matched_message: Optional[Dict] = None
+        
+        # Einträge sind (seq, record), seq hält die zeitliche Reihenfolge
+        self._first: List[tuple] = []
+        self._last: deque = deque(maxlen=boundary_count)
+        self._errors: deque = deque(maxlen=max_errors)
+        # Topic -> Messages gesamt / [angebotene Messages, Samples]
+        self._topic_counts: Dict[str, int] = {}
+        self._reservoirs: Dict[str, List] = {}
+    
+    @property
+    def stopped(self) -> bool:
+        return self.stop_reason is not None
+    
+    @property
+    def missing_topics(self) -> List[str]:
+        return list(self._missing_topics)
     
-    def analyze_messages(self, messages: List[Dict]) -> Dict[str, Any]:
+    def add(self, message: Dict) -> bool:
         """
-        Analyze message collection for basic schema patterns
+        Message Record einsortieren
         
-        Args:
-            messages: List of message dictionaries
-            
         Returns:
-            Dict containing:
-            - topic_schemas: Schema patterns by topic
-            - payload_types: Distribution of payload types
-            - common_fields: Common JSON fields found
-            - schema_summary: High-level schema summary
+            True, sobald eine Early-Stop Bedingung erfüllt ist
         """
-        start_time = datetime.now()
+        if self.stopped:
+            return True
         
-        if not messages:
-            return self._create_schema_result({}, start_time, "empty_input")
+        seq = self.total_messages
+        entry = (seq, message)
+        self.total_messages += 1
+        topic = message.get('topic', '')
         
-        logger.info(f"Analyzing schema for {len(messages)} messages")
+        if len(self._first) < self.boundary_count:
+            self._first.append(entry)
+        self._last.append(entry)
         
-        # Group messages by topic pattern
-        topic_patterns = defaultdict(list)
-        payload_types = defaultdict(int)
-        json_fields = defaultdict(int)
+        if topic in self._topic_counts:
+            self._topic_counts[topic] += 1
+        elif len(self._topic_counts) < self.max_topics:
+            self._topic_counts[topic] = 1
+            self._reservoirs[topic] = [0, []]
+        else:
+            self.topics_untracked += 1
         
-        for message in messages:
-            topic = message.get('topic', '')
-            payload = message.get('payload', '')
-            
-            # Generalize topic to pattern
-            topic_pattern = self._generalize_topic(topic)
-            topic_patterns[topic_pattern].append(message)
-            
-            # Detect payload type
-            payload_type = self._detect_payload_type(payload)
-            payload_types[payload_type] += 1
-            
-            # Extract JSON fields if applicable
-            if payload_type == 'json':
-                fields = self._extract_json_fields(payload)
-                for field in fields:
-                    json_fields[field] += 1
+        if self.pruner._is_error_message(message):
+            self.errors_seen += 1
+            self._errors.append(entry)
+        elif topic in self._reservoirs:
+            self._sample(self._reservoirs[topic], entry)
         
-        # Analyze schema patterns per topic
-        topic_schemas = {}
-        for pattern, pattern_messages in topic_patterns.items():
-            topic_schemas[pattern] = self._analyze_topic_schema(pattern_messages)
+        if self._missing_topics:
+            self._missing_topics = [
+                pattern for pattern in self._missing_topics if not topic_matches(topic, pattern)
+            ]
+            if not self._missing_topics:
+                self.stop_reason = 'expected_topics'
         
-        # Create common fields summary
-        common_fields = dict(sorted(json_fields.items(), key=lambda x: x[1], reverse=True)[:20])
+        if self.stop_predicate is not None and self.stop_predicate(message):
+            self.matched_message = message
+            self.stop_reason = 'match'
         
-        logger.info(f"Schema analysis complete: {len(topic_schemas)} topic patterns found")
+        if self.stop_after_messages and self.total_messages >= self.stop_after_messages:
+            self.stop_reason = self.stop_reason or 'message_count'
         
-        return self._create_schema_result({
-            'topic_schemas': dict(topic_schemas),
-            'payload_types': dict(payload_types),
-            'common_fields': common_fields,
-            'schema_summary': {
-                'total_topics': len(topic_patterns),
-                'total_messages': len(messages),
-                'dominant_payload_type': max(payload_types.items(), key=lambda x: x[1])[0] if payload_types else 'unknown'
+        return self.stopped
+    
+    def _sample(self, reservoir: List, entry: tuple):
+        """Reservoir Sampling pro Topic (Algorithm R)"""
+        reservoir[0] += 1
+        samples = reservoir[1]
+        if len(samples) < self.per_topic_samples:
+            samples.append(entry)
+        else:
+            index = self.rng.randrange(reservoir[0])
+            if index < self.per_topic_samples:
+                samples[index] = entry
+    
+    def get_messages(self) -> List[Dict]:
+        """
+        Auswahl von max. ``target_count`` Messages in zeitlicher Reihenfolge
+        
+        Priorität: Match > Errors > erste/letzte Messages > Topic Samples
+        (reihum über alle Topics, damit jedes Topic vertreten ist)
+        """
+        selected: Dict[int, Dict] = {}
+        
+        def take(entries):
+            for seq, record in entries:
+                if len(selected) >= self.target_count:
+                    return
+                selected.setdefault(seq, record)
+        
+        if self.matched_message is not None:
+            take([(self.total_messages - 1, self.matched_message)])
+        take(reversed(self._errors))
+        take(self._first)
+        take(reversed(self._last))
+        
+        reservoirs = [sorted(samples, key=lambda item: item[0]) for _, samples in self._reservoirs.values()]
+        for round_index in range(self.per_topic_samples):
+            take(samples[round_index] for samples in reservoirs if round_index < len(samples))
+        
+        return [selected[seq] for seq in sorted(selected)]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'strategy': 'streaming_reservoir',
+            'target_count': self.target_count,
+            'total_messages': self.total_messages,
+            'unique_topics': len(self._topic_counts),
+            'error_messages_seen': self.errors_seen,
+            'error_messages_preserved': len(self._errors),
+            'per_topic_samples': self.per_topic_samples,
+            'topics_untracked': self.topics_untracked,
+            'stop_reason': self.stop_reason or 'timeout'
+        }
+
+
+# Speicherbudget der Schema Inference
+SCHEMA_MAX_PATTERNS = 100
+SCHEMA_MAX_FIELDS = 200
+SCHEMA_MAX_DEPTH = 8
+SCHEMA_MAX_ARRAY_ITEMS = 20
+# K Minimum Values Sketch für die String Kardinalität
+CARDINALITY_SKETCH_SIZE = 64
+
+
+def generalize_topic(topic: str) -> str:
+    """Generalize topic to pattern (replace variable parts with placeholders)"""
+    if not topic:
+        return "empty"
+    
+    generalized_parts = []
+    for part in topic.split('/'):
+        # Simple heuristics for variable parts
+        if (part.isdigit() or 
+            len(part) > 10 or 
+            any(char in part for char in ['_', '-']) and len(part) > 6):
+            generalized_parts.append('+')  # Variable part
+        else:
+            generalized_parts.append(part)
+    
+    return '/'.join(generalized_parts)
+
+
+def _value_type(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, dict):
+        return 'object'
+    if isinstance(value, list):
+        return 'array'
+    return type(value).__name__
+
+
+class FieldStats:
+    """
+    Statistik eines Feld Pfads (mergeable)
+    
+    Typ Verteilung, numerisch min/max/mean/variance (Welford) und für
+    Strings eine Kardinalitäts Schätzung (K Minimum Values Sketch).
+    """
+    
+    __slots__ = ('count', 'types', 'numeric_count', 'mean', 'm2', 'min', 'max', 'string_hashes', 'examples')
+    
+    def __init__(self):
+        self.count = 0
+        self.types: Dict[str, int] = {}
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.string_hashes: List[int] = []
+        self.examples: List[str] = []
+    
+    def add(self, value: Any, value_type: str):
+        self.count += 1
+        self.types[value_type] = self.types.get(value_type, 0) + 1
+        
+        if value_type in ('integer', 'number'):
+            self.numeric_count += 1
+            delta = value - self.mean
+            self.mean += delta / self.numeric_count
+            self.m2 += delta * (value - self.mean)
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+        elif value_type == 'string':
+            self._add_string_hash(int.from_bytes(
+                hashlib.blake2b(value.encode('utf-8', 'replace'), digest_size=8).digest(), 'big'
+            ))
+            if len(self.examples) < 3 and value not in self.examples:
+                self.examples.append(value[:50])
+    
+    def _add_string_hash(self, value_hash: int):
+        hashes = self.string_hashes
+        if len(hashes) >= CARDINALITY_SKETCH_SIZE and value_hash >= hashes[-1]:
+            return
+        position = bisect.bisect_left(hashes, value_hash)
+        if position < len(hashes) and hashes[position] == value_hash:
+            return
+        hashes.insert(position, value_hash)
+        if len(hashes) > CARDINALITY_SKETCH_SIZE:
+            hashes.pop()
+    
+    def merge(self, other: 'FieldStats'):
+        self.count += other.count
+        for value_type, count in other.types.items():
+            self.types[value_type] = self.types.get(value_type, 0) + count
+        
+        if other.numeric_count:
+            total = self.numeric_count + other.numeric_count
+            delta = other.mean - self.mean
+            self.mean += delta * other.numeric_count / total
+            self.m2 += other.m2 + delta * delta * self.numeric_count * other.numeric_count / total
+            self.numeric_count = total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        
+        for value_hash in other.string_hashes:
+            self._add_string_hash(value_hash)
+        for example in other.examples:
+            if len(self.examples) < 3 and example not in self.examples:
+                self.examples.append(example)
+    
+    def distinct_estimate(self) -> int:
+        hashes = self.string_hashes
+        if len(hashes) < CARDINALITY_SKETCH_SIZE:
+            return len(hashes)
+        return int((CARDINALITY_SKETCH_SIZE - 1) * 2 ** 64 / (hashes[-1] + 1))
+    
+    def to_dict(self, parent_count: int) -> Dict[str, Any]:
+        result = {
+            'count': self.count,
+            'presence': round(self.count / parent_count, 3) if parent_count else 0,
+            'types': dict(self.types)
+        }
+        if self.numeric_count:
+            variance = self.m2 / self.numeric_count
+            result['numeric'] = {
+                'min': self.min,
+                'max': self.max,
+                'mean': round(self.mean, 4),
+                'variance': round(variance, 4),
+                'stddev': round(math.sqrt(variance), 4)
+            }
+        if self.string_hashes:
+            result['string'] = {
+                'distinct_estimate': self.distinct_estimate(),
+                'examples': list(self.examples)
             }
-        }, start_time, "success")
-    
-    def _generalize_topic(self, topic: str) -> str:
-        """Generalize topic to pattern (replace variable parts with placeholders)"""
-        if not topic:
-            return "empty"
-        
-        parts = topic.split('/')
-        generalized_parts = []
-        
-        for part in parts:
-            # Simple heuristics for variable parts
-            if (part.isdigit() or 
-                len(part) > 10 or 
-                any(char in part for char in ['_', '-']) and len(part) > 6):
-                generalized_parts.append('+')  # Variable part
+        return result
+
+
+class TopicSchemaState:
+    """Schema Zustand eines Topic Patterns (inkrementell, mergeable)"""
+    
+    def __init__(self, max_fields: int = SCHEMA_MAX_FIELDS):
+        self.max_fields = max_fields
+        self.message_count = 0
+        self.structured_count = 0
+        self.payload_types: Dict[str, int] = {}
+        self.fields: Dict[str, FieldStats] = {}
+        self.fields_dropped = 0
+        self.sample_payloads: List[str] = []
+    
+    def add(self, payload: Any, payload_type: str, data: Any) -> bool:
+        """Message aufnehmen; True wenn neue Struktur (Typ/Feld) gesehen wurde"""
+        self.message_count += 1
+        changed = payload_type not in self.payload_types
+        self.payload_types[payload_type] = self.payload_types.get(payload_type, 0) + 1
+        
+        if payload_type in STRUCTURED_TYPES:
+            self.structured_count += 1
+            changed = self._walk(data, '', 0) or changed
+        
+        # Keep sample payloads (limited size)
+        if len(self.sample_payloads) < 3:
+            sample_payload = str(payload)[:100]  # First 100 chars
+            if sample_payload not in self.sample_payloads:
+                self.sample_payloads.append(sample_payload)
+        
+        return changed
+    
+    def _walk(self, value: Any, path: str, depth: int) -> bool:
+        changed = False
+        if isinstance(value, dict):
+            for key, child in value.items():
+                changed = self._record(f"{path}.{key}" if path else str(key), child, depth) or changed
+        elif isinstance(value, list):
+            for child in value[:SCHEMA_MAX_ARRAY_ITEMS]:
+                changed = self._record(f"{path}[]", child, depth) or changed
+        return changed
+    
+    def _record(self, path: str, value: Any, depth: int) -> bool:
+        stats = self.fields.get(path)
+        changed = False
+        if stats is None:
+            if len(self.fields) >= self.max_fields:
+                self.fields_dropped += 1
+                return False
+            stats = self.fields[path] = FieldStats()
+            changed = True
+        
+        value_type = _value_type(value)
+        changed = changed or value_type not in stats.types
+        stats.add(value, value_type)
+        
+        if value_type in ('object', 'array') and depth + 1 < SCHEMA_MAX_DEPTH:
+            changed = self._walk(value, path, depth + 1) or changed
+        return changed
+    
+    def merge(self, other: 'TopicSchemaState'):
+        self.message_count += other.message_count
+        self.structured_count += other.structured_count
+        self.fields_dropped += other.fields_dropped
+        for payload_type, count in other.payload_types.items():
+            self.payload_types[payload_type] = self.payload_types.get(payload_type, 0) + count
+        for path, stats in other.fields.items():
+            if path in self.fields:
+                self.fields[path].merge(stats)
+            elif len(self.fields) < self.max_fields:
+                self.fields[path] = FieldStats()
+                self.fields[path].merge(stats)
             else:
-                generalized_parts.append(part)
-        
-        return '/'.join(generalized_parts)
-    
-    def _detect_payload_type(self, payload: Any) -> str:
-        """Detect payload type using simple rules"""
-        if not payload:
-            return 'empty'
-        
-        payload_str = str(payload).strip()
-        
-        # JSON detection
-        if payload_str.startswith(('{', '[')):
-            try:
-                json.loads(payload_str)
-                return 'json'
-            except json.JSONDecodeError:
-                pass
-        
-        # Number detection
-        try:
-            float(payload_str)
-            return 'number'
-        except ValueError:
-            pass
-        
-        # Binary detection (simple heuristic)
-        if isinstance(payload, bytes) or 'binary data' in payload_str.lower():
-            return 'binary'
-        
-        # Default to text
-        return 'text'
-    
-    def _extract_json_fields(self, payload: Any) -> List[str]:
-        """Extract field names from JSON payload"""
-        try:
-            data = json.loads(str(payload))
-            if isinstance(data, dict):
-                return list(data.keys())
-        except (json.JSONDecodeError, TypeError):
-            pass
-        return []
-    
-    def _analyze_topic_schema(self, messages: List[Dict]) -> Dict[str, Any]:
-        """Analyze schema for specific topic pattern"""
-        if not messages:
-            return {}
-        
+                self.fields_dropped += 1
+        for sample_payload in other.sample_payloads:
+            if len(self.sample_payloads) < 3 and sample_payload not in self.sample_payloads:
+                self.sample_payloads.append(sample_payload)
+    
+    def top_level_fields(self) -> Dict[str, int]:
+        return {
+            path: stats.count for path, stats in self.fields.items()
+            if '.' not in path and not path.endswith('[]')
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        common_fields = sorted(self.top_level_fields().items(), key=lambda x: x[1], reverse=True)[:10]
+        return {
+            'message_count': self.message_count,
+            'payload_types': dict(self.payload_types),
+            'common_fields': dict(common_fields),
+            'fields': {
+                path: self.fields[path].to_dict(self.structured_count) for path in sorted(self.fields)
+            },
+            'fields_dropped': self.fields_dropped,
+            'sample_payloads': list(self.sample_payloads)
+        }
+
+
+class SchemaAccumulator:
+    """
+    Inkrementelle Schema Inference über alle Topic Patterns
+    
+    Messages werden einzeln aufgenommen (``add``), Zustände aus mehreren
+    Batches lassen sich zusammenführen (``merge``). Der Speicher ist durch
+    ``max_patterns``/``max_fields`` begrenzt, nicht durch die Anzahl Messages.
+    """
+    
+    def __init__(self, max_patterns: int = SCHEMA_MAX_PATTERNS, max_fields: int = SCHEMA_MAX_FIELDS):
+        self.max_patterns = max_patterns
+        self.max_fields = max_fields
+        self.patterns: Dict[str, TopicSchemaState] = {}
+        self.message_count = 0
+        self.messages_dropped = 0
+        # Messages seit der letzten neuen Struktur (Stabilität des Schemas)
+        self.messages_since_change = 0
+    
+    def add(self, message: Dict) -> bool:
+        """Message aufnehmen; True wenn sich das Schema dadurch geändert hat"""
+        self.message_count += 1
+        topic_pattern = generalize_topic(message.get('topic', ''))
+        
+        state = self.patterns.get(topic_pattern)
+        changed = False
+        if state is None:
+            if len(self.patterns) >= self.max_patterns:
+                self.messages_dropped += 1
+                self.messages_since_change += 1
+                return False
+            state = self.patterns[topic_pattern] = TopicSchemaState(self.max_fields)
+            changed = True
+        
+        # Decode-once: MessageRecords bringen den dekodierten Payload mit
+        decoded = get_decoded(message)
+        changed = state.add(message.get('payload', ''), decoded.payload_type, decoded.value) or changed
+        
+        self.messages_since_change = 0 if changed else self.messages_since_change + 1
+        return changed
+    
+    def merge(self, other: 'SchemaAccumulator') -> 'SchemaAccumulator':
+        self.message_count += other.message_count
+        self.messages_dropped += other.messages_dropped
+        for topic_pattern, state in other.patterns.items():
+            if topic_pattern in self.patterns:
+                self.patterns[topic_pattern].merge(state)
+            elif len(self.patterns) < self.max_patterns:
+                self.patterns[topic_pattern] = TopicSchemaState(self.max_fields)
+                self.patterns[topic_pattern].merge(state)
+            else:
+                self.messages_dropped += state.message_count
+        return self
+    
+    def is_stable(self, min_messages: int) -> bool:
+        """Kein neues Pattern/Feld/Typ in den letzten ``min_messages`` Messages"""
+        return self.message_count >= min_messages and self.messages_since_change >= min_messages
+    
+    def to_dict(self) -> Dict[str, Any]:
         payload_types = defaultdict(int)
         json_fields = defaultdict(int)
-        sample_payloads = []
+        for state in self.patterns.values():
+            for payload_type, count in state.payload_types.items():
+                payload_types[payload_type] += count
+            for field, count in state.top_level_fields().items():
+                json_fields[field] += count
         
-        for message in messages[:10]:  # Analyze first 10 messages
-            payload = message.get('payload', '')
-            payload_type = self._detect_payload_type(payload)
-            payload_types[payload_type] += 1
-            
-            if payload_type == 'json':
-                fields = self._extract_json_fields(payload)
-                for field in fields:
-                    json_fields[field] += 1
-            
-            # Keep sample payloads (limited size)
-            if len(sample_payloads) < 3:
-                sample_payload = str(payload)[:100]  # First 100 chars
-                if sample_payload not in sample_payloads:
-                    sample_payloads.append(sample_payload)
+        # Create common fields summary
+        common_fields = dict(sorted(json_fields.items(), key=lambda x: x[1], reverse=True)[:20])
         
         return {
-            'message_count': len(messages),
+            'topic_schemas': {pattern: state.to_dict() for pattern, state in self.patterns.items()},
             'payload_types': dict(payload_types),
-            'common_fields': dict(sorted(json_fields.items(), key=lambda x: x[1], reverse=True)[:10]),
-            'sample_payloads': sample_payloads
+            'common_fields': common_fields,
+            'schema_summary': {
+                'total_topics': len(self.patterns),
+                'total_messages': self.message_count,
+                'messages_dropped': self.messages_dropped,
+                'dominant_payload_type': max(payload_types.items(), key=lambda x: x[1])[0] if payload_types else 'unknown'
+            }
         }
+
+
+class SchemaDetector:
+    """
+    Simple schema detection for MQTT messages
+    
+    Detects basic patterns in message structures without complex AI.
+    Die Analyse läuft über einen SchemaAccumulator, Messages werden also
+    einzeln und mit konstantem Speicher verarbeitet.
+    """
+    
+    def __init__(self):
+        """Initialize schema detector"""
+        logger.info("SchemaDetector initialized")
+    
+    def create_accumulator(self) -> SchemaAccumulator:
+        return SchemaAccumulator()
+    
+    def analyze_messages(self, messages: Iterable[Dict]) -> Dict[str, Any]:
+        """
+        Analyze message collection for basic schema patterns
+        
+        Args:
+            messages: Messages (list or any iterable of message dictionaries)
+            
+        Returns:
+            Dict containing:
+            - topic_schemas: Schema patterns by topic (incl. nested field statistics)
+            - payload_types: Distribution of payload types
+            - common_fields: Common JSON fields found
+            - schema_summary: High-level schema summary
+        """
+        start_time = datetime.now()
+        
+        accumulator = self.create_accumulator()
+        for message in messages:
+            accumulator.add(message)
+        
+        if not accumulator.message_count:
+            return self._create_schema_result({}, start_time, "empty_input")
+        
+        return self.summarize(accumulator, start_time)
+    
+    def summarize(self, accumulator: SchemaAccumulator, start_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Schema Ergebnis aus einem (ggf. gemergten) Accumulator"""
+        logger.info(f"Schema analysis complete: {len(accumulator.patterns)} topic patterns found "
+                    f"in {accumulator.message_count} messages")
+        return self._create_schema_result(accumulator.to_dict(), start_time or datetime.now(), "success")
     
     def _create_schema_result(self, schema_data: Dict, start_time: datetime, status: str) -> Dict[str, Any]:
         """Create standardized schema analysis result"""
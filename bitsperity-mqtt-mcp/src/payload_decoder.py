@@ -0,0 +1,268 @@
+"""
+bitsperity-mqtt-mcp - Payload Decoder
+Decode-once Pipeline für MQTT Payloads
+
+Jede Message wird genau einmal dekodiert (UTF-8, JSON, Zahl, CBOR,
+MessagePack, Hex/Base64). Das Ergebnis hängt als ``decoded`` am
+MessageRecord; Pruner, Collector und Schema Inference verwenden es
+weiter, statt den Payload erneut zu parsen.
+
+orjson, msgpack und cbor2 sind optional - ohne sie wird die stdlib
+``json`` verwendet bzw. das Binärformat nicht erkannt.
+"""
+
+import base64
+import binascii
+import datetime
+import io
+import json
+import re
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+# Payload Typen mit strukturiertem Wert (dict/list)
+STRUCTURED_TYPES = ('json', 'cbor', 'msgpack')
+
+_NUMBER_START = frozenset('0123456789+-.')
+_HEX_RE = re.compile(r'[0-9a-fA-F]+')
+_BASE64_RE = re.compile(r'[A-Za-z0-9+/]+={0,2}')
+_MIN_ENCODED_LENGTH = 16
+
+
+def loads_json(data):
+    """JSON parsen (orjson falls verfügbar, stdlib für NaN/große Integer)"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+class DecodedPayload:
+    """
+    Einmal dekodierter Payload
+
+    - payload_type: json, number, text, hex, base64, cbor, msgpack, binary, empty
+    - value: Geparster Wert (dict/list, float, str) oder None
+    - text: UTF-8 Text des Payloads (None bei Binärdaten)
+    - size: Payload Größe in Bytes
+    """
+
+    __slots__ = ('payload_type', 'value', 'text', 'size', '_search_text')
+
+    def __init__(self, payload_type: str, value: Any, text: Optional[str], size: int):
+        self.payload_type = payload_type
+        self.value = value
+        self.text = text
+        self.size = size
+        self._search_text: Optional[str] = None
+
+    @property
+    def is_structured(self) -> bool:
+        return self.payload_type in STRUCTURED_TYPES
+
+    @property
+    def raw_text(self) -> str:
+        """Text des Payloads bzw. Platzhalter für Binärdaten"""
+        if self.text is not None:
+            return self.text
+        return f"<binary data: {self.size} bytes>"
+
+    @property
+    def display(self) -> Any:
+        """Wert für das ``payload`` Feld der Tool Ergebnisse"""
+        if self.is_structured:
+            return self.value
+        return self.raw_text
+
+    @property
+    def search_text(self) -> str:
+        """Lowercase Text für Error Pattern Matching (gecacht)"""
+        if self._search_text is None:
+            text = self.text if self.text is not None else str(self.display)
+            self._search_text = text.lower()
+        return self._search_text
+
+
+def _decode_text(text: str, size: int) -> DecodedPayload:
+    stripped = text.strip()
+    if not stripped:
+        return DecodedPayload('empty', None, text, size)
+
+    first = stripped[0]
+    if first in '{[':
+        try:
+            return DecodedPayload('json', loads_json(stripped), text, size)
+        except ValueError:
+            pass
+    elif first in _NUMBER_START:
+        try:
+            return DecodedPayload('number', float(stripped), text, size)
+        except ValueError:
+            pass
+
+    if stripped.startswith('<binary data'):
+        return DecodedPayload('binary', None, text, size)
+
+    if len(stripped) >= _MIN_ENCODED_LENGTH:
+        if len(stripped) % 2 == 0 and _HEX_RE.fullmatch(stripped):
+            return DecodedPayload('hex', stripped, text, size)
+        if len(stripped) % 4 == 0 and _BASE64_RE.fullmatch(stripped) and _looks_like_base64(stripped):
+            return DecodedPayload('base64', stripped, text, size)
+
+    return DecodedPayload('text', text, text, size)
+
+
+def _looks_like_base64(text: str) -> bool:
+    """Base64 statt Wort: gemischte Groß-/Kleinschreibung und Ziffern bzw. Padding"""
+    if not (any(char.isdigit() for char in text) or text.endswith('=')):
+        return False
+    try:
+        base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    return True
+
+
+def _json_safe(value: Any) -> Any:
+    """
+    Binärformat Werte JSON serialisierbar machen
+
+    MessagePack/CBOR liefern bytes, Integer/bytes Map Keys, datetime und
+    weitere Typen, die ``json.dumps`` ablehnt: bytes -> Base64, Keys -> str,
+    datetime -> ISO Format, alles andere Unbekannte -> str.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {_json_safe_key(key): _json_safe(entry) for key, entry in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(entry) for entry in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_safe_key(key: Any) -> str:
+    if isinstance(key, str):
+        return key
+    if isinstance(key, (bytes, bytearray)):
+        try:
+            return bytes(key).decode('utf-8')
+        except UnicodeDecodeError:
+            return base64.b64encode(bytes(key)).decode('ascii')
+    return str(_json_safe(key))
+
+
+def _decode_msgpack(data: bytes) -> Any:
+    if msgpack is None:
+        return None
+    try:
+        value = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except Exception:
+        return None
+    return _json_safe(value) if isinstance(value, (dict, list)) else None
+
+
+def _decode_cbor(data: bytes) -> Any:
+    if cbor2 is None:
+        return None
+    try:
+        stream = io.BytesIO(data)
+        value = cbor2.CBORDecoder(stream).decode()
+    except Exception:
+        return None
+    if stream.tell() != len(data):
+        return None
+    if isinstance(value, cbor2.CBORTag):
+        value = value.value
+    return _json_safe(value) if isinstance(value, (dict, list)) else None
+
+
+def _decode_binary(data: bytes) -> DecodedPayload:
+    size = len(data)
+    first = data[0]
+
+    # Container Header: MessagePack fixmap/fixarray/map16/32/array16/32,
+    # CBOR major type 4/5 (Array/Map) und self-describe Tag 0xd9d9f7
+    is_msgpack_header = 0x80 <= first <= 0x9f or 0xdc <= first <= 0xdf
+    is_cbor_header = 0x80 <= first <= 0xbf or first == 0xd9
+    decoders = [('msgpack', _decode_msgpack), ('cbor', _decode_cbor)]
+    if is_cbor_header and not 0x80 <= first <= 0x9f:
+        decoders.reverse()
+
+    if is_msgpack_header or is_cbor_header:
+        for payload_type, decoder in decoders:
+            value = decoder(data)
+            if value is not None:
+                return DecodedPayload(payload_type, value, None, size)
+
+    return DecodedPayload('binary', None, None, size)
+
+
+def decode_payload(payload: Any) -> DecodedPayload:
+    """
+    Payload einmal dekodieren
+
+    Akzeptiert rohe MQTT Payloads (bytes/bytearray/str/int/float/None) und
+    bereits dekodierte Werte (dict/list aus einem Message Record).
+    """
+    if payload is None:
+        return DecodedPayload('empty', None, '', 0)
+    if isinstance(payload, (dict, list)):
+        return DecodedPayload('json', payload, None, 0)
+    if isinstance(payload, (int, float)) and not isinstance(payload, bool):
+        text = str(payload)
+        return DecodedPayload('number', float(payload), text, len(text))
+    if isinstance(payload, str):
+        return _decode_text(payload, len(payload))
+
+    data = bytes(payload)
+    if not data:
+        return DecodedPayload('empty', None, '', 0)
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return _decode_binary(data)
+    return _decode_text(text, len(data))
+
+
+class MessageRecord(dict):
+    """
+    Message Record der Tool Ergebnisse
+
+    Ein normales dict (JSON serialisierbar, ``record['topic']``) mit dem
+    dekodierten Payload als Slot Attribut ``decoded`` - nicht Teil der
+    serialisierten Daten.
+    """
+
+    __slots__ = ('decoded',)
+
+    def __init__(self, data: Dict[str, Any], decoded: DecodedPayload):
+        super().__init__(data)
+        self.decoded = decoded
+
+
+def get_decoded(message: Dict[str, Any]) -> DecodedPayload:
+    """Dekodierten Payload eines Records (gecacht oder einmalig dekodiert)"""
+    decoded = getattr(message, 'decoded', None)
+    if decoded is None:
+        decoded = decode_payload(message.get('payload', ''))
+    return decoded
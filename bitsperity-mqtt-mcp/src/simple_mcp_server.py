@@ -15,7 +15,11 @@ import sys
 import json
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+import reprlib
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 import os
 import time
@@ -24,8 +28,10 @@ from mqtt_connection_manager import MQTTConnectionManager
 from mqtt_tools import MQTTTools
 
 # MongoDB für Tool Call Logging (analog zu MongoDB MCP)
+import bson
+from bson.errors import InvalidDocument
 from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo.errors import BulkWriteError, PyMongoError
 
 # Configure logging für development + production
 log_handlers = [logging.StreamHandler(sys.stderr)]
@@ -62,138 +68,359 @@ TOOL_CALLS_COLLECTION = "mcp_tool_calls"
 SYSTEM_LOGS_COLLECTION = "mcp_system_logs"
 PERFORMANCE_METRICS_COLLECTION = "mcp_performance_metrics"
 
+# Concurrent Request Handling: max. gleichzeitige Requests / Tool Calls pro Session
+MAX_CONCURRENT_REQUESTS = 32
+MAX_CONCURRENT_TOOL_CALLS_PER_SESSION = 4
+
+# Logging Pipeline: Batch Größe / Flush Intervall des Writer Threads
+LOG_BATCH_SIZE = 200
+LOG_FLUSH_INTERVAL = 1.0
+# Max. gepufferte Log Dokumente (darüber werden Records verworfen)
+LOG_QUEUE_MAX_SIZE = 10000
+# Flushes langsamer als das gelten als "MongoDB langsam" (Low Priority wird verworfen)
+LOG_SLOW_FLUSH_SECONDS = 2.0
+# Wartezeit bis zum nächsten Verbindungsversuch nach einem Fehler
+LOG_RECONNECT_INTERVAL = 60.0
+# Results darüber werden nur als Zusammenfassung gespeichert
+LOG_MAX_RESULT_BYTES = 100 * 1024
+
+_result_repr = reprlib.Repr()
+_result_repr.maxlevel = 3
+_result_repr.maxdict = 20
+_result_repr.maxlist = 10
+_result_repr.maxstring = 200
+_result_repr.maxother = 200
+
+
+def estimate_size(value: Any, limit: int = LOG_MAX_RESULT_BYTES) -> int:
+    """
+    Grobe Größe eines JSON-artigen Werts in Bytes (ohne ``str(result)``)
+
+    Bricht ab, sobald ``limit`` überschritten ist - große Results werden
+    so nur bis zur Grenze angeschaut.
+    """
+    size = 0
+    stack = [value]
+    while stack and size <= limit:
+        item = stack.pop()
+        if isinstance(item, str):
+            size += len(item) + 2
+        elif isinstance(item, dict):
+            size += 2
+            for key, entry in item.items():
+                size += len(str(key)) + 4
+                stack.append(entry)
+        elif isinstance(item, (list, tuple)):
+            size += 2
+            stack.extend(item)
+        elif isinstance(item, (bytes, bytearray)):
+            size += len(item)
+        else:
+            size += 8
+    return size
+
+
+def bson_safe(value: Any) -> Any:
+    """Wert BSON kodierbar machen (str Keys, unbekannte Typen als str)"""
+    if isinstance(value, dict):
+        return {str(key): bson_safe(entry) for key, entry in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [bson_safe(entry) for entry in value]
+    if value is None or isinstance(value, (str, bool, int, float, bytes, datetime)):
+        return value
+    return str(value)
+
+
+def sanitize_document(doc: dict) -> dict:
+    """Dokument unverändert lassen, wenn es kodierbar ist, sonst ``bson_safe``"""
+    try:
+        bson.encode(doc)
+        return doc
+    except (InvalidDocument, OverflowError):
+        return bson_safe(doc)
+
+
 class MQTTMCPLogger:
-    """MongoDB logger for tool calls and system logs"""
-    
-    def __init__(self):
+    """
+    MongoDB logger for tool calls and system logs
+
+    Die ``log_*`` Methoden bauen nur das Dokument und hängen es an eine
+    Queue; ein Writer Thread schreibt per ``insert_many`` (alle
+    ``LOG_BATCH_SIZE`` Dokumente bzw. ``LOG_FLUSH_INTERVAL`` Sekunden).
+    Ist MongoDB langsam oder nicht erreichbar, werden zuerst Low Priority
+    Records (API Requests, Performance Metriken) verworfen - Tool Calls
+    warten nie auf die Logging Datenbank.
+    """
+
+    def __init__(self, connection_string: str = MONGODB_CONNECTION_STRING, start: bool = True):
+        self.connection_string = connection_string
         self.mongodb_client = None
         self.db = None
-        self._init_mongodb_connection()
-    
+
+        self._high: deque = deque()
+        self._low: deque = deque()
+        self._condition = threading.Condition()
+        self._writing = 0
+        self._degraded = False
+        self._closed = False
+        self._next_connect = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'written': 0,
+            'dropped_low_priority': 0,
+            'dropped_high_priority': 0,
+            'failed': 0,
+            'flushes': 0,
+            'last_flush_ms': 0.0
+        }
+
+        if start:
+            self.start()
+
+    def start(self):
+        """Writer Thread starten (verbindet sich selbst mit MongoDB)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_loop, name="mcp-log-writer", daemon=True)
+            self._thread.start()
+
     def _init_mongodb_connection(self):
         """Initialize MongoDB connection for logging"""
         try:
             self.mongodb_client = MongoClient(
-                MONGODB_CONNECTION_STRING,
+                self.connection_string,
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=5000
             )
-            
+
             # Test connection
             self.mongodb_client.admin.command('ping')
-            
+
             # Get database
-            self.db = self.mongodb_client[MONGODB_DATABASE]
-            
+            db = self.mongodb_client[MONGODB_DATABASE]
+
             # Create TTL indexes for automatic cleanup
             # Tool calls: 24 hours
-            self.db[TOOL_CALLS_COLLECTION].create_index(
+            db[TOOL_CALLS_COLLECTION].create_index(
                 "timestamp",
                 expireAfterSeconds=86400  # 24 hours
             )
-            
-            # System logs: 7 days  
-            self.db[SYSTEM_LOGS_COLLECTION].create_index(
-                "timestamp", 
+
+            # System logs: 7 days
+            db[SYSTEM_LOGS_COLLECTION].create_index(
+                "timestamp",
                 expireAfterSeconds=604800  # 7 days
             )
-            
+
             # Performance metrics: 7 days
-            self.db[PERFORMANCE_METRICS_COLLECTION].create_index(
+            db[PERFORMANCE_METRICS_COLLECTION].create_index(
                 "timestamp",
                 expireAfterSeconds=604800  # 7 days
             )
-            
+
+            self.db = db
             logger.info("MongoDB logging connection established")
-            
+
         except PyMongoError as e:
             logger.warning(f"MongoDB logging failed, tool calls won't be logged: {e}")
             self.mongodb_client = None
         except Exception as e:
             logger.warning(f"Unexpected error with MongoDB logging: {e}")
             self.mongodb_client = None
-    
-    def log_tool_call(self, tool_name: str, params: dict, success: bool, 
+
+    # --- Producer (Event Loop) ---
+
+    def _enqueue(self, collection: str, doc: dict, high_priority: bool):
+        with self._condition:
+            if self._closed:
+                return
+            if not high_priority and self._degraded:
+                self.stats['dropped_low_priority'] += 1
+                return
+
+            if len(self._high) + len(self._low) >= LOG_QUEUE_MAX_SIZE:
+                if self._low:
+                    self._low.popleft()
+                    self.stats['dropped_low_priority'] += 1
+                elif high_priority:
+                    self._high.popleft()
+                    self.stats['dropped_high_priority'] += 1
+                else:
+                    self.stats['dropped_low_priority'] += 1
+                    return
+
+            (self._high if high_priority else self._low).append((collection, doc))
+            if len(self._high) + len(self._low) >= LOG_BATCH_SIZE:
+                self._condition.notify_all()
+
+    def log_tool_call(self, tool_name: str, params: dict, success: bool,
                      duration: float, result: dict = None, error: str = None):
         """Log tool call to MongoDB"""
-        if not self.mongodb_client:
-            return
-            
         try:
-            # Determine result storage strategy based on size
-            result_str = str(result) if result else ""
-            result_size_kb = round(len(result_str) / 1024, 2)
-            
+            # Determine result storage strategy based on (estimated) size
+            result_size = estimate_size(result) if result else 0
             # Store full result if reasonable size (<100KB), otherwise store summary
-            store_full_result = result_size_kb < 100 and result is not None
-            
+            store_full_result = result is not None and result_size < LOG_MAX_RESULT_BYTES
+
+            if store_full_result:
+                stored_result = result
+            elif result:
+                summary = _result_repr.repr(result)
+                stored_result = {
+                    'status': result.get('status', 'unknown') if isinstance(result, dict) else 'unknown',
+                    'summary': summary[:1000] + '...' if len(summary) > 1000 else summary,
+                    'truncated': True
+                }
+            else:
+                stored_result = None
+
             doc = {
                 'timestamp': datetime.now(),
                 'tool_name': tool_name,
                 'params': params,
                 'success': success,
                 'duration_ms': round(duration * 1000, 2),
-                'result_summary': result.get('status', 'unknown') if result else 'no_result',
-                'result_size_kb': result_size_kb,
+                'result_summary': result.get('status', 'unknown') if isinstance(result, dict) else 'no_result',
+                'result_size_kb': round(result_size / 1024, 2),
                 'error': error,
                 # Store full result if not too large, otherwise store truncated summary
-                'result': result if store_full_result else (
-                    {
-                        'status': result.get('status', 'unknown'),
-                        'summary': str(result)[:1000] + '...' if len(str(result)) > 1000 else str(result),
-                        'truncated': not store_full_result and result is not None
-                    } if result else None
-                )
+                'result': stored_result
             }
-            
-            self.db[TOOL_CALLS_COLLECTION].insert_one(doc)
-            
+            self._enqueue(TOOL_CALLS_COLLECTION, doc, high_priority=True)
         except Exception as e:
             logger.error(f"Failed to log tool call: {e}")
-            # Log the error details for debugging
             logger.error(f"Tool: {tool_name}, Success: {success}, Result type: {type(result)}")
-            if result:
-                logger.error(f"Result keys: {list(result.keys()) if isinstance(result, dict) else 'not a dict'}")
-    
-    def log_system_event(self, event_type: str, message: str, level: str = "INFO", 
+
+    def log_system_event(self, event_type: str, message: str, level: str = "INFO",
                         metadata: dict = None):
-        """Log system event to MongoDB"""
-        if not self.mongodb_client:
-            return
-            
-        try:
-            doc = {
-                'timestamp': datetime.now(),
-                'event_type': event_type,
-                'level': level,
-                'message': message,
-                'metadata': metadata or {}
-            }
-            
-            self.db[SYSTEM_LOGS_COLLECTION].insert_one(doc)
-            
-        except Exception as e:
-            logger.error(f"Failed to log system event: {e}")
-    
+        """Log system event to MongoDB (INFO Events sind Low Priority)"""
+        doc = {
+            'timestamp': datetime.now(),
+            'event_type': event_type,
+            'level': level,
+            'message': message,
+            'metadata': metadata or {}
+        }
+        self._enqueue(SYSTEM_LOGS_COLLECTION, doc, high_priority=level not in ("DEBUG", "INFO"))
+
     def log_performance_metric(self, metric_name: str, value: float, unit: str = "",
                               metadata: dict = None):
-        """Log performance metric to MongoDB"""
-        if not self.mongodb_client:
-            return
-            
+        """Log performance metric to MongoDB (Low Priority)"""
+        doc = {
+            'timestamp': datetime.now(),
+            'metric_name': metric_name,
+            'value': value,
+            'unit': unit,
+            'metadata': metadata or {}
+        }
+        self._enqueue(PERFORMANCE_METRICS_COLLECTION, doc, high_priority=False)
+
+    # --- Writer Thread ---
+
+    def _take_batch(self) -> List[Tuple[str, dict]]:
+        batch = []
+        while self._high and len(batch) < LOG_BATCH_SIZE:
+            batch.append(self._high.popleft())
+        while self._low and len(batch) < LOG_BATCH_SIZE:
+            batch.append(self._low.popleft())
+        return batch
+
+    def _writer_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._high) + len(self._low) >= LOG_BATCH_SIZE,
+                    timeout=LOG_FLUSH_INTERVAL
+                )
+                closed = self._closed
+
+            if self.db is None and time.monotonic() >= self._next_connect:
+                self._init_mongodb_connection()
+                if self.db is None:
+                    self._next_connect = time.monotonic() + LOG_RECONNECT_INTERVAL
+
+            while True:
+                with self._condition:
+                    # Ohne Datenbank nur Low Priority abwerfen, Tool Calls bis zur Queue Grenze halten
+                    self._degraded = self.db is None or self.stats['last_flush_ms'] > LOG_SLOW_FLUSH_SECONDS * 1000
+                    if self.db is None:
+                        self.stats['dropped_low_priority'] += len(self._low)
+                        self._low.clear()
+                        batch = []
+                    else:
+                        batch = self._take_batch()
+                    self._writing = len(batch)
+                if not batch:
+                    break
+                self._write_batch(batch)
+
+            with self._condition:
+                self._writing = 0
+                self._condition.notify_all()
+            if closed:
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, dict]]):
+        by_collection: Dict[str, List[dict]] = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+
+        start = time.perf_counter()
+        for collection, docs in by_collection.items():
+            try:
+                try:
+                    written = self._insert(collection, docs)
+                except InvalidDocument as e:
+                    # Ein nicht kodierbares Dokument (z.B. int Keys) verwirft sonst den ganzen Batch
+                    logger.warning(f"Invalid log document in {collection}, sanitizing batch: {e}")
+                    written = self._insert(collection, [sanitize_document(doc) for doc in docs])
+                self.stats['written'] += written
+                self.stats['failed'] += len(docs) - written
+            except Exception as e:
+                self.stats['failed'] += len(docs)
+                logger.error(f"Failed to write {len(docs)} log documents to {collection}: {e}")
+        self.stats['flushes'] += 1
+        self.stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _insert(self, collection: str, docs: List[dict]) -> int:
+        """insert_many (ordered=False); liefert die Anzahl geschriebener Dokumente"""
         try:
-            doc = {
-                'timestamp': datetime.now(),
-                'metric_name': metric_name,
-                'value': value,
-                'unit': unit,
-                'metadata': metadata or {}
+            self.db[collection].insert_many(docs, ordered=False)
+            return len(docs)
+        except BulkWriteError as e:
+            # Ungeordnet: alle Dokumente ohne Write Error sind geschrieben; doppelte _id
+            # heißt, das Dokument war schon vor einem Retry geschrieben
+            errors = e.details.get('writeErrors', [])
+            duplicates = sum(1 for error in errors if error.get('code') == 11000)
+            if len(errors) > duplicates:
+                logger.error(f"Failed to write {len(errors) - duplicates} log documents to {collection}")
+            return e.details.get('nInserted', 0) + duplicates
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Auf das Schreiben der gepufferten Dokumente warten (blockierend)"""
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: self.db is None or (not self._high and not self._low and not self._writing),
+                timeout=timeout
+            )
+
+    def close(self, timeout: float = 5.0):
+        """Restliche Dokumente schreiben und den Writer Thread beenden"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                **self.stats,
+                'queued': len(self._high) + len(self._low),
+                'degraded': self._degraded,
+                'connected': self.db is not None
             }
-            
-            self.db[PERFORMANCE_METRICS_COLLECTION].insert_one(doc)
-            
-        except Exception as e:
-            logger.error(f"Failed to log performance metric: {e}")
 
 # Global logger instance
 mqtt_logger = MQTTMCPLogger()
@@ -245,6 +472,16 @@ class SimpleMCPServer:
                         'connection_string': {
                             'type': 'string',
                             'description': 'MQTT connection string (mqtt://[username:password@]broker:port[/client_id])'
+                        },
+                        'buffer_pattern': {
+                            'type': 'string',
+                            'description': 'Optional always-on capture pattern (e.g. "#"); recent messages are kept in a ring buffer so collection tools answer instantly'
+                        },
+                        'buffer_size': {
+                            'type': 'integer',
+                            'description': 'Maximum number of buffered messages',
+                            'minimum': 100,
+                            'default': 10000
                         }
                     },
                     'required': ['connection_string']
@@ -286,6 +523,12 @@ class SimpleMCPServer:
                             'type': 'string',
                             'description': 'MQTT topic pattern for discovery (default: "#" for all topics)',
                             'default': '#'
+                        },
+                        'max_topics': {
+                            'type': 'integer',
+                            'description': 'Maximum number of topic names returned (most active first); all topics are summarized in topic_tree',
+                            'minimum': 1,
+                            'default': 100
                         }
                     },
                     'required': ['session_id']
@@ -311,6 +554,20 @@ class SimpleMCPServer:
                             'minimum': 10,
                             'maximum': 300,
                             'default': 30
+                        },
+                        'max_messages': {
+                            'type': 'integer',
+                            'description': 'Stop early after this many messages',
+                            'minimum': 1
+                        },
+                        'stop_on_match': {
+                            'type': 'string',
+                            'description': 'Stop early at the first message whose topic or payload matches this regular expression'
+                        },
+                        'expected_topics': {
+                            'type': 'array',
+                            'items': {'type': 'string'},
+                            'description': 'Stop early once each of these topics (or patterns) has sent a message'
                         }
                     },
                     'required': ['session_id', 'topic_pattern']
@@ -362,6 +619,11 @@ class SimpleMCPServer:
                         'topic_pattern': {
                             'type': 'string',
                             'description': 'MQTT topic pattern to analyze'
+                        },
+                        'reset': {
+                            'type': 'boolean',
+                            'description': 'Discard the schema accumulated by earlier calls for this pattern',
+                            'default': False
                         }
                     },
                     'required': ['session_id', 'topic_pattern']
@@ -415,6 +677,11 @@ class SimpleMCPServer:
             }
         }
         
+        # Laufende Requests (für notifications/cancelled) und Limits
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._request_slots: Optional[asyncio.Semaphore] = None
+        self._session_slots: Dict[str, list] = {}
+        
         logger.info(f"SimpleMCPServer initialized with {len(self.tools)} tools (Phase 4)")
         
         # Log server startup
@@ -474,6 +741,15 @@ class SimpleMCPServer:
                 # Return None to indicate no response should be sent
                 return None
                 
+            elif method == "notifications/cancelled":
+                # Laufenden Request abbrechen (z.B. lange subscribe_and_collect)
+                cancelled_id = params.get("requestId")
+                task = self._inflight.get(cancelled_id)
+                if task is not None and not task.done():
+                    logger.info(f"Cancelling request {cancelled_id}: {params.get('reason', 'no reason given')}")
+                    task.cancel()
+                return None
+                
             elif method == "tools/list":
                 return {
                     "jsonrpc": "2.0",
@@ -490,7 +766,8 @@ class SimpleMCPServer:
                 if tool_name in self.tools:
                     try:
                         start_time = time.time()
-                        result = await self.tools[tool_name](**tool_arguments)
+                        async with self._session_slot(tool_arguments.get('session_id')):
+                            result = await self.tools[tool_name](**tool_arguments)
                         # Fix: MQTT tools use different status values for success
                         status = result.get('status', 'unknown') if result else 'no_result'
                         success = status in ['success', 'connected', 'closed'] if result else False
@@ -531,7 +808,8 @@ class SimpleMCPServer:
             # Legacy direct tool calls (backward compatibility)
             elif method in self.tools:
                 try:
-                    result = await self.tools[method](**params)
+                    async with self._session_slot(params.get('session_id')):
+                        result = await self.tools[method](**params)
                     return {
                         "jsonrpc": "2.0",
                         "result": result,
@@ -575,22 +853,79 @@ class SimpleMCPServer:
             "id": request_id
         }
     
-    async def run(self):
+    @asynccontextmanager
+    async def _session_slot(self, session_id: Optional[str]):
+        """Begrenzt gleichzeitige Tool Calls pro MQTT Session"""
+        if not session_id:
+            yield
+            return
+        
+        slot = self._session_slots.get(session_id)
+        if slot is None:
+            slot = self._session_slots[session_id] = [asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS_PER_SESSION), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._session_slots[session_id]
+    
+    async def _dispatch(self, request: Any, responses: asyncio.Queue):
+        """Request als eigener Task: Antwort in die Writer Queue"""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            async with self._request_slots:
+                response = await self.handle_request(request)
+        except asyncio.CancelledError:
+            # Abgebrochene Requests bekommen keine Antwort (MCP Cancellation)
+            logger.info(f"Request {request_id} cancelled")
+            mqtt_logger.log_system_event("request_cancelled", f"Request {request_id} cancelled", "INFO",
+                                         {"request_id": request_id})
+            return
+        finally:
+            if request_id is not None and self._inflight.get(request_id) is asyncio.current_task():
+                del self._inflight[request_id]
+        
+        if response:
+            await responses.put(response)
+    
+    async def _write_responses(self, responses: asyncio.Queue, write_line: Callable[[str], None]):
+        """Einziger Writer: Antworten in Fertigstellungs-Reihenfolge, nie verschachtelt"""
+        while True:
+            response = await responses.get()
+            if response is None:
+                return
+            try:
+                line = json.dumps(response)
+            except (TypeError, ValueError) as e:
+                # Nicht serialisierbares Result (z.B. Legacy Direct Call) darf den Writer nicht beenden
+                logger.error(f"Response not JSON serializable: {e}")
+                request_id = response.get("id") if isinstance(response, dict) else None
+                line = json.dumps(self._error_response(request_id, -32603, f"Internal error: {e}"))
+            try:
+                write_line(line)
+            except Exception as e:
+                logger.error(f"Failed to write response: {e}")
+                continue
+            logger.debug(f"Sent response: {line}")
+    
+    async def serve(self, read_line: Callable[[], Awaitable[str]], write_line: Callable[[str], None]):
         """
-        Main server loop - STDIO communication
+        Request Loop
         
-        Liest JSON-RPC requests von STDIN und sendet responses zu STDOUT
+        Jeder Request läuft als eigener Task, lange Tool Calls blockieren
+        also keine weiteren Requests. Bei EOF wird auf laufende Requests gewartet.
         """
-        logger.info("MCP Server starting - Phase 4 with MongoDB Logging")
-        mqtt_logger.log_system_event("server_start", "MQTT MCP Server started successfully", "INFO")
+        self._request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        responses: asyncio.Queue = asyncio.Queue()
+        writer = asyncio.create_task(self._write_responses(responses, write_line))
+        pending: Set[asyncio.Task] = set()
         
         try:
             while True:
-                # Read line from STDIN
-                line = await asyncio.get_event_loop().run_in_executor(
-                    None, sys.stdin.readline
-                )
-                
+                line = await read_line()
                 if not line:
                     break
                 
@@ -602,20 +937,50 @@ class SimpleMCPServer:
                     # Parse JSON request
                     request = json.loads(line)
                     logger.debug(f"Received request: {request}")
-                    
-                    # Handle request
-                    response = await self.handle_request(request)
-                    
-                    # Send response to stdout (same as MongoDB MCP)
-                    if response:
-                        print(json.dumps(response), flush=True)
-                        logger.debug(f"Sent response: {response}")
-                    
                 except json.JSONDecodeError as e:
                     logger.error(f"JSON decode error: {e}")
-                    error_response = self._error_response(None, -32700, "Parse error")
-                    print(json.dumps(error_response), flush=True)
-                    
+                    await responses.put(self._error_response(None, -32700, "Parse error"))
+                    continue
+                
+                # Notifications (z.B. notifications/cancelled) sofort im Reader,
+                # damit sie nie hinter den Requests warten, die sie betreffen
+                if isinstance(request, dict) and str(request.get("method", "")).startswith("notifications/"):
+                    await self.handle_request(request)
+                    continue
+                
+                task = asyncio.create_task(self._dispatch(request, responses))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                request_id = request.get("id") if isinstance(request, dict) else None
+                if request_id is not None:
+                    self._inflight[request_id] = task
+            
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            for task in pending:
+                task.cancel()
+            await responses.put(None)
+            await writer
+    
+    async def run(self):
+        """
+        Main server loop - STDIO communication
+        
+        Liest JSON-RPC requests von STDIN und sendet responses zu STDOUT
+        """
+        logger.info("MCP Server starting - Phase 4 with MongoDB Logging")
+        mqtt_logger.log_system_event("server_start", "MQTT MCP Server started successfully", "INFO")
+        
+        async def read_stdin_line() -> str:
+            return await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+        
+        def write_stdout_line(line: str):
+            # Send response to stdout (same as MongoDB MCP)
+            print(line, flush=True)
+        
+        try:
+            await self.serve(read_stdin_line, write_stdout_line)
         except KeyboardInterrupt:
             logger.info("Server shutdown requested")
             mqtt_logger.log_system_event("server_shutdown", "Server shutdown requested", "INFO")
@@ -630,6 +995,8 @@ class SimpleMCPServer:
         logger.info("Shutting down MCP Server")
         mqtt_logger.log_system_event("server_shutdown", "MQTT MCP Server shutting down", "INFO")
         await self.connection_manager.cleanup_all_sessions()
+        # Gepufferte Log Dokumente schreiben, ohne den Event Loop zu blockieren
+        await asyncio.get_event_loop().run_in_executor(None, mqtt_logger.flush)
         logger.info("MCP Server shutdown complete")
 
 
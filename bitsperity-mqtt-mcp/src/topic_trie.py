@@ -0,0 +1,269 @@
+"""
+bitsperity-mqtt-mcp - Topic Trie
+Topic Hierarchie aus dem beobachteten Traffic einer Session
+
+Jede empfangene Message aktualisiert den Pfad ihres Topics (Message Count,
+Last Seen, Anzahl Topics im Teilbaum). ``+``/``#`` Abfragen laufen nur die
+passenden Äste ab, ``summary()`` fasst große Topic Mengen hierarchisch
+zusammen statt sie abzuschneiden.
+"""
+
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Obergrenze für bekannte Topics pro Session (Speicher)
+DEFAULT_MAX_TOPICS = 100000
+
+
+def topic_matches(topic: str, pattern: str) -> bool:
+    """MQTT Topic Matching (``+``/``#``, ``$``-Topics nur explizit)"""
+    topic_levels = topic.split('/')
+    pattern_levels = pattern.split('/')
+
+    if topic.startswith('$') and pattern_levels[0] in ('#', '+'):
+        return False
+
+    for index, level in enumerate(pattern_levels):
+        if level == '#':
+            return True
+        if index >= len(topic_levels):
+            return False
+        if level != '+' and level != topic_levels[index]:
+            return False
+
+    return len(topic_levels) == len(pattern_levels)
+
+
+def pattern_covers(capture: str, pattern: str) -> bool:
+    """True, wenn jedes Topic von ``pattern`` auch von ``capture`` erfasst wird"""
+    capture_levels = capture.split('/')
+    pattern_levels = pattern.split('/')
+
+    if pattern.startswith('$') and capture_levels[0] in ('#', '+'):
+        return False
+
+    for index, level in enumerate(capture_levels):
+        if level == '#':
+            return True
+        if index >= len(pattern_levels) or pattern_levels[index] == '#':
+            return False
+        if level == '+':
+            continue
+        if pattern_levels[index] != level:
+            return False
+
+    return len(pattern_levels) == len(capture_levels)
+
+
+class TopicNode:
+    """Ein Topic Level; ``is_topic`` wenn auf genau diesem Pfad Messages ankamen"""
+
+    __slots__ = ('children', 'is_topic', 'messages', 'subtree_messages', 'subtree_topics', 'last_seen')
+
+    def __init__(self):
+        self.children: Dict[str, 'TopicNode'] = {}
+        self.is_topic = False
+        self.messages = 0
+        self.subtree_messages = 0
+        self.subtree_topics = 0
+        self.last_seen = 0.0
+
+
+class TopicTrie:
+    """Topic Trie mit MQTT Wildcard Abfragen"""
+
+    def __init__(self, max_topics: int = DEFAULT_MAX_TOPICS):
+        self.root = TopicNode()
+        self.max_topics = max_topics
+        self.topics_dropped = 0
+
+    def __len__(self) -> int:
+        return self.root.subtree_topics
+
+    def observe(self, topic: str, timestamp: Optional[float] = None) -> bool:
+        """Message auf ``topic`` zählen; False wenn ``max_topics`` erreicht ist"""
+        timestamp = time.time() if timestamp is None else timestamp
+
+        path = [self.root]
+        node = self.root
+        for level in topic.split('/'):
+            child = node.children.get(level)
+            if child is None:
+                if len(self) >= self.max_topics:
+                    self.topics_dropped += 1
+                    return False
+                child = node.children[level] = TopicNode()
+            node = child
+            path.append(node)
+
+        is_new = not node.is_topic
+        if is_new and len(self) >= self.max_topics:
+            self.topics_dropped += 1
+            return False
+
+        node.is_topic = True
+        node.messages += 1
+        for entry in path:
+            entry.subtree_messages += 1
+            entry.last_seen = timestamp
+            if is_new:
+                entry.subtree_topics += 1
+        return True
+
+    def get(self, topic: str) -> Optional[TopicNode]:
+        node = self.root
+        for level in topic.split('/'):
+            node = node.children.get(level)
+            if node is None:
+                return None
+        return node if node.is_topic else None
+
+    def match(self, pattern: str) -> List[Tuple[str, TopicNode]]:
+        """Alle bekannten Topics zu ``pattern`` (Aufwand ~ Größe des Ergebnisses)"""
+        results: List[Tuple[str, TopicNode]] = []
+        self._match(self.root, pattern.split('/'), 0, [], results)
+        return results
+
+    def _match(self, node: TopicNode, levels: List[str], index: int, prefix: List[str],
+               results: List[Tuple[str, TopicNode]]):
+        if index == len(levels):
+            if node.is_topic:
+                results.append(('/'.join(prefix), node))
+            return
+
+        level = levels[index]
+        if level == '#':
+            # "sensor/#" umfasst auch "sensor"
+            if index > 0 and node.is_topic:
+                results.append(('/'.join(prefix), node))
+            self._collect(node, prefix, results, skip_system=index == 0)
+            return
+
+        if level == '+':
+            for name, child in node.children.items():
+                if index == 0 and name.startswith('$'):
+                    continue
+                self._match(child, levels, index + 1, prefix + [name], results)
+            return
+
+        child = node.children.get(level)
+        if child is not None:
+            self._match(child, levels, index + 1, prefix + [level], results)
+
+    @staticmethod
+    def _collect(node: TopicNode, prefix: List[str], results: List[Tuple[str, TopicNode]], skip_system: bool):
+        stack = [
+            (child, prefix + [name]) for name, child in node.children.items()
+            if not (skip_system and name.startswith('$'))
+        ]
+        while stack:
+            current, path = stack.pop()
+            if current.is_topic:
+                results.append(('/'.join(path), current))
+            for name, child in current.children.items():
+                stack.append((child, path + [name]))
+
+    def summary(self, pattern: str = '#', max_depth: int = 2, max_children: int = 10) -> Dict[str, Any]:
+        """
+        Hierarchische Zusammenfassung der Topics zu ``pattern``
+
+        Pro Ebene (bis ``max_depth``) die aktivsten ``max_children`` Äste mit
+        Anzahl Topics, Messages und Last Seen; der Rest als ``more_children``.
+        Unterhalb von ``#`` werden die Zähler der Knoten direkt verwendet.
+        """
+        entry = self._summarize(self.root, pattern.split('/'), 0, '', 0, max_depth, max_children)
+        entry = entry or self._summary_entry('', 0, 0, 0.0, [], max_children)
+
+        pending = [entry]
+        while pending:
+            current = pending.pop()
+            del current['_last_seen']
+            pending.extend(current.get('children', []))
+        return entry
+
+    def _summarize(self, node: TopicNode, levels: List[str], index: int, path: str, depth: int,
+                   max_depth: int, max_children: int) -> Optional[Dict[str, Any]]:
+        if index == len(levels):
+            if not node.is_topic:
+                return None
+            return self._summary_entry(path, 1, node.messages, node.last_seen, [], max_children)
+
+        level = levels[index]
+        if level == '#' and index > 0:
+            return self._summarize_subtree(node, path, depth, max_depth, max_children)
+
+        if depth >= max_depth:
+            results: List[Tuple[str, TopicNode]] = []
+            self._match(node, levels, index, [], results)
+            if not results:
+                return None
+            return self._summary_entry(
+                path, len(results), sum(match.messages for _, match in results),
+                max(match.last_seen for _, match in results), [], max_children
+            )
+
+        if level in ('#', '+'):
+            candidates = [
+                (name, child) for name, child in node.children.items()
+                if not (index == 0 and name.startswith('$'))
+            ]
+        else:
+            candidates = [(level, node.children[level])] if level in node.children else []
+
+        children = []
+        for name, child in candidates:
+            child_path = f"{path}/{name}" if path else name
+            if level == '#':
+                entry = self._summarize_subtree(child, child_path, depth + 1, max_depth, max_children)
+            else:
+                entry = self._summarize(child, levels, index + 1, child_path, depth + 1, max_depth, max_children)
+            if entry is not None:
+                children.append(entry)
+
+        if not children:
+            return None
+        return self._summary_entry(
+            path, sum(child['topics'] for child in children), sum(child['messages'] for child in children),
+            max(child['_last_seen'] for child in children), children, max_children
+        )
+
+    def _summarize_subtree(self, node: TopicNode, path: str, depth: int,
+                           max_depth: int, max_children: int) -> Dict[str, Any]:
+        children = []
+        if depth < max_depth and node.children:
+            ranked = sorted(node.children.items(), key=lambda item: (-item[1].subtree_messages, item[0]))
+            children = [
+                self._summarize_subtree(child, f"{path}/{name}", depth + 1, max_depth, max_children)
+                for name, child in ranked[:max_children]
+            ]
+        entry = self._summary_entry(path, node.subtree_topics, node.subtree_messages, node.last_seen,
+                                    children, max_children)
+        if len(node.children) > max_children and depth < max_depth:
+            entry['more_children'] = len(node.children) - max_children
+        return entry
+
+    @staticmethod
+    def _summary_entry(path: str, topics: int, messages: int, last_seen: float,
+                       children: List[Dict[str, Any]], max_children: int) -> Dict[str, Any]:
+        entry = {
+            'path': path or '#',
+            'topics': topics,
+            'messages': messages,
+            'last_seen': datetime.fromtimestamp(last_seen).isoformat() if last_seen else None,
+            '_last_seen': last_seen,
+        }
+        if children:
+            children.sort(key=lambda child: (-child['messages'], child['path']))
+            entry['children'] = children[:max_children]
+            if len(children) > max_children:
+                entry['more_children'] = len(children) - max_children
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'topics': len(self),
+            'messages': self.root.subtree_messages,
+            'topics_dropped': self.topics_dropped,
+            'max_topics': self.max_topics
+        }
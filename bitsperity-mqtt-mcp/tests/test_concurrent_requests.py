@@ -0,0 +1,177 @@
+"""
+Tests für die nebenläufige Request Verarbeitung des MCP Servers
+(Tasks pro Request, ein Writer, notifications/cancelled, Session Limits)
+"""
+
+import pytest
+import pytest_asyncio
+import asyncio
+import json
+import sys
+import os
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import simple_mcp_server
+from simple_mcp_server import SimpleMCPServer
+
+
+def tool_call(request_id, name, **arguments):
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments}
+    })
+
+
+class StdioStub:
+    """Zeilen für read_line einspeisen, geschriebene Antworten sammeln"""
+
+    def __init__(self):
+        self.lines: asyncio.Queue = asyncio.Queue()
+        self.responses = []
+        self.response_event = asyncio.Event()
+
+    async def read_line(self) -> str:
+        return await self.lines.get()
+
+    def write_line(self, line: str):
+        self.responses.append(json.loads(line))
+        self.response_event.set()
+
+    async def wait_for_response(self, request_id, timeout: float = 2.0):
+        async def wait():
+            while not any(response.get("id") == request_id for response in self.responses):
+                self.response_event.clear()
+                await self.response_event.wait()
+        await asyncio.wait_for(wait(), timeout=timeout)
+
+    def ids(self):
+        return [response.get("id") for response in self.responses]
+
+
+class TestConcurrentRequests:
+    """Requests laufen als Tasks, lange Tool Calls blockieren nichts"""
+
+    @pytest_asyncio.fixture
+    async def server(self):
+        server = SimpleMCPServer()
+        yield server
+        await server.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_slow_call_does_not_block_other_requests(self, server):
+        release = asyncio.Event()
+
+        async def slow_tool(**kwargs):
+            await release.wait()
+            return {'status': 'success', 'tool': 'slow'}
+
+        async def fast_tool(**kwargs):
+            return {'status': 'success', 'tool': 'fast'}
+
+        server.tools['mqtt_slow'] = slow_tool
+        server.tools['mqtt_fast'] = fast_tool
+        stdio = StdioStub()
+        serve = asyncio.create_task(server.serve(stdio.read_line, stdio.write_line))
+
+        await stdio.lines.put(tool_call(1, 'mqtt_slow'))
+        await stdio.lines.put(tool_call(2, 'mqtt_fast'))
+        await stdio.lines.put('{not json')
+        await stdio.wait_for_response(2)
+        await stdio.wait_for_response(None)
+        assert 1 not in stdio.ids()
+        assert stdio.responses[stdio.ids().index(None)]["error"]["code"] == -32700
+
+        release.set()
+        await stdio.lines.put('')
+        await asyncio.wait_for(serve, timeout=2)
+        assert stdio.ids()[-1] == 1
+        assert json.loads(stdio.responses[-1]["result"]["content"][0]["text"])["tool"] == "slow"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_notification_cancels_running_call(self, server):
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def collect_tool(**kwargs):
+            started.set()
+            try:
+                await asyncio.sleep(300)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return {'status': 'success'}
+
+        server.tools['mqtt_collect'] = collect_tool
+        stdio = StdioStub()
+        serve = asyncio.create_task(server.serve(stdio.read_line, stdio.write_line))
+
+        await stdio.lines.put(tool_call("abc", 'mqtt_collect', session_id='s1'))
+        await asyncio.wait_for(started.wait(), timeout=2)
+        await stdio.lines.put(json.dumps({
+            "jsonrpc": "2.0",
+            "method": "notifications/cancelled",
+            "params": {"requestId": "abc", "reason": "user aborted"}
+        }))
+        await asyncio.wait_for(cancelled.wait(), timeout=2)
+
+        await stdio.lines.put('')
+        await asyncio.wait_for(serve, timeout=2)
+        assert stdio.responses == []
+        assert server._inflight == {}
+        assert server._session_slots == {}
+
+    @pytest.mark.asyncio
+    async def test_per_session_limit(self, server, monkeypatch):
+        monkeypatch.setattr(simple_mcp_server, 'MAX_CONCURRENT_TOOL_CALLS_PER_SESSION', 2)
+        running = {}
+        peak = {}
+
+        async def probe_tool(session_id, **kwargs):
+            running[session_id] = running.get(session_id, 0) + 1
+            peak[session_id] = max(peak.get(session_id, 0), running[session_id])
+            await asyncio.sleep(0.05)
+            running[session_id] -= 1
+            return {'status': 'success'}
+
+        server.tools['mqtt_probe'] = probe_tool
+        stdio = StdioStub()
+        serve = asyncio.create_task(server.serve(stdio.read_line, stdio.write_line))
+
+        for index in range(6):
+            await stdio.lines.put(tool_call(index, 'mqtt_probe', session_id='s1'))
+        for index in range(6, 9):
+            await stdio.lines.put(tool_call(index, 'mqtt_probe', session_id='s2'))
+        await stdio.lines.put('')
+        await asyncio.wait_for(serve, timeout=5)
+
+        assert sorted(stdio.ids()) == list(range(9))
+        assert peak == {'s1': 2, 's2': 2}
+        assert server._session_slots == {}
+
+    @pytest.mark.asyncio
+    async def test_unserializable_response_does_not_stop_writer(self, server):
+        async def raw_tool(**kwargs):
+            return {'status': 'success', 'blob': b'\x00\x01'}
+
+        async def fast_tool(**kwargs):
+            return {'status': 'success'}
+
+        server.tools['mqtt_raw'] = raw_tool
+        server.tools['mqtt_fast'] = fast_tool
+        stdio = StdioStub()
+        serve = asyncio.create_task(server.serve(stdio.read_line, stdio.write_line))
+
+        # Legacy Direct Call liefert das Result unverändert in der Antwort
+        await stdio.lines.put(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "mqtt_raw", "params": {}}))
+        await stdio.wait_for_response(1)
+        await stdio.lines.put(tool_call(2, 'mqtt_fast'))
+        await stdio.wait_for_response(2)
+        await stdio.lines.put('')
+        await asyncio.wait_for(serve, timeout=2)
+
+        assert stdio.responses[stdio.ids().index(1)]["error"]["code"] == -32603
+        assert "result" in stdio.responses[stdio.ids().index(2)]
@@ -0,0 +1,186 @@
+"""
+Tests für die gebatchte MongoDB Logging Pipeline (MQTTMCPLogger)
+"""
+
+import time
+import sys
+import os
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import bson
+from pymongo.errors import BulkWriteError
+
+import simple_mcp_server
+from simple_mcp_server import MQTTMCPLogger, estimate_size
+
+
+class RecordingCollection:
+    """Sammelt insert_many Aufrufe; ``delay`` simuliert eine langsame Datenbank"""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    def insert_many(self, docs, ordered=True):
+        time.sleep(self.delay)
+        self.batches.append(list(docs))
+
+
+class EncodingCollection(RecordingCollection):
+    """Kodiert wie pymongo jedes Dokument vor dem Schreiben (InvalidDocument verwirft alles)"""
+
+    def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            bson.encode(doc)
+        super().insert_many(docs, ordered)
+
+
+class RecordingDatabase(dict):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+
+    def __missing__(self, name):
+        collection = self[name] = RecordingCollection(self.delay)
+        return collection
+
+
+def make_logger(delay: float = 0.0) -> MQTTMCPLogger:
+    mcp_logger = MQTTMCPLogger(start=False)
+    mcp_logger.db = RecordingDatabase(delay)
+    mcp_logger.start()
+    return mcp_logger
+
+
+class TestEstimateSize:
+    """Größenschätzung ohne str(result)"""
+
+    def test_close_to_json_length(self):
+        result = {'status': 'success', 'messages': [{'topic': 'a/b', 'payload': 'x' * 100}] * 50}
+        estimate = estimate_size(result)
+        assert 0.7 * len(str(result)) < estimate < 1.3 * len(str(result))
+
+    def test_stops_at_limit(self):
+        result = {'messages': ['x' * 1000] * 100000}
+        assert estimate_size(result, limit=10000) < 20000
+
+
+class TestMQTTMCPLogger:
+    """Batches, Prioritäten und Verhalten bei langsamer Datenbank"""
+
+    def test_batched_insert_many(self):
+        mcp_logger = make_logger()
+        for index in range(250):
+            mcp_logger.log_tool_call("mqtt_publish", {'index': index}, True, 0.01, {'status': 'success'})
+        mcp_logger.log_performance_metric("tool_call_duration", 0.01, "seconds")
+
+        assert mcp_logger.flush(timeout=5)
+        batches = mcp_logger.db[simple_mcp_server.TOOL_CALLS_COLLECTION].batches
+        assert sum(len(batch) for batch in batches) == 250
+        assert len(batches) < 250
+        assert len(mcp_logger.db[simple_mcp_server.PERFORMANCE_METRICS_COLLECTION].batches) == 1
+        assert mcp_logger.get_stats()['written'] == 251
+        mcp_logger.close()
+
+    def test_large_result_stored_as_summary(self):
+        mcp_logger = make_logger()
+        result = {'status': 'success', 'messages': [{'payload': 'x' * 1000}] * 500}
+        mcp_logger.log_tool_call("mqtt_collect", {}, True, 1.0, result)
+
+        assert mcp_logger.flush(timeout=5)
+        doc = mcp_logger.db[simple_mcp_server.TOOL_CALLS_COLLECTION].batches[0][0]
+        assert doc['result']['truncated'] is True
+        assert doc['result']['status'] == 'success'
+        assert len(doc['result']['summary']) <= 1003
+        assert doc['result_size_kb'] >= 100
+        mcp_logger.close()
+
+    def test_logging_does_not_wait_for_slow_database(self, monkeypatch):
+        monkeypatch.setattr(simple_mcp_server, 'LOG_FLUSH_INTERVAL', 0.01)
+        mcp_logger = make_logger(delay=0.5)
+        mcp_logger.log_system_event("api_request", "first", "INFO")
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        for index in range(1000):
+            mcp_logger.log_tool_call("mqtt_publish", {'index': index}, True, 0.01, {'status': 'success'})
+        assert time.perf_counter() - start < 0.5
+        mcp_logger.close()
+
+    def test_drops_low_priority_first(self, monkeypatch):
+        monkeypatch.setattr(simple_mcp_server, 'LOG_QUEUE_MAX_SIZE', 10)
+        mcp_logger = MQTTMCPLogger(start=False)
+
+        for index in range(5):
+            mcp_logger.log_performance_metric("metric", index)
+        for index in range(8):
+            mcp_logger.log_tool_call("mqtt_publish", {'index': index}, True, 0.01, {'status': 'success'})
+        mcp_logger.log_performance_metric("metric", 99)
+
+        stats = mcp_logger.get_stats()
+        assert stats['queued'] == 10
+        assert stats['dropped_low_priority'] == 4
+        assert stats['dropped_high_priority'] == 0
+
+        # Erst die restlichen Low Priority Records, dann der älteste Tool Call
+        for index in range(8, 11):
+            mcp_logger.log_tool_call("mqtt_publish", {'index': index}, True, 0.01, {'status': 'success'})
+        stats = mcp_logger.get_stats()
+        assert stats['dropped_low_priority'] == 6
+        assert stats['dropped_high_priority'] == 1
+        assert [doc['params']['index'] for _, doc in mcp_logger._high] == list(range(1, 11))
+
+    def test_degraded_mode_rejects_low_priority(self):
+        mcp_logger = MQTTMCPLogger(start=False)
+        mcp_logger._degraded = True
+
+        mcp_logger.log_system_event("api_request", "Method: tools/list", "INFO")
+        mcp_logger.log_system_event("server_error", "boom", "ERROR")
+        mcp_logger.log_tool_call("mqtt_publish", {}, False, 0.01, None, "failed")
+
+        stats = mcp_logger.get_stats()
+        assert stats['queued'] == 2
+        assert stats['dropped_low_priority'] == 1
+
+    def test_close_flushes_remaining_documents(self, monkeypatch):
+        monkeypatch.setattr(simple_mcp_server, 'LOG_FLUSH_INTERVAL', 60)
+        mcp_logger = make_logger()
+        mcp_logger.log_system_event("server_shutdown", "bye", "INFO")
+        mcp_logger.close()
+
+        assert not mcp_logger._thread.is_alive()
+        assert mcp_logger.db[simple_mcp_server.SYSTEM_LOGS_COLLECTION].batches[0][0]['message'] == "bye"
+
+    def test_invalid_document_only_affects_itself(self, monkeypatch):
+        monkeypatch.setattr(simple_mcp_server, 'LOG_FLUSH_INTERVAL', 60)
+        mcp_logger = MQTTMCPLogger(start=False)
+        mcp_logger.db = RecordingDatabase()
+        collection = mcp_logger.db[simple_mcp_server.TOOL_CALLS_COLLECTION] = EncodingCollection()
+        mcp_logger.start()
+
+        mcp_logger.log_tool_call("mqtt_collect", {}, True, 0.1, {'status': 'success', 'payload': {1: 'int key'}})
+        for index in range(3):
+            mcp_logger.log_tool_call("mqtt_publish", {'index': index}, True, 0.01, {'status': 'success'})
+        mcp_logger.close()
+
+        docs = [doc for batch in collection.batches for doc in batch]
+        assert len(docs) == 4
+        assert docs[0]['result']['payload'] == {'1': 'int key'}
+        assert docs[1]['params'] == {'index': 0}
+        assert mcp_logger.get_stats()['written'] == 4
+        assert mcp_logger.get_stats()['failed'] == 0
+
+    def test_bulk_write_error_counts_inserted_documents(self):
+        class PartialCollection:
+            def insert_many(self, docs, ordered=True):
+                raise BulkWriteError({'nInserted': len(docs) - 1, 'writeErrors': [{'index': 0, 'code': 2}]})
+
+        mcp_logger = MQTTMCPLogger(start=False)
+        mcp_logger.db = {simple_mcp_server.SYSTEM_LOGS_COLLECTION: PartialCollection()}
+        mcp_logger._write_batch([(simple_mcp_server.SYSTEM_LOGS_COLLECTION, {'message': str(index)})
+                                 for index in range(5)])
+
+        assert mcp_logger.stats['written'] == 4
+        assert mcp_logger.stats['failed'] == 1
@@ -0,0 +1,123 @@
+"""
+Tests für den Message Ring Buffer (Always-on Capture pro Session)
+"""
+
+import pytest
+import time
+import sys
+import os
+
+import aiomqtt
+from cryptography.fernet import Fernet
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from message_buffer import MessageRingBuffer, topic_matches, pattern_covers
+from mqtt_connection_manager import MQTTSession
+
+
+def make_message(topic: str, payload: bytes = b"1") -> aiomqtt.Message:
+    return aiomqtt.Message(topic, payload, 0, False, 1, None)
+
+
+class TestTopicPatterns:
+    """Topic Matching und Pattern Abdeckung"""
+
+    @pytest.mark.parametrize("topic,pattern,expected", [
+        ("sensor/a/temp", "sensor/+/temp", True),
+        ("sensor/a/temp", "sensor/#", True),
+        ("sensor", "sensor/#", True),
+        ("sensor/a/b/temp", "sensor/+/temp", False),
+        ("sensor/a", "sensor/a/temp", False),
+        ("$SYS/broker/uptime", "#", False),
+        ("$SYS/broker/uptime", "$SYS/#", True),
+    ])
+    def test_topic_matches(self, topic, pattern, expected):
+        assert topic_matches(topic, pattern) is expected
+
+    @pytest.mark.parametrize("capture,pattern,expected", [
+        ("#", "sensor/+/temp", True),
+        ("#", "#", True),
+        ("sensor/#", "sensor/+/temp", True),
+        ("sensor/+/temp", "sensor/a/temp", True),
+        ("sensor/+/temp", "sensor/#", False),
+        ("sensor/#", "#", False),
+        ("sensor/a/temp", "sensor/+/temp", False),
+        ("#", "$SYS/#", False),
+    ])
+    def test_pattern_covers(self, capture, pattern, expected):
+        assert pattern_covers(capture, pattern) is expected
+
+
+class TestMessageRingBuffer:
+    """Ring Buffer mit Index pro Topic"""
+
+    def test_eviction_keeps_topic_index_consistent(self):
+        buffer = MessageRingBuffer('#', max_messages=3)
+        for topic in ["a/1", "b/1", "a/1", "c/1", "a/1"]:
+            buffer.append(make_message(topic))
+
+        assert len(buffer) == 3
+        assert buffer.messages_evicted == 2
+        assert sorted(buffer.topics(["#"])) == ["a/1", "c/1"]
+        assert [entry.topic for entry in buffer.query(["#"], 60)] == ["a/1", "c/1", "a/1"]
+
+    def test_byte_limit(self):
+        buffer = MessageRingBuffer('#', max_messages=100, max_bytes=10)
+        for _ in range(5):
+            buffer.append(make_message("a/b", b"1234"))
+        assert len(buffer) == 2
+        assert buffer.get_stats()['buffered_bytes'] == 8
+
+    def test_query_window_and_limit(self):
+        buffer = MessageRingBuffer('#')
+        now = time.time()
+        buffer.append(make_message("sensor/a/temp"), received_at=now - 120)
+        for index in range(5):
+            buffer.append(make_message("sensor/a/temp", str(index).encode()), received_at=now - 5 + index)
+        buffer.append(make_message("sensor/a/humidity"), received_at=now)
+
+        entries = buffer.query(["sensor/+/temp"], 60)
+        assert [entry.message.payload for entry in entries] == [b"0", b"1", b"2", b"3", b"4"]
+
+        latest = buffer.query(["sensor/#"], 60, limit=2)
+        assert [entry.topic for entry in latest] == ["sensor/a/temp", "sensor/a/humidity"]
+
+    def test_covers_requires_gapless_capture(self):
+        buffer = MessageRingBuffer('sensor/#')
+        assert buffer.covers(["sensor/+/temp"], 10) is False
+
+        buffer.mark_covered(time.time() - 30)
+        assert buffer.covers(["sensor/+/temp"], 10) is True
+        assert buffer.covers(["sensor/+/temp"], 60) is False
+        assert buffer.covers(["device/#"], 10) is False
+
+        buffer.mark_gap()
+        assert buffer.covers(["sensor/+/temp"], 10) is False
+
+    def test_covers_false_after_eviction_in_window(self):
+        buffer = MessageRingBuffer('#', max_messages=1)
+        buffer.mark_covered(time.time() - 30)
+        buffer.append(make_message("a/b"))
+        buffer.append(make_message("a/b"))
+        assert buffer.covers(["a/b"], 10) is False
+
+
+class TestSessionCapture:
+    """Session Dispatcher füllt den Buffer"""
+
+    @pytest.mark.asyncio
+    async def test_dispatch_fills_buffer(self):
+        session = MQTTSession("test-session-0002", "mqtt://127.0.0.1:1883", Fernet(Fernet.generate_key()))
+        await session.start_buffer("sensor/#", max_messages=100)
+        assert "sensor/#" in session.subscribed_topics
+
+        session._dispatch(make_message("sensor/a/temp"))
+        session._dispatch(make_message("device/b/status"))
+        assert len(session.message_buffer) == 1
+        assert session.to_dict()['message_buffer']['buffered_messages'] == 1
+
+        await session.stop_buffer()
+        assert session.message_buffer is None
+        assert session.subscribed_topics == set()
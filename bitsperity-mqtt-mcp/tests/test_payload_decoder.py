@@ -0,0 +1,135 @@
+"""
+Tests für den Payload Decoder (Decode-once Pipeline)
+"""
+
+import pytest
+import base64
+import json
+import sys
+import os
+
+import aiomqtt
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import payload_decoder
+from payload_decoder import MessageRecord, decode_payload, get_decoded
+from message_pruner import SimpleMessagePruner, SchemaAccumulator
+from mqtt_tools import MQTTTools
+
+
+class TestDecodePayload:
+    """Typ Erkennung und geparste Werte"""
+
+    @pytest.mark.parametrize("payload,payload_type,value", [
+        (b'{"temperature": 21.5}', 'json', {'temperature': 21.5}),
+        (b' [1, 2] ', 'json', [1, 2]),
+        (b'{not json', 'text', '{not json'),
+        (b'-12.5', 'number', -12.5),
+        (b'ON', 'text', 'ON'),
+        (b'', 'empty', None),
+        (None, 'empty', None),
+        (42, 'number', 42.0),
+        ('{"a": 1}', 'json', {'a': 1}),
+        (b'deadbeef00112233', 'hex', 'deadbeef00112233'),
+        (base64.b64encode(b'\x00\x01binary\xff\xfe').decode(), 'base64', base64.b64encode(b'\x00\x01binary\xff\xfe').decode()),
+        (b'ThisIsJustALongWord', 'text', 'ThisIsJustALongWord'),
+        (b'\xff\xfe\x00\x01', 'binary', None),
+        ('<binary data: 1024 bytes>', 'binary', None),
+    ])
+    def test_types(self, payload, payload_type, value):
+        decoded = decode_payload(payload)
+        assert decoded.payload_type == payload_type
+        assert decoded.value == value
+
+    def test_json_fallback_for_nan(self):
+        decoded = decode_payload(b'{"value": NaN}')
+        assert decoded.payload_type == 'json'
+        assert decoded.value['value'] != decoded.value['value']
+
+    def test_msgpack(self):
+        msgpack = pytest.importorskip("msgpack")
+        decoded = decode_payload(msgpack.packb({'temperature': 21, 'tags': ['a']}))
+        assert decoded.payload_type == 'msgpack'
+        assert decoded.value == {'temperature': 21, 'tags': ['a']}
+        assert decoded.raw_text.startswith('<binary data:')
+
+    def test_msgpack_bytes_and_non_str_keys_are_json_safe(self):
+        msgpack = pytest.importorskip("msgpack")
+        payload = msgpack.packb({'blob': b'\x00\xffraw', 1: 'one', 'nested': [{2: b'ab'}]})
+        decoded = decode_payload(payload)
+
+        assert decoded.payload_type == 'msgpack'
+        assert decoded.value == {
+            'blob': base64.b64encode(b'\x00\xffraw').decode(),
+            '1': 'one',
+            'nested': [{'2': base64.b64encode(b'ab').decode()}]
+        }
+        json.dumps({'payload': decoded.display})
+
+    def test_msgpack_bytes_key(self):
+        msgpack = pytest.importorskip("msgpack")
+        decoded = decode_payload(msgpack.packb({b'name': 1, b'\xff': 2}, use_bin_type=True))
+        assert decoded.value == {'name': 1, base64.b64encode(b'\xff').decode(): 2}
+
+    def test_cbor_datetime_is_json_safe(self):
+        cbor2 = pytest.importorskip("cbor2")
+        import datetime
+        timestamp = datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+        decoded = decode_payload(cbor2.dumps({'ts': timestamp, 7: b'\x01'}))
+        assert decoded.value == {'ts': timestamp.isoformat(), '7': 'AQ=='}
+        json.dumps(decoded.display)
+
+    def test_cbor(self):
+        cbor2 = pytest.importorskip("cbor2")
+        decoded = decode_payload(cbor2.dumps({'temperature': 21}))
+        assert decoded.payload_type == 'cbor'
+        assert decoded.value == {'temperature': 21}
+
+    def test_stdlib_json_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(payload_decoder, 'orjson', None)
+        assert decode_payload(b'{"a": [1, 2]}').value == {'a': [1, 2]}
+
+
+class TestMessageRecord:
+    """Records tragen den dekodierten Payload weiter"""
+
+    def make_record(self, payload: bytes) -> MessageRecord:
+        tools = MQTTTools.__new__(MQTTTools)
+        return tools._message_record(aiomqtt.Message("device/pump1/status", payload, 0, False, 1, None))
+
+    def test_record_serializes_as_dict(self):
+        record = self.make_record(b'{"status": "error", "code": 3}')
+
+        assert isinstance(record, dict)
+        assert record['payload'] == {'status': 'error', 'code': 3}
+        assert record['payload_type'] == 'json'
+        assert 'decoded' not in json.loads(json.dumps(record))
+        assert get_decoded(record) is record.decoded
+
+    def test_downstream_reuses_decoded_value(self, monkeypatch):
+        record = self.make_record(b'{"status": "error", "meta": {"fw": "1.2"}}')
+
+        def fail(*args, **kwargs):
+            raise AssertionError("payload parsed twice")
+
+        monkeypatch.setattr(payload_decoder, 'loads_json', fail)
+        monkeypatch.setattr(payload_decoder.json, 'loads', fail)
+
+        assert SimpleMessagePruner()._is_error_message(record)
+        accumulator = SchemaAccumulator()
+        accumulator.add(record)
+        assert 'meta.fw' in accumulator.to_dict()['topic_schemas']['device/pump1/status']['fields']
+
+    def test_msgpack_record_is_serializable(self):
+        msgpack = pytest.importorskip("msgpack")
+        record = self.make_record(msgpack.packb({'blob': b'\x00\x01', 5: True}))
+        assert json.loads(json.dumps({'messages': [record]}))['messages'][0]['payload'] == {
+            'blob': 'AAE=', '5': True
+        }
+
+    def test_binary_record(self):
+        record = self.make_record(b'\xff\x00\xfe')
+        assert record['payload'] == '<binary data: 3 bytes>'
+        assert record['payload_type'] == 'binary'
@@ -9,12 +9,17 @@ import asyncio
 import sys
 import os
 import json
+import random
+import statistics
 
 # Import der zu testenden Module
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from simple_mcp_server import SimpleMCPServer
-from message_pruner import SimpleMessagePruner, SchemaDetector
+from message_pruner import SimpleMessagePruner, SchemaDetector, SchemaAccumulator, StreamingMessageCollector
+
+# Langlaufende Benchmarks nur mit RUN_SLOW_TESTS=1
+slow = pytest.mark.skipif(not os.environ.get('RUN_SLOW_TESTS'), reason="slow benchmark, set RUN_SLOW_TESTS=1")
 
 
 class TestPhase3MessagePruning:
@@ -143,6 +148,75 @@ class TestPhase3MessagePruning:
         assert result['pruned_messages'] == []
 
 
+class TestPhase3StreamingCollector:
+    """Test Streaming Collection mit Reservoir Sampling und Early Stop"""
+    
+    @staticmethod
+    def make_record(index, topic='sensor/device1/temperature', payload=None):
+        payload = payload or f'{{"temperature": {index}}}'
+        return {'topic': topic, 'payload': payload, 'payload_raw': payload, 'timestamp': str(index)}
+    
+    def test_constant_memory_and_selection(self):
+        """Reservoir pro Topic, Errors und Boundaries bleiben begrenzt"""
+        collector = StreamingMessageCollector(target_count=50, per_topic_samples=5, rng=random.Random(1))
+        
+        for i in range(10000):
+            collector.add(self.make_record(i, topic=f'sensor/device{i % 20}/temperature'))
+            if i % 1000 == 500:
+                collector.add(self.make_record(i, topic='alarm/device1/error', payload='{"error": "overheat"}'))
+        
+        assert collector.total_messages == 10010
+        assert all(len(collector._reservoirs[f'sensor/device{i}/temperature'][1]) == 5 for i in range(20))
+        assert collector._reservoirs['alarm/device1/error'][1] == []
+        
+        messages = collector.get_messages()
+        assert len(messages) == 50
+        assert messages[0]['timestamp'] == '0'
+        assert messages[-1]['timestamp'] == '9999'
+        assert sum(1 for msg in messages if msg['topic'] == 'alarm/device1/error') == 10
+        assert len(set(msg['topic'] for msg in messages)) == 21
+        
+        stats = collector.get_stats()
+        assert stats['unique_topics'] == 21
+        assert stats['error_messages_seen'] == 10
+        assert stats['stop_reason'] == 'timeout'
+    
+    def test_reservoir_is_uniform_over_window(self):
+        """Samples stammen nicht nur vom Anfang der Collection"""
+        collector = StreamingMessageCollector(target_count=20, boundary_count=0, per_topic_samples=20,
+                                              rng=random.Random(7))
+        for i in range(5000):
+            collector.add(self.make_record(i))
+        
+        indexes = [int(msg['timestamp']) for msg in collector.get_messages()]
+        assert len(indexes) == 20
+        assert any(index > 2500 for index in indexes)
+        assert any(index < 2500 for index in indexes)
+    
+    def test_stop_after_messages(self):
+        collector = StreamingMessageCollector(stop_after_messages=3)
+        assert [collector.add(self.make_record(i)) for i in range(3)] == [False, False, True]
+        assert collector.stop_reason == 'message_count'
+    
+    def test_stop_predicate(self):
+        collector = StreamingMessageCollector(stop_predicate=lambda record: '"temperature": 42' in record['payload_raw'])
+        stopped_at = next(i for i in range(100) if collector.add(self.make_record(i)))
+        
+        assert stopped_at == 42
+        assert collector.stop_reason == 'match'
+        assert collector.matched_message['timestamp'] == '42'
+        assert collector.get_messages()[-1]['timestamp'] == '42'
+    
+    def test_expected_topics(self):
+        collector = StreamingMessageCollector(expected_topics=['device/pump1/status', 'sensor/+/temperature'])
+        
+        assert not collector.add(self.make_record(0))
+        assert collector.missing_topics == ['device/pump1/status']
+        assert collector.add(self.make_record(1, topic='device/pump1/status', payload='on'))
+        assert collector.stop_reason == 'expected_topics'
+        assert collector.missing_topics == []
+
+
 class TestPhase3SchemaDetection:
     """Test Schema Detection Functionality"""
     
@@ -291,6 +365,93 @@ class TestPhase3SchemaDetection:
         assert result['common_fields'] == {}
 
 
+class TestPhase3SchemaAccumulator:
+    """Test inkrementelle, mergeable Schema Inference"""
+    
+    @staticmethod
+    def make_messages(start, stop):
+        return [{
+            'topic': f'sensor/{i % 3}/data',
+            'payload': json.dumps({
+                'temperature': 20 + i % 7,
+                'meta': {'device': f'dev-{i}', 'tags': ['a', 'b']},
+                'ok': True
+            })
+        } for i in range(start, stop)]
+    
+    def test_nested_fields_and_numeric_stats(self):
+        accumulator = SchemaAccumulator()
+        for message in self.make_messages(0, 100):
+            accumulator.add(message)
+        
+        schema = accumulator.to_dict()['topic_schemas']['sensor/+/data']
+        fields = schema['fields']
+        assert set(fields) == {'temperature', 'meta', 'meta.device', 'meta.tags', 'meta.tags[]', 'ok'}
+        assert fields['meta']['types'] == {'object': 100}
+        assert fields['meta.tags[]']['count'] == 200
+        assert fields['ok']['types'] == {'boolean': 100}
+        
+        values = [20 + i % 7 for i in range(100)]
+        numeric = fields['temperature']['numeric']
+        assert numeric['min'] == 20 and numeric['max'] == 26
+        assert numeric['mean'] == pytest.approx(statistics.fmean(values), abs=1e-4)
+        assert numeric['variance'] == pytest.approx(statistics.pvariance(values), abs=1e-4)
+        
+        assert 70 <= fields['meta.device']['string']['distinct_estimate'] <= 130
+        assert fields['meta.device']['string']['examples'] == ['dev-0', 'dev-1', 'dev-2']
+    
+    def test_merge_matches_single_pass(self):
+        single = SchemaAccumulator()
+        for message in self.make_messages(0, 300):
+            single.add(message)
+        
+        merged = SchemaAccumulator()
+        for start in (0, 100, 200):
+            batch = SchemaAccumulator()
+            for message in self.make_messages(start, start + 100):
+                batch.add(message)
+            merged.merge(batch)
+        
+        single_fields = single.to_dict()['topic_schemas']['sensor/+/data']['fields']
+        merged_fields = merged.to_dict()['topic_schemas']['sensor/+/data']['fields']
+        assert merged.message_count == 300
+        assert merged_fields['temperature'] == single_fields['temperature']
+        assert merged_fields['meta.device']['string'] == single_fields['meta.device']['string']
+    
+    def test_cardinality_estimate(self):
+        accumulator = SchemaAccumulator()
+        for i in range(5000):
+            accumulator.add({'topic': 'device/state', 'payload': {'id': f'device-{i % 2000}', 'mode': 'auto'}})
+        
+        fields = accumulator.to_dict()['topic_schemas']['device/state']['fields']
+        assert fields['mode']['string']['distinct_estimate'] == 1
+        assert 1400 <= fields['id']['string']['distinct_estimate'] <= 2600
+    
+    def test_decoded_record_payloads(self):
+        """Message Records mit bereits dekodiertem JSON werden als json erkannt"""
+        accumulator = SchemaAccumulator()
+        accumulator.add({'topic': 'a/b', 'payload': {'value': 1}, 'payload_raw': '{"value": 1}'})
+        accumulator.add({'topic': 'a/b', 'payload': '42'})
+        accumulator.add({'topic': 'a/b', 'payload': '<binary data: 8 bytes>'})
+        
+        assert accumulator.to_dict()['payload_types'] == {'json': 1, 'number': 1, 'binary': 1}
+    
+    def test_stability_and_budget(self):
+        accumulator = SchemaAccumulator(max_patterns=1, max_fields=2)
+        assert accumulator.add({'topic': 'a/b', 'payload': {'x': 1, 'y': 2, 'z': 3}})
+        for _ in range(10):
+            assert not accumulator.add({'topic': 'a/b', 'payload': {'x': 1}})
+        assert accumulator.is_stable(10)
+        assert not accumulator.is_stable(11)
+        
+        assert accumulator.add({'topic': 'a/b', 'payload': {'x': 'text'}})
+        assert not accumulator.add({'topic': 'c/d', 'payload': '1'})
+        
+        result = accumulator.to_dict()
+        assert result['topic_schemas']['a/b']['fields_dropped'] == 1
+        assert result['schema_summary']['messages_dropped'] == 1
+
+
 class TestPhase3ToolIntegration:
     """Test Phase 3 Tool Integration"""
     
@@ -385,6 +546,38 @@ class TestPhase3Performance:
         assert 'processing_time_seconds' in result
         assert result['processing_time_seconds'] > 0
     
+    @pytest.mark.parametrize("message_count,max_seconds", [
+        (10000, 2.0),
+        pytest.param(100000, 20.0, marks=slow),
+    ])
+    def test_pruning_benchmark(self, message_count, max_seconds):
+        """Micro-Benchmark: Pruning Zeit für 10k und 100k Messages (Ausgabe mit -s)"""
+        import time
+        
+        messages = []
+        for i in range(message_count):
+            is_error = i % 997 == 0
+            messages.append({
+                'topic': f'sensor/device{i % 100}/' + ('error' if is_error else 'data'),
+                'payload': f'{{"value": {i}, "status": "ok"}}',
+                'qos': 0,
+                'retain': False,
+                'timestamp': f'2025-01-23T10:00:00.{i:06d}Z'
+            })
+        
+        pruner = SimpleMessagePruner(target_count=50)
+        
+        start_time = time.perf_counter()
+        result = pruner.prune_messages(messages, target_count=50)
+        processing_time = time.perf_counter() - start_time
+        
+        print(f"\nprune_messages: {message_count} messages -> {result['pruned_count']} "
+              f"in {processing_time * 1000:.0f} ms ({processing_time / message_count * 1e6:.2f} µs/message)")
+        
+        assert processing_time < max_seconds
+        assert result['pruned_count'] == 50
+        assert result['pruning_stats']['error_messages_preserved'] == min(50, len(range(0, message_count, 997)))
+    
     def test_schema_analysis_performance(self):
         """Test that schema analysis is reasonably fast"""
         import time
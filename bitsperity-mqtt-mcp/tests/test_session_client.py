@@ -0,0 +1,112 @@
+"""
+Tests für den langlebigen MQTT Client pro Session
+Dispatcher, Subscription Refcounting und Verbindungsstatus (ohne Broker)
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+
+import aiomqtt
+from cryptography.fernet import Fernet
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mqtt_connection_manager import MQTTSession, MessageSubscription
+
+
+def make_message(topic: str, payload: bytes = b"1") -> aiomqtt.Message:
+    return aiomqtt.Message(topic, payload, 0, False, 1, None)
+
+
+@pytest.fixture
+def session():
+    """Session ohne Verbindung (kein Broker nötig)"""
+    return MQTTSession("test-session-0001", "mqtt://127.0.0.1:1883", Fernet(Fernet.generate_key()))
+
+
+class TestSessionDispatcher:
+    """Verteilung eingehender Messages an Tool Subscriptions"""
+
+    @pytest.mark.asyncio
+    async def test_dispatch_to_matching_subscriptions(self, session):
+        async with session.subscribe("sensor/+/temp") as temps, session.subscribe("sensor/#") as everything:
+            session._dispatch(make_message("sensor/a/temp"))
+            session._dispatch(make_message("sensor/a/humidity"))
+            session._dispatch(make_message("device/b/status"))
+
+            assert temps.queue.qsize() == 1
+            assert everything.queue.qsize() == 2
+            message = await asyncio.wait_for(temps.__anext__(), timeout=1)
+            assert message.topic.value == "sensor/a/temp"
+
+        assert session.messages_received == 3
+
+    @pytest.mark.asyncio
+    async def test_multiple_patterns_deliver_once(self, session):
+        async with session.subscribe(["device/pump1/#", "device/+/status"]) as subscription:
+            session._dispatch(make_message("device/pump1/status"))
+            assert subscription.queue.qsize() == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_messages(self):
+        subscription = MessageSubscription(["#"], maxsize=2)
+        for _ in range(5):
+            subscription.deliver(make_message("a/b"))
+        assert subscription.queue.qsize() == 2
+        assert subscription.dropped == 3
+
+
+class TestSessionSubscriptions:
+    """Broker Subscriptions werden pro Pattern gezählt"""
+
+    @pytest.mark.asyncio
+    async def test_pattern_refcount(self, session):
+        async with session.subscribe("sensor/#"):
+            async with session.subscribe("sensor/#", qos=1):
+                assert session._pattern_refs["sensor/#"] == 2
+                assert session._pattern_qos["sensor/#"] == 1
+            assert session._pattern_refs["sensor/#"] == 1
+            assert "sensor/#" in session.subscribed_topics
+
+        assert session._pattern_refs == {}
+        assert session.subscribed_topics == set()
+        assert session._subscriptions == []
+
+    @pytest.mark.asyncio
+    async def test_subscription_removed_on_error(self, session):
+        with pytest.raises(RuntimeError):
+            async with session.subscribe("alarm/#"):
+                raise RuntimeError("tool failed")
+
+        assert session._subscriptions == []
+        assert session._pattern_refs == {}
+
+
+class TestSessionConnectionState:
+    """Verbindungsstatus ohne laufenden Client"""
+
+    @pytest.mark.asyncio
+    async def test_wait_connected_without_client(self, session):
+        assert await session.wait_connected(timeout=0.1) is False
+
+    @pytest.mark.asyncio
+    async def test_publish_requires_connection(self, session):
+        with pytest.raises(aiomqtt.MqttError):
+            await session.publish("a/b", "x")
+
+    @pytest.mark.asyncio
+    async def test_connect_refused(self, session):
+        session.parsed_connection['port'] = 1
+        assert await session.connect() is False
+        assert "MQTT Error" in session.connection_error
+        assert session.reconnect_count == 0
+        await session.disconnect()
+
+    def test_client_options(self, session):
+        options = session.client_options()
+        assert options['identifier'] == "bitsperity-mqtt-mcp-test-ses"
+        assert options['hostname'] == "127.0.0.1"
+        assert 'username' not in options
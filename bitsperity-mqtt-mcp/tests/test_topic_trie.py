@@ -0,0 +1,95 @@
+"""
+Tests für den Topic Trie (Topic Discovery mit Wildcard Abfragen)
+"""
+
+import pytest
+import sys
+import os
+
+import aiomqtt
+from cryptography.fernet import Fernet
+
+# Import der zu testenden Module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from topic_trie import TopicTrie, topic_matches
+from mqtt_connection_manager import MQTTSession
+
+
+TOPICS = [
+    "sensor",
+    "sensor/a/temp",
+    "sensor/a/humidity",
+    "sensor/b/temp",
+    "sensor/b/x/temp",
+    "device/1/status",
+    "$SYS/broker/uptime",
+]
+
+
+@pytest.fixture
+def trie():
+    trie = TopicTrie()
+    for topic in TOPICS:
+        trie.observe(topic, timestamp=1000.0)
+    return trie
+
+
+class TestTopicTrie:
+    """Trie Aufbau und Wildcard Abfragen"""
+
+    def test_observe_counts(self, trie):
+        trie.observe("sensor/a/temp", timestamp=2000.0)
+
+        assert len(trie) == len(TOPICS)
+        node = trie.get("sensor/a/temp")
+        assert node.messages == 2
+        assert node.last_seen == 2000.0
+        assert trie.get("sensor/a") is None
+        assert trie.root.children["sensor"].subtree_topics == 5
+        assert trie.root.children["sensor"].subtree_messages == 6
+
+    @pytest.mark.parametrize("pattern", [
+        "#", "+", "sensor/#", "sensor/+/temp", "+/+/temp", "+/a/#",
+        "sensor/a/temp", "$SYS/#", "$SYS/+/uptime", "missing/#",
+    ])
+    def test_match_agrees_with_topic_matches(self, trie, pattern):
+        expected = sorted(topic for topic in TOPICS if topic_matches(topic, pattern))
+        assert sorted(topic for topic, _ in trie.match(pattern)) == expected
+
+    def test_max_topics(self):
+        trie = TopicTrie(max_topics=2)
+        assert trie.observe("a/1")
+        assert trie.observe("a/2")
+        assert not trie.observe("a/3")
+        assert trie.observe("a/1")
+        assert len(trie) == 2
+        assert trie.get_stats()['topics_dropped'] == 1
+        assert trie.get("a/3") is None
+
+    def test_summary(self, trie):
+        for _ in range(3):
+            trie.observe("device/1/status", timestamp=1000.0)
+
+        summary = trie.summary("#", max_depth=1, max_children=1)
+        assert summary['topics'] == 6
+        assert summary['messages'] == 9
+        assert [child['path'] for child in summary['children']] == ["sensor"]
+        assert summary['more_children'] == 1
+        assert 'children' not in summary['children'][0]
+
+        sensor = trie.summary("sensor/+/temp")
+        assert sensor['topics'] == 2
+        assert [child['path'] for child in sensor['children'][0]['children']] == ["sensor/a", "sensor/b"]
+
+
+class TestSessionTopicTrie:
+    """Session Dispatcher pflegt den Trie"""
+
+    def test_dispatch_observes_topics(self):
+        session = MQTTSession("test-session-0003", "mqtt://127.0.0.1:1883", Fernet(Fernet.generate_key()))
+        for topic in ["sensor/a/temp", "sensor/a/temp", "sensor/b/temp"]:
+            session._dispatch(aiomqtt.Message(topic, b"1", 0, False, 1, None))
+
+        assert session.to_dict()['known_topics'] == 2
+        assert session.topic_trie.get("sensor/a/temp").messages == 2